@@ -0,0 +1,80 @@
+"""Offline tools for the partitioned analytics log: import the legacy JSONL file, scan a time range, seal stale segments."""
+import argparse
+import collections
+import json
+import os
+import sys
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.analytics import ANALYTICS_DIR
+from src.analytics_storage import EVENT_FORMAT, EVENT_FORMATS, PartitionedEventLog, iter_events, load_manifest, parse_ts, seal_stale_segments, select_segments
+from src.event_schema import normalize
+
+
+def import_legacy(path: str, root: str, partition: str, fmt: str = EVENT_FORMAT) -> int:
+    """Copies a single-file analytics log into partitions (applying the event schemas), sealing every segment."""
+    log = PartitionedEventLog(root, partition=partition, max_segment_seconds=float("inf"), format=fmt)
+    imported = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entry = normalize(entry)
+            log.write_lines([log.encode(entry)], [entry])
+            imported += 1
+    log.close()
+    return imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dir", default=ANALYTICS_DIR or "analytics_logs", help="Partitioned analytics directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="Import a legacy analytics_log.jsonl")
+    imp.add_argument("path")
+    imp.add_argument("--partition", choices=["hour", "day"], default="hour")
+    imp.add_argument("--format", choices=EVENT_FORMATS, default=EVENT_FORMAT, help="Encoding of the new segments")
+    scan = sub.add_parser("scan", help="Print or count events in a time range (UTC ISO timestamps)")
+    scan.add_argument("--start")
+    scan.add_argument("--end")
+    scan.add_argument("--event", action="append", help="Only these event names (repeatable)")
+    scan.add_argument("--count", action="store_true", help="Print counts per event instead of the events")
+    seal = sub.add_parser("seal-stale", help="Seal and compress segments left open by crashed processes")
+    seal.add_argument("--older-than", type=float, default=7200, help="Seconds since the segment was last written")
+    sub.add_parser("manifest", help="Summarize the manifest")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        print(f"Imported {import_legacy(args.path, args.dir, args.partition, args.format)} events into {args.dir}")
+    elif args.command == "scan":
+        start, end = parse_ts(args.start) if args.start else None, parse_ts(args.end) if args.end else None
+        segments = select_segments(args.dir, start, end)
+        events = iter_events(args.dir, start, end, set(args.event) if args.event else None)
+        if args.count:
+            counts = collections.Counter(e.get("event") for e in events)
+            for name, n in counts.most_common():
+                print(f"{n:>8}  {name}")
+            print(f"{sum(counts.values()):>8}  total ({len(segments)} segments read)", file=sys.stderr)
+        else:
+            for event in events:
+                print(json.dumps(event))
+    elif args.command == "seal-stale":
+        print(f"Sealed {seal_stale_segments(args.dir, args.older_than)} segments")
+    else:
+        segments = load_manifest(args.dir)["segments"]
+        partitions = collections.Counter(s["partition"] for s in segments)
+        raw = sum(s.get("bytes", 0) for s in segments)
+        stored = sum(s.get("compressed_bytes", s.get("bytes", 0)) for s in segments)
+        print(f"segments={len(segments)} partitions={len(partitions)} events={sum(s['events'] for s in segments)} "
+              f"open={sum(s['status'] == 'open' for s in segments)} raw_bytes={raw} stored_bytes={stored}")
+
+
+if __name__ == "__main__":
+    main()
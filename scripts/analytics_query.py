@@ -0,0 +1,60 @@
+"""Ingests analytics events into a columnar store and answers funnel, phase dwell time and skip rate questions.
+
+    python scripts/analytics_query.py ingest --source analytics_logs --output events.parquet
+    python scripts/analytics_query.py funnel --data events.parquet
+    python scripts/analytics_query.py dwell --data events.parquet
+    python scripts/analytics_query.py skips --data events.sqlite
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.analytics_columnar import QUERY_EVENTS, EventColumns, format_rows, funnel, ingest, phase_dwell_times, skip_rates
+from src.workflows.value_prop import PHASE_ORDER
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    ing = sub.add_parser("ingest", help="Convert events to Parquet (.parquet) or an indexed SQLite table")
+    ing.add_argument("--source", default="analytics_logs", help="Partitioned analytics directory or a JSONL file")
+    ing.add_argument("--output", default="analytics_events.parquet")
+    for name in ("funnel", "dwell", "skips"):
+        query = sub.add_parser(name)
+        query.add_argument("--data", default="analytics_events.parquet", help="Output of the ingest command")
+        query.add_argument("--json", action="store_true", help="Print rows as JSON")
+        if name == "funnel":
+            query.add_argument("--phases", nargs="*", default=PHASE_ORDER,
+                               help="Funnel steps in order (default: the value proposition phase order)")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    start = time.perf_counter()
+    if args.command == "ingest":
+        rows = ingest(args.source, args.output)
+        print(f"Ingested {rows} events into {args.output} in {time.perf_counter() - start:.2f}s")
+        return
+
+    # Dwell times need every event (a session's last event closes its last phase).
+    columns = EventColumns.load(args.data, events=None if args.command == "dwell" else QUERY_EVENTS)
+    loaded = time.perf_counter()
+    if args.command == "funnel":
+        rows = funnel(columns, args.phases)
+    elif args.command == "dwell":
+        rows = phase_dwell_times(columns)
+    else:
+        rows = skip_rates(columns)
+    done = time.perf_counter()
+    print(json.dumps(rows, indent=2) if args.json else format_rows(rows))
+    print(f"{len(columns)} events loaded in {loaded - start:.3f}s, query {done - loaded:.3f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Benchmarks the columnar analytics queries on a synthetic event log (10M events by default).
+
+Sessions walk the value proposition phases with random dwell times, skips and drop-offs,
+emitting several other events per phase. The log is generated straight into Parquet (and,
+with --sqlite, an indexed SQLite table); the line-by-line JSON baseline is measured on a
+sample of --jsonl-sample events and extrapolated to the full size.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.analytics_columnar import QUERY_EVENTS, EventColumns, funnel, phase_dwell_times, skip_rates, write_sqlite
+from src.workflows.value_prop import PHASE_ORDER
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+OTHER_EVENTS = ["user_input_submitted", "intent_classified", "phase_engine_response", "phase_engine_enter_success"]
+EVENT_NAMES = ["phase_enter", "phase_skipped"] + OTHER_EVENTS
+
+
+def synthesize(n_events: int, seed: int = 0) -> dict:
+    """Columns (ts, session, phase, event codes) for about n_events events."""
+    rng = np.random.default_rng(seed)
+    n_phases = len(PHASE_ORDER)
+    per_phase = 1 + len(OTHER_EVENTS)  # phase_enter (or phase_skipped) plus the other events
+    n_sessions = max(1, n_events // (per_phase * n_phases // 2))
+    # Each session reaches a random depth of the phase order; each step is entered or skipped.
+    depth = np.minimum(rng.geometric(0.12, n_sessions), n_phases)
+    session = np.repeat(np.arange(n_sessions), depth)
+    first_visit = np.cumsum(depth) - depth
+    phase = np.arange(len(session)) - first_visit[session]
+    skipped = rng.random(len(session)) < 0.08
+    dwell = rng.lognormal(3.5, 1.0, len(session))  # seconds per phase visit
+    session_start = rng.uniform(0, 30 * 86400, n_sessions)
+    elapsed = np.cumsum(dwell) - dwell
+    offsets = elapsed - elapsed[first_visit][session]
+    visit_ts = session_start[session] + offsets
+
+    # Expand each visit into its phase event plus the other events spread over the dwell time.
+    k = np.arange(per_phase)
+    ts = (visit_ts[:, None] + dwell[:, None] * k / per_phase).ravel()
+    event = np.where(k == 0, 0, k + 1)[None, :].repeat(len(session), axis=0)
+    event[:, 0] = np.where(skipped, 1, 0)
+    event[skipped, 1:] = -1  # a skipped phase emits nothing else
+    keep = np.flatnonzero(event.ravel() >= 0)[:n_events]
+    base = 1_700_000_000 * 10**6
+    return {
+        "ts": (base + ts * 1e6).astype(np.int64)[keep],
+        "session": np.repeat(session, per_phase)[keep],
+        "phase": np.repeat(phase, per_phase)[keep],
+        "event": event.ravel()[keep],
+    }
+
+
+def write_synthetic_parquet(data: dict, path: str):
+    schema = pa.schema([("ts", pa.timestamp("us")), ("session_id", pa.dictionary(pa.int32(), pa.string())),
+                        ("phase", pa.dictionary(pa.int32(), pa.string())),
+                        ("event", pa.dictionary(pa.int32(), pa.string()))])
+    n_sessions = int(data["session"].max()) + 1
+    table = pa.Table.from_arrays([
+        pa.array(data["ts"], type=pa.int64()).cast(pa.timestamp("us")),
+        pa.DictionaryArray.from_arrays(pa.array(data["session"], pa.int32()),
+                                       pa.array([f"s{i}" for i in range(n_sessions)])),
+        pa.DictionaryArray.from_arrays(pa.array(data["phase"], pa.int32()), pa.array(PHASE_ORDER)),
+        pa.DictionaryArray.from_arrays(pa.array(data["event"], pa.int32()), pa.array(EVENT_NAMES)),
+    ], schema=schema)
+    pq.write_table(table, path, compression="zstd", row_group_size=1_000_000)
+
+
+def json_lines(data: dict, limit: int) -> list:
+    return [json.dumps({"utc_ts": int(data["ts"][i]), "session_id": f"s{data['session'][i]}",
+                        "phase": PHASE_ORDER[data["phase"][i]], "event": EVENT_NAMES[data["event"][i]]})
+            for i in range(min(limit, len(data["ts"])))]
+
+
+def baseline_dwell(lines: list) -> dict:
+    """The current approach: parse every line, then walk each session's phase_enter events in Python."""
+    visits = {}
+    last_seen = {}
+    for line in lines:
+        event = json.loads(line)
+        last_seen[event["session_id"]] = event["utc_ts"]
+        if event["event"] == "phase_enter":
+            visits.setdefault(event["session_id"], []).append((event["utc_ts"], event["phase"]))
+    dwell = {}
+    for session_id, entries in visits.items():
+        entries.sort()
+        for (ts, phase), nxt in zip(entries, entries[1:] + [(last_seen[session_id], None)]):
+            dwell.setdefault(phase, []).append((nxt[0] - ts) / 1e6)
+    return {phase: sum(v) / len(v) for phase, v in dwell.items()}
+
+
+def timed(label: str, fn, results: list):
+    start = time.perf_counter()
+    value = fn()
+    results.append((label, time.perf_counter() - start))
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=10_000_000)
+    parser.add_argument("--jsonl-sample", type=int, default=200_000, help="Events for the line-by-line baseline")
+    parser.add_argument("--sqlite", action="store_true", help="Also load and query an indexed SQLite store")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    if pa is None:
+        sys.exit("This benchmark needs pyarrow.")
+
+    timings = []
+    data = timed("synthesize", lambda: synthesize(args.events, args.seed), timings)
+    n = len(data["ts"])
+    with tempfile.TemporaryDirectory() as tmp:
+        parquet_path = os.path.join(tmp, "events.parquet")
+        timed("parquet write", lambda: write_synthetic_parquet(data, parquet_path), timings)
+        size_mb = os.path.getsize(parquet_path) / 1e6
+        columns = timed("parquet load (all events)", lambda: EventColumns.load(parquet_path), timings)
+        timed("dwell times", lambda: phase_dwell_times(columns), timings)
+        subset = timed("parquet load (phase events)", lambda: EventColumns.load(parquet_path, QUERY_EVENTS), timings)
+        timed("funnel", lambda: funnel(subset, PHASE_ORDER), timings)
+        timed("skip rates", lambda: skip_rates(subset), timings)
+        if args.sqlite:
+            sqlite_path = os.path.join(tmp, "events.sqlite")
+            chunk = {"ts": data["ts"].tolist(), "session_id": [f"s{s}" for s in data["session"].tolist()],
+                     "workflow": ["value_prop"] * n, "phase": [PHASE_ORDER[p] for p in data["phase"].tolist()],
+                     "event": [EVENT_NAMES[e] for e in data["event"].tolist()], "attrs": [None] * n}
+            timed("sqlite write + indexes", lambda: write_sqlite([chunk], sqlite_path), timings)
+            sqlite_columns = timed("sqlite load (phase events)", lambda: EventColumns.load(sqlite_path, QUERY_EVENTS), timings)
+            timed("sqlite funnel", lambda: funnel(sqlite_columns, PHASE_ORDER), timings)
+
+    lines = json_lines(data, args.jsonl_sample)
+    timed("jsonl baseline (sample)", lambda: baseline_dwell(lines), timings)
+    extrapolated = timings[-1][1] * n / max(1, len(lines))
+
+    print(f"events={n} sessions={int(data['session'].max()) + 1} parquet_mb={size_mb:.1f}")
+    for label, seconds in timings:
+        print(f"{label:<30}{seconds:>10.3f}s")
+    columnar = dict(timings)["parquet load (all events)"] + dict(timings)["dwell times"]
+    print(f"{'jsonl dwell (extrapolated)':<30}{extrapolated:>10.3f}s  -> columnar dwell is {extrapolated / columnar:.0f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Compares the size and write cost of analytics events as JSON Lines and as binary records.
+
+A synthetic mix of the events a value-prop session logs is normalized (src/event_schema.py) and
+written through PartitionedEventLog in both formats. Reported per format: bytes per event in the
+open segment and after sealing, and microseconds per event to encode and to write.
+"""
+import argparse
+import datetime
+import logging
+import os
+import sys
+import tempfile
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src import event_codec
+from src.analytics_storage import EVENT_FORMATS, PartitionedEventLog, iter_events, load_manifest
+from src.event_schema import normalize
+from src.workflows.value_prop import PHASE_ORDER
+
+
+def synthetic_events(count: int) -> list:
+    start = datetime.datetime.utcnow() - datetime.timedelta(minutes=30)
+    events = []
+    for i in range(count):
+        phase = PHASE_ORDER[(i // 12) % len(PHASE_ORDER)]
+        envelope = {"utc_ts": (start + datetime.timedelta(milliseconds=37 * i)).isoformat(),
+                    "session_id": f"{i // 120:032x}", "workflow": "value_prop", "phase": phase}
+        kind = i % 6
+        if kind == 0:
+            fields = {"event": "user_input_submitted", "input_length": 40 + i % 200}
+        elif kind == 1:
+            fields = {"event": "intent_classified", "phase_name": phase, "workflow_name": "value_prop",
+                      "user_input": "Clinics lose revenue when patients miss follow-ups " * (1 + i % 3),
+                      "intent": "provide_detail"}
+        elif kind == 2:
+            fields = {"event": "llm_call", "call_site": "plan_turn", "ok": True, "model": "gpt-4o-mini",
+                      "latency_ms": 640.0 + i % 900, "prompt_tokens": 900 + i % 400, "completion_tokens": 180}
+        elif kind == 3:
+            fields = {"event": "phase_engine_response", "reply_length": 600 + i % 300, "next_phase_suggestion": phase}
+        elif kind == 4:
+            fields = {"event": "turn_completed", "latency_ms": 1200.0 + i % 2000}
+        else:
+            fields = {"event": "search_call", "ok": bool(i % 2), "results": 5, "latency_ms": 300.0 + i % 700}
+        events.append(normalize({**envelope, **fields}))
+    return events
+
+
+def measure(fmt: str, events: list, root: str) -> dict:
+    log = PartitionedEventLog(root, partition="day", format=fmt, max_segment_bytes=1 << 40,
+                              max_segment_seconds=float("inf"))
+    start = time.perf_counter()
+    lines = [log.encode(event) for event in events]
+    encoded = time.perf_counter() - start
+    start = time.perf_counter()
+    for i in range(0, len(events), 64):  # The analytics writer hands over batches
+        log.write_lines(lines[i:i + 64], events[i:i + 64])
+    log.fsync()
+    written = time.perf_counter() - start
+    raw_bytes = sum(len(line.encode("utf-8") if isinstance(line, str) else line) for line in lines)
+    log.close()
+    sealed_bytes = sum(os.path.getsize(os.path.join(root, s["path"])) for s in load_manifest(root)["segments"])
+    start = time.perf_counter()
+    read = sum(1 for _ in iter_events(root))
+    read_seconds = time.perf_counter() - start
+    assert read == len(events)
+    n = len(events)
+    return {"bytes": raw_bytes / n, "sealed": sealed_bytes / n, "encode_us": encoded / n * 1e6,
+            "write_us": written / n * 1e6, "read_us": read_seconds / n * 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=50_000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    events = synthetic_events(args.events)
+    results = {}
+    for fmt in EVENT_FORMATS:
+        with tempfile.TemporaryDirectory() as tmp:
+            results[fmt] = measure(fmt, events, tmp)
+    print(f"{args.events:,} events; msgpack {'installed' if event_codec.msgpack is not None else 'not installed (built-in packer)'}")
+    print(f"{'format':<8}{'bytes/event':>13}{'sealed':>9}{'encode_us':>11}{'write_us':>10}{'read_us':>9}")
+    for fmt, r in results.items():
+        print(f"{fmt:<8}{r['bytes']:>13.1f}{r['sealed']:>9.1f}{r['encode_us']:>11.2f}{r['write_us']:>10.2f}{r['read_us']:>9.2f}")
+    print(f"\nbinary is {results['jsonl']['bytes'] / results['binary']['bytes']:.1f}x smaller uncompressed, "
+          f"{results['jsonl']['sealed'] / results['binary']['sealed']:.1f}x smaller sealed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Measures logging overhead per turn and checks it against a budget.
+
+Each turn runs the value-prop phase engine against the offline fake LLM backend (no simulated
+latency), saves the session to a temporary SQLite database and logs an analytics event, so the
+hot logging sites (phase engine debug_log, save_session, log_event) all run. The same turns are
+timed under several logging setups, with output going to os.devnull. Overhead is measured
+against logging.disable(). The exit status is 1 when the default setup (INFO, JSON, queue
+handler) exceeds --budget-ms per turn.
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import streamlit as st
+
+from src import analytics, persistence_utils
+from src.core import logger as app_logging
+from src.llm_backends import FakeBackend, set_backend
+from src.workflows.value_prop import PHASE_ORDER
+from src.workflows.value_prop.persona import ValuePropCoachPersona
+from scripts.benchmark_turn_pipeline import SCRIPTED_INPUTS, load_phase_engine
+
+SAMPLED_SITES = (analytics.event_debug, persistence_utils.save_debug)
+
+
+def run_turns(sessions: int, max_turns: int) -> int:
+    turns = 0
+    for session in range(sessions):
+        st.session_state.clear()
+        st.session_state.update({"workflow": "value_prop", "phase": PHASE_ORDER[0], "scratchpad": {},
+                                 "user_id": f"bench-{session}"})
+        persona = ValuePropCoachPersona()
+        engine = load_phase_engine(PHASE_ORDER[0], persona)
+        engine.enter()
+        for _ in range(max_turns):
+            phase = st.session_state["phase"]
+            next_phase = engine.handle_response(SCRIPTED_INPUTS.get(phase, "Let's continue.")).get("next_phase")
+            if next_phase and next_phase != phase and next_phase in PHASE_ORDER:
+                st.session_state["phase"] = next_phase
+                engine = load_phase_engine(next_phase, persona)
+                engine.enter()
+            persistence_utils.save_session(st.session_state["user_id"], dict(st.session_state))
+            analytics.log_event("benchmark_turn", turn=turns)
+            turns += 1
+            if phase == PHASE_ORDER[-1]:
+                break
+    return turns
+
+
+def setup(name: str, devnull):
+    """Installs one logging setup, including the sampling rate of the hot debug sites."""
+    logging.disable(logging.NOTSET)
+    app_logging.stop_logging()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    output = logging.StreamHandler(devnull)
+    if name == "off":
+        logging.disable(logging.CRITICAL)
+        return
+    if name == "debug-text-sync":
+        # Roughly the old setup: DEBUG text records written synchronously by the calling thread.
+        output.setFormatter(logging.Formatter(app_logging.TEXT_FORMAT))
+        root.addHandler(output)
+        root.setLevel(logging.DEBUG)
+        every = 1
+    else:
+        output.setFormatter(app_logging.JsonFormatter())
+        level = logging.INFO if name == "info-json" else logging.DEBUG
+        app_logging.configure_logging(level=level, levels="", handler=output)
+        every = 1 if name == "debug-json-unsampled" else app_logging.LOG_DEBUG_SAMPLE_EVERY
+    for site in SAMPLED_SITES:
+        site.every = every
+
+
+def measure(name: str, args, devnull) -> float:
+    """Seconds per turn, including draining whatever the log queue still holds."""
+    setup(name, devnull)
+    start = time.perf_counter()
+    turns = run_turns(args.sessions, args.max_turns)
+    app_logging.stop_logging()  # Drains the queue, so deferred formatting is counted too
+    analytics.flush_events()
+    return (time.perf_counter() - start) / max(1, turns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--max-turns", type=int, default=12)
+    parser.add_argument("--rounds", type=int, default=3, help="Each setup is timed this many times; the best round counts")
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("LOG_BUDGET_MS", "0.5")),
+                        help="Allowed logging overhead per turn for the default setup")
+    args = parser.parse_args()
+
+    analytics.LOG_FILE_PATH = os.devnull
+    analytics.ANALYTICS_DIR = ""
+    # Bare-mode Streamlit warns on its own stderr handler on every session_state access; that is
+    # not app logging, so it is silenced under every setup.
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"):
+            logging.getLogger(name).setLevel(logging.ERROR)
+    set_backend(FakeBackend(sleep=False))
+    setups = ["off", "info-json", "debug-json-sampled", "debug-json-unsampled", "debug-text-sync"]
+    best = {name: float("inf") for name in setups}
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull:
+        persistence_utils.SQLITE_DB_PATH = os.path.join(tmp, "sessions.sqlite")
+        persistence_utils.ensure_db()
+        run_turns(2, args.max_turns)  # Warm up imports and caches
+        for _ in range(args.rounds):
+            for name in setups:
+                best[name] = min(best[name], measure(name, args, devnull))
+    logging.disable(logging.NOTSET)
+    app_logging.configure_logging()
+
+    baseline = best["off"]
+    print(f"{'setup':<24}{'ms/turn':>10}{'overhead_ms':>14}")
+    for name in setups:
+        print(f"{name:<24}{best[name] * 1000:>10.3f}{(best[name] - baseline) * 1000:>14.3f}")
+    overhead_ms = (best["info-json"] - baseline) * 1000
+    within = overhead_ms <= args.budget_ms
+    print(f"\ndefault setup (info-json) overhead {overhead_ms:.3f} ms/turn; budget {args.budget_ms} ms: "
+          f"{'OK' if within else 'OVER BUDGET'}")
+    sys.exit(0 if within else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Benchmarks the compiled scratchpad extraction engine against the previous per-call regex loop."""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.constants import CANONICAL_KEYS
+from src.utils.scratchpad_extractor import EXTRACTION_ENGINE, EXTRACTION_RULES
+
+DEFAULT_SESSIONS_PATH = "exported_sessions.jsonl"
+
+
+def legacy_patterns() -> dict:
+    """The pattern table as update_scratchpad used to rebuild it on every call (one list per key)."""
+    patterns = {}
+    for key, pattern, _ in EXTRACTION_RULES:
+        patterns.setdefault(key, []).append(pattern)
+    return patterns
+
+
+def legacy_extract(message: str, patterns: dict) -> dict:
+    """The old first pass: re.search pattern by pattern for every key."""
+    extracted = {}
+    for key, key_patterns in dict(patterns).items():
+        if key not in CANONICAL_KEYS:
+            continue
+        for pattern in key_patterns:
+            match = re.search(pattern, message, re.IGNORECASE)
+            if match:
+                value = next((g for g in match.groups() if g is not None), match.group(0)).strip()
+                if value.lower().startswith("that "):
+                    value = value[5:]
+                extracted[key] = value
+                break
+    return extracted
+
+
+def load_messages(path: str, roles: set) -> list:
+    messages = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            for turn in json.loads(line).get("conversation_history", []):
+                if isinstance(turn, dict) and turn.get("role") in roles and turn.get("text"):
+                    messages.append(turn["text"])
+    return messages
+
+
+def time_it(fn, messages: list, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message in messages:
+            fn(message)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", default=DEFAULT_SESSIONS_PATH, help="JSONL file of exported sessions")
+    parser.add_argument("--roles", default="user,assistant", help="Comma-separated roles whose messages are used")
+    parser.add_argument("--repeat", type=int, default=20, help="Passes over the corpus per implementation")
+    args = parser.parse_args()
+
+    messages = load_messages(args.sessions, set(args.roles.split(",")))
+    if not messages:
+        print("No messages found.")
+        return
+    patterns = legacy_patterns()
+
+    # The old code rebuilt the pattern dict on every call; include that cost.
+    legacy_seconds = time_it(lambda m: legacy_extract(m, legacy_patterns()), messages, args.repeat)
+    engine_seconds = time_it(EXTRACTION_ENGINE.extract, messages, args.repeat)
+
+    mismatches = sum(1 for m in messages if legacy_extract(m, patterns) != EXTRACTION_ENGINE.extract(m))
+    prefiltered = sum(1 for m in messages if not EXTRACTION_ENGINE.find_triggers(m))
+    calls = len(messages) * args.repeat
+
+    print(f"messages={len(messages)} repeat={args.repeat} skipped_by_prefilter={prefiltered} mismatches={mismatches}")
+    print(f"{'implementation':<16}{'total_s':>10}{'us/msg':>10}{'msgs/s':>12}")
+    for name, seconds in [("legacy", legacy_seconds), ("engine", engine_seconds)]:
+        print(f"{name:<16}{seconds:>10.3f}{seconds / calls * 1e6:>10.1f}{calls / seconds:>12.0f}")
+    print(f"speedup: {legacy_seconds / engine_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
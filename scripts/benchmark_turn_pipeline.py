@@ -0,0 +1,179 @@
+"""Benchmarks the value-prop phase-engine turn pipeline against the offline fake LLM backend.
+
+Run with TRACE_EXPORTER=file to also write per-turn spans for scripts/trace_report.py.
+"""
+import argparse
+import importlib
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import uuid
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import streamlit as st
+
+from src import analytics
+from src.core import tracing
+from src.llm_backends import FakeBackend, load_canned_responses, set_backend
+from src.llm_routing import format_route_stats, get_route_stats
+from src.personas.coach import CoachPersona
+from src.utils.scratchpad_extractor import LLMExtractionGate, get_session_extractor
+from src.workflows.value_prop import PHASE_ORDER
+from src.workflows.value_prop.persona import ValuePropCoachPersona
+
+DEFAULT_RESPONSES_PATH = "exported_sessions.jsonl"
+
+# One scripted user reply per phase; enough detail to pass micro-validation and advance.
+SCRIPTED_INPUTS = {
+    "intake": "I am a hospital administrator with fifteen years in imaging departments.",
+    "problem": "The problem is that patients miss follow-up imaging appointments after discharge.",
+    "target_customer": "Our target customers are mid-sized community hospitals with busy imaging centers.",
+    "solution": "Our solution is a text-message assistant that books and reminds patients automatically.",
+    "main_benefit": "The main benefit is a 30% reduction in missed imaging appointments within six months.",
+    "differentiator": "The key differentiator is that it integrates directly with existing scheduling systems.",
+    "use_case": "A discharged patient gets a text, picks a slot, and receives reminders until the scan.",
+    "recommendation": "summary",
+    "iteration": "summary",
+    "summary": "done",
+}
+
+
+def load_phase_engine(phase_slug: str, persona):
+    """Instantiates a value-prop phase engine using the same naming convention as streamlit_app."""
+    module = importlib.import_module(f"src.workflows.value_prop.phases.{phase_slug}")
+    class_name = "".join(part.capitalize() for part in phase_slug.split('_')) + "Phase"
+    return getattr(module, class_name)(coach_persona=persona, workflow_name="value_prop")
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_session(coach: CoachPersona, max_turns: int, timings: dict, gate_totals: dict):
+    """Drives one simulated session through the phases, timing each stage of every turn."""
+    st.session_state.clear()
+    st.session_state["workflow"] = "value_prop"
+    st.session_state["phase"] = PHASE_ORDER[0]
+    st.session_state["scratchpad"] = {}
+    persona = ValuePropCoachPersona()
+    engine = load_phase_engine(PHASE_ORDER[0], persona)
+    engine.enter()
+    history = []
+    extractor = get_session_extractor()
+    session_id = uuid.uuid4().hex[:8]
+
+    for turn_number in range(1, max_turns + 1):
+        phase = st.session_state["phase"]
+        user_input = SCRIPTED_INPUTS.get(phase, "Let's continue.")
+        turn_start = time.perf_counter()
+        turn_span = tracing.start_turn(session_id, turn_number, workflow="value_prop", phase=phase)
+
+        start = time.perf_counter()
+        history.append({"role": "user", "text": user_input})
+        # The whole history is passed, as a Streamlit rerun would; only the new message is extracted.
+        extractor.process_history(history, st.session_state["scratchpad"])
+        timings["scratchpad_extraction"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        response = engine.handle_response(user_input)
+        next_phase = response.get("next_phase")
+        if next_phase and next_phase != phase and next_phase in PHASE_ORDER:
+            st.session_state["phase"] = next_phase
+            engine = load_phase_engine(next_phase, persona)
+            engine.enter()
+        timings["phase_engine"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        reply = coach.propose_next_conversation_turn(
+            intake_answers=[], scratchpad=st.session_state["scratchpad"], phase=phase, conversation_history=history
+        )
+        history.append({"role": "assistant", "text": reply})
+        timings["coach_reply"].append(time.perf_counter() - start)
+
+        turn_span.end()
+        timings["turn"].append(time.perf_counter() - turn_start)
+        if phase == PHASE_ORDER[-1]:
+            break  # One reply to the final summary ends the session
+
+    extractor.flush(st.session_state["scratchpad"])
+    for key, value in extractor.gate.stats.items():
+        gate_totals[key] = gate_totals.get(key, 0) + value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=10, help="Number of simulated sessions")
+    parser.add_argument("--max-turns", type=int, default=12, help="Turn cap per session")
+    parser.add_argument("--latency", default="lognormal:-0.5,0.5",
+                        help="Fake LLM latency distribution, e.g. constant:0.8, uniform:0.2,1.5, normal:0.8,0.2")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the latency distribution")
+    parser.add_argument("--responses", default=DEFAULT_RESPONSES_PATH, help="JSONL of recorded sessions for canned replies")
+    parser.add_argument("--no-sleep", action="store_true", help="Sample latency but do not sleep (measures pure CPU cost)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    # Keep the benchmark from appending to the real analytics log or flooding stdout.
+    analytics.LOG_FILE_PATH = os.devnull
+    analytics.ANALYTICS_DIR = ""
+    logging.disable(logging.INFO)
+
+    responses = load_canned_responses(args.responses) if os.path.exists(args.responses) else None
+    backend = FakeBackend(responses=responses, latency=args.latency, seed=args.seed, sleep=not args.no_sleep)
+    set_backend(backend)
+
+    coach = CoachPersona()
+    timings = {"scratchpad_extraction": [], "phase_engine": [], "coach_reply": [], "turn": []}
+    gate_totals = {}
+    wall_start = time.perf_counter()
+    for _ in range(args.sessions):
+        run_session(coach, args.max_turns, timings, gate_totals)
+    wall = time.perf_counter() - wall_start
+
+    results = {
+        "sessions": args.sessions,
+        "turns": len(timings["turn"]),
+        "llm_calls": backend.call_count,
+        "latency_spec": args.latency,
+        "wall_seconds": round(wall, 3),
+        "stages": {
+            stage: {
+                "mean_ms": round(statistics.mean(values) * 1000, 2) if values else 0.0,
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+            }
+            for stage, values in timings.items()
+        },
+        "routes": get_route_stats(),
+        "scratchpad_llm_gate": LLMExtractionGate({"pending": [], "stats": gate_totals}).report(),
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"sessions={results['sessions']} turns={results['turns']} llm_calls={results['llm_calls']} "
+          f"latency={results['latency_spec']} wall={results['wall_seconds']}s")
+    print(f"{'stage':<24}{'mean_ms':>10}{'p50_ms':>10}{'p95_ms':>10}{'p99_ms':>10}")
+    for stage, row in results["stages"].items():
+        print(f"{stage:<24}{row['mean_ms']:>10}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+    print()
+    print(format_route_stats(results["routes"]))
+    gate_report = results["scratchpad_llm_gate"]
+    print()
+    print(f"scratchpad LLM gate: messages={gate_report['messages']} gated_out={gate_report['gated_out']} "
+          f"llm_calls={gate_report['llm_calls']} saved={gate_report['llm_calls_saved']} "
+          f"reduction={gate_report['call_reduction']:.0%} extraction_rate={gate_report['extraction_rate']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
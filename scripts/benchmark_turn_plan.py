@@ -0,0 +1,107 @@
+"""Compares LLM round-trips and tokens per coaching turn: the per-method chain vs. the single plan_turn() call.
+
+Replays user turns from recorded sessions against the offline fake backend, so no API key is needed.
+Token counts are the fake backend's estimates (about 4 characters per token).
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.llm_backends import FakeBackend, set_backend
+from src.llm_utils import generate_contextual_follow_up
+from src.personas.coach import CoachPersona
+
+DEFAULT_SESSIONS_PATH = "exported_sessions.jsonl"
+PLAN_REPLY = json.dumps({
+    "paraphrase": "You're focusing on how this problem shows up day to day.",
+    "coaching": "Naming who feels it most will make the value proposition sharper.",
+    "follow_up_question": "Who experiences this problem most often?",
+    "short_summary": "User describes the problem they want to solve.",
+})
+
+
+class CountingBackend(FakeBackend):
+    """FakeBackend that also totals the tokens of every call."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def complete(self, messages, model=None, **kwargs):
+        result = super().complete(messages, **({"model": model} if model else {}), **kwargs)
+        self.prompt_tokens += result["prompt_tokens"]
+        self.completion_tokens += result["completion_tokens"]
+        return result
+
+
+def load_turns(path: str, max_turns: int) -> list:
+    turns = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            session = json.loads(line)
+            scratchpad = session.get("scratchpad", {}) or {}
+            phase = session.get("stage", "problem")
+            for turn in session.get("conversation_history", []):
+                if isinstance(turn, dict) and turn.get("role") == "user" and turn.get("text"):
+                    turns.append((turn["text"], phase, scratchpad))
+                    if len(turns) >= max_turns:
+                        return turns
+    return turns
+
+
+def run(mode: str, persona: CoachPersona, turns: list) -> dict:
+    backend = CountingBackend(responses=[PLAN_REPLY] if mode == "plan" else None, sleep=False)
+    set_backend(backend)
+    fallbacks = 0
+    for text, phase, scratchpad in turns:
+        cue = persona.detect_user_cues(text, phase)
+        if mode == "plan":
+            fallbacks += persona.plan_turn(text, phase, scratchpad, cue)["source"] == "fallback"
+        else:
+            coaching = persona.coach_on_decision(phase, text, scratchpad, cue)
+            persona.paraphrase_user_input(text, cue, phase, scratchpad)
+            generate_contextual_follow_up(coaching)
+            persona.generate_short_summary(text)
+    set_backend(None)
+    n = len(turns) or 1
+    return {
+        "mode": mode,
+        "turns": len(turns),
+        "calls_per_turn": round(backend.call_count / n, 2),
+        "prompt_tokens_per_turn": round(backend.prompt_tokens / n, 1),
+        "completion_tokens_per_turn": round(backend.completion_tokens / n, 1),
+        "fallbacks": fallbacks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", default=DEFAULT_SESSIONS_PATH, help="JSONL file of recorded sessions")
+    parser.add_argument("--max-turns", type=int, default=200, help="User turns to replay")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    persona = CoachPersona()
+    turns = load_turns(args.sessions, args.max_turns)
+    rows = [run("chain", persona, turns), run("plan", persona, turns)]
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"{'mode':<8}{'turns':>7}{'calls/turn':>12}{'prompt_tok/turn':>17}{'completion_tok/turn':>21}{'fallbacks':>11}")
+    for r in rows:
+        print(f"{r['mode']:<8}{r['turns']:>7}{r['calls_per_turn']:>12}{r['prompt_tokens_per_turn']:>17}"
+              f"{r['completion_tokens_per_turn']:>21}{r['fallbacks']:>11}")
+
+
+if __name__ == "__main__":
+    main()
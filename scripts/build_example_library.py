@@ -0,0 +1,105 @@
+"""Generates the example library offline: a few examples per (phase, topic), merged into a new library version.
+
+Runs one batch job with checkpoint/resume, so an interrupted build can be restarted cheaply.
+Existing examples are kept; generated ones that duplicate an existing example are dropped.
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.brainstorm import dedupe_and_rank
+from src.example_library import DEFAULT_LIBRARY_PATH, SCHEMA_VERSION, library_version
+from src.llm_backends import DEFAULT_MODEL
+from src.llm_batch import format_batch_report, make_request, run_batch
+
+PHASE_GUIDANCE = {
+    "problem": "a specific problem statement: who struggles with what, and why it matters",
+    "target_customer": "a target customer or user described concretely enough to find and reach",
+    "solution": "a solution described by what it does for the user",
+    "main_benefit": "a main benefit, measurable where possible",
+    "differentiator": "a differentiator compared with the usual alternative",
+    "use_case": "a short scenario of one person using the solution",
+}
+
+
+def build_requests(topics: dict, per_topic: int, model: str) -> list:
+    requests = []
+    for phase, guidance in PHASE_GUIDANCE.items():
+        for topic, keywords in topics.items():
+            prompt = (
+                f"Write {per_topic} distinct examples of {guidance}, for a digital health idea about "
+                f"{topic.replace('_', ' ')} ({', '.join(keywords[:6])}). Each example is one or two sentences "
+                f"without quotation marks. Reply with only a JSON list of strings."
+            )
+            requests.append(make_request(f"{phase}|{topic}", [{"role": "user", "content": prompt}],
+                                         model=model, temperature=0.8, max_tokens=400))
+    return requests
+
+
+def parse_examples(text: str) -> list:
+    """The strings of a JSON list reply (tolerating a code fence); [] if it is not one."""
+    text = text.strip().removeprefix("```json").removeprefix("```").removesuffix("```").strip()
+    try:
+        items = json.loads(text)
+    except json.JSONDecodeError:
+        return []
+    return [item.strip() for item in items if isinstance(item, str) and item.strip()] if isinstance(items, list) else []
+
+
+def merge_library(library: dict, results: dict, model: str) -> tuple:
+    """Adds generated examples to a copy of library. Returns (new library, number added)."""
+    examples = list(library.get("examples", []))
+    added = 0
+    for custom_id, record in sorted(results.items()):
+        if record.get("status") != "ok":
+            continue
+        phase, topic = custom_id.split("|", 1)
+        existing = [e for e in examples if e["phase"] == phase and e["topic"] == topic]
+        candidates = parse_examples(record["text"])
+        kept = {text for text, _ in dedupe_and_rank([e["text"] for e in existing] + candidates, "")}
+        for text in candidates:
+            if text in kept and text not in {e["text"] for e in existing}:
+                existing.append({"id": f"{phase}.{topic}.{len(existing) + 1}", "phase": phase, "topic": topic,
+                                 "text": text, "source": model})
+                examples.append(existing[-1])
+                added += 1
+    merged = {**library, "examples": examples}
+    today = datetime.date.today().isoformat()
+    merged.update(schema_version=SCHEMA_VERSION, version=f"{today.replace('-', '.')}-{library_version(merged)}",
+                  generated_at=today, generator=model)
+    return merged, added
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--library", default=DEFAULT_LIBRARY_PATH, help="Existing library to extend")
+    parser.add_argument("--output", help="Where to write the new library (default: overwrite --library)")
+    parser.add_argument("--checkpoint", help="Checkpoint JSONL for resume (default: <output>.checkpoint)")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--per-topic", type=int, default=3, help="Examples to request per (phase, topic)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    output_path = args.output or args.library
+    with open(args.library, "r", encoding="utf-8") as f:
+        library = json.load(f)
+    requests = build_requests(library.get("topics", {}), args.per_topic, args.model)
+    results, report = run_batch(requests, job_name="example_library", concurrency=args.concurrency,
+                                checkpoint_path=args.checkpoint or f"{output_path}.checkpoint")
+    print(format_batch_report(report))
+
+    merged, added = merge_library(library, results, args.model)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(merged, f, indent=2)
+        f.write("\n")
+    print(f"Added {added} examples; wrote library {merged['version']} ({len(merged['examples'])} examples) to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
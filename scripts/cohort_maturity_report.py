@@ -0,0 +1,89 @@
+"""Scores idea maturity across all stored sessions and prints the cohort summary.
+
+Use --synthetic N to generate N fake sessions into a temporary database and measure throughput.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.constants import CANONICAL_KEYS
+from src.cohort_maturity import DEFAULT_BATCH_SIZE, SUMMARY_TABLE, format_cohort_summary, score_sessions
+
+FRAGMENTS = {
+    "subject": ["patients", "clinics", "nurses", "caregivers", "radiology groups", "payers", "pharmacies", "students"],
+    "verb": ["miss", "lose", "spend", "struggle with", "pay too much for", "wait weeks for"],
+    "object": ["follow-up appointments", "claims", "scheduling", "medication refills", "care coordination", "billing"],
+    "detail": ["", " by 20%", " costing $4,000 a month", " in the US Midwest", " using Epic", " every week"],
+}
+
+
+def synthetic_value(rng: random.Random) -> str:
+    return f"{rng.choice(FRAGMENTS['subject'])} {rng.choice(FRAGMENTS['verb'])} {rng.choice(FRAGMENTS['object'])}{rng.choice(FRAGMENTS['detail'])}"
+
+
+def create_synthetic_db(path: str, sessions: int, seed: int = 0):
+    """Fills a chatbot_sessions table with sessions whose scratchpads are partly filled with varied answers."""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS chatbot_sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT,
+            session_data TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    conn.execute("BEGIN")
+    for i in range(sessions):
+        fill = rng.random()
+        scratchpad = {key: (synthetic_value(rng) if rng.random() < fill else "") for key in CANONICAL_KEYS}
+        data = {"scratchpad": scratchpad, "phase": "summary", "history": [{"role": "user", "content": "msg"}] * 5}
+        conn.execute("INSERT INTO chatbot_sessions (user_id, session_data) VALUES (?, ?)", (f"user{i % 500}", json.dumps(data)))
+    conn.execute("COMMIT")
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="SQLite database with chatbot_sessions (default: the app's database)")
+    parser.add_argument("--synthetic", type=int, help="Generate this many synthetic sessions in a temporary database")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Sessions read and scored per batch")
+    parser.add_argument("--table", default=SUMMARY_TABLE, help="Summary table to write per-session scores to")
+    parser.add_argument("--no-write", action="store_true", help="Do not write the per-session summary table")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    tmp_dir = None
+    if args.synthetic:
+        tmp_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmp_dir.name, "synthetic_sessions.sqlite")
+        create_synthetic_db(db_path, args.synthetic)
+    elif args.db:
+        db_path = args.db
+    else:
+        from src.persistence_utils import SQLITE_DB_PATH
+        db_path = SQLITE_DB_PATH
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        summary = score_sessions(conn, batch_size=args.batch_size, summary_table=None if args.no_write else args.table)
+    finally:
+        conn.close()
+        if tmp_dir:
+            tmp_dir.cleanup()
+
+    print(json.dumps(summary, indent=2) if args.json else format_cohort_summary(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,12 @@
 """Exports conversation exchanges from session JSON files to a JSONL file for evals."""
+import argparse
 import os
 import json
+import sys
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
 
 print(">>> Export script started!")
 
@@ -34,8 +40,39 @@ def extract_convos_from_session(session_path):
     print(f"Found {len(exchanges)} exchanges in {os.path.basename(session_path)}")
     return exchanges
 
+def regenerate_ideals(exchanges, concurrency=8, checkpoint_path=None, model=None):
+    """
+    Replaces each exchange's 'ideal' with a fresh coach answer, generated as one batch job
+    (bounded concurrency, retries, resumable via checkpoint_path).
+    """
+    from src.llm_backends import DEFAULT_MODEL
+    from src.llm_batch import format_batch_report, make_request, run_batch
+    from src.llm_utils import COACH_SYSTEM_PROMPT
+
+    requests = [
+        make_request(
+            str(i),
+            [{"role": "system", "content": COACH_SYSTEM_PROMPT}, {"role": "user", "content": ex["input"]}],
+            model=model or DEFAULT_MODEL, temperature=0.7, max_tokens=300,
+        )
+        for i, ex in enumerate(exchanges) if ex["input"]
+    ]
+    results, report = run_batch(requests, job_name="export_ideals", concurrency=concurrency, checkpoint_path=checkpoint_path)
+    print(format_batch_report(report))
+    for i, ex in enumerate(exchanges):
+        record = results.get(str(i))
+        if record and record.get("status") == "ok":
+            ex["ideal"] = record["text"].strip()
+    return exchanges
+
 def main():
     print(">>> Calling main()")
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--regenerate-ideal", action="store_true", help="Regenerate 'ideal' answers with the LLM in one batch job")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--checkpoint", default=OUTPUT_JSONL + ".checkpoint", help="Checkpoint file used to resume --regenerate-ideal")
+    parser.add_argument("--model", default=None)
+    args = parser.parse_args()
     os.makedirs(os.path.dirname(OUTPUT_JSONL), exist_ok=True)
     all_exchanges = []
 
@@ -54,6 +91,9 @@ def main():
         except Exception as e:
             print(f"Error reading {session_path}: {e}")
 
+    if all_exchanges and args.regenerate_ideal:
+        all_exchanges = regenerate_ideals(all_exchanges, args.concurrency, args.checkpoint, args.model)
+
     if all_exchanges:
         with open(OUTPUT_JSONL, "w", encoding="utf-8") as out_f:
             for ex in all_exchanges:
@@ -0,0 +1,82 @@
+"""Renders prompts from recorded sessions and reports cacheable-prefix vs dynamic tokens per LLM call site."""
+import argparse
+import json
+import os
+import sys
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src import llm_utils
+from src.personas import coach as coach_module
+from src.personas.coach import CoachPersona
+from src.prompt_cache import cacheable_prefix_report, capture_llm_messages, format_report
+
+DEFAULT_SESSIONS_PATH = "exported_sessions.jsonl"
+
+
+def load_sessions(path: str) -> list:
+    sessions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                sessions.append(json.loads(line))
+    return sessions
+
+
+def render_session(session: dict, persona: CoachPersona, samples: dict, max_turns: int):
+    """Appends one render per call site for every user turn of a recorded session."""
+    session_id = session.get("user_id", "unknown")
+    history = [t for t in session.get("conversation_history", []) if isinstance(t, dict) and t.get("text")]
+    scratchpad = session.get("scratchpad", {}) or {}
+    summaries = session.get("summaries", []) or []
+    intake_answers = session.get("intake_answers", []) or []
+    phase = session.get("stage", "exploration")
+
+    user_turns = [i for i, t in enumerate(history) if t.get("role") == "user"][:max_turns]
+    for i in user_turns:
+        text = history[i]["text"]
+        prior = history[:i]
+
+        def add(call_site, messages):
+            samples.setdefault(call_site, []).append({"session": session_id, "messages": messages})
+
+        add("build_conversation_messages", llm_utils.build_conversation_messages(scratchpad, text, phase))
+        system, user = llm_utils.build_prompt(prior, scratchpad, summaries, text, phase)
+        add("build_prompt", [{"role": "system", "content": system}, {"role": "user", "content": user}])
+        add("propose_next_conversation_turn", persona.build_next_turn_messages(intake_answers, scratchpad, phase, prior))
+
+        with capture_llm_messages(coach_module, reply="?") as captured:
+            persona.active_listening(text)
+            persona.paraphrase_user_input(text, persona.detect_user_cues(text), phase, scratchpad)
+            persona.coach_on_decision(phase, text, scratchpad)
+            persona.generate_short_summary(text)
+        for call_site, messages in zip(
+            ["active_listening", "paraphrase_user_input", "coach_on_decision", "generate_short_summary"], captured
+        ):
+            add(call_site, messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", default=DEFAULT_SESSIONS_PATH, help="JSONL file of recorded sessions")
+    parser.add_argument("--max-turns", type=int, default=20, help="User turns rendered per session")
+    parser.add_argument("--json", action="store_true", help="Print rows as JSON instead of a table")
+    args = parser.parse_args()
+
+    persona = CoachPersona()
+    samples = {}
+    for session in load_sessions(args.sessions):
+        render_session(session, persona, samples, args.max_turns)
+
+    rows = cacheable_prefix_report(samples)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(format_report(rows))
+
+
+if __name__ == "__main__":
+    main()
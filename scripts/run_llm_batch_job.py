@@ -0,0 +1,129 @@
+"""Runs bulk LLM jobs (session summaries, scratchpad extraction) over exported sessions with checkpoint/resume."""
+import argparse
+import json
+import os
+import sys
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.constants import CANONICAL_KEYS
+from src.llm_backends import DEFAULT_MODEL
+from src.llm_batch import (
+    collect_openai_batch, format_batch_report, make_request, run_batch, submit_openai_batch,
+)
+from src.personas.coach import CoachPersona
+from src.utils.scratchpad_extractor import build_llm_extraction_prompt, parse_llm_extraction_response
+
+DEFAULT_SESSIONS_PATH = "exported_sessions.jsonl"
+
+
+def load_sessions(path: str) -> list:
+    sessions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                sessions.append(json.loads(line))
+    return sessions
+
+
+def _turns(session: dict) -> list:
+    return [t for t in session.get("conversation_history", []) if isinstance(t, dict) and t.get("text")]
+
+
+def build_summary_requests(sessions: list, model: str) -> list:
+    """One summary request per session that has any conversation text."""
+    persona = CoachPersona()
+    requests = []
+    for session in sessions:
+        turns = _turns(session)
+        if not turns:
+            continue
+        transcript = "\n".join(f"{t['role']}: {t['text']}" for t in turns)
+        requests.append(make_request(
+            f"{session.get('user_id', 'unknown')}:summary",
+            persona.build_short_summary_messages(transcript),
+            model=model, temperature=0.5, max_tokens=100,
+        ))
+    return requests
+
+
+def build_scratchpad_requests(sessions: list, model: str) -> list:
+    """One extraction request per user turn, using the same prompt as the live LLM fallback."""
+    requests = []
+    for session in sessions:
+        for i, turn in enumerate(_turns(session)):
+            if turn.get("role") != "user":
+                continue
+            prompt = build_llm_extraction_prompt(turn["text"], CANONICAL_KEYS)
+            requests.append(make_request(
+                f"{session.get('user_id', 'unknown')}:{i}",
+                [{"role": "user", "content": prompt}],
+                model=model, temperature=0.1,
+            ))
+    return requests
+
+
+def write_outputs(job: str, results: dict, output_path: str):
+    """Folds per-request results back into one record per session."""
+    by_session = {}
+    for custom_id, record in sorted(results.items()):
+        if record.get("status") != "ok":
+            continue
+        user_id = custom_id.rsplit(":", 1)[0]
+        if job == "summaries":
+            by_session[user_id] = {"user_id": user_id, "summary": record["text"].strip()}
+        else:
+            entry = by_session.setdefault(user_id, {"user_id": user_id, "scratchpad": {}})
+            for key, value in parse_llm_extraction_response(record["text"], CANONICAL_KEYS).items():
+                if key in CANONICAL_KEYS and value and not entry["scratchpad"].get(key):
+                    entry["scratchpad"][key] = value
+    with open(output_path, "w", encoding="utf-8") as f:
+        for entry in by_session.values():
+            f.write(json.dumps(entry) + "\n")
+    print(f"Wrote {len(by_session)} sessions to {output_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("job", choices=["summaries", "scratchpad"], help="Which bulk job to run")
+    parser.add_argument("--sessions", default=DEFAULT_SESSIONS_PATH, help="JSONL file of exported sessions")
+    parser.add_argument("--output", help="Output JSONL (default: <job>_batch_output.jsonl)")
+    parser.add_argument("--checkpoint", help="Checkpoint JSONL for resume (default: <output>.checkpoint)")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--mode", choices=["pool", "openai-batch"], default="pool",
+                        help="Local bounded async pool, or submit to the OpenAI Batch API")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--collect", metavar="BATCH_ID", help="Collect results of a submitted OpenAI batch")
+    args = parser.parse_args()
+
+    output_path = args.output or f"{args.job}_batch_output.jsonl"
+    checkpoint_path = args.checkpoint or f"{output_path}.checkpoint"
+    sessions = load_sessions(args.sessions)
+    builder = build_summary_requests if args.job == "summaries" else build_scratchpad_requests
+    requests = builder(sessions, args.model)
+
+    if args.collect:
+        results, report = collect_openai_batch(args.collect, job_name=args.job, total=len(requests),
+                                               checkpoint_path=checkpoint_path)
+        print(format_batch_report(report))
+        if results is not None:
+            write_outputs(args.job, results, output_path)
+        return
+
+    if args.mode == "openai-batch":
+        batch_id = submit_openai_batch(requests, f"{output_path}.batch_input.jsonl", metadata={"job": args.job})
+        print(f"Submitted batch {batch_id} ({len(requests)} requests). Collect with --collect {batch_id}")
+        return
+
+    results, report = run_batch(requests, job_name=args.job, concurrency=args.concurrency,
+                                max_retries=args.max_retries, checkpoint_path=checkpoint_path)
+    print(format_batch_report(report))
+    write_outputs(args.job, results, output_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Prints a flame-style latency breakdown of recent turns from a trace file (TRACE_EXPORTER=file).
+
+    python scripts/trace_report.py                      # last 5 turns plus per-span totals
+    python scripts/trace_report.py --session abc123 --last 20
+    python scripts/trace_report.py --collapsed > turns.folded   # for flamegraph.pl or speedscope
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.core.tracing import TRACE_FILE
+from src.trace_report import aggregate, collapsed_stacks, format_aggregate, format_flame, load_spans, turn_breakdowns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", default=TRACE_FILE, help="Span file written by the file exporter")
+    parser.add_argument("--session", help="Only turns of this session (user_id)")
+    parser.add_argument("--last", type=int, default=5, help="Turns to show in detail (0 for none)")
+    parser.add_argument("--collapsed", action="store_true", help="Print collapsed stacks (self time in microseconds) instead")
+    parser.add_argument("--json", action="store_true", help="Print the per-span totals as JSON")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    if not os.path.exists(args.file):
+        sys.exit(f"No trace file at {args.file}; run the app with TRACE_EXPORTER=file.")
+    turns = turn_breakdowns(load_spans(args.file), session_id=args.session)
+    if args.collapsed:
+        print("\n".join(collapsed_stacks(turns)))
+        return
+    if args.json:
+        print(json.dumps(aggregate(turns), indent=2))
+        return
+    if not turns:
+        print("No traced turns found.")
+        return
+    for turn in turns[-args.last:] if args.last > 0 else []:
+        print(format_flame(turn))
+        print()
+    print(f"All {len(turns)} turns, by self time:")
+    print(format_aggregate(aggregate(turns)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Prints LLM token usage and cost from the usage ledger, grouped by day, call site, model or session.
+
+    python scripts/usage_report.py                       # per day, last 7 days
+    python scripts/usage_report.py --by call_site --days 1
+    python scripts/usage_report.py --by session --limit 20
+    python scripts/usage_report.py --session abc123 --by call_site
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import sys
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src import usage_ledger
+from src.usage_ledger import UsageLedger, format_report, utc_day
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="Ledger database (default: USAGE_DB_PATH or the session database)")
+    parser.add_argument("--by", choices=["day", "call_site", "model", "session"], default="day")
+    parser.add_argument("--days", type=int, default=7, help="UTC days to include, today counting as 1 (0 for all)")
+    parser.add_argument("--session", help="Only calls of this session (user_id)")
+    parser.add_argument("--limit", type=int, default=0, help="Rows to show (0 for all)")
+    parser.add_argument("--json", action="store_true", help="Print the rows as JSON")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    if args.db and not os.path.exists(args.db):
+        sys.exit(f"No ledger database at {args.db}.")
+    ledger = UsageLedger(args.db) if args.db else usage_ledger.get_ledger()
+    since = None
+    if args.days > 0:
+        since = (datetime.date.fromisoformat(utc_day()) - datetime.timedelta(days=args.days - 1)).isoformat()
+    rows = ledger.report(by=args.by, since=since, session_id=args.session, limit=args.limit)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(format_report(rows))
+    today = ledger.day_tokens()
+    cap = ledger.daily_cap
+    print(f"\nToday ({utc_day()}, UTC): {today} tokens across all sessions; daily cap "
+          f"{f'{cap} ({today / cap:.0%} used)' if cap > 0 else 'off'}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,287 @@
+import atexit
 import json
 import datetime
+import os
+import queue
+import threading
+import time
+from typing import Optional
+
 import streamlit as st
-from src.core.logger import get_logger
+from src.analytics_storage import PartitionedEventLog, get_event_log
+from src.event_schema import normalize
+from src.core.logger import get_logger, get_sampled_logger
+from src.core import metrics
+from src.core.tracing import traced
+from src.usage_ledger import current_session_id
 
 logger = get_logger(__name__)
+# log_event runs several times per turn; its debug echo of each event is sampled.
+event_debug = get_sampled_logger(__name__)
 
 LOG_FILE_PATH = "analytics_log.jsonl"
+# Directory of time-partitioned, rotating event segments (see src.analytics_storage).
+# Set ANALYTICS_DIR to an empty string to append to the single LOG_FILE_PATH file instead.
+ANALYTICS_DIR = os.environ.get("ANALYTICS_DIR", "analytics_logs")
+
+# Events held in memory before the drop policy applies.
+ANALYTICS_QUEUE_SIZE = int(os.environ.get("ANALYTICS_QUEUE_SIZE", "10000"))
+# Events written per batch, and the longest a partial batch waits before it is written anyway.
+ANALYTICS_BATCH_SIZE = int(os.environ.get("ANALYTICS_BATCH_SIZE", "256"))
+ANALYTICS_FLUSH_INTERVAL = float(os.environ.get("ANALYTICS_FLUSH_INTERVAL", "0.5"))
+# Seconds between fsyncs; 0 fsyncs after every batch.
+ANALYTICS_FSYNC_INTERVAL = float(os.environ.get("ANALYTICS_FSYNC_INTERVAL", "5"))
+# When the queue is full: "drop_oldest", "drop_newest", or "block" (backpressure on the caller).
+ANALYTICS_DROP_POLICY = os.environ.get("ANALYTICS_DROP_POLICY", "drop_oldest")
+# With "block", how long a caller waits for room before the event is dropped after all.
+ANALYTICS_BLOCK_TIMEOUT = float(os.environ.get("ANALYTICS_BLOCK_TIMEOUT", "0.05"))
+
+DROP_POLICIES = ("drop_oldest", "drop_newest", "block")
+_STOP = object()
+
+
+class AnalyticsWriter:
+    """
+    Writes analytics events from a background thread. emit() only enqueues; the writer thread
+    drains the queue in batches, applies the event schemas (src/event_schema.py), appends the
+    events to their target (a JSON Lines file kept open between batches, or a PartitionedEventLog
+    in its own encoding) and fsyncs at most every fsync_interval seconds. A full queue applies the drop
+    policy instead of slowing the request path, and every drop is counted in stats.
+    """
+
+    def __init__(self, max_queue: int = ANALYTICS_QUEUE_SIZE, batch_size: int = ANALYTICS_BATCH_SIZE,
+                 flush_interval: float = ANALYTICS_FLUSH_INTERVAL, fsync_interval: float = ANALYTICS_FSYNC_INTERVAL,
+                 drop_policy: str = ANALYTICS_DROP_POLICY, block_timeout: float = ANALYTICS_BLOCK_TIMEOUT,
+                 autostart: bool = True):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown analytics drop policy '{drop_policy}'; expected one of {DROP_POLICIES}")
+        self._queue = queue.Queue(maxsize=max(1, max_queue))
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.drop_policy = drop_policy
+        self.block_timeout = block_timeout
+        self.autostart = autostart
+        self.stats = {"enqueued": 0, "written": 0, "dropped": 0, "batches": 0, "fsyncs": 0, "errors": 0}
+        self._files = {}
+        self._stores = {}
+        self._last_fsync = time.monotonic()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="analytics-writer", daemon=True)
+                self._thread.start()
+
+    def emit(self, path, entry: dict) -> bool:
+        """Queues entry for path (a file path or a PartitionedEventLog) without blocking (except under the "block" policy). Returns False if dropped."""
+        if self.autostart and (self._thread is None or not self._thread.is_alive()):
+            self.start()
+        item = (path, entry)
+        try:
+            if self.drop_policy == "block":
+                self._queue.put(item, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(item)
+        except queue.Full:
+            if self.drop_policy != "drop_oldest":
+                self.stats["dropped"] += 1
+                return False
+            try:
+                oldest = self._queue.get_nowait()
+                if not isinstance(oldest, tuple):
+                    # A flush or stop marker is never dropped; the new event is dropped instead.
+                    self._queue.put_nowait(oldest)
+                    self.stats["dropped"] += 1
+                    return False
+                self.stats["dropped"] += 1
+                self._queue.put_nowait(item)
+            except (queue.Empty, queue.Full):
+                self.stats["dropped"] += 1
+                return False
+        self.stats["enqueued"] += 1
+        return True
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Waits until everything queued so far is written and fsynced. Returns False on timeout."""
+        if self._thread is None or not self._thread.is_alive():
+            return self._queue.empty()
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5.0):
+        """Flushes, stops the writer thread and closes the files."""
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+                self._thread.join(timeout)
+            except queue.Full:
+                logger.warning("Analytics writer queue still full at close; unwritten events are lost.")
+        self._close_files()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._maybe_fsync()
+                continue
+            batch, markers = [], []
+            try:
+                for item in self._drain(first):
+                    if item is _STOP:
+                        stopping = True
+                    elif isinstance(item, threading.Event):
+                        markers.append(item)
+                    else:
+                        batch.append(item)
+                self._write(batch)
+                self._maybe_fsync(force=bool(markers) or stopping)
+            except Exception as e:  # The thread must outlive any one bad batch
+                self.stats["errors"] += 1
+                logger.error(f"Analytics writer failed on a batch of {len(batch)} events: {e}")
+            finally:
+                for marker in markers:
+                    marker.set()
+        self._close_files()
+
+    def _drain(self, first):
+        yield first
+        for _ in range(self.batch_size - 1):
+            try:
+                yield self._queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def _write(self, batch: list):
+        if not batch:
+            return
+        lines_by_target = {}
+        for target, entry in batch:
+            try:
+                entry = normalize(entry)
+                lines, entries = lines_by_target.setdefault(target, ([], []))
+                if isinstance(target, PartitionedEventLog):
+                    lines.append(target.encode(entry))
+                else:
+                    lines.append(json.dumps(entry, default=str) + "\n")
+                entries.append(entry)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Unserializable analytics event {entry.get('event')}: {e}")
+        for target, (lines, entries) in lines_by_target.items():
+            try:
+                if isinstance(target, PartitionedEventLog):
+                    self._stores[id(target)] = target
+                    target.write_lines(lines, entries)
+                else:
+                    f = self._files.get(target)
+                    if f is None:
+                        f = self._files[target] = open(target, "a", encoding="utf-8")
+                    f.write("".join(lines))
+                    f.flush()
+                self.stats["written"] += len(lines)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Failed to write {len(lines)} analytics events to {target}: {e}")
+                self._files.pop(target, None)
+        self.stats["batches"] += 1
+
+    def _maybe_fsync(self, force: bool = False):
+        if not (self._files or self._stores) or (not force and time.monotonic() - self._last_fsync < self.fsync_interval):
+            return
+        for target in list(self._files.values()) + list(self._stores.values()):
+            try:
+                target.fsync() if isinstance(target, PartitionedEventLog) else os.fsync(target.fileno())
+            except (OSError, ValueError):
+                pass  # e.g. os.devnull or a file closed underneath us
+        self._last_fsync = time.monotonic()
+        self.stats["fsyncs"] += 1
+
+    def _close_files(self):
+        for f in self._files.values():
+            try:
+                f.close()
+            except OSError:
+                pass
+        self._files.clear()
+        for store in self._stores.values():
+            try:
+                store.close()  # Seals (and compresses) the active segment
+            except OSError as e:
+                logger.error(f"Failed to seal analytics segment in {store.root}: {e}")
+        self._stores.clear()
+
+
+_writer: Optional[AnalyticsWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> AnalyticsWriter:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = AnalyticsWriter()
+    return _writer
+
+
+metrics.gauge("analytics_queue_depth", "Analytics events waiting for the background writer.",
+              fn=lambda: _writer.queue_depth() if _writer is not None else 0)
+metrics.counter("analytics_events_dropped_total", "Analytics events dropped by the queue's drop policy.",
+                fn=lambda: _writer.stats["dropped"] if _writer is not None else 0)
+
+
+def flush_events(timeout: float = 5.0) -> bool:
+    """Writes out every queued event."""
+    return _writer.flush(timeout) if _writer is not None else True
+
+
+@atexit.register
+def close_events(timeout: float = 5.0):
+    """Writes out every queued event and seals the active segments; run at interpreter exit."""
+    if _writer is not None:
+        _writer.close(timeout)
+
 
+@traced()
 def log_event(event_name: str, **kwargs):
     """
-    Logs an event to a JSON Lines file.
-    Each event is a JSON object on a new line.
+    Logs an event to the partitioned analytics log (or the single JSON Lines file).
+    The event name and its fields should be declared in src/event_schema.py. The event is queued for the background writer,
+    so values should not be mutated after the call; call flush_events() to wait for the write.
     """
     try:
         timestamp = datetime.datetime.utcnow().isoformat()
         workflow = st.session_state.get("workflow", "unknown_workflow")
         phase = st.session_state.get("phase", "unknown_phase")
 
+        # Worker threads (brainstorm, summaries) see no session_state; they carry the
+        # session bound for the script run in their copied context instead.
+        session_id = st.session_state.get("user_id") or current_session_id()
         log_entry = {
             "utc_ts": timestamp,
+            "session_id": session_id,
             "workflow": workflow,
             "phase": phase,
             "event": event_name,
             **kwargs
         }
-        with open(LOG_FILE_PATH, "a") as f:
-            f.write(json.dumps(log_entry) + "\n")
-        logger.debug(f"Analytics event logged: {event_name}, Data: {log_entry}")
+        target = get_event_log(ANALYTICS_DIR) if ANALYTICS_DIR else LOG_FILE_PATH
+        get_writer().emit(target, log_entry)
+        event_debug.debug("Analytics event logged: %s", event_name, extra={"analytics_event": log_entry})
     except Exception as e:
-        logger.error(f"Failed to log analytics event: {event_name}. Error: {e}", exc_info=True)
+        logger.error("Failed to log analytics event: %s. Error: %s", event_name, e, exc_info=True)
 
 if __name__ == '__main__':
     # Example usage (for testing purposes)
@@ -39,5 +292,6 @@ if __name__ == '__main__':
 
     log_event("test_event", detail="This is a test event.", custom_data={"value": 123})
     log_event("another_event", source="manual_test")
+    flush_events()
 
-    print(f"Check '{LOG_FILE_PATH}' for logged events.")
\ No newline at end of file
+    print(f"Check '{ANALYTICS_DIR or LOG_FILE_PATH}' for logged events.")
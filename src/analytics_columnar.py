@@ -0,0 +1,331 @@
+"""Converts the analytics event stream into a columnar store and computes funnels, phase dwell times and skip rates on it."""
+import datetime
+import json
+import os
+import sqlite3
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+from src.analytics_storage import iter_events, parse_ts
+from src.event_codec import is_binary_path, iter_file_events
+from src.core.logger import get_logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output needs pyarrow; the SQLite store works without it
+    pa = None
+    pc = None
+    pq = None
+
+logger = get_logger(__name__)
+
+# Columns every event is reduced to; the remaining fields are kept as a JSON "attrs" string.
+BASE_FIELDS = ("utc_ts", "session_id", "workflow", "phase", "event")
+INGEST_CHUNK_EVENTS = 250_000
+# Events without a session_id (logged before it existed) start a new inferred session on a
+# workflow reset or after this much inactivity.
+SESSION_GAP_SECONDS = 30 * 60
+SESSION_START_EVENTS = frozenset({"workflow_reset_start"})
+PERCENTILES = (50, 90)
+
+
+def _event_phase(event: dict) -> Optional[str]:
+    """phase_name (set by phase engines) is more reliable than the session-level phase field."""
+    return event.get("phase_name") or event.get("phase")
+
+
+class SessionInferrer:
+    """Assigns session ids to legacy events that have none, in stream order."""
+
+    def __init__(self, gap_seconds: float = SESSION_GAP_SECONDS):
+        self.gap_seconds = gap_seconds
+        self.sessions = 0
+        self.last_ts = None
+
+    def __call__(self, event: dict, ts_us: int) -> str:
+        if event.get("session_id"):
+            return str(event["session_id"])
+        gap = self.last_ts is not None and (ts_us - self.last_ts) > self.gap_seconds * 1e6
+        if self.sessions == 0 or gap or event.get("event") in SESSION_START_EVENTS:
+            self.sessions += 1
+        self.last_ts = ts_us
+        return f"legacy-{self.sessions}"
+
+
+def read_event_source(source: str) -> Iterator[dict]:
+    """Events from a partitioned analytics directory or a single JSON Lines (or binary .evb) file."""
+    if os.path.isdir(source):
+        yield from iter_events(source)
+        return
+    with open(source, "rb") as f:
+        yield from iter_file_events(f, binary=is_binary_path(source))
+
+
+def iter_column_chunks(events: Iterable[dict], chunk_events: int = INGEST_CHUNK_EVENTS) -> Iterator[dict]:
+    """
+    Groups events into dicts of column lists: ts (microseconds since the epoch, UTC), session_id,
+    workflow, phase, event and attrs (the other fields as JSON). Events without a readable
+    timestamp are skipped.
+    """
+    infer_session = SessionInferrer()
+    epoch = datetime.datetime(1970, 1, 1)
+    columns = {"ts": [], "session_id": [], "workflow": [], "phase": [], "event": [], "attrs": []}
+    for event in events:
+        ts = parse_ts(event.get("utc_ts"))
+        if ts is None:
+            continue
+        ts_us = (ts - epoch) // datetime.timedelta(microseconds=1)
+        columns["ts"].append(ts_us)
+        columns["session_id"].append(infer_session(event, ts_us))
+        columns["workflow"].append(event.get("workflow") or event.get("workflow_name"))
+        columns["phase"].append(_event_phase(event))
+        columns["event"].append(event.get("event"))
+        attrs = {k: v for k, v in event.items() if k not in BASE_FIELDS}
+        columns["attrs"].append(json.dumps(attrs, default=str) if attrs else None)
+        if len(columns["ts"]) >= chunk_events:
+            yield columns
+            columns = {k: [] for k in columns}
+    if columns["ts"]:
+        yield columns
+
+
+def _arrow_schema():
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("ts", pa.timestamp("us")), ("session_id", dictionary), ("workflow", dictionary),
+        ("phase", dictionary), ("event", dictionary), ("attrs", pa.string()),
+    ])
+
+
+def write_parquet(chunks: Iterable[dict], path: str) -> int:
+    """Writes column chunks as Parquet row groups (dictionary-encoded strings, zstd). Returns rows written."""
+    if pa is None:
+        raise RuntimeError("Parquet output needs the pyarrow package; use the SQLite store instead")
+    schema = _arrow_schema()
+    rows = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for columns in chunks:
+            arrays = [pa.array(columns["ts"], type=pa.timestamp("us"))]
+            arrays += [pa.array(columns[name], type=pa.string()).dictionary_encode()
+                       for name in ("session_id", "workflow", "phase", "event")]
+            arrays.append(pa.array(columns["attrs"], type=pa.string()))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            rows += len(columns["ts"])
+    return rows
+
+
+def write_sqlite(chunks: Iterable[dict], path: str) -> int:
+    """Writes column chunks to a typed, indexed events table. Returns rows written."""
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS events (
+            ts INTEGER NOT NULL,
+            session_id TEXT,
+            workflow TEXT,
+            phase TEXT,
+            event TEXT NOT NULL,
+            attrs TEXT
+        )
+    """)
+    rows = 0
+    for columns in chunks:
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT INTO events (ts, session_id, workflow, phase, event, attrs) VALUES (?, ?, ?, ?, ?, ?)",
+            zip(columns["ts"], columns["session_id"], columns["workflow"], columns["phase"],
+                columns["event"], columns["attrs"]),
+        )
+        conn.execute("COMMIT")
+        rows += len(columns["ts"])
+    # Built after the bulk load, which is much faster than maintaining them row by row.
+    for column in ("event", "workflow", "phase", "ts", "session_id"):
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_events_{column} ON events ({column})")
+    conn.close()
+    return rows
+
+
+def ingest(source: str, output: str, chunk_events: int = INGEST_CHUNK_EVENTS) -> int:
+    """Converts source events into output (.parquet, or an SQLite database for any other extension)."""
+    chunks = iter_column_chunks(read_event_source(source), chunk_events)
+    if output.endswith(".parquet"):
+        return write_parquet(chunks, output)
+    return write_sqlite(chunks, output)
+
+
+class EventColumns:
+    """
+    The query columns as numpy arrays: ts (int64 microseconds) and integer codes for session,
+    phase and event, with the code -> name lists alongside. Queries only compare codes.
+    """
+
+    def __init__(self, ts, session, phase, phase_names, event, event_names):
+        self.ts = np.asarray(ts, dtype=np.int64)
+        self.session = np.asarray(session, dtype=np.int64)
+        self.phase = np.asarray(phase, dtype=np.int64)
+        self.phase_names = list(phase_names)
+        self.event = np.asarray(event, dtype=np.int64)
+        self.event_names = list(event_names)
+
+    def __len__(self):
+        return len(self.ts)
+
+    def event_code(self, name: str) -> int:
+        return self.event_names.index(name) if name in self.event_names else -2
+
+    @staticmethod
+    def _codes(values) -> tuple:
+        names, codes = np.unique(np.array(["" if v is None else v for v in values], dtype=object).astype(str),
+                                 return_inverse=True)
+        return codes, [n or None for n in names.tolist()]
+
+    @classmethod
+    def from_lists(cls, ts, session_ids, phases, events) -> "EventColumns":
+        session, _ = cls._codes(session_ids)
+        phase, phase_names = cls._codes(phases)
+        event, event_names = cls._codes(events)
+        return cls(ts, session, phase, phase_names, event, event_names)
+
+    @classmethod
+    def load(cls, path: str, events: Optional[Iterable[str]] = None) -> "EventColumns":
+        """Reads the query columns from a Parquet file or SQLite store, optionally only some events."""
+        events = list(events) if events is not None else None
+        if path.endswith(".parquet"):
+            if pq is None:
+                raise RuntimeError("Reading Parquet needs the pyarrow package")
+            filters = [("event", "in", events)] if events else None
+            table = pq.read_table(path, columns=["ts", "session_id", "phase", "event"], filters=filters)
+            ts = table.column("ts").cast(pa.int64()).to_numpy()
+            encoded = []
+            for name in ("session_id", "phase", "event"):
+                # Re-encoding the strings with one shared dictionary is several times faster than
+                # unify_dictionaries() over per-row-group dictionaries with many distinct sessions.
+                column = pc.dictionary_encode(table.column(name).cast(pa.string())).combine_chunks()
+                indices = column.indices.fill_null(-1).to_numpy(zero_copy_only=False).astype(np.int64)
+                names = column.dictionary.to_pylist() + [None]  # index -1 -> None
+                encoded.append((np.where(indices < 0, len(names) - 1, indices), names))
+            return cls(ts, encoded[0][0], encoded[1][0], encoded[1][1], encoded[2][0], encoded[2][1])
+
+        conn = sqlite3.connect(path)
+        where = f"WHERE event IN ({','.join('?' * len(events))})" if events else ""
+        rows = conn.execute(f"SELECT ts, session_id, phase, event FROM events {where}", events or []).fetchall()
+        conn.close()
+        if not rows:
+            return cls.from_lists([], [], [], [])
+        ts, sessions, phases, names = zip(*rows)
+        return cls.from_lists(ts, sessions, phases, names)
+
+
+def _phase_rows(columns: EventColumns, event_name: str) -> tuple:
+    mask = columns.event == columns.event_code(event_name)
+    return columns.session[mask], columns.phase[mask], columns.ts[mask]
+
+
+def _sessions_per_phase(session: np.ndarray, phase: np.ndarray, n_phases: int) -> np.ndarray:
+    """Number of distinct sessions per phase code (codes are dense, so a presence grid is cheapest)."""
+    if not len(session):
+        return np.zeros(n_phases, dtype=np.int64)
+    seen = np.zeros((int(session.max()) + 1, n_phases), dtype=bool)
+    seen[session, phase] = True
+    return seen.sum(axis=0)
+
+
+def funnel(columns: EventColumns, phase_order: Optional[list] = None) -> list:
+    """
+    Sessions that entered each phase, in phase_order (default: by how many sessions reached it).
+    Returns [{"phase", "sessions", "of_first", "of_previous"}, ...].
+    """
+    session, phase, _ = _phase_rows(columns, "phase_enter")
+    counts = _sessions_per_phase(session, phase, len(columns.phase_names))
+    by_name = {name: int(counts[i]) for i, name in enumerate(columns.phase_names) if name is not None}
+    order = phase_order or sorted(by_name, key=lambda p: -by_name[p])
+    rows, first, previous = [], None, None
+    for name in order:
+        n = by_name.get(name, 0)
+        first = n if first is None else first
+        rows.append({
+            "phase": name, "sessions": n,
+            "of_first": round(n / first, 3) if first else 0.0,
+            "of_previous": round(n / previous, 3) if previous else (1.0 if previous is None else 0.0),
+        })
+        previous = n
+    return rows
+
+
+def phase_dwell_times(columns: EventColumns) -> list:
+    """
+    Seconds from entering a phase to the session's next phase_enter, or to its last event for
+    the final phase. Returns per-phase visit counts, mean and percentiles, slowest first.
+    """
+    enter = columns.event_code("phase_enter")
+    # Each session's last event closes its last phase visit. Events are ingested in stream
+    # (time) order, so a stable sort by session alone usually leaves each session in time order;
+    # only when it does not is the time sort added.
+    order = np.argsort(columns.session, kind="stable")
+    s, ts = columns.session[order], columns.ts[order]
+    if np.any((np.diff(ts) < 0) & (s[1:] == s[:-1])):
+        order = np.argsort(columns.ts, kind="stable")
+        order = order[np.argsort(columns.session[order], kind="stable")]
+        s, ts = columns.session[order], columns.ts[order]
+    is_last = np.ones(len(s), dtype=bool)
+    is_last[:-1] = s[1:] != s[:-1]
+    session_end = np.zeros(int(s.max()) + 1 if len(s) else 0, dtype=np.int64)
+    session_end[s[is_last]] = ts[is_last]
+
+    e = columns.event[order] == enter
+    s, ts, phase = s[e], ts[e], columns.phase[order][e]
+    if not len(s):
+        return []
+    next_ts = np.empty_like(ts)
+    next_ts[:-1] = ts[1:]
+    same_session = np.zeros(len(s), dtype=bool)
+    same_session[:-1] = s[1:] == s[:-1]
+    last_visit = ~same_session
+    next_ts[last_visit] = session_end[s[last_visit]]
+    dwell = (next_ts - ts) / 1e6
+
+    rows = []
+    phase_order = np.argsort(phase, kind="stable")
+    boundaries = np.flatnonzero(np.diff(phase[phase_order])) + 1
+    for group in np.split(phase_order, boundaries):
+        values = dwell[group]
+        stats = np.percentile(values, PERCENTILES)
+        rows.append({
+            "phase": columns.phase_names[phase[group[0]]], "visits": int(len(values)),
+            "mean_seconds": round(float(values.mean()), 1),
+            **{f"p{p}_seconds": round(float(v), 1) for p, v in zip(PERCENTILES, stats)},
+        })
+    return sorted(rows, key=lambda r: -r["mean_seconds"])
+
+
+def skip_rates(columns: EventColumns) -> list:
+    """Per phase: sessions that skipped it / sessions that entered or skipped it."""
+    n_phases = len(columns.phase_names)
+    enter_session, enter_phase, _ = _phase_rows(columns, "phase_enter")
+    skip_session, skip_phase, _ = _phase_rows(columns, "phase_skipped")
+    seen = _sessions_per_phase(np.concatenate([enter_session, skip_session]),
+                               np.concatenate([enter_phase, skip_phase]), n_phases)
+    skipped = _sessions_per_phase(skip_session, skip_phase, n_phases)
+    rows = []
+    for i, name in enumerate(columns.phase_names):
+        if name is None or not seen[i]:
+            continue
+        rows.append({"phase": name, "sessions": int(seen[i]), "skipped": int(skipped[i]),
+                     "skip_rate": round(skipped[i] / seen[i], 3)})
+    return sorted(rows, key=lambda r: -r["skip_rate"])
+
+
+QUERY_EVENTS = ("phase_enter", "phase_skipped")
+
+
+def format_rows(rows: list) -> str:
+    if not rows:
+        return "(no rows)"
+    headers = list(rows[0])
+    widths = [max(len(h), *(len(str(r[h])) for r in rows)) for h in headers]
+    lines = ["  ".join(h.ljust(w) for h, w in zip(headers, widths))]
+    lines += ["  ".join(str(r[h]).ljust(w) for h, w in zip(headers, widths)) for r in rows]
+    return "\n".join(lines)
@@ -0,0 +1,357 @@
+"""Time-partitioned, rotating analytics event segments with compression and a manifest index."""
+import datetime
+import gzip
+import io
+import itertools
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Iterator, Optional
+
+from src import event_codec
+from src.core.logger import get_logger
+
+try:
+    import zstandard
+except ImportError:  # Sealed segments fall back to gzip
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; the manifest is then updated without a file lock
+    fcntl = None
+
+logger = get_logger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+PARTITION_FORMATS = {"hour": "dt=%Y-%m-%d/hour=%H", "day": "dt=%Y-%m-%d"}
+PARTITION_SPANS = {"hour": datetime.timedelta(hours=1), "day": datetime.timedelta(days=1)}
+DEFAULT_PARTITION = os.environ.get("ANALYTICS_PARTITION", "hour")
+MAX_SEGMENT_BYTES = int(os.environ.get("ANALYTICS_MAX_SEGMENT_BYTES", str(8 * 1024 * 1024)))
+MAX_SEGMENT_SECONDS = float(os.environ.get("ANALYTICS_MAX_SEGMENT_SECONDS", "3600"))
+ZSTD_LEVEL = int(os.environ.get("ANALYTICS_ZSTD_LEVEL", "10"))
+# Encoding of new segments written by the app: "binary" (src/event_codec.py) or "jsonl".
+# Readers handle both, so the setting can change at any time.
+EVENT_FORMATS = ("jsonl", "binary")
+EVENT_FORMAT = os.environ.get("ANALYTICS_FORMAT", "binary")
+
+
+def parse_ts(value) -> Optional[datetime.datetime]:
+    """Parses an event's utc_ts (naive UTC ISO format) into a naive UTC datetime; None if unreadable."""
+    if isinstance(value, datetime.datetime):
+        return value.astimezone(datetime.timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+    try:
+        return parse_ts(datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00")))
+    except (TypeError, ValueError):
+        return None
+
+
+def _partition_start(ts: datetime.datetime, partition: str) -> datetime.datetime:
+    return ts.replace(minute=0, second=0, microsecond=0) if partition == "hour" else ts.replace(
+        hour=0, minute=0, second=0, microsecond=0)
+
+
+class _ManifestLock:
+    """Serializes manifest updates across processes sharing one log directory."""
+
+    def __init__(self, root: str):
+        self.path = os.path.join(root, ".manifest.lock")
+        self._f = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._f = open(self.path, "a")
+            fcntl.flock(self._f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._f is not None:
+            fcntl.flock(self._f, fcntl.LOCK_UN)
+            self._f.close()
+            self._f = None
+
+
+def load_manifest(root: str) -> dict:
+    path = os.path.join(root, MANIFEST_NAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {"version": MANIFEST_VERSION, "segments": []}
+    except (OSError, json.JSONDecodeError) as e:
+        logger.error(f"Unreadable analytics manifest {path}: {e}")
+        return {"version": MANIFEST_VERSION, "segments": []}
+    manifest.setdefault("segments", [])
+    return manifest
+
+
+def _save_manifest(root: str, manifest: dict):
+    path = os.path.join(root, MANIFEST_NAME)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, path)
+
+
+def _update_manifest(root: str, segment: dict, keep_sealed: bool = False) -> bool:
+    """
+    Inserts or replaces (by id) one segment entry. With keep_sealed, an entry already sealed (by
+    another process) is left as it is. Returns whether the entry was written.
+    """
+    with _ManifestLock(root):
+        manifest = load_manifest(root)
+        if keep_sealed and any(s["id"] == segment["id"] and s["status"] != "open" for s in manifest["segments"]):
+            return False
+        manifest["segments"] = [s for s in manifest["segments"] if s["id"] != segment["id"]] + [segment]
+        manifest["segments"].sort(key=lambda s: (s["partition_start"], s["id"]))
+        _save_manifest(root, manifest)
+    return True
+
+
+def _is_sealed(root: str, segment_id: str) -> bool:
+    return any(s["id"] == segment_id and s["status"] != "open" for s in load_manifest(root)["segments"])
+
+
+def _writer_alive(segment_id: str) -> bool:
+    """Whether the process that opened a segment (its pid is the id's second part) is still running."""
+    try:
+        pid = int(segment_id.split("-")[1])
+    except (IndexError, ValueError):
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # Exists, owned by another user
+    return True
+
+
+def compress_segment(path: str, level: int = ZSTD_LEVEL) -> tuple:
+    """Compresses a closed segment next to itself and removes the original. Returns (new path, codec)."""
+    if zstandard is not None:
+        out_path, codec = f"{path}.zst", "zstd"
+        with open(path, "rb") as src, open(out_path, "wb") as dst:
+            zstandard.ZstdCompressor(level=level).copy_stream(src, dst)
+    else:
+        out_path, codec = f"{path}.gz", "gzip"
+        with open(path, "rb") as src, gzip.open(out_path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+    os.remove(path)
+    return out_path, codec
+
+
+def open_segment(path: str, codec: Optional[str]):
+    """Opens a segment for reading as a binary stream, decompressing sealed ones."""
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError(f"{path} is zstd-compressed but the zstandard package is not installed")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True))
+    if codec == "gzip":
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def iter_segment(root: str, meta: dict) -> Iterator[dict]:
+    """All events of one manifest entry, in either encoding."""
+    with open_segment(os.path.join(root, meta["path"]), meta.get("codec")) as f:
+        yield from event_codec.iter_file_events(f, binary=meta.get("format") == "binary")
+
+
+# Shared by every log in the process, so two logs over one root never open segments with the same id.
+_segment_seq = itertools.count(1)
+
+
+class PartitionedEventLog:
+    """
+    Appends event lines into segments under root/<partition>/ (e.g. dt=2026-10-18/hour=14).
+    The active segment is rotated when an event belongs to another partition, or the segment
+    reaches max_segment_bytes or max_segment_seconds. Rotated segments are compressed (zstd,
+    or gzip without the zstandard package). Every segment, open or sealed, is listed in
+    root/manifest.json with its time bounds and event count, so readers can skip partitions
+    outside a time range. Used from the analytics writer thread; not safe for concurrent writers
+    in one process, while separate processes each write their own segments. Segments are JSON
+    Lines, or length-prefixed binary records (.evb) with format="binary"; encode() produces
+    whichever write_lines() expects.
+    """
+
+    def __init__(self, root: str, partition: str = DEFAULT_PARTITION, max_segment_bytes: int = MAX_SEGMENT_BYTES,
+                 max_segment_seconds: float = MAX_SEGMENT_SECONDS, compress: bool = True, format: str = "jsonl"):
+        if partition not in PARTITION_FORMATS:
+            raise ValueError(f"Unknown analytics partition '{partition}'; expected one of {list(PARTITION_FORMATS)}")
+        if format not in EVENT_FORMATS:
+            raise ValueError(f"Unknown analytics format '{format}'; expected one of {list(EVENT_FORMATS)}")
+        self.root = root
+        self.format = format
+        self.partition = partition
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_seconds = max_segment_seconds
+        self.compress = compress
+        self._active = None
+        os.makedirs(root, exist_ok=True)
+
+    def _open_segment(self, partition_start: datetime.datetime):
+        rel_dir = partition_start.strftime(PARTITION_FORMATS[self.partition])
+        os.makedirs(os.path.join(self.root, rel_dir), exist_ok=True)
+        segment_id = f"{datetime.datetime.utcnow():%Y%m%dT%H%M%S}-{os.getpid()}-{next(_segment_seq)}"
+        binary = self.format == "binary"
+        rel_path = f"{rel_dir}/events-{segment_id}{event_codec.BINARY_SUFFIX if binary else '.jsonl'}"
+        self._active = {
+            "meta": {
+                "id": segment_id, "path": rel_path, "status": "open", "codec": None,
+                "partition": rel_dir, "partition_start": partition_start.isoformat(),
+                "partition_end": (partition_start + PARTITION_SPANS[self.partition]).isoformat(),
+                "min_ts": None, "max_ts": None, "events": 0, "bytes": 0, "format": self.format,
+            },
+            "file": open(os.path.join(self.root, rel_path), "ab") if binary else
+            open(os.path.join(self.root, rel_path), "a", encoding="utf-8"),
+            "opened": time.monotonic(),
+            "partition_start": partition_start,
+        }
+        _update_manifest(self.root, self._active["meta"])
+
+    def _needs_rotation(self, partition_start: datetime.datetime) -> bool:
+        active = self._active
+        return (active["partition_start"] != partition_start
+                or active["meta"]["bytes"] >= self.max_segment_bytes
+                or time.monotonic() - active["opened"] >= self.max_segment_seconds)
+
+    def encode(self, entry: dict):
+        """The serialized form of entry for this log: a binary record, or a JSON line."""
+        if self.format == "binary":
+            return event_codec.encode_event(entry)
+        return json.dumps(entry, default=str) + "\n"
+
+    def write_lines(self, lines: list, entries: list):
+        """Appends serialized lines (or binary records); entries are the matching events, used for their utc_ts."""
+        for line, entry in zip(lines, entries):
+            ts = parse_ts(entry.get("utc_ts")) or datetime.datetime.utcnow()
+            partition_start = _partition_start(ts, self.partition)
+            if self._active is not None and self._needs_rotation(partition_start):
+                self.rotate()
+            if self._active is None:
+                self._open_segment(partition_start)
+            meta = self._active["meta"]
+            self._active["file"].write(line)
+            iso = ts.isoformat()
+            meta["events"] += 1
+            meta["bytes"] += len(line)
+            meta["min_ts"] = iso if meta["min_ts"] is None or iso < meta["min_ts"] else meta["min_ts"]
+            meta["max_ts"] = iso if meta["max_ts"] is None or iso > meta["max_ts"] else meta["max_ts"]
+        if self._active is not None:
+            self._active["file"].flush()
+
+    def fsync(self):
+        if self._active is not None:
+            os.fsync(self._active["file"].fileno())
+
+    def rotate(self):
+        """Seals the active segment: closes, compresses and records it in the manifest."""
+        active, self._active = self._active, None
+        if active is None:
+            return
+        active["file"].close()
+        meta = active["meta"]
+        if _is_sealed(self.root, meta["id"]):
+            # Sealed by seal_stale_segments() while this process sat idle; its entry is the current one.
+            logger.warning(f"Analytics segment {meta['path']} was already sealed by another process.")
+            return
+        meta["status"] = "sealed"
+        if self.compress and meta["events"]:
+            try:
+                path, meta["codec"] = compress_segment(os.path.join(self.root, meta["path"]))
+                meta["path"] = os.path.relpath(path, self.root)
+                meta["compressed_bytes"] = os.path.getsize(path)
+            except OSError as e:
+                logger.error(f"Failed to compress analytics segment {meta['path']}: {e}")
+        _update_manifest(self.root, meta, keep_sealed=True)
+
+    def close(self):
+        self.rotate()
+
+
+def seal_stale_segments(root: str, older_than_seconds: float = 2 * MAX_SEGMENT_SECONDS) -> int:
+    """
+    Seals segments still marked open whose file has not been written for older_than_seconds,
+    e.g. left behind by a process that crashed. Segments whose writer process is still running are
+    left to it, however idle. Returns how many were sealed.
+    """
+    sealed = 0
+    for meta in load_manifest(root)["segments"]:
+        if meta["status"] != "open" or _writer_alive(meta["id"]):
+            continue
+        path = os.path.join(root, meta["path"])
+        try:
+            if time.time() - os.path.getmtime(path) < older_than_seconds:
+                continue
+            meta["min_ts"], meta["max_ts"], meta["events"] = None, None, 0
+            for event in iter_segment(root, meta):
+                ts = parse_ts(event.get("utc_ts"))
+                if ts is not None:
+                    iso = ts.isoformat()
+                    meta["min_ts"] = min(meta["min_ts"] or iso, iso)
+                    meta["max_ts"] = max(meta["max_ts"] or iso, iso)
+                meta["events"] += 1
+            meta["bytes"] = os.path.getsize(path)
+            new_path, meta["codec"] = compress_segment(path)
+            meta["path"] = os.path.relpath(new_path, root)
+            meta["status"] = "sealed"
+        except OSError as e:
+            logger.warning(f"Could not seal stale analytics segment {meta['path']}: {e}")
+            continue
+        if _update_manifest(root, meta, keep_sealed=True):
+            sealed += 1
+    return sealed
+
+
+def select_segments(root: str, start: Optional[datetime.datetime] = None,
+                    end: Optional[datetime.datetime] = None) -> list:
+    """Manifest entries whose partition (and known event times) can overlap [start, end)."""
+    selected = []
+    for meta in load_manifest(root)["segments"]:
+        lo = parse_ts(meta.get("min_ts")) or parse_ts(meta["partition_start"])
+        hi = parse_ts(meta.get("max_ts")) or parse_ts(meta["partition_end"])
+        if meta["status"] == "open":  # Still growing; only its partition bounds are final
+            hi = parse_ts(meta["partition_end"])
+        if (end is None or lo < end) and (start is None or hi >= start):
+            selected.append(meta)
+    return selected
+
+
+def iter_events(root: str, start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None,
+                events: Optional[set] = None) -> Iterator[dict]:
+    """
+    Yields events with start <= utc_ts < end (naive UTC datetimes; None is unbounded), optionally
+    only those named in events, reading only the segments the manifest says can contain them.
+    """
+    for meta in select_segments(root, start, end):
+        try:
+            for event in iter_segment(root, meta):
+                if events is not None and event.get("event") not in events:
+                    continue
+                ts = parse_ts(event.get("utc_ts"))
+                if ts is None or (start is not None and ts < start) or (end is not None and ts >= end):
+                    continue
+                yield event
+        except FileNotFoundError:
+            logger.warning(f"Analytics segment {os.path.join(root, meta['path'])} is listed in the manifest but missing.")
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_event_log(root: str) -> PartitionedEventLog:
+    """One PartitionedEventLog per directory for this process, writing EVENT_FORMAT segments."""
+    store = _stores.get(root)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(root)
+            if store is None:
+                store = _stores[root] = PartitionedEventLog(root, format=EVENT_FORMAT)
+    return store
@@ -0,0 +1,226 @@
+"""
+Incremental reader of the analytics event stream and the rolling-window aggregates behind the
+live admin page (src/pages/admin_dashboard.py).
+
+EventTailer remembers a byte offset per segment (or for the single LOG_FILE_PATH file), so each
+poll reads only the lines appended since the last one. A segment sealed while it was being
+tailed is finished from its compressed copy at the same uncompressed offset; sealed segments
+seen for the first time are read only if they can hold events inside the backfill window.
+LiveStats keeps the window's events in deques and drops them as they age out.
+"""
+import collections
+import datetime
+import os
+import threading
+import time
+from typing import Optional
+
+from src.analytics_storage import load_manifest, open_segment, parse_ts
+from src.event_codec import decode_json_lines, decode_records, is_binary_path
+from src.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Events older than this are not aggregated; also how far back the first poll reads.
+LIVE_WINDOW_SECONDS = float(os.environ.get("ADMIN_WINDOW_SECONDS", "900"))
+# A session counts as active on its last phase if its latest event is this recent.
+LIVE_ACTIVE_SECONDS = float(os.environ.get("ADMIN_ACTIVE_SECONDS", "300"))
+# On first poll of a single large JSON Lines file, only its last this-many bytes are read.
+BACKFILL_BYTES = 4 * 1024 * 1024
+PERCENTILES = (50, 90, 99)
+
+
+def _epoch(ts: datetime.datetime) -> float:
+    return ts.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+class EventTailer:
+    """
+    Reads new events from source: an ANALYTICS_DIR of partitioned segments (JSON Lines or binary),
+    or a single file. Only complete lines/records are consumed; a partially written last one is
+    read on a later poll.
+    """
+
+    def __init__(self, source: str, backfill_seconds: float = LIVE_WINDOW_SECONDS):
+        self.source = source
+        self.backfill_seconds = backfill_seconds
+        self._offsets = {}  # segment id (or the file path) -> offset of the first unread byte
+        self._finished = set()  # sealed segments read to the end, or skipped as too old
+        self.stats = {"polls": 0, "bytes_read": 0, "events": 0}
+
+    def poll(self) -> list:
+        """Events appended since the previous poll (on the first poll, those of the backfill window)."""
+        self.stats["polls"] += 1
+        if os.path.isdir(self.source):
+            events = self._poll_partitioned()
+        elif os.path.exists(self.source):
+            events = self._poll_file()
+        else:
+            events = []
+        self.stats["events"] += len(events)
+        return events
+
+    def _read_from(self, key: str, f, binary: bool, size: Optional[int] = None) -> list:
+        """Reads f from the stored offset, consuming only up to the last complete line or record."""
+        offset = self._offsets.get(key, 0)
+        if size is not None:
+            f.seek(offset)
+        else:  # Decompressing streams cannot seek; skip ahead by reading
+            remaining = offset
+            while remaining > 0:
+                chunk = f.read(min(remaining, 1 << 20))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+        events, consumed = (decode_records if binary else decode_json_lines)(f.read())
+        self._offsets[key] = offset + consumed
+        self.stats["bytes_read"] += consumed
+        return events
+
+    def _poll_file(self) -> list:
+        size = os.path.getsize(self.source)
+        offset = self._offsets.get(self.source)
+        binary = is_binary_path(self.source)
+        if offset is None or size < offset:  # First poll, or the file was truncated/replaced
+            # Records of a binary file cannot be found from the middle, so it is read from the start.
+            offset = 0 if binary else max(0, size - BACKFILL_BYTES)
+            self._offsets[self.source] = offset
+            skip_partial = offset > 0
+        else:
+            skip_partial = False
+        with open(self.source, "rb") as f:
+            if skip_partial:  # Started mid-file; drop the line the backfill cut through
+                f.seek(offset)
+                self._offsets[self.source] = offset + len(f.readline())
+            return self._read_from(self.source, f, binary, size)
+
+    def _poll_partitioned(self) -> list:
+        cutoff = time.time() - self.backfill_seconds
+        events = []
+        for meta in load_manifest(self.source)["segments"]:
+            segment_id = meta["id"]
+            if segment_id in self._finished:
+                continue
+            if segment_id not in self._offsets:
+                newest = parse_ts(meta.get("max_ts")) or parse_ts(meta["partition_end"])
+                if meta["status"] != "open" and (newest is None or _epoch(newest) < cutoff):
+                    self._finished.add(segment_id)
+                    continue
+            path = os.path.join(self.source, meta["path"])
+            binary = meta.get("format") == "binary"
+            try:
+                if meta["status"] == "open":
+                    with open(path, "rb") as f:
+                        events.extend(self._read_from(segment_id, f, binary, os.path.getsize(path)))
+                else:
+                    with open_segment(path, meta.get("codec")) as f:
+                        events.extend(self._read_from(segment_id, f, binary))
+                    self._finished.add(segment_id)
+                    self._offsets.pop(segment_id, None)
+            except FileNotFoundError:
+                continue  # Being sealed right now; the manifest will list the compressed copy next poll
+        return events
+
+
+def percentile(sorted_values: list, pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class LiveStats:
+    """
+    Rolling-window aggregates over analytics events: active sessions per phase, turn latency
+    percentiles, LLM and search call rates, and error counts. add() is O(1) per event and
+    snapshot() first evicts whatever has aged out of the window.
+    """
+
+    def __init__(self, window_seconds: float = LIVE_WINDOW_SECONDS, active_seconds: float = LIVE_ACTIVE_SECONDS):
+        self.window_seconds = window_seconds
+        self.active_seconds = active_seconds
+        self._sessions = {}  # session_id -> (last event time, workflow, phase)
+        self._turns = collections.deque()  # (time, latency_ms)
+        self._calls = {"llm_call": collections.deque(), "search_call": collections.deque()}  # (time, ok)
+        self._errors = collections.deque()  # (time, event name)
+
+    def add(self, event: dict):
+        ts = parse_ts(event.get("utc_ts"))
+        if ts is None:
+            return
+        t = _epoch(ts)
+        if t < time.time() - self.window_seconds:
+            return
+        name = event.get("event")
+        session_id = event.get("session_id")
+        previous = self._sessions.get(session_id, (0, None, None))
+        if session_id is not None and t >= previous[0]:
+            # Events logged off the script thread carry no phase; they keep the session's last known one.
+            phase = event.get("phase")
+            known = phase and not str(phase).startswith("unknown")
+            self._sessions[session_id] = (t, event.get("workflow") if known else previous[1], phase if known else previous[2])
+        if name == "turn_completed" and event.get("latency_ms") is not None:
+            self._turns.append((t, float(event["latency_ms"])))
+        if name in self._calls:
+            ok = event.get("ok", True)
+            self._calls[name].append((t, ok))
+            if not ok:
+                self._errors.append((t, name))
+        elif name and name.endswith("_failed"):
+            self._errors.append((t, name))
+
+    def extend(self, events: list):
+        for event in events:
+            self.add(event)
+
+    def _evict(self, now: float):
+        cutoff = now - self.window_seconds
+        for queue_ in (self._turns, self._errors, *self._calls.values()):
+            while queue_ and queue_[0][0] < cutoff:
+                queue_.popleft()
+        active_cutoff = now - self.active_seconds
+        for session_id in [s for s, entry in self._sessions.items() if entry[0] < active_cutoff]:
+            del self._sessions[session_id]
+
+    def snapshot(self, now: Optional[float] = None) -> dict:
+        now = time.time() if now is None else now
+        self._evict(now)
+        minutes = self.window_seconds / 60
+        by_phase = collections.Counter((workflow or "unknown", phase or "unknown")
+                                       for _, workflow, phase in self._sessions.values())
+        latencies = sorted(latency for _, latency in self._turns)
+        calls = {}
+        for name, queue_ in self._calls.items():
+            errors = sum(1 for _, ok in queue_ if not ok)
+            calls[name] = {"calls": len(queue_), "per_minute": round(len(queue_) / minutes, 2), "errors": errors}
+        return {
+            "window_seconds": self.window_seconds,
+            "active_sessions": len(self._sessions),
+            "active_by_phase": [{"workflow": w, "phase": p, "sessions": n} for (w, p), n in by_phase.most_common()],
+            "turns": len(latencies),
+            "turns_per_minute": round(len(latencies) / minutes, 2),
+            "turn_latency_ms": {f"p{pct}": percentile(latencies, pct) for pct in PERCENTILES},
+            "llm": calls["llm_call"],
+            "search": calls["search_call"],
+            "errors": dict(collections.Counter(name for _, name in self._errors).most_common()),
+        }
+
+
+class LiveFeed:
+    """A tailer and its aggregates behind one lock, so several dashboard viewers can share them."""
+
+    def __init__(self, source: str, window_seconds: float = LIVE_WINDOW_SECONDS,
+                 active_seconds: float = LIVE_ACTIVE_SECONDS):
+        self.tailer = EventTailer(source, backfill_seconds=window_seconds)
+        self.stats = LiveStats(window_seconds, active_seconds)
+        self._lock = threading.Lock()
+
+    def refresh(self) -> dict:
+        """Reads the new events and returns the current snapshot."""
+        with self._lock:
+            try:
+                self.stats.extend(self.tailer.poll())
+            except Exception as e:
+                logger.warning("Failed to read new analytics events from %s: %s", self.tailer.source, e)
+            return self.stats.snapshot()
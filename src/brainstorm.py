@@ -0,0 +1,176 @@
+"""Runs several diverse LLM generations concurrently, dedupes them locally and ranks them against the scratchpad."""
+import contextvars
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional
+
+import numpy as np
+
+from src.core.logger import get_logger
+from src.llm_utils import query_openai
+from src.usage_ledger import DailyTokenCapExceeded
+from src.utils.text_embedding import cosine_similarity_matrix, embed_text, embed_texts
+
+logger = get_logger(__name__)
+
+# Generations per brainstorm. Each is a full LLM call on the brainstorm route, and all of them
+# are billed, including those abandoned past the latency budget; the spend shows under that
+# route in llm_routing.get_route_stats() and per call site in the usage ledger.
+BRAINSTORM_CANDIDATES = int(os.environ.get("BRAINSTORM_CANDIDATES", "2"))
+# Seconds to wait for candidates; stragglers are dropped once at least one candidate is back.
+BRAINSTORM_LATENCY_BUDGET = float(os.environ.get("BRAINSTORM_LATENCY_BUDGET", "8"))
+# Spread of sampling temperatures; candidate i uses TEMPERATURES[i % len] and seed i.
+BRAINSTORM_TEMPERATURES = (0.7, 0.9, 1.0, 0.8, 1.1)
+# Candidates (or ideas) at least this similar to a better-ranked one are dropped as duplicates.
+DEDUPE_SIMILARITY = 0.75
+
+_LIST_ITEM_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+(.+)$")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _shared_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=int(os.environ.get("BRAINSTORM_WORKERS", "8")),
+                    thread_name_prefix="brainstorm",
+                )
+    return _executor
+
+
+def split_ideas(text: str) -> list:
+    """Returns the bulleted or numbered items of a response (empty if it is not a list)."""
+    return [m.group(1).strip() for m in map(_LIST_ITEM_RE.match, text.splitlines()) if m]
+
+
+def scratchpad_context(scratchpad: Optional[dict]) -> str:
+    """The filled scratchpad values as one text, used as the ranking reference."""
+    return " ".join(str(v) for v in (scratchpad or {}).values() if isinstance(v, str) and v)
+
+
+def merge_idea_list(template: str, ideas: list) -> str:
+    """
+    Rewrites template's list with ideas, keeping the lines before the first item and
+    after the last item (the response's own lead-in and closing question).
+    """
+    lines = template.splitlines()
+    item_lines = [i for i, line in enumerate(lines) if _LIST_ITEM_RE.match(line)]
+    head = lines[:item_lines[0]] if item_lines else []
+    tail = lines[item_lines[-1] + 1:] if item_lines else []
+    body = [f"{n}. {idea}" for n, idea in enumerate(ideas, 1)]
+    return "\n".join(head + body + tail).strip()
+
+
+def dedupe_and_rank(texts: list, reference: str, dedupe_similarity: float = DEDUPE_SIMILARITY) -> list:
+    """
+    Orders texts by similarity to reference (ties keep their original order) and drops any text
+    at least dedupe_similarity similar to one already kept. Returns [(text, relevance), ...].
+    """
+    texts = [t for t in texts if t and t.strip()]
+    if not texts:
+        return []
+    vectors = embed_texts(texts)
+    relevance = vectors @ embed_text(reference) if reference else np.zeros(len(texts), dtype=np.float32)
+    order = np.argsort(-relevance, kind="stable")
+    similarity = cosine_similarity_matrix(vectors, vectors)
+
+    kept = []
+    for i in order:
+        if all(similarity[i, j] < dedupe_similarity for j in kept):
+            kept.append(i)
+    return [(texts[i], float(relevance[i])) for i in kept]
+
+
+class BrainstormEngine:
+    """
+    Fans one prompt out to several concurrent generations with different temperatures and
+    seeds, waits up to a latency budget, then keeps the distinct candidates ranked by relevance
+    to the scratchpad. Calls still running when the budget expires are abandoned (queued ones
+    are cancelled; a running HTTP call cannot be interrupted, its result is simply ignored).
+    """
+
+    def __init__(self, candidates: int = BRAINSTORM_CANDIDATES, latency_budget: float = BRAINSTORM_LATENCY_BUDGET,
+                 temperatures: tuple = BRAINSTORM_TEMPERATURES, dedupe_similarity: float = DEDUPE_SIMILARITY,
+                 executor: Optional[ThreadPoolExecutor] = None, complete: Optional[Callable] = None):
+        self.candidates = max(1, candidates)
+        self.latency_budget = latency_budget
+        self.temperatures = temperatures
+        self.dedupe_similarity = dedupe_similarity
+        self._executor = executor
+        self._complete = complete or query_openai
+        self.last_stats = {}
+
+    def generate_candidates(self, messages: list, call_site: str, **kwargs) -> list:
+        """
+        Returns the texts of the generations that finished within the latency budget. Raises
+        DailyTokenCapExceeded if no candidate came back because the daily token cap was reached.
+        """
+        executor = self._executor or _shared_executor()
+        start = time.perf_counter()
+        # Each call runs in its own copy of the caller's context, so it keeps the session's
+        # usage-ledger attribution and trace.
+        futures = [
+            executor.submit(
+                contextvars.copy_context().run, self._complete, messages, call_site=call_site,
+                temperature=self.temperatures[i % len(self.temperatures)], seed=i, **kwargs,
+            )
+            for i in range(self.candidates)
+        ]
+        done, pending = wait(futures, timeout=self.latency_budget)
+        # Never worse than a single call: with nothing usable yet, wait for the first success.
+        while pending and not any(f.exception() is None for f in done):
+            more, pending = wait(pending, return_when=FIRST_COMPLETED)
+            done |= more
+        for future in pending:
+            future.cancel()
+
+        texts, failures, cap_error = [], 0, None
+        for future in futures:
+            if future not in done:
+                continue
+            if isinstance(future.exception(), DailyTokenCapExceeded):
+                failures += 1
+                cap_error = future.exception()
+                continue
+            if future.exception() is not None:
+                failures += 1
+                logger.warning(f"Brainstorm candidate for '{call_site}' failed: {future.exception()}")
+                continue
+            texts.append(future.result())
+        self.last_stats = {
+            "requested": self.candidates, "returned": len(texts), "failed": failures,
+            "abandoned": len(pending), "seconds": round(time.perf_counter() - start, 3),
+        }
+        logger.debug("Brainstorm '%s': %s", call_site, self.last_stats)
+        if not texts and cap_error is not None:
+            raise cap_error
+        return texts
+
+    def best_responses(self, messages: list, call_site: str, scratchpad: Optional[dict] = None,
+                       top_k: int = 1, extra_context: str = "", **kwargs) -> list:
+        """Top-k distinct whole responses, most relevant to the scratchpad (plus extra_context) first."""
+        texts = self.generate_candidates(messages, call_site, **kwargs)
+        reference = f"{scratchpad_context(scratchpad)} {extra_context}".strip()
+        ranked = dedupe_and_rank(texts, reference, self.dedupe_similarity)
+        return [text for text, _ in ranked[:top_k]]
+
+    def best_ideas(self, messages: list, call_site: str, scratchpad: Optional[dict] = None,
+                   top_k: int = 3, extra_context: str = "", **kwargs) -> tuple:
+        """
+        Pools the list items of every candidate and returns (top-k distinct ideas, best whole
+        response). Ideas is empty when candidates are not lists (e.g. a clarifying question).
+        """
+        texts = self.generate_candidates(messages, call_site, **kwargs)
+        reference = f"{scratchpad_context(scratchpad)} {extra_context}".strip()
+        ranked_responses = dedupe_and_rank(texts, reference, self.dedupe_similarity)
+        best_response = ranked_responses[0][0] if ranked_responses else None
+        ideas = [idea for text in texts for idea in split_ideas(text)]
+        ranked_ideas = dedupe_and_rank(ideas, reference, self.dedupe_similarity)
+        return [idea for idea, _ in ranked_ideas[:top_k]], best_response
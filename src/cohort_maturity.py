@@ -0,0 +1,175 @@
+"""Scores idea maturity for every stored session in vectorized batches and summarizes the cohort."""
+import json
+import sqlite3
+import time
+from typing import Iterator, Optional
+
+import numpy as np
+
+from src.constants import CANONICAL_KEYS
+from src.core.logger import get_logger
+from src.utils.idea_maturity import RUBRIC, quality_matrix
+
+logger = get_logger(__name__)
+
+DEFAULT_BATCH_SIZE = 2000
+PERCENTILES = (10, 25, 50, 75, 90)
+SUMMARY_TABLE = "session_maturity"
+
+ELEMENT_WEIGHTS = np.array([RUBRIC["elements"][k]["weight"] for k in CANONICAL_KEYS], dtype=np.float32)
+# Column order that sorts elements by name, for the same tie-breaking as calculate_maturity().
+_NAME_ORDER = np.argsort(np.array(CANONICAL_KEYS))
+
+
+def iter_session_batches(conn: sqlite3.Connection, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[list]:
+    """
+    Streams (session_id, user_id, created_at, scratchpad) rows out of chatbot_sessions in batches.
+    Only the scratchpad is pulled out of the stored JSON, by SQLite itself where JSON1 is available.
+    Rows with unreadable session_data are scored as empty.
+    """
+    try:
+        cursor = conn.execute(
+            "SELECT id, user_id, created_at, "
+            "CASE WHEN json_valid(session_data) THEN json_extract(session_data, '$.scratchpad') END "
+            "FROM chatbot_sessions ORDER BY id"
+        )
+        extract_in_python = False
+    except sqlite3.OperationalError:
+        cursor = conn.execute("SELECT id, user_id, created_at, session_data FROM chatbot_sessions ORDER BY id")
+        extract_in_python = True
+
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        batch = []
+        for session_id, user_id, created_at, payload in rows:
+            try:
+                data = json.loads(payload) if payload else {}
+            except (TypeError, json.JSONDecodeError):
+                logger.warning(f"Session {session_id}: unreadable session_data, scored as empty.")
+                data = {}
+            scratchpad = data.get("scratchpad", {}) if extract_in_python else data
+            batch.append((session_id, user_id, created_at, scratchpad if isinstance(scratchpad, dict) else {}))
+        yield batch
+
+
+def score_quality_matrix(quality: np.ndarray) -> tuple:
+    """
+    Vectorized calculate_maturity() over a (sessions, elements) quality matrix.
+    Returns (scores, weakest) where weakest is a (sessions, 2) array of element indices, -1 when none.
+    """
+    element_scores = quality * ELEMENT_WEIGHTS
+    scores = np.minimum(element_scores.sum(axis=1), RUBRIC["scoring_cap"]).astype(np.int32)
+
+    by_name = element_scores[:, _NAME_ORDER]
+    order = np.argsort(by_name, axis=1, kind="stable")[:, :2]
+    weakest = _NAME_ORDER[order]
+    below_weight = np.take_along_axis(element_scores, weakest, axis=1) < ELEMENT_WEIGHTS[weakest]
+    weakest = np.where(below_weight, weakest, -1)
+    return scores, weakest
+
+
+def ensure_summary_table(conn: sqlite3.Connection, table: str = SUMMARY_TABLE):
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            session_id INTEGER PRIMARY KEY,
+            user_id TEXT,
+            created_at TIMESTAMP,
+            score INTEGER,
+            weakest_1 TEXT,
+            weakest_2 TEXT,
+            scored_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    ''')
+
+
+def score_sessions(
+    conn: sqlite3.Connection,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    summary_table: Optional[str] = SUMMARY_TABLE,
+) -> dict:
+    """
+    Scores every session in conn, writing one row per session to summary_table (skipped when
+    None), and returns the cohort summary: score percentiles, per-element presence and quality
+    means, how often each element is among the weakest two, and throughput timings.
+    """
+    if summary_table:
+        ensure_summary_table(conn, summary_table)
+
+    all_scores = []
+    presence_sum = np.zeros(len(CANONICAL_KEYS))
+    quality_sum = np.zeros(len(CANONICAL_KEYS))
+    weakest_counts = np.zeros(len(CANONICAL_KEYS), dtype=np.int64)
+    timings = {"read_seconds": 0.0, "score_seconds": 0.0, "write_seconds": 0.0}
+    quality_cache = {}  # Answers repeat across a cohort; score each distinct one once
+
+    batches = iter_session_batches(conn, batch_size)
+    while True:
+        start = time.perf_counter()
+        batch = next(batches, None)
+        timings["read_seconds"] += time.perf_counter() - start
+        if batch is None:
+            break
+
+        start = time.perf_counter()
+        quality = quality_matrix([row[3] for row in batch], cache=quality_cache)
+        scores, weakest = score_quality_matrix(quality)
+        presence_sum += (quality > 0).sum(axis=0)
+        quality_sum += quality.sum(axis=0)
+        weakest_counts += np.bincount(weakest[weakest >= 0], minlength=len(CANONICAL_KEYS))
+        all_scores.append(scores)
+        timings["score_seconds"] += time.perf_counter() - start
+
+        if summary_table:
+            start = time.perf_counter()
+            names = np.array(CANONICAL_KEYS + [None], dtype=object)  # index -1 -> None
+            rows = [
+                (row[0], row[1], row[2], int(score), names[w[0]], names[w[1]])
+                for row, score, w in zip(batch, scores.tolist(), weakest)
+            ]
+            conn.execute("BEGIN")
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {summary_table} (session_id, user_id, created_at, score, weakest_1, weakest_2) "
+                f"VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+            timings["write_seconds"] += time.perf_counter() - start
+
+    scores = np.concatenate(all_scores) if all_scores else np.zeros(0, dtype=np.int32)
+    sessions = len(scores)
+    total_seconds = sum(timings.values())
+    return {
+        "sessions": sessions,
+        "score_mean": round(float(scores.mean()), 2) if sessions else 0.0,
+        "score_percentiles": {
+            f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(scores, PERCENTILES))
+        } if sessions else {},
+        "elements": {
+            key: {
+                "presence_rate": round(presence_sum[i] / sessions, 3) if sessions else 0.0,
+                "mean_quality": round(quality_sum[i] / sessions, 3) if sessions else 0.0,
+                "weakest_count": int(weakest_counts[i]),
+            }
+            for i, key in enumerate(CANONICAL_KEYS)
+        },
+        "timings": {k: round(v, 3) for k, v in timings.items()},
+        "sessions_per_second": round(sessions / total_seconds) if total_seconds else 0,
+    }
+
+
+def format_cohort_summary(summary: dict) -> str:
+    lines = [
+        f"sessions={summary['sessions']} mean_score={summary['score_mean']} "
+        + " ".join(f"{k}={v:g}" for k, v in summary["score_percentiles"].items()),
+        f"{'element':<18}{'presence':>10}{'quality':>10}{'weakest':>10}",
+    ]
+    for key, row in summary["elements"].items():
+        lines.append(f"{key:<18}{row['presence_rate']:>10.3f}{row['mean_quality']:>10.3f}{row['weakest_count']:>10}")
+    t = summary["timings"]
+    lines.append(
+        f"read={t['read_seconds']}s score={t['score_seconds']}s write={t['write_seconds']}s "
+        f"throughput={summary['sessions_per_second']} sessions/s"
+    )
+    return "\n".join(lines)
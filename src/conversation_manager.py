@@ -14,12 +14,16 @@ import asyncio
 import logging
 import random
 import re
+import time
 
 from src.persistence_utils import save_session, load_session, ensure_db
 from src.llm_utils import query_openai, generate_contextual_follow_up, build_conversation_messages # Removed unused build_prompt, propose_next_conversation_turn
 from src import search_utils # Changed from 'from src import search_utils'
 # Removed: from . import conversation_phases - Phase logic will be handled by workflows
 from src.utils.scratchpad_extractor import update_scratchpad
+from src.rolling_summary import get_session_summarizer
+from src.core import metrics
+from src import usage_ledger
 from src.constants import EMPTY_SCRATCHPAD, REQUIRED_SCRATCHPAD_KEYS
 from src.registry import get_workflow, get_persona, populate_registries, get_available_workflows, get_available_personas
 
@@ -293,8 +297,9 @@ async def generate_assistant_response(user_input: str) -> tuple[str, list]:
     # st.session_state.setdefault("phase", "exploration") # Phase removed
     st.session_state.setdefault("module", "default_module") # Default module for simulation
     st.session_state.setdefault("turn_count", 0) # Ensure turn_count exists
+    turn_start = time.perf_counter()
 
-    logging.debug(f"generate_assistant_response called with user_input: '{user_input[:50]}...'")
+    logging.debug("generate_assistant_response called with user_input: '%s...'", user_input[:50])
 
     workflow_instance = st.session_state.get("current_workflow_instance")
     if not workflow_instance:
@@ -373,7 +378,11 @@ async def generate_assistant_response(user_input: str) -> tuple[str, list]:
         "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat()
     })
     st.session_state["turn_count"] += 1
+    # Fold older turns into the rolling summary off the request path.
+    get_session_summarizer().schedule(st.session_state["conversation_history"])
     save_session(st.session_state["user_id"], dict(st.session_state))
+    metrics.record_turn(st.session_state["user_id"], st.session_state.get("workflow"), st.session_state.get("phase"),
+                        time.perf_counter() - turn_start)
     return final_response_text, search_results
 
 # Removed route_conversation function as its logic is now incorporated into
@@ -443,20 +452,11 @@ def create_turn_summary(text: str) -> str:
 
 def reconstruct_context_from_summaries() -> str:
     """
-    Combines the latest 10 summaries and the 3 most recent conversation turns
-    to reconstruct context for LLM prompt building.
+    Reconstructs context for LLM prompt building from the rolling conversation summary
+    (session summary plus the latest chunk summaries) and the most recent conversation turns,
+    within the summarizer's token budget.
     """
-    context_parts = []
-
-    # Add latest 10 summaries
-    context_parts.extend(st.session_state["summaries"][-10:])
-
-    # Add 3 most recent conversation turns
-    recent_turns = st.session_state["conversation_history"][-3:]
-    for turn in recent_turns:
-        context_parts.append(f"{turn['role']}: {turn['text']}")
-
-    return "\n".join(context_parts)
+    return get_session_summarizer().context(st.session_state["conversation_history"])
 
 def build_summary_from_scratchpad(scratchpad: dict) -> str:
     """
@@ -513,7 +513,8 @@ def update_token_usage(tokens: int):
     try:
         st.session_state.setdefault("token_usage", {"session": 0, "daily": 0})
         st.session_state["token_usage"]["session"] += tokens
-        st.session_state["token_usage"]["daily"] += tokens
+        # The daily figure is global across sessions; the usage ledger holds it.
+        st.session_state["token_usage"]["daily"] = usage_ledger.get_ledger().day_tokens()
         save_session(st.session_state["user_id"], st.session_state.to_dict())
     except Exception as e:
         logging.error(f"Error updating token usage: {e}")
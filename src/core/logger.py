@@ -1,14 +1,173 @@
+"""
+Logging setup shared by the app: one JSON object per line (or plain text) on stdout, written by a
+background QueueListener so a log call never waits on I/O. Levels come from the environment:
+
+    LOG_LEVEL=INFO                                   root level (default INFO)
+    LOG_LEVELS=src.persistence_utils=DEBUG,src.analytics=WARNING   per-logger overrides
+    LOG_FORMAT=json                                  "json" (default) or "text"
+    LOG_DEBUG_SAMPLE_EVERY=100                       hot debug sites emit 1 record in N (get_sampled_logger)
+
+Pass values as %-style arguments (logger.debug("saved %s", key)) rather than f-strings, so the
+message is only built for records that pass the level check. Keyword data goes in extra= and
+becomes fields of the JSON record.
+"""
+import atexit
+import datetime
+import itertools
+import json
 import logging
+import logging.handlers
+import os
+import queue
 import sys
+from typing import Optional
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_LEVELS = os.environ.get("LOG_LEVELS", "")
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json").strip().lower()
+# Records held for the listener thread; when full, new records are dropped (and counted).
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+LOG_DEBUG_SAMPLE_EVERY = int(os.environ.get("LOG_DEBUG_SAMPLE_EVERY", "100"))
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+# Attributes every LogRecord has; anything else on a record came from extra=.
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+def parse_level(value, default: int = logging.INFO) -> int:
+    if isinstance(value, int):
+        return value
+    level = logging.getLevelName(str(value or "").strip().upper())
+    return level if isinstance(level, int) else default
+
+
+def parse_levels(spec: str) -> dict:
+    """"a.b=DEBUG,c=WARNING" -> {"a.b": 10, "c": 30}; malformed entries are ignored."""
+    levels = {}
+    for item in (spec or "").split(","):
+        name, sep, level = item.partition("=")
+        if sep and name.strip():
+            levels[name.strip()] = parse_level(level, default=logging.NOTSET)
+    return levels
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread; a full queue drops the record instead of blocking the caller."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the %-arguments now, since the values may change before the listener runs, but
+        # leave the (costlier) JSON formatting to the listener thread.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """Writes to whatever sys.stdout is at emit time (test runners and Streamlit swap it)."""
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
 
-# Configure logger
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+
+
+def configure_logging(level=None, levels: Optional[str] = None, fmt: Optional[str] = None,
+                      handler: Optional[logging.Handler] = None) -> NonBlockingQueueHandler:
+    """
+    (Re)installs the root queue handler and its listener. Arguments default to the LOG_*
+    settings; handler replaces the stdout output (e.g. for benchmarks).
+    """
+    global _listener, _queue_handler
+    stop_logging()
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        # Also catches a copy installed by this module imported under a second name (core.logger).
+        if type(existing).__name__ == "NonBlockingQueueHandler":
+            root.removeHandler(existing)
+    output = handler or _StdoutHandler()
+    if handler is None:
+        output.setFormatter(JsonFormatter() if (fmt or LOG_FORMAT) == "json" else logging.Formatter(TEXT_FORMAT))
+    _queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=max(1, LOG_QUEUE_SIZE)))
+    root.addHandler(_queue_handler)
+    root.setLevel(parse_level(LOG_LEVEL if level is None else level))
+    for name, logger_level in parse_levels(LOG_LEVELS if levels is None else levels).items():
+        logging.getLogger(name).setLevel(logger_level)
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, output)
+    _listener.start()
+    return _queue_handler
+
+
+@atexit.register
+def stop_logging():
+    """Writes out queued records and removes the queue handler."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+
+
+class SampledLogger:
+    """
+    Wraps a logger at a hot debug site: only every `every`-th debug call is emitted, tagged with
+    sample_every so counts can be scaled back up. Disabled DEBUG costs one isEnabledFor check.
+    """
+
+    def __init__(self, logger: logging.Logger, every: int = LOG_DEBUG_SAMPLE_EVERY):
+        self.logger = logger
+        self.every = max(1, every)
+        self._calls = itertools.count()
+
+    def sample(self) -> bool:
+        """True for the debug calls that should be emitted; use it to skip building costly arguments."""
+        return self.logger.isEnabledFor(logging.DEBUG) and next(self._calls) % self.every == 0
+
+    def debug(self, msg, *args, extra: Optional[dict] = None, **kwargs):
+        if not self.sample():
+            return
+        self.logger.debug(msg, *args, extra={**(extra or {}), "sample_every": self.every}, stacklevel=2, **kwargs)
+
+
+configure_logging()
 
 logger = logging.getLogger("app_logger")
 
@@ -16,4 +175,9 @@ def get_logger(name: str = "app_logger"):
     """
     Returns a logger instance.
     """
-    return logging.getLogger(name)
\ No newline at end of file
+    return logging.getLogger(name)
+
+
+def get_sampled_logger(name: str, every: Optional[int] = None) -> SampledLogger:
+    """A logger for a hot debug site that emits one debug record in every `every` (LOG_DEBUG_SAMPLE_EVERY)."""
+    return SampledLogger(logging.getLogger(name), LOG_DEBUG_SAMPLE_EVERY if every is None else every)
@@ -0,0 +1,310 @@
+"""
+In-process Prometheus-style metrics: counters, gauges and histograms with labels, rendered in the
+Prometheus text exposition format.
+
+Modules declare their metrics at import time (counter()/gauge()/histogram() return the existing
+metric when the name is already registered, so Streamlit reruns do not duplicate them).
+start_exporters() serves REGISTRY on a side port (METRICS_PORT) and/or rewrites a file for the
+node_exporter textfile collector (METRICS_TEXTFILE); both are off by default.
+"""
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+from src.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Port of the /metrics endpoint; 0 disables it.
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))
+METRICS_ADDR = os.environ.get("METRICS_ADDR", "127.0.0.1")
+# File rewritten every METRICS_TEXTFILE_INTERVAL seconds (should end in .prom); empty disables it.
+METRICS_TEXTFILE = os.environ.get("METRICS_TEXTFILE", "")
+METRICS_TEXTFILE_INTERVAL = float(os.environ.get("METRICS_TEXTFILE_INTERVAL", "15"))
+# A session counts as active if it had a turn within this many seconds.
+ACTIVE_SESSION_WINDOW = float(os.environ.get("METRICS_ACTIVE_SESSION_WINDOW", "900"))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), fn: Optional[Callable] = None):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        # fn is read at render time instead of stored values: it returns a number, or a dict of
+        # label-value tuples to numbers.
+        self._fn = fn
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _current(self) -> dict:
+        if self._fn is None:
+            with self._lock:
+                return dict(self._values)
+        try:
+            result = self._fn()
+        except Exception as e:
+            logger.warning(f"Metric callback for {self.name} failed: {e}")
+            return {}
+        return result if isinstance(result, dict) else {(): result}
+
+    def samples(self) -> list:
+        """(sample name, labels, value) triples."""
+        return [(self.name, dict(zip(self.label_names, key)), value) for key, value in sorted(self._current().items())]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            entry["counts"][next(i for i, bound in enumerate(self.buckets) if value <= bound)] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def time(self, **labels):
+        """Context manager observing the duration of its block in seconds."""
+        return _Timer(self, labels)
+
+    def value(self, **labels) -> dict:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return {"count": entry["count"], "sum": entry["sum"]} if entry else {"count": 0, "sum": 0.0}
+
+    def samples(self) -> list:
+        with self._lock:
+            entries = [(key, dict(entry, counts=list(entry["counts"]))) for key, entry in sorted(self._values.items())]
+        rows = []
+        for key, entry in entries:
+            labels = dict(zip(self.label_names, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry["counts"]):
+                cumulative += count
+                rows.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            rows.append((f"{self.name}_sum", labels, entry["sum"]))
+            rows.append((f"{self.name}_count", labels, entry["count"]))
+        return rows
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.type_name}")
+            return metric
+
+    def counter(self, name: str, help_text: str, labels: tuple = (), fn: Optional[Callable] = None) -> Counter:
+        return self._get_or_create(Counter, name, help_text, labels, fn)
+
+    def gauge(self, name: str, help_text: str, labels: tuple = (), fn: Optional[Callable] = None) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text, labels, fn)
+
+    def histogram(self, name: str, help_text: str, labels: tuple = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, labels, buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for sample_name, labels, value in metric.samples():
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+_session_last_seen = {}
+_session_lock = threading.Lock()
+
+
+def mark_session_active(session_id):
+    if session_id:
+        with _session_lock:
+            _session_last_seen[session_id] = time.monotonic()
+
+
+def active_sessions(window: float = ACTIVE_SESSION_WINDOW) -> int:
+    """Sessions with a turn in the last window seconds; older ones are forgotten."""
+    cutoff = time.monotonic() - window
+    with _session_lock:
+        for session_id in [s for s, seen in _session_last_seen.items() if seen < cutoff]:
+            del _session_last_seen[session_id]
+        return len(_session_last_seen)
+
+
+gauge("coach_active_sessions", "Sessions with a turn in the last METRICS_ACTIVE_SESSION_WINDOW seconds.",
+      fn=lambda: active_sessions())
+TURNS = counter("coach_turns_total", "User turns handled.", ("workflow", "phase"))
+TURN_LATENCY = histogram("coach_turn_duration_seconds", "Time to produce the reply to a user turn.", ("workflow",),
+                         buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+
+
+def record_turn(session_id, workflow: str, phase: str, seconds: float):
+    """Counts a handled turn (rate(coach_turns_total) is turns/sec) and marks its session active."""
+    TURNS.inc(workflow=workflow or "unknown", phase=phase or "unknown")
+    TURN_LATENCY.observe(seconds, workflow=workflow or "unknown")
+    mark_session_active(session_id)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the app log
+
+
+def start_http_server(port: int, addr: str = METRICS_ADDR) -> ThreadingHTTPServer:
+    """Serves REGISTRY at http://addr:port/metrics from a daemon thread."""
+    server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def write_textfile(path: str):
+    """Atomically replaces path with the current metrics (for the node_exporter textfile collector)."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(REGISTRY.render())
+    os.replace(tmp_path, path)
+
+
+def _textfile_loop(path: str, interval: float):
+    while True:
+        try:
+            write_textfile(path)
+        except OSError as e:
+            logger.warning(f"Failed to write metrics textfile {path}: {e}")
+        time.sleep(interval)
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters(port: int = METRICS_PORT, textfile: str = METRICS_TEXTFILE,
+                    interval: float = METRICS_TEXTFILE_INTERVAL) -> bool:
+    """Starts the configured exporters once per process; later calls are no-ops. Returns True if any started."""
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return False
+        _exporters_started = True
+    started = False
+    if port:
+        try:
+            start_http_server(port)
+            logger.info(f"Serving metrics on http://{METRICS_ADDR}:{port}/metrics")
+            started = True
+        except OSError as e:
+            logger.error(f"Could not serve metrics on port {port}: {e}")
+    if textfile:
+        threading.Thread(target=_textfile_loop, args=(textfile, interval), name="metrics-textfile", daemon=True).start()
+        logger.info(f"Writing metrics to {textfile} every {interval}s")
+        started = True
+    return started
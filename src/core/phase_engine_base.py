@@ -3,6 +3,7 @@ import streamlit as st
 from src.core.logger import get_logger
 from src.analytics import log_event
 from src.core.coach_persona_base import CoachPersonaBase
+from src.core.tracing import span, traced
 
 logger = get_logger(__name__)
 
@@ -21,7 +22,14 @@ class PhaseEngineBase(ABC):
             logger.warning(f"PhaseEngine subclass {self.__class__.__name__} should define a 'phase_name'.")
             self.phase_name = self.__class__.__name__.replace("Phase", "")
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Overrides of enter()/handle_response() are traced like the base implementations.
+        for method_name in ("enter", "handle_response"):
+            if method_name in cls.__dict__:
+                setattr(cls, method_name, traced()(cls.__dict__[method_name]))
 
+    @traced()
     def enter(self) -> str:
         """
         Called when entering this phase.
@@ -33,6 +41,7 @@ class PhaseEngineBase(ABC):
         self._is_complete = False # Reset completion status on entry
         return self.coach_persona.get_step_intro_message(phase_name=self.phase_name)
 
+    @traced()
     def handle_response(self, user_input: str) -> dict:
         """
         Processes the user's response based on classified intent.
@@ -40,7 +49,8 @@ class PhaseEngineBase(ABC):
         Returns a dictionary: {"next_phase": str | None, "reply": str}
         """
         self.debug_log(step="handle_response_start", user_input=user_input)
-        intent = self.classify_intent(user_input)
+        with span("classify_intent"):
+            intent = self.classify_intent(user_input)
         log_event("intent_classified", phase_name=self.phase_name, workflow_name=self.workflow_name, user_input=user_input, intent=intent)
 
         reply: str = ""
@@ -60,7 +70,8 @@ class PhaseEngineBase(ABC):
         if intent in ["provide_detail", "affirm"]:
             # For "affirm", micro_validate will check if it's a standalone vague affirmation (e.g. "ok")
             # or part of actual content.
-            is_valid_content = self.coach_persona.micro_validate(user_input_stripped, phase_name=self.phase_name)
+            with span("micro_validate"):
+                is_valid_content = self.coach_persona.micro_validate(user_input_stripped, phase_name=self.phase_name)
             if is_valid_content:
                 self.store_input_to_scratchpad(user_input_stripped)
                 # self.mark_complete() # Removed: Subclass's get_next_phase_after_completion will decide if phase is fully done.
@@ -130,7 +141,7 @@ class PhaseEngineBase(ABC):
         """
         Helper for logging debug information.
         """
-        logger.debug(f"Workflow: {self.workflow_name}, Phase: {self.phase_name}, Step: {step}", extra=kwargs)
+        logger.debug("Workflow: %s, Phase: %s, Step: %s", self.workflow_name, self.phase_name, step, extra=kwargs)
 
     def classify_intent(self, user_input: str) -> str:
         """
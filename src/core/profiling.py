@@ -0,0 +1,199 @@
+"""
+Opt-in sampling profiler for Streamlit script runs.
+
+While active, a daemon thread wakes every PROFILE_INTERVAL_MS, reads the profiled thread's
+stack from sys._current_frames() and counts it. Nothing is installed on the profiled thread
+itself (no sys.setprofile), so a profiled run slows down only by the sampling thread's share of
+the GIL, and runs that are not profiled pay one check. When the run ends, its samples are written
+next to each other as:
+
+    <PROFILE_DIR>/<session>-<run>.folded             collapsed stacks (flamegraph.pl, speedscope)
+    <PROFILE_DIR>/<session>-<run>.speedscope.json    speedscope's sampled-profile format
+
+A run is profiled when its session id is listed in PROFILE_SESSIONS ("*" for every session), or
+when the page URL carries ?profile=<PROFILE_TOKEN> (only if PROFILE_TOKEN is set), so a live
+session can be profiled without a redeploy. See profile_run().
+"""
+import hmac
+import json
+import os
+import re
+import sys
+import threading
+import time
+from typing import Optional
+
+from src.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Session ids to profile, comma-separated; "*" profiles every session. Empty disables it.
+PROFILE_SESSIONS = os.environ.get("PROFILE_SESSIONS", "")
+# Secret that enables profiling from the URL (?profile=<token>); empty disables the query param.
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "5"))
+QUERY_PARAM = "profile"
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+def _frame_key(frame) -> tuple:
+    code = frame.f_code
+    return code.co_name, code.co_filename, code.co_firstlineno
+
+
+class SamplingProfiler:
+    """
+    Samples one thread's Python stack at a fixed interval. Stacks are kept as tuples of
+    (function, file, first line) from the outermost frame inward, each with its sample count
+    and the wall time the samples stood for.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_MS / 1000, thread_id: Optional[int] = None):
+        self.interval = max(0.0005, interval)
+        self.thread_id = thread_id
+        self.stacks = {}  # stack tuple -> [samples, seconds]
+        self.samples = 0
+        self.start_time = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> "SamplingProfiler":
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        self.start_time = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.duration = time.perf_counter() - self.start_time
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break  # The profiled thread has exited
+            stack = []
+            while frame is not None:
+                stack.append(_frame_key(frame))
+                frame = frame.f_back
+            del frame
+            if stack:
+                entry = self.stacks.setdefault(tuple(reversed(stack)), [0, 0.0])
+                entry[0] += 1
+                entry[1] += now - last  # The sample stands for the time since the previous one
+                self.samples += 1
+            last = now
+
+    def collapsed(self) -> list:
+        """Lines of "outer;inner;leaf <microseconds>", the format flamegraph.pl and speedscope read."""
+        lines = []
+        for stack, (_, seconds) in sorted(self.stacks.items(), key=lambda item: -item[1][1]):
+            names = ";".join(f"{name} ({os.path.basename(path)}:{line})" for name, path, line in stack)
+            lines.append(f"{names} {max(1, round(seconds * 1_000_000))}")
+        return lines
+
+    def speedscope(self, name: str = "profile") -> dict:
+        """The samples as a speedscope "sampled" profile (one aggregated sample per distinct stack)."""
+        frames, index = [], {}
+        samples, weights = [], []
+        for stack, (_, seconds) in self.stacks.items():
+            ids = []
+            for key in stack:
+                if key not in index:
+                    index[key] = len(frames)
+                    frames.append({"name": key[0], "file": key[1], "line": key[2]})
+                ids.append(index[key])
+            samples.append(ids)
+            weights.append(seconds)
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "src.core.profiling",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled", "name": name, "unit": "seconds",
+                "startValue": 0, "endValue": round(sum(weights), 6),
+                "samples": samples, "weights": [round(w, 6) for w in weights],
+            }],
+        }
+
+    def write(self, directory: str, name: str) -> tuple:
+        """Writes <name>.folded and <name>.speedscope.json into directory; returns both paths."""
+        os.makedirs(directory, exist_ok=True)
+        folded_path = os.path.join(directory, f"{name}.folded")
+        speedscope_path = os.path.join(directory, f"{name}.speedscope.json")
+        with open(folded_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(self.collapsed()) + "\n")
+        with open(speedscope_path, "w", encoding="utf-8") as f:
+            json.dump(self.speedscope(name), f)
+        return folded_path, speedscope_path
+
+
+def should_profile(session_id, query_value: Optional[str] = None, sessions: Optional[str] = None,
+                   token: Optional[str] = None) -> bool:
+    """True when this session is listed in PROFILE_SESSIONS or the URL carries the profiling token."""
+    sessions = PROFILE_SESSIONS if sessions is None else sessions
+    token = PROFILE_TOKEN if token is None else token
+    if token and hmac.compare_digest(str(query_value or "").encode("utf-8"), token.encode("utf-8")):
+        return True
+    selected = {s.strip() for s in sessions.split(",") if s.strip()}
+    return "*" in selected or (session_id is not None and str(session_id) in selected)
+
+
+class _NoProfile:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class _RunProfile:
+    def __init__(self, name: str, directory: str):
+        self.name = name
+        self.directory = directory
+        self.profiler = SamplingProfiler()
+
+    def __enter__(self):
+        return self.profiler.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        # Also reached through st.rerun()/st.stop(), which end a run by raising.
+        self.profiler.stop()
+        try:
+            paths = self.profiler.write(self.directory, self.name)
+            logger.info("Profiled script run %s: %s samples over %.3fs -> %s", self.name, self.profiler.samples,
+                        self.profiler.duration, paths[1])
+        except OSError as e:
+            logger.warning("Could not write profile %s: %s", self.name, e)
+        return False
+
+
+def profile_run(session_id, query_value: Optional[str] = None, directory: Optional[str] = None):
+    """
+    Context manager around one script run: samples it when should_profile() says so and writes
+    its files on exit, otherwise does nothing. Files are named after the session and run time.
+    """
+    if not should_profile(session_id, query_value):
+        return _NoProfile()
+    session = re.sub(r"[^A-Za-z0-9_.-]", "_", str(session_id or "anonymous"))[:64]
+    return _RunProfile(f"{session}-{time.strftime('%Y%m%dT%H%M%S')}-{time.time_ns() % 1_000_000_000:09d}",
+                       directory or PROFILE_DIR)
@@ -0,0 +1,359 @@
+"""
+Lightweight span tracing for coaching turns.
+
+Spans are opened with `with span("name"):` (or the @traced decorator) and nest through a
+contextvar, so every span opened while a turn is active carries that turn's trace, session and
+turn ids. Finished spans are handed to a background exporter that appends them to a JSON Lines
+file (TRACE_EXPORTER=file) or posts them to a local OTLP/HTTP collector (TRACE_EXPORTER=otlp).
+With no exporter configured, span() returns a shared no-op and costs one function call.
+
+See src/trace_report.py and scripts/trace_report.py for the per-turn breakdown.
+"""
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import os
+import queue
+import threading
+import time
+import urllib.request
+from typing import Optional
+
+from src.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# "" (tracing off), "file" or "otlp".
+TRACE_EXPORTER = os.environ.get("TRACE_EXPORTER", "").strip().lower()
+TRACE_FILE = os.environ.get("TRACE_FILE", "traces.jsonl")
+TRACE_OTLP_ENDPOINT = os.environ.get("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACE_SERVICE_NAME = os.environ.get("TRACE_SERVICE_NAME", "ideation-coach")
+# Finished spans held in memory before new ones are dropped.
+TRACE_QUEUE_SIZE = int(os.environ.get("TRACE_QUEUE_SIZE", "10000"))
+
+EXPORTERS = ("", "file", "otlp")
+# Session-state key holding the pending Streamlit rerun of the last turn (a plain, serializable dict).
+RERUN_KEY = "_trace_rerun"
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+def _new_id(n_bytes: int) -> str:
+    return os.urandom(n_bytes).hex()
+
+
+class Span:
+    """One timed operation. Times are wall-clock nanoseconds so spans from separate script runs line up."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "session_id", "turn_id", "attrs", "start_ns", "end_ns", "error")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attrs: Optional[dict] = None,
+                 session_id=None, turn_id=None, trace_id: Optional[str] = None, span_id: Optional[str] = None,
+                 start_ns: Optional[int] = None):
+        self.name = name
+        self.trace_id = trace_id or (parent.trace_id if parent else _new_id(16))
+        self.span_id = span_id or _new_id(8)
+        self.parent_id = parent.span_id if parent else None
+        self.session_id = session_id if session_id is not None else (parent.session_id if parent else None)
+        self.turn_id = turn_id if turn_id is not None else (parent.turn_id if parent else None)
+        self.attrs = attrs or {}
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    def set(self, key: str, value):
+        self.attrs[key] = value
+
+    def end(self, error: Optional[BaseException] = None):
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        exporter = get_exporter()
+        if exporter is not None:
+            exporter.export(self.to_dict())
+
+    def to_dict(self) -> dict:
+        record = {
+            "name": self.name, "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+            "session_id": self.session_id, "turn_id": self.turn_id,
+            "start_ns": self.start_ns, "end_ns": self.end_ns, "attrs": self.attrs,
+        }
+        if self.error:
+            record["error"] = self.error
+        return record
+
+
+class _SpanScope:
+    """Makes a span current for the duration of a with-block (or until end())."""
+
+    __slots__ = ("span", "_token")
+
+    def __init__(self, span_obj: Span):
+        self.span = span_obj
+        self._token = None
+
+    def __enter__(self) -> Span:
+        self._token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._token is not None:
+            _current.reset(self._token)
+            self._token = None
+        self.span.end(exc)
+        return False
+
+    def end(self):
+        self.__exit__(None, None, None)
+
+
+class _NoopSpan:
+    __slots__ = ()
+    span = None
+
+    def set(self, key, value):
+        pass
+
+    def end(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def enabled() -> bool:
+    return get_exporter() is not None
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def span(name: str, **attrs):
+    """Context manager timing a child of the current span (or a new trace's root)."""
+    if get_exporter() is None:
+        return _NOOP
+    return _SpanScope(Span(name, parent=_current.get(), attrs=attrs))
+
+
+def traced(name: Optional[str] = None, **attrs):
+    """Decorator wrapping every call of a function (sync or async) in a span named after it."""
+    def decorate(fn):
+        span_name = name or fn.__qualname__
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, **attrs):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name, **attrs):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def start_turn(session_id, turn_id, **attrs):
+    """
+    Opens the root "turn" span and makes it current; spans opened until its end() belong to
+    the turn's trace and carry its session and turn ids.
+    """
+    if get_exporter() is None:
+        return _NOOP
+    scope = _SpanScope(Span("turn", attrs=attrs, session_id=session_id, turn_id=turn_id))
+    scope.__enter__()
+    return scope
+
+
+def mark_rerun(state: dict, turn_scope):
+    """Records in state that the turn is about to trigger a Streamlit rerun, so the rerun is timed in the same trace."""
+    turn_span = getattr(turn_scope, "span", None)
+    if turn_span is None:
+        return
+    state[RERUN_KEY] = {
+        "trace_id": turn_span.trace_id, "span_id": _new_id(8), "session_id": turn_span.session_id,
+        "turn_id": turn_span.turn_id, "start_ns": time.time_ns(),
+    }
+
+
+def _rerun_span(marker: dict) -> Span:
+    # A second root of the turn's trace: it starts when the turn span ends, so it is not nested under it.
+    return Span("streamlit_rerun", session_id=marker.get("session_id"), turn_id=marker.get("turn_id"),
+                trace_id=marker["trace_id"], span_id=marker["span_id"], start_ns=marker["start_ns"])
+
+
+def resume_rerun(state: dict):
+    """
+    Called at the top of a script run: while a rerun is pending, spans opened in this run
+    (e.g. entering the next phase) become children of the rerun span.
+    """
+    marker = state.get(RERUN_KEY)
+    _current.set(_rerun_span(marker) if marker and get_exporter() is not None else None)
+
+
+def finish_rerun(state: dict):
+    """Ends the pending rerun span once the run has rendered the turn's result."""
+    marker = state.pop(RERUN_KEY, None)
+    _current.set(None)
+    if marker and get_exporter() is not None:
+        _rerun_span(marker).end()
+
+
+class BatchSpanExporter:
+    """Exports finished spans from a daemon thread in batches; a full queue drops spans rather than slowing the turn."""
+
+    def __init__(self, max_queue: int = TRACE_QUEUE_SIZE, batch_size: int = 256):
+        self._queue = queue.Queue(maxsize=max(1, max_queue))
+        self.batch_size = max(1, batch_size)
+        self.stats = {"exported": 0, "dropped": 0, "errors": 0}
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def export(self, record: dict):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                    self._thread.start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Waits until every span exported so far has been sent. Returns False on timeout."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def _run(self):
+        while True:
+            batch, markers = [], []
+            item = self._queue.get()
+            while True:
+                (markers if isinstance(item, threading.Event) else batch).append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self.send(batch)
+                    self.stats["exported"] += len(batch)
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    logger.warning(f"Failed to export {len(batch)} spans with {type(self).__name__}: {e}")
+            for marker in markers:
+                marker.set()
+
+    def send(self, batch: list):
+        raise NotImplementedError
+
+
+class FileSpanExporter(BatchSpanExporter):
+    """Appends one JSON object per span to a JSON Lines file."""
+
+    def __init__(self, path: str = TRACE_FILE, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+
+    def send(self, batch: list):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(record, default=str) + "\n" for record in batch))
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_payload(batch: list, service_name: str = TRACE_SERVICE_NAME) -> dict:
+    """Builds an OTLP/HTTP JSON ExportTraceServiceRequest from span records."""
+    spans = []
+    for record in batch:
+        attrs = dict(record.get("attrs") or {})
+        for key, name in (("session_id", "session.id"), ("turn_id", "turn.id")):
+            if record.get(key) is not None:
+                attrs[name] = record[key]
+        otlp_span = {
+            "traceId": record["trace_id"], "spanId": record["span_id"], "name": record["name"], "kind": 1,
+            "startTimeUnixNano": str(record["start_ns"]), "endTimeUnixNano": str(record["end_ns"]),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in attrs.items() if v is not None],
+            "status": {"code": 2, "message": record["error"]} if record.get("error") else {},
+        }
+        if record.get("parent_id"):
+            otlp_span["parentSpanId"] = record["parent_id"]
+        spans.append(otlp_span)
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+        "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+    }]}
+
+
+class OTLPSpanExporter(BatchSpanExporter):
+    """Posts spans as OTLP/HTTP JSON to a local collector (e.g. an OpenTelemetry Collector or Jaeger on :4318)."""
+
+    def __init__(self, endpoint: str = TRACE_OTLP_ENDPOINT, service_name: str = TRACE_SERVICE_NAME,
+                 timeout: float = 2.0, **kwargs):
+        super().__init__(**kwargs)
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def send(self, batch: list):
+        body = json.dumps(otlp_payload(batch, self.service_name), default=str).encode("utf-8")
+        request = urllib.request.Request(self.endpoint, data=body, method="POST",
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+_UNSET = object()
+_exporter = _UNSET
+_exporter_lock = threading.Lock()
+
+
+def get_exporter() -> Optional[BatchSpanExporter]:
+    """The exporter chosen by TRACE_EXPORTER, created on first use; None when tracing is off."""
+    global _exporter
+    if _exporter is _UNSET:
+        with _exporter_lock:
+            if _exporter is _UNSET:
+                if TRACE_EXPORTER not in EXPORTERS:
+                    logger.warning(f"Unknown TRACE_EXPORTER '{TRACE_EXPORTER}'; expected one of {EXPORTERS}. Tracing is off.")
+                _exporter = {"file": FileSpanExporter, "otlp": OTLPSpanExporter}.get(TRACE_EXPORTER, lambda: None)()
+    return _exporter
+
+
+def set_exporter(exporter: Optional[BatchSpanExporter]):
+    """Replaces the exporter (None turns tracing off); for tests and scripts."""
+    global _exporter
+    _exporter = exporter
+
+
+@atexit.register
+def flush_spans(timeout: float = 5.0) -> bool:
+    exporter = _exporter if _exporter is not _UNSET else None
+    return exporter.flush(timeout) if exporter is not None else True
@@ -1,5 +1,6 @@
 from typing import Dict
 from ..llm_utils import query_openai
+from ..summary_store import DERIVED_KEYS
 
 class SummaryEngine:
     def generate(self, scratchpad: Dict[str, str]) -> str:
@@ -8,7 +9,7 @@ class SummaryEngine:
 
         context = "\n".join(
             f"{fmt(k)}: {v}"
-            for k, v in scratchpad.items() if v
+            for k, v in scratchpad.items() if v and k not in DERIVED_KEYS
         ) or "No structured input yet."
 
         prompt = (
@@ -27,7 +28,7 @@ class SummaryEngine:
         )
 
         try:
-            return query_openai(prompt)
+            return query_openai([{"role": "user", "content": prompt}], call_site="summary_engine")
         except Exception:
             return (
                 "Elevator Pitch:\n<example pitch here>\n\n"
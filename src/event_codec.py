@@ -0,0 +1,349 @@
+"""
+Compact binary encoding of analytics events (the "binary" ANALYTICS_FORMAT of partitioned segments).
+
+A binary segment (events-*.evb) is a sequence of records, each a LEB128 varint byte length
+followed by a MessagePack array:
+
+    [event, ts, session, workflow, phase, values, extras]
+
+    event     schema id from src/event_schema.py (the name as a string for undeclared events)
+    ts        utc_ts as integer microseconds since the epoch (the original value if it has another form)
+    session   session_id as raw bytes when it is lowercase hex, otherwise the string
+    workflow, phase   index into event_schema.INTERNED, otherwise the string
+    values    the schema's fields in declaration order (nil where absent)
+    extras    map of undeclared fields, or nil
+
+The msgpack package is used when installed; otherwise a small built-in packer writes the same
+bytes, so either side can read the other's files. A truncated last record (a segment still being
+written) is left for the next read. decode_records() and iter_file_events() read both this
+format and the older JSON Lines segments.
+"""
+import datetime
+import json
+import struct
+from typing import Iterator, Optional
+
+from src import event_schema
+
+try:
+    import msgpack
+except ImportError:  # The built-in packer below writes the same format
+    msgpack = None
+
+BINARY_SUFFIX = ".evb"
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+# --- MessagePack subset (nil, bool, int, float64, str, bin, array, map) ---
+
+def _pack_into(out: bytearray, obj):
+    if obj is None:
+        out.append(0xC0)
+    elif obj is True:
+        out.append(0xC3)
+    elif obj is False:
+        out.append(0xC2)
+    elif isinstance(obj, int):
+        if 0 <= obj < 0x80:
+            out.append(obj)
+        elif -32 <= obj < 0:
+            out.append(obj & 0xFF)
+        elif 0 <= obj <= 0xFF:
+            out += b"\xcc" + struct.pack(">B", obj)
+        elif 0 <= obj <= 0xFFFF:
+            out += b"\xcd" + struct.pack(">H", obj)
+        elif 0 <= obj <= 0xFFFFFFFF:
+            out += b"\xce" + struct.pack(">I", obj)
+        elif 0 <= obj <= 0xFFFFFFFFFFFFFFFF:
+            out += b"\xcf" + struct.pack(">Q", obj)
+        elif -0x80 <= obj < 0:
+            out += b"\xd0" + struct.pack(">b", obj)
+        elif -0x8000 <= obj < 0:
+            out += b"\xd1" + struct.pack(">h", obj)
+        elif -0x80000000 <= obj < 0:
+            out += b"\xd2" + struct.pack(">i", obj)
+        elif -0x8000000000000000 <= obj < 0:
+            out += b"\xd3" + struct.pack(">q", obj)
+        else:  # Outside MessagePack's integer range
+            _pack_into(out, str(obj))
+    elif isinstance(obj, float):
+        out += b"\xcb" + struct.pack(">d", obj)
+    elif isinstance(obj, str):
+        data = obj.encode("utf-8")
+        n = len(data)
+        if n < 32:
+            out.append(0xA0 | n)
+        elif n <= 0xFF:
+            out += b"\xd9" + struct.pack(">B", n)
+        elif n <= 0xFFFF:
+            out += b"\xda" + struct.pack(">H", n)
+        else:
+            out += b"\xdb" + struct.pack(">I", n)
+        out += data
+    elif isinstance(obj, (bytes, bytearray)):
+        n = len(obj)
+        if n <= 0xFF:
+            out += b"\xc4" + struct.pack(">B", n)
+        elif n <= 0xFFFF:
+            out += b"\xc5" + struct.pack(">H", n)
+        else:
+            out += b"\xc6" + struct.pack(">I", n)
+        out += obj
+    elif isinstance(obj, (list, tuple)):
+        n = len(obj)
+        if n < 16:
+            out.append(0x90 | n)
+        elif n <= 0xFFFF:
+            out += b"\xdc" + struct.pack(">H", n)
+        else:
+            out += b"\xdd" + struct.pack(">I", n)
+        for item in obj:
+            _pack_into(out, item)
+    elif isinstance(obj, dict):
+        n = len(obj)
+        if n < 16:
+            out.append(0x80 | n)
+        elif n <= 0xFFFF:
+            out += b"\xde" + struct.pack(">H", n)
+        else:
+            out += b"\xdf" + struct.pack(">I", n)
+        for key, value in obj.items():
+            _pack_into(out, key)
+            _pack_into(out, value)
+    else:
+        _pack_into(out, str(obj))
+
+
+_FIXED = {0xCC: ">B", 0xCD: ">H", 0xCE: ">I", 0xCF: ">Q", 0xD0: ">b", 0xD1: ">h", 0xD2: ">i", 0xD3: ">q",
+          0xCA: ">f", 0xCB: ">d"}
+_LENGTHS = {0xD9: ">B", 0xDA: ">H", 0xDB: ">I", 0xC4: ">B", 0xC5: ">H", 0xC6: ">I",
+            0xDC: ">H", 0xDD: ">I", 0xDE: ">H", 0xDF: ">I"}
+
+
+def _unpack_from(data, pos: int) -> tuple:
+    tag = data[pos]
+    pos += 1
+    if tag < 0x80:
+        return tag, pos
+    if tag >= 0xE0:
+        return tag - 0x100, pos
+    if 0xA0 <= tag <= 0xBF:
+        n = tag & 0x1F
+        return bytes(data[pos:pos + n]).decode("utf-8"), pos + n
+    if 0x90 <= tag <= 0x9F:
+        return _unpack_array(data, pos, tag & 0x0F)
+    if 0x80 <= tag <= 0x8F:
+        return _unpack_map(data, pos, tag & 0x0F)
+    if tag == 0xC0:
+        return None, pos
+    if tag == 0xC2:
+        return False, pos
+    if tag == 0xC3:
+        return True, pos
+    if tag in _FIXED:
+        fmt = _FIXED[tag]
+        return struct.unpack_from(fmt, data, pos)[0], pos + struct.calcsize(fmt)
+    if tag in _LENGTHS:
+        fmt = _LENGTHS[tag]
+        n = struct.unpack_from(fmt, data, pos)[0]
+        pos += struct.calcsize(fmt)
+        if tag in (0xD9, 0xDA, 0xDB):
+            return bytes(data[pos:pos + n]).decode("utf-8"), pos + n
+        if tag in (0xC4, 0xC5, 0xC6):
+            return bytes(data[pos:pos + n]), pos + n
+        if tag in (0xDC, 0xDD):
+            return _unpack_array(data, pos, n)
+        return _unpack_map(data, pos, n)
+    raise ValueError(f"Unsupported MessagePack type 0x{tag:02x}")
+
+
+def _unpack_array(data, pos: int, n: int) -> tuple:
+    items = []
+    for _ in range(n):
+        item, pos = _unpack_from(data, pos)
+        items.append(item)
+    return items, pos
+
+
+def _unpack_map(data, pos: int, n: int) -> tuple:
+    result = {}
+    for _ in range(n):
+        key, pos = _unpack_from(data, pos)
+        result[key], pos = _unpack_from(data, pos)
+    return result, pos
+
+
+def packb(obj) -> bytes:
+    if msgpack is not None:
+        return msgpack.packb(obj, use_bin_type=True, default=str)
+    out = bytearray()
+    _pack_into(out, obj)
+    return bytes(out)
+
+
+def unpackb(data: bytes):
+    if msgpack is not None:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+    value, end = _unpack_from(data, 0)
+    if end != len(data):
+        raise ValueError("Trailing bytes after MessagePack value")
+    return value
+
+
+# --- Length-prefixed framing ---
+
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def _read_varint(data, pos: int) -> Optional[tuple]:
+    """(value, position after it), or None if data ends inside the varint."""
+    shift = value = 0
+    while pos < len(data):
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+    return None
+
+
+# --- Events ---
+
+def _encode_ts(value):
+    if isinstance(value, str):
+        try:
+            ts = datetime.datetime.fromisoformat(value)
+        except ValueError:
+            return value
+        if ts.tzinfo is None and ts.isoformat() == value:  # Only when decoding restores the same string
+            return (ts - _EPOCH) // datetime.timedelta(microseconds=1)
+    if value is None or isinstance(value, str):
+        return value
+    return [value if isinstance(value, (int, float)) else str(value)]  # Kept apart from the encoded timestamps
+
+
+def _decode_ts(value):
+    if isinstance(value, int):
+        return (_EPOCH + datetime.timedelta(microseconds=value)).isoformat()
+    if isinstance(value, list):
+        return value[0]
+    return value
+
+
+def _encode_session(value):
+    if isinstance(value, str) and value and len(value) % 2 == 0:
+        try:
+            raw = bytes.fromhex(value)
+        except ValueError:
+            return value
+        if raw.hex() == value:
+            return raw
+    return value
+
+
+def _decode_session(value):
+    return value.hex() if isinstance(value, bytes) else value
+
+
+def _encode_name(value):
+    return event_schema.INTERNED_IDS.get(value, value)
+
+
+def _decode_name(value):
+    return event_schema.INTERNED[value] if isinstance(value, int) and 0 <= value < len(event_schema.INTERNED) else value
+
+
+def encode_event(entry: dict) -> bytes:
+    """One length-prefixed binary record for an (already normalized) event."""
+    name = entry.get("event")
+    schema = event_schema.SCHEMAS.get(name)
+    if schema is not None:
+        values = [entry.get(field) for field in schema.names]
+        extras = {k: v for k, v in entry.items() if k not in schema.fields and k not in event_schema.ENVELOPE}
+    else:
+        values = []
+        extras = {k: v for k, v in entry.items() if k not in event_schema.ENVELOPE}
+    payload = packb([
+        schema.event_id if schema is not None else name,
+        _encode_ts(entry.get("utc_ts")),
+        _encode_session(entry.get("session_id")),
+        _encode_name(entry.get("workflow")),
+        _encode_name(entry.get("phase")),
+        values,
+        extras or None,
+    ])
+    return _varint(len(payload)) + payload
+
+
+def decode_event(payload: bytes) -> dict:
+    event, ts, session, workflow, phase, values, extras = unpackb(payload)
+    schema = event_schema.SCHEMAS_BY_ID.get(event) if isinstance(event, int) else None
+    entry = {"utc_ts": _decode_ts(ts), "session_id": _decode_session(session), "workflow": _decode_name(workflow),
+             "phase": _decode_name(phase), "event": schema.name if schema is not None else event}
+    if schema is not None:
+        for name, value in zip(schema.names, values):
+            if value is not None:
+                entry[name] = value
+    if extras:
+        entry.update(extras)
+    return entry
+
+
+def decode_records(data, final: bool = False) -> tuple:
+    """
+    Decodes the complete records at the start of data. Returns (events, bytes consumed); a
+    partial last record is not consumed. Corrupt records are skipped; with final=True, an
+    incomplete tail is treated as consumed.
+    """
+    events = []
+    pos = 0
+    while pos < len(data):
+        header = _read_varint(data, pos)
+        if header is None or header[1] + header[0] > len(data):
+            break
+        length, start = header
+        try:
+            events.append(decode_event(bytes(data[start:start + length])))
+        except Exception:
+            pass  # A corrupt record; its length prefix still says where the next one starts
+        pos = start + length
+    return events, len(data) if final else pos
+
+
+def decode_json_lines(data, final: bool = False) -> tuple:
+    """The JSON Lines counterpart of decode_records(): (events, bytes consumed up to the last newline)."""
+    end = len(data) if final else bytes(data).rfind(b"\n") + 1
+    events = []
+    for line in bytes(data[:end]).splitlines():
+        if not line.strip():
+            continue
+        try:
+            events.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue  # A torn line from an interrupted write
+    return events, end
+
+
+def is_binary_path(path: str) -> bool:
+    return BINARY_SUFFIX in path.rsplit("/", 1)[-1]
+
+
+def iter_file_events(f, binary: bool) -> Iterator[dict]:
+    """Events of an open binary-mode file object in either format."""
+    if binary:
+        yield from decode_records(f.read(), final=True)[0]
+        return
+    for line in f:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            continue
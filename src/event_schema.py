@@ -0,0 +1,185 @@
+"""
+Declared schemas for analytics events.
+
+Every event name logged through analytics.log_event is declared here with a stable numeric id
+(used by the binary encoding in src/event_codec.py) and its typed fields. normalize() runs on the
+analytics writer thread before an event is stored: declared fields are coerced to their type,
+long strings are truncated, and fields holding user text are replaced by a short hash so raw
+input never reaches the log. Fields an event does not declare are kept, with strings truncated
+to EXTRA_MAX_LEN; undeclared events are kept the same way and reported once per name.
+
+Ids and interned strings are append-only: never renumber or reuse them, or older binary logs
+decode to the wrong names.
+"""
+import hashlib
+from typing import Optional
+
+from src.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Keys every event carries (set by log_event); they are not part of the per-event fields.
+ENVELOPE = ("utc_ts", "session_id", "workflow", "phase", "event")
+EXTRA_MAX_LEN = 256
+HASH_PREFIX = "sha256:"
+# Integers the binary encoding can store (MessagePack int64/uint64); others are kept as strings.
+INT_MIN, INT_MAX = -2 ** 63, 2 ** 64 - 1
+
+
+class Field:
+    """A typed event field: kind is "str", "int", "float", "bool" or "json" (any JSON-style value)."""
+
+    __slots__ = ("kind", "max_len", "hashed")
+
+    def __init__(self, kind: str, max_len: Optional[int] = None, hashed: bool = False):
+        if kind not in ("str", "int", "float", "bool", "json"):
+            raise ValueError(f"Unknown field kind '{kind}'")
+        self.kind = kind
+        self.max_len = max_len
+        self.hashed = hashed
+
+
+class EventSchema:
+    __slots__ = ("name", "event_id", "fields", "names")
+
+    def __init__(self, name: str, event_id: int, fields: dict):
+        self.name = name
+        self.event_id = event_id
+        self.fields = fields
+        self.names = tuple(fields)  # Positional order of the values in a binary record
+
+
+STR = Field("str", max_len=EXTRA_MAX_LEN)
+NAME = Field("str", max_len=64)
+ERROR = Field("str", max_len=300)
+USER_TEXT = Field("str", hashed=True)
+INT = Field("int")
+FLOAT = Field("float")
+BOOL = Field("bool")
+
+_DECLARATIONS = [
+    # (id, name, fields)
+    (1, "phase_enter", {"phase_name": NAME, "workflow_name": NAME}),
+    (2, "phase_complete", {"phase_name": NAME, "workflow_name": NAME}),
+    (3, "phase_skipped", {"phase_name": NAME, "workflow_name": NAME}),
+    (4, "intent_classified", {"phase_name": NAME, "workflow_name": NAME, "user_input": USER_TEXT, "intent": NAME}),
+    (5, "intent_reclassified_empty", {"phase_name": NAME, "original_intent": NAME}),
+    (6, "unexpected_input", {"phase_name": NAME, "workflow_name": NAME, "user_input": USER_TEXT}),
+    (7, "user_input_submitted", {"input_length": INT}),
+    (8, "phase_engine_enter_start", {}),
+    (9, "phase_engine_enter_success", {"message_length": INT}),
+    (10, "phase_engine_enter_failed", {"error": ERROR}),
+    (11, "phase_engine_response", {"reply_length": INT, "next_phase_suggestion": NAME}),
+    (12, "phase_engine_response_failed", {"error": ERROR}),
+    (13, "phase_marked_complete", {"next_candidate_from_engine": NAME}),
+    (14, "workflow_completed", {}),
+    (15, "workflow_reset_start", {"selected_workflow": NAME}),
+    (16, "workflow_reset_complete", {"active_workflow": NAME, "initial_phase": NAME}),
+    (17, "workflow_reset_failed", {"error": ERROR, "selected_workflow": NAME}),
+    (18, "intake_question_presented", {"phase_name": NAME, "workflow_name": NAME, "question_key": NAME, "question_idx": INT}),
+    (19, "intake_answer_stored", {"phase_name": NAME, "workflow_name": NAME, "question_key": NAME, "question_idx": INT,
+                                  "answer_length": INT}),
+    (20, "intake_all_questions_complete", {"phase_name": NAME, "workflow_name": NAME}),
+    (21, "use_case_prompted", {"phase_name": NAME, "workflow_name": NAME, "story_found": BOOL}),
+    (22, "use_case_suggestion_selected", {"phase_name": NAME, "selection": STR, "index": INT}),
+    (23, "use_case_provided_by_user_confirmed", {"phase_name": NAME, "length": INT}),
+    (24, "use_case_affirmed_from_prior_input", {"phase_name": NAME}),
+    (25, "use_case_invalid_selection_index_in_get_next", {"index_input": USER_TEXT}),
+    (26, "use_case_selection_not_int_in_get_next", {"input_val": USER_TEXT}),
+    # 27 and 28 are retired (phase prefetching was removed); ids are never reused, and older
+    # binary segments still decode with them.
+    (27, "phase_prefetch_scheduled", {"target_phase": NAME}),
+    (28, "phase_prefetch_lookup", {"target_phase": NAME, "hit": BOOL}),
+    (29, "scratchpad_llm_extraction", {"messages_batched": INT, "keys_extracted": Field("json")}),
+    (30, "turn_completed", {"latency_ms": FLOAT}),
+    (31, "llm_call", {"call_site": NAME, "ok": BOOL, "model": NAME, "latency_ms": FLOAT, "prompt_tokens": INT,
+                      "completion_tokens": INT, "error": ERROR}),
+    (32, "search_call", {"ok": BOOL, "results": INT, "latency_ms": FLOAT, "error": ERROR}),
+    (33, "daily_limit_reached", {}),
+]
+
+SCHEMAS = {name: EventSchema(name, event_id, fields) for event_id, name, fields in _DECLARATIONS}
+SCHEMAS_BY_ID = {schema.event_id: schema for schema in SCHEMAS.values()}
+
+# Workflow and phase names written as small integers in binary records (index = id).
+INTERNED = (
+    "unknown_workflow", "unknown_phase",
+    "value_prop", "market_analysis", "business_model", "planning_growth", "beta_testing", "pitch_prep",
+    "intake", "problem", "target_customer", "solution", "main_benefit", "differentiator", "use_case",
+    "recommendation", "iteration", "summary", "revise", "revise_detail",
+)
+INTERNED_IDS = {value: i for i, value in enumerate(INTERNED)}
+
+_reported = set()
+
+
+def get_schema(name) -> Optional[EventSchema]:
+    return SCHEMAS.get(name)
+
+
+def hash_text(value: str) -> str:
+    """A short, stable stand-in for user text: equal inputs still compare equal in analysis."""
+    return HASH_PREFIX + hashlib.sha256(value.encode("utf-8")).hexdigest()[:16]
+
+
+def _report(key: tuple, message: str, *args):
+    if key not in _reported:
+        _reported.add(key)
+        logger.warning(message, *args)
+
+
+def _coerce(field: Field, value, event: str, name: str):
+    if value is None:
+        return None
+    try:
+        if field.kind == "str":
+            value = value if isinstance(value, str) else str(value)
+            if field.hashed:
+                return hash_text(value)
+            return value[:field.max_len] if field.max_len is not None else value
+        if field.kind == "int":
+            value = int(value)
+            if not INT_MIN <= value <= INT_MAX:
+                raise ValueError("out of range")
+            return value
+        if field.kind == "float":
+            return float(value)
+        if field.kind == "bool":
+            return bool(value)
+        return _limit(value)
+    except (TypeError, ValueError):
+        _report((event, name), "Analytics field %s.%s is not a valid %s; dropped.", event, name, field.kind)
+        return None
+
+
+def _limit(value):
+    """Truncates strings inside an undeclared (or "json") value; other values are kept as they are."""
+    if isinstance(value, str):
+        return value[:EXTRA_MAX_LEN]
+    if isinstance(value, dict):
+        return {str(k): _limit(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [_limit(v) for v in value]
+    if isinstance(value, int) and not isinstance(value, bool) and not INT_MIN <= value <= INT_MAX:
+        return str(value)[:EXTRA_MAX_LEN]
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return str(value)[:EXTRA_MAX_LEN]
+
+
+def normalize(entry: dict) -> dict:
+    """Returns entry with its fields typed, size-limited and user text hashed per the event's schema."""
+    name = entry.get("event")
+    schema = SCHEMAS.get(name)
+    if schema is None:
+        _report((name,), "Analytics event '%s' has no declared schema; storing its fields as extras.", name)
+    out = {}
+    for key, value in entry.items():
+        if key in ENVELOPE:
+            out[key] = value
+            continue
+        field = schema.fields.get(key) if schema is not None else None
+        if field is None and schema is not None:
+            _report((name, key), "Analytics field %s.%s is not declared; storing it as an extra.", name, key)
+        out[key] = _coerce(field, value, name, key) if field is not None else _limit(value)
+    return out
@@ -0,0 +1,115 @@
+"""Offline-generated, versioned library of examples per phase and topic, with local similarity retrieval."""
+import hashlib
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+from src.core.logger import get_logger
+from src.utils.text_embedding import embed_text, embed_texts
+
+logger = get_logger(__name__)
+
+SCHEMA_VERSION = 1
+DEFAULT_LIBRARY_PATH = os.environ.get(
+    "EXAMPLE_LIBRARY_PATH", os.path.join(os.path.dirname(__file__), "data", "example_library.json")
+)
+# Below this score an example is not considered relevant to the query.
+MIN_RELEVANCE = float(os.environ.get("EXAMPLE_LIBRARY_MIN_RELEVANCE", "0.3"))
+# Added to the similarity of examples whose topic keywords appear in the query.
+TOPIC_MATCH_BOOST = 0.3
+# Step names used by older code paths, mapped to the library's phase names.
+PHASE_ALIASES = {"target_user": "target_customer", "benefit": "main_benefit"}
+
+
+def library_version(content: dict) -> str:
+    """Content hash used as the suffix of a library version, so any edit produces a new version."""
+    payload = json.dumps({"topics": content.get("topics", {}), "examples": content.get("examples", [])}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:8]
+
+
+class ExampleLibrary:
+    """
+    Examples are {"id", "phase", "topic", "text", "source"}; topics map a topic name to
+    keywords (e.g. intake interests) that select it. Each phase's examples are embedded once,
+    together with their topic keywords, and ranked by cosine similarity to the query plus a
+    boost when the query names one of the example's topic keywords.
+    """
+
+    def __init__(self, data: dict):
+        if data.get("schema_version") != SCHEMA_VERSION:
+            raise ValueError(f"Unsupported example library schema: {data.get('schema_version')}")
+        self.version = data.get("version", "unknown")
+        self.topics = data.get("topics", {})
+        self.by_phase = {}
+        for example in data.get("examples", []):
+            self.by_phase.setdefault(example["phase"], []).append(example)
+        self._matrices = {}
+
+    def matched_topics(self, query: str) -> set:
+        """Topics with a keyword that appears in query as a whole word or phrase."""
+        text = f" {' '.join(re.findall(r'[a-z0-9]+', query.lower()))} "
+        return {
+            topic for topic, keywords in self.topics.items()
+            if any(f" {' '.join(re.findall(r'[a-z0-9]+', k.lower()))} " in text for k in keywords + [topic.replace('_', ' ')])
+        }
+
+    def has_phase(self, phase: str) -> bool:
+        return bool(self.by_phase.get(PHASE_ALIASES.get(phase, phase)))
+
+    def _matrix(self, phase: str) -> np.ndarray:
+        if phase not in self._matrices:
+            texts = [
+                f"{e['text']} {' '.join(self.topics.get(e['topic'], []))} {e['topic'].replace('_', ' ')}"
+                for e in self.by_phase[phase]
+            ]
+            self._matrices[phase] = embed_texts(texts)
+        return self._matrices[phase]
+
+    def find(self, phase: str, query: str = "", k: int = 1, exclude_ids: Optional[set] = None) -> list:
+        """
+        Returns up to k examples for phase, most similar to query first, each with a "score".
+        With no query the phase's examples come back in library order. Returns [] when the phase
+        is unknown or nothing reaches MIN_RELEVANCE, which is the cue to fall back to the LLM.
+        """
+        phase = PHASE_ALIASES.get(phase, phase)
+        examples = self.by_phase.get(phase, [])
+        if not examples:
+            return []
+        exclude_ids = exclude_ids or set()
+        if not query or not query.strip():
+            return [{**e, "score": 0.0} for e in examples if e["id"] not in exclude_ids][:k]
+
+        scores = self._matrix(phase) @ embed_text(query)
+        topics = self.matched_topics(query)
+        if topics:
+            scores = scores + TOPIC_MATCH_BOOST * np.array([e["topic"] in topics for e in examples])
+        results = []
+        for i in np.argsort(-scores, kind="stable"):
+            if scores[i] < MIN_RELEVANCE or len(results) >= k:
+                break
+            if examples[i]["id"] not in exclude_ids:
+                results.append({**examples[i], "score": float(scores[i])})
+        return results
+
+
+@lru_cache(maxsize=4)
+def load_example_library(path: str = DEFAULT_LIBRARY_PATH) -> Optional[ExampleLibrary]:
+    """Loads (once per path) the library; returns None if it is missing or invalid."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            library = ExampleLibrary(json.load(f))
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Example library unavailable at {path}: {e}")
+        return None
+    logger.info(f"Loaded example library {library.version} from {path}")
+    return library
+
+
+def find_examples(phase: str, query: str = "", k: int = 1, exclude_ids: Optional[set] = None) -> list:
+    """find() on the default library; [] if it is unavailable."""
+    library = load_example_library()
+    return library.find(phase, query, k, exclude_ids) if library else []
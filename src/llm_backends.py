@@ -0,0 +1,216 @@
+"""Pluggable LLM backends: the OpenAI API, OpenAI-compatible local servers, and a deterministic offline fake."""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+DEFAULT_MODEL = "gpt-4-1106-preview"
+
+# Canned replies used by FakeBackend when no recorded responses are supplied.
+DEFAULT_FAKE_RESPONSES = [
+    "That's a helpful starting point. Who feels this problem most acutely today?",
+    "I hear you - speed and low friction matter here. What would a first pilot look like?",
+    "Got it. What makes your approach different from what clinics already use?",
+]
+
+
+class LLMBackend(ABC):
+    """
+    Base class for all LLM backends.
+    complete() takes OpenAI-style chat messages and returns a dict:
+    {"text": str, "model": str, "prompt_tokens": int, "completion_tokens": int}
+    """
+    name: str = "base"
+
+    @abstractmethod
+    def complete(self, messages: list, model: str = DEFAULT_MODEL, **kwargs) -> dict:
+        raise NotImplementedError("Subclasses must implement complete.")
+
+    def is_configured(self) -> bool:
+        """Returns False when the backend cannot serve requests (e.g. a missing API key)."""
+        return True
+
+
+class OpenAIBackend(LLMBackend):
+    """Calls the OpenAI chat completions API. The client is created on first use, not at import."""
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None, client=None):
+        self.api_key = api_key if api_key is not None else os.environ.get("OPENAI_API_KEY")
+        self.base_url = base_url
+        self._client = client
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from openai import OpenAI
+                    self._client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+        return self._client
+
+    def is_configured(self) -> bool:
+        return bool(self.api_key)
+
+    def complete(self, messages: list, model: str = DEFAULT_MODEL, **kwargs) -> dict:
+        response = self.client.chat.completions.create(model=model, messages=messages, **kwargs)
+        usage = getattr(response, "usage", None)
+        return {
+            "text": response.choices[0].message.content or "",
+            "model": getattr(response, "model", model) or model,
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        }
+
+
+class OpenAICompatibleBackend(OpenAIBackend):
+    """
+    Talks to a local OpenAI-compatible server (vLLM, Ollama, LM Studio, llama.cpp).
+    LOCAL_LLM_BASE_URL selects the server and LOCAL_LLM_MODEL, when set, replaces
+    the requested model name since local servers do not host OpenAI models.
+    """
+    name = "local"
+
+    def __init__(self, base_url: Optional[str] = None, model: Optional[str] = None, api_key: Optional[str] = None, client=None):
+        super().__init__(
+            api_key=api_key or os.environ.get("LOCAL_LLM_API_KEY", "not-needed"),
+            base_url=base_url or os.environ.get("LOCAL_LLM_BASE_URL", "http://localhost:8000/v1"),
+            client=client,
+        )
+        self.model = model or os.environ.get("LOCAL_LLM_MODEL")
+
+    def complete(self, messages: list, model: str = DEFAULT_MODEL, **kwargs) -> dict:
+        return super().complete(messages, model=self.model or model, **kwargs)
+
+
+def parse_latency_spec(spec: str):
+    """
+    Parses a latency distribution spec into a sampler taking a random.Random.
+    Supported forms (seconds): "constant:0.8", "uniform:0.2,1.5", "normal:0.8,0.2", "lognormal:-0.5,0.6".
+    """
+    if not spec:
+        return lambda rng: 0.0
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v.strip()] if params else []
+    kind = kind.strip().lower()
+    if kind == "constant":
+        delay = values[0] if values else 0.0
+        return lambda rng: delay
+    if kind == "uniform":
+        low, high = values
+        return lambda rng: rng.uniform(low, high)
+    if kind == "normal":
+        mean, stdev = values
+        return lambda rng: max(0.0, rng.gauss(mean, stdev))
+    if kind == "lognormal":
+        mu, sigma = values
+        return lambda rng: rng.lognormvariate(mu, sigma)
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def load_canned_responses(path: str) -> list:
+    """
+    Loads canned replies from a JSONL file. Accepts recorded sessions (assistant turns in
+    'conversation_history'), eval exports ('ideal') or plain {"response": ...} lines.
+    """
+    responses = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "response" in record:
+                responses.append(record["response"])
+            elif "ideal" in record:
+                responses.append(record["ideal"])
+            for turn in record.get("conversation_history", []):
+                if isinstance(turn, dict) and turn.get("role") == "assistant" and turn.get("text"):
+                    responses.append(turn["text"])
+    return responses
+
+
+class FakeBackend(LLMBackend):
+    """
+    Deterministic offline stand-in for load tests and CI.
+    The reply is chosen by hashing the request, so the same messages always get the same
+    answer. Latency is drawn from a seeded distribution and actually slept unless sleep=False.
+    """
+    name = "fake"
+
+    def __init__(self, responses: Optional[list] = None, latency: str = "", seed: int = 0, sleep: bool = True):
+        self.responses = list(responses) if responses else list(DEFAULT_FAKE_RESPONSES)
+        self._sample_latency = parse_latency_spec(latency)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.sleep = sleep
+        self.call_count = 0
+
+    def complete(self, messages: list, model: str = DEFAULT_MODEL, **kwargs) -> dict:
+        rendered = json.dumps(messages, sort_keys=True, ensure_ascii=False)
+        # A seed varies the reply like sampling would; requests without one keep their usual answer.
+        key = rendered if kwargs.get("seed") is None else f"{rendered}|seed={kwargs['seed']}"
+        with self._lock:
+            self.call_count += 1
+            delay = self._sample_latency(self._rng)
+        if self.sleep and delay > 0:
+            time.sleep(delay)
+
+        digest = int(hashlib.sha256(key.encode("utf-8")).hexdigest(), 16)
+        text = self.responses[digest % len(self.responses)]
+        max_tokens = kwargs.get("max_tokens")
+        if max_tokens:
+            text = " ".join(text.split()[:max_tokens])
+        return {
+            "text": text,
+            "model": model,
+            "prompt_tokens": max(1, len(rendered) // 4),
+            "completion_tokens": max(1, len(text) // 4),
+        }
+
+
+def create_backend_from_env() -> LLMBackend:
+    """
+    Builds the backend selected by LLM_BACKEND ("openai" by default, "local" or "fake").
+    The fake backend reads FAKE_LLM_LATENCY, FAKE_LLM_SEED and FAKE_LLM_RESPONSES (a JSONL path).
+    """
+    kind = os.environ.get("LLM_BACKEND", "openai").strip().lower()
+    if kind == "local":
+        return OpenAICompatibleBackend()
+    if kind == "fake":
+        responses_path = os.environ.get("FAKE_LLM_RESPONSES")
+        responses = load_canned_responses(responses_path) if responses_path else None
+        return FakeBackend(
+            responses=responses,
+            latency=os.environ.get("FAKE_LLM_LATENCY", ""),
+            seed=int(os.environ.get("FAKE_LLM_SEED", "0")),
+        )
+    if kind != "openai":
+        raise ValueError(f"Unknown LLM_BACKEND: {kind}")
+    return OpenAIBackend()
+
+
+_backend: Optional[LLMBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> LLMBackend:
+    """Returns the process-wide backend, creating it from the environment on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend_from_env()
+    return _backend
+
+
+def set_backend(backend: Optional[LLMBackend]):
+    """Replaces the process-wide backend. Passing None re-reads the environment on next use."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
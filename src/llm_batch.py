@@ -0,0 +1,249 @@
+"""Runs bulk offline LLM jobs through a bounded async pool or the OpenAI Batch API, with checkpoint/resume and cost reports."""
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Callable, Dict, List, Optional
+
+try:
+    from src.llm_backends import DEFAULT_MODEL, LLMBackend, get_backend
+    from src.core.logger import get_logger
+except ImportError:
+    from llm_backends import DEFAULT_MODEL, LLMBackend, get_backend
+    from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# USD per 1M tokens (input, output). The Batch API bills at half these rates.
+MODEL_PRICES = {
+    "gpt-4-1106-preview": (10.00, 30.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+BATCH_API_DISCOUNT = 0.5
+
+
+def make_request(custom_id: str, messages: list, **kwargs) -> dict:
+    """
+    Builds one batch request. kwargs are passed to the backend (model, temperature, max_tokens...).
+    custom_id must be unique within a job; it is how results and checkpoints are keyed.
+    """
+    return {"custom_id": str(custom_id), "messages": messages, "kwargs": kwargs}
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int, discount: float = 1.0) -> Optional[float]:
+    """Returns the USD cost for the given usage, or None when the model has no known price."""
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return None
+    input_price, output_price = prices
+    return round((prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000 * discount, 6)
+
+
+def load_checkpoint(path: Optional[str]) -> Dict[str, dict]:
+    """Reads completed results from a checkpoint JSONL file, keyed by custom_id."""
+    results = {}
+    if not path or not os.path.exists(path):
+        return results
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # A torn final line from an interrupted run is simply redone
+            if record.get("status") == "ok":
+                results[record["custom_id"]] = record
+    return results
+
+
+def _append_checkpoint(path: Optional[str], record: dict):
+    if not path:
+        return
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+
+
+def _build_report(job_name: str, mode: str, total: int, resumed: int, results: Dict[str, dict],
+                  retries: int, wall_seconds: float, discount: float = 1.0) -> dict:
+    completed = [r for r in results.values() if r.get("status") == "ok"]
+    failed = [r for r in results.values() if r.get("status") != "ok"]
+    prompt_tokens = sum(r.get("prompt_tokens", 0) for r in completed)
+    completion_tokens = sum(r.get("completion_tokens", 0) for r in completed)
+
+    cost = 0.0
+    unpriced_models = set()
+    for r in completed:
+        c = estimate_cost(r.get("model", ""), r.get("prompt_tokens", 0), r.get("completion_tokens", 0), discount)
+        if c is None:
+            unpriced_models.add(r.get("model", ""))
+        else:
+            cost += c
+
+    ran_now = len(completed) - resumed
+    return {
+        "job": job_name,
+        "mode": mode,
+        "requests": total,
+        "completed": len(completed),
+        "resumed_from_checkpoint": resumed,
+        "failed": len(failed),
+        "retries": retries,
+        "wall_seconds": round(wall_seconds, 3),
+        "requests_per_second": round(ran_now / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "estimated_cost_usd": round(cost, 4),
+        "unpriced_models": sorted(unpriced_models),
+    }
+
+
+async def run_batch_async(requests: List[dict], job_name: str = "batch", concurrency: int = 8, max_retries: int = 3,
+                          checkpoint_path: Optional[str] = None, backend: Optional[LLMBackend] = None,
+                          backoff_seconds: float = 1.0, on_result: Optional[Callable[[dict], None]] = None):
+    """
+    Runs requests through a bounded-concurrency pool with exponential-backoff retries.
+    Requests already recorded as ok in checkpoint_path are skipped, and each new result is
+    appended there as soon as it completes, so an interrupted job resumes where it stopped.
+    Returns (results keyed by custom_id, report dict).
+    """
+    backend = backend or get_backend()
+    # A checkpoint may hold records of requests not in this run (e.g. an earlier, larger job); only
+    # the current requests are resumed, returned and reported.
+    request_ids = {r["custom_id"] for r in requests}
+    results = {cid: record for cid, record in load_checkpoint(checkpoint_path).items() if cid in request_ids}
+    resumed = len(results)
+    pending = [r for r in requests if r["custom_id"] not in results]
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    retry_count = 0
+    start = time.perf_counter()
+
+    async def _run_one(request: dict):
+        nonlocal retry_count
+        kwargs = dict(request.get("kwargs", {}))
+        model = kwargs.pop("model", DEFAULT_MODEL)
+        async with semaphore:
+            for attempt in range(max_retries + 1):
+                try:
+                    response = await asyncio.to_thread(backend.complete, request["messages"], model=model, **kwargs)
+                    record = {"custom_id": request["custom_id"], "status": "ok", **response}
+                    break
+                except Exception as e:
+                    if attempt >= max_retries:
+                        logger.error(f"Batch job '{job_name}': request {request['custom_id']} failed after {attempt + 1} attempts: {e}")
+                        record = {"custom_id": request["custom_id"], "status": "error", "error": str(e)}
+                        break
+                    retry_count += 1
+                    await asyncio.sleep(backoff_seconds * (2 ** attempt) * (0.5 + random.random()))
+        results[request["custom_id"]] = record
+        if record["status"] == "ok":
+            _append_checkpoint(checkpoint_path, record)
+        if on_result:
+            on_result(record)
+
+    await asyncio.gather(*(_run_one(r) for r in pending))
+    wall = time.perf_counter() - start
+    report = _build_report(job_name, "pool", len(requests), resumed, results, retry_count, wall)
+    return results, report
+
+
+def run_batch(requests: List[dict], **kwargs):
+    """Synchronous wrapper around run_batch_async() for scripts."""
+    return asyncio.run(run_batch_async(requests, **kwargs))
+
+
+def format_batch_report(report: dict) -> str:
+    """Formats a report from run_batch() as aligned key/value lines."""
+    width = max(len(k) for k in report)
+    return "\n".join(f"{k.ljust(width)}  {v}" for k, v in report.items())
+
+
+# --- OpenAI Batch API (async, up to 24h turnaround, half price) ---
+
+def write_openai_batch_file(requests: List[dict], path: str) -> str:
+    """Writes requests in the OpenAI Batch API input format (one /v1/chat/completions call per line)."""
+    with open(path, "w", encoding="utf-8") as f:
+        for request in requests:
+            body = dict(request.get("kwargs", {}))
+            body.setdefault("model", DEFAULT_MODEL)
+            body["messages"] = request["messages"]
+            f.write(json.dumps({
+                "custom_id": request["custom_id"],
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": body,
+            }) + "\n")
+    return path
+
+
+def submit_openai_batch(requests: List[dict], input_path: str, client=None, metadata: Optional[dict] = None) -> str:
+    """Uploads the requests and creates an OpenAI batch. Returns the batch id."""
+    if client is None:
+        from openai import OpenAI
+        client = OpenAI()
+    write_openai_batch_file(requests, input_path)
+    with open(input_path, "rb") as f:
+        batch_file = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+        metadata=metadata or {},
+    )
+    logger.info(f"Submitted OpenAI batch {batch.id} with {len(requests)} requests.")
+    return batch.id
+
+
+def parse_openai_batch_output(lines) -> Dict[str, dict]:
+    """Converts OpenAI Batch API output lines into results shaped like run_batch() results."""
+    results = {}
+    for line in lines:
+        line = line.strip() if isinstance(line, str) else line.decode("utf-8").strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        custom_id = record["custom_id"]
+        response = record.get("response") or {}
+        body = response.get("body") or {}
+        if record.get("error") or response.get("status_code") != 200:
+            results[custom_id] = {"custom_id": custom_id, "status": "error", "error": str(record.get("error") or body)}
+            continue
+        usage = body.get("usage", {})
+        results[custom_id] = {
+            "custom_id": custom_id,
+            "status": "ok",
+            "text": body["choices"][0]["message"]["content"] or "",
+            "model": body.get("model", ""),
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0),
+        }
+    return results
+
+
+def collect_openai_batch(batch_id: str, job_name: str = "batch", total: Optional[int] = None, client=None,
+                         checkpoint_path: Optional[str] = None):
+    """
+    Fetches a finished OpenAI batch. Returns (results, report), or (None, status dict) while
+    the batch is still running. Results are also written to checkpoint_path when given.
+    """
+    if client is None:
+        from openai import OpenAI
+        client = OpenAI()
+    batch = client.batches.retrieve(batch_id)
+    if batch.status != "completed":
+        return None, {"job": job_name, "batch_id": batch_id, "status": batch.status}
+
+    content = client.files.content(batch.output_file_id)
+    results = parse_openai_batch_output(content.text.splitlines())
+    for record in results.values():
+        if record["status"] == "ok":
+            _append_checkpoint(checkpoint_path, record)
+    wall = (batch.completed_at or 0) - (batch.created_at or 0)
+    report = _build_report(job_name, "openai_batch", total or len(results), 0, results, 0, float(wall), BATCH_API_DISCOUNT)
+    return results, report
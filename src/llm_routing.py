@@ -0,0 +1,213 @@
+"""Routes LLM calls to a model chain by call site, with per-route timeouts, fallbacks and latency/cost histograms."""
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+try:
+    from src.llm_backends import DEFAULT_MODEL
+    from src.llm_batch import estimate_cost
+    from src.core.logger import get_logger
+    from src.core import metrics
+    from src import usage_ledger
+except ImportError:
+    from llm_backends import DEFAULT_MODEL
+    from llm_batch import estimate_cost
+    from core.logger import get_logger
+    from core import metrics
+    import usage_ledger
+
+logger = get_logger(__name__)
+
+# Each route lists models to try in order (fallback chain), a max_tokens cap applied on top of
+# the caller's value (None = no cap) and a per-attempt timeout in seconds (None = SDK default).
+ROUTES = {
+    "default": {"models": [DEFAULT_MODEL], "max_tokens": None, "timeout": None},
+    "acknowledgement": {"models": ["gpt-4o-mini", "gpt-3.5-turbo"], "max_tokens": 80, "timeout": 8},
+    "summary": {"models": ["gpt-4o-mini", "gpt-3.5-turbo"], "max_tokens": 150, "timeout": 15},
+    "extraction": {"models": ["gpt-4o-mini", "gpt-3.5-turbo"], "max_tokens": 400, "timeout": 15},
+    "coaching": {"models": [DEFAULT_MODEL, "gpt-4o"], "max_tokens": None, "timeout": 30},
+    "brainstorm": {"models": [DEFAULT_MODEL, "gpt-4o"], "max_tokens": None, "timeout": 45},
+}
+
+# Call site (usually the calling function's name) -> route name. Unlisted call sites use "default".
+CALL_SITE_ROUTES = {
+    "active_listening": "acknowledgement",
+    "diplomatic_acknowledgement": "acknowledgement",
+    "offer_example": "acknowledgement",
+    "offer_strategic_suggestion": "acknowledgement",
+    "generate_contextual_follow_up": "acknowledgement",
+    "generate_short_summary": "summary",
+    "summary_engine": "summary",
+    "rolling_summary_chunk": "summary",
+    "rolling_summary_session": "summary",
+    "scratchpad_extraction": "extraction",
+    "paraphrase_user_input": "coaching",
+    "coach_on_decision": "coaching",
+    "plan_turn": "coaching",
+    "provide_actual_example": "coaching",
+    "provide_actual_strategic_suggestion": "coaching",
+    "propose_next_conversation_turn": "coaching",
+    "provide_feedback": "brainstorm",
+    "generate_ideas": "brainstorm",
+    "assist_with_brainstorming": "brainstorm",
+}
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is unbounded.
+LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+LLM_LATENCY = metrics.histogram("llm_request_duration_seconds", "LLM call latency per attempt.",
+                                ("call_site", "route", "model", "outcome"), buckets=LATENCY_BUCKETS)
+LLM_TOKENS = metrics.counter("llm_tokens_total", "LLM tokens used.", ("call_site", "model", "kind"))
+LLM_COST = metrics.counter("llm_cost_usd_total", "Estimated LLM spend in USD.", ("call_site", "model"))
+LLM_CAPPED = metrics.counter("llm_calls_capped_total", "LLM calls refused by the global DAILY_TOKEN_CAP.")
+
+
+def load_routes(path: Optional[str] = None):
+    """
+    Merges route overrides from a JSON file (LLM_ROUTES_FILE by default) into ROUTES/CALL_SITE_ROUTES.
+    The file may contain {"routes": {...}, "call_sites": {...}} using the same shapes as above.
+    """
+    path = path or os.environ.get("LLM_ROUTES_FILE")
+    if not path or not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        overrides = json.load(f)
+    for name, route in overrides.get("routes", {}).items():
+        ROUTES[name] = {**ROUTES.get(name, ROUTES["default"]), **route}
+    CALL_SITE_ROUTES.update(overrides.get("call_sites", {}))
+    logger.info(f"Loaded LLM route overrides from {path}")
+
+
+def resolve_route(call_site: Optional[str]) -> tuple:
+    """Returns (route_name, route) for a call site."""
+    name = CALL_SITE_ROUTES.get(call_site, "default") if call_site else "default"
+    return name, ROUTES.get(name, ROUTES["default"])
+
+
+def _reserve_usage(messages: list, max_tokens: Optional[int]) -> int:
+    """Admits a call under the global daily token cap; returns the reserved estimate (0 if the ledger is unavailable)."""
+    estimate = usage_ledger.estimate_tokens(messages, max_tokens)
+    try:
+        admitted = usage_ledger.get_ledger().reserve(estimate)
+    except Exception as e:
+        logger.warning("Usage ledger unavailable; the daily token cap is not enforced for this call: %s", e)
+        return 0
+    if not admitted:
+        LLM_CAPPED.inc()
+        raise usage_ledger.DailyTokenCapExceeded()
+    return estimate
+
+
+def _record_usage(call_site: str, model: str, prompt_tokens: int, completion_tokens: int, cost: float, reserved: int):
+    try:
+        usage_ledger.get_ledger().record(call_site, model, prompt_tokens, completion_tokens, cost, reserved=reserved)
+    except Exception as e:
+        logger.warning("Failed to record LLM usage for %s: %s", call_site, e)
+
+
+def _record(route_name: str, model: str, latency: float, ok: bool, result: Optional[dict] = None, fallback: bool = False,
+            call_site: Optional[str] = None, reserved: int = 0):
+    call_site = call_site or "none"
+    LLM_LATENCY.observe(latency, call_site=call_site, route=route_name, model=model, outcome="ok" if ok else "error")
+    if ok:
+        prompt_tokens = result.get("prompt_tokens", 0)
+        completion_tokens = result.get("completion_tokens", 0)
+        cost = estimate_cost(model, prompt_tokens, completion_tokens) or 0.0
+        LLM_TOKENS.inc(prompt_tokens, call_site=call_site, model=model, kind="prompt")
+        LLM_TOKENS.inc(completion_tokens, call_site=call_site, model=model, kind="completion")
+        LLM_COST.inc(cost, call_site=call_site, model=model)
+        _record_usage(call_site, model, prompt_tokens, completion_tokens, cost, reserved)
+    with _stats_lock:
+        entry = _stats.setdefault((route_name, model), {
+            "calls": 0, "errors": 0, "fallbacks": 0, "latency_sum": 0.0,
+            "latency_buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+            "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0,
+        })
+        entry["calls"] += 1
+        entry["latency_sum"] += latency
+        bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if latency <= bound), len(LATENCY_BUCKETS))
+        entry["latency_buckets"][bucket] += 1
+        if fallback:
+            entry["fallbacks"] += 1
+        if not ok:
+            entry["errors"] += 1
+            return
+        entry["prompt_tokens"] += prompt_tokens
+        entry["completion_tokens"] += completion_tokens
+        entry["cost_usd"] += cost
+
+
+def complete_with_route(backend, messages: list, call_site: Optional[str] = None, **kwargs) -> dict:
+    """
+    Sends messages through the route for call_site, trying each model of the chain in turn.
+    An explicit model= kwarg is tried first, ahead of the route's chain. Raises the last error
+    if every model fails, and usage_ledger.DailyTokenCapExceeded (without calling the backend)
+    when the call would take today's usage past DAILY_TOKEN_CAP.
+    """
+    route_name, route = resolve_route(call_site)
+    explicit_model = kwargs.pop("model", None)
+    models = [explicit_model] if explicit_model else []
+    models += [m for m in route["models"] if m != explicit_model]
+
+    if route.get("max_tokens") is not None:
+        kwargs["max_tokens"] = min(kwargs.get("max_tokens") or route["max_tokens"], route["max_tokens"])
+    if route.get("timeout") is not None and "timeout" not in kwargs:
+        kwargs["timeout"] = route["timeout"]
+
+    reserved = _reserve_usage(messages, kwargs.get("max_tokens"))
+    last_error = None
+    for i, model in enumerate(models):
+        start = time.perf_counter()
+        try:
+            result = backend.complete(messages, model=model, **kwargs)
+        except Exception as e:
+            _record(route_name, model, time.perf_counter() - start, ok=False, fallback=i > 0, call_site=call_site)
+            logger.warning(f"LLM route '{route_name}' ({call_site}) model {model} failed: {e}")
+            last_error = e
+            continue
+        _record(route_name, model, time.perf_counter() - start, ok=True, result=result, fallback=i > 0, call_site=call_site,
+                reserved=reserved)
+        return result
+    if reserved:
+        usage_ledger.get_ledger().release(reserved)
+    raise last_error
+
+
+def get_route_stats() -> list:
+    """Returns one row per (route, model) with call counts, latency histogram and cost totals."""
+    rows = []
+    with _stats_lock:
+        for (route_name, model), entry in sorted(_stats.items()):
+            calls = entry["calls"]
+            rows.append({
+                "route": route_name,
+                "model": model,
+                **{k: v for k, v in entry.items() if k != "latency_buckets"},
+                "mean_latency_ms": round(entry["latency_sum"] / calls * 1000, 1) if calls else 0.0,
+                "latency_histogram": dict(zip([f"<={b}s" for b in LATENCY_BUCKETS] + ["inf"], entry["latency_buckets"])),
+                "cost_usd": round(entry["cost_usd"], 6),
+            })
+    return rows
+
+
+def reset_route_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def format_route_stats(rows: list) -> str:
+    """Formats get_route_stats() rows as a compact text table."""
+    headers = ["route", "model", "calls", "errors", "fallbacks", "mean_latency_ms", "cost_usd"]
+    widths = {h: max([len(h)] + [len(str(r[h])) for r in rows]) for h in headers}
+    lines = ["  ".join(h.ljust(widths[h]) for h in headers)]
+    for row in rows:
+        lines.append("  ".join(str(row[h]).ljust(widths[h]) for h in headers))
+    return "\n".join(lines)
+
+
+load_routes()
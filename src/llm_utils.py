@@ -1,15 +1,29 @@
 """Provides utility functions for interacting with OpenAI's LLMs, managing prompts, and token counting."""
+import logging
 import os
+import time
 from dotenv import load_dotenv # Import load_dotenv
-from openai import OpenAI # Import the OpenAI class
 import streamlit as st
 from typing import Optional
 # from src.coach_persona import COACH_PROMPT # Removed import as COACH_PROMPT is no longer defined there
 
 load_dotenv() # Load environment variables from .env file
 
-# Instantiate the client. It will automatically pick up the OPENAI_API_KEY environment variable.
-client = OpenAI()
+# The backend (OpenAI, a local OpenAI-compatible server, or the offline fake) is chosen by the
+# LLM_BACKEND environment variable and created on first use, so importing this module never
+# requires an API key.
+try:
+    from src.llm_backends import get_backend
+    from src.llm_routing import complete_with_route
+    from src import usage_ledger
+    from src.core.tracing import span
+    from src.analytics import log_event
+except ImportError:
+    from llm_backends import get_backend
+    from llm_routing import complete_with_route
+    import usage_ledger
+    from core.tracing import span
+    from analytics import log_event
 
 COACH_SYSTEM_PROMPT = """
 You are an expert business coach specializing in digital health innovation. You help users discover, clarify, and sharpen their own ideas for solving real-world problems—especially in healthcare. Your style is masterfully conversational, warm but candid, intellectually curious, and never pandering. You gently but intelligently challenge vague statements, but never sound like you’re filling out a checklist.
@@ -44,26 +58,70 @@ Rules:
 4. No features or rabbit holes until the value prop is confirmed.
 """.strip()
 
+# Static guidelines appended to COACH_SYSTEM_PROMPT by build_prompt(). Kept as constants (rather
+# than rebuilt inside the function) so the system block is byte-stable across calls, which is
+# what lets provider-side prefix caching reuse it.
+COACH_OPERATIONAL_GUIDELINES = """
+
+ADDITIONAL OPERATIONAL GUIDELINES:
+SYSTEM GOALS (Internal):
+- Internally maximise:
+  a) Idea maturity score
+  b) Coverage of value‑proposition elements in the scratchpad.
+
+RESEARCH POLICY:
+- Use web_search() only when (a) the user explicitly requests it or (b) current phase == 'refinement' and missing fact is identified.
+- Hard limit: 3 calls per session.
+
+WEAKNESSES:
+- When weaknesses arise, state them plainly, followed by at least one mitigation or alternative.
+"""
+
+BUILD_PROMPT_SYSTEM_INSTRUCTIONS = COACH_SYSTEM_PROMPT + COACH_OPERATIONAL_GUIDELINES
+
+# Leading line of the user message built by build_conversation_messages(); static so it is
+# part of the cacheable prefix.
+CONVERSATION_CONTEXT_INSTRUCTIONS = (
+    "Your job is to advance the conversation in a natural, helpful, and opportunity-oriented way."
+)
+
 # Configure OpenAI key from env
 # openai.api_key = os.getenv('OPENAI_API_KEY') # Removed: Handled by client instantiation
 
 # Unified function to query OpenAI's GPT-4.1
-def query_openai(messages: list, **kwargs): # Changed 'prompt' to 'messages: list'
-    # Ensure API key is available (client instantiation handles this, but good to be aware)
-    if not client.api_key:
+def query_openai(messages: list, call_site: Optional[str] = None, **kwargs): # Changed 'prompt' to 'messages: list'
+    """
+    Sends messages to the configured LLM backend and returns the stripped reply text.
+    call_site selects the model chain, max_tokens cap and timeout from llm_routing.ROUTES;
+    calls without one use the default route (DEFAULT_MODEL, no fallback).
+    """
+    backend = get_backend()
+    if not backend.is_configured():
         error_handling.log_error("OpenAI API key is not configured.")
         raise ValueError("OpenAI API key not configured.")
 
     # COACH_PROMPT was previously prepended here.
     # System messages are now expected to be part of the 'messages' input if needed,
     # or handled by specific functions like build_prompt.
-    
-    response = client.chat.completions.create(
-        model=kwargs.pop('model', 'gpt-4-1106-preview'), # Allow model override via kwargs, default
-        messages=messages, # Use the original messages list
-        **kwargs # Pass through any other keyword arguments like temperature, max_tokens
-    )
-    return response.choices[0].message.content.strip() # Ensure stripping
+
+    start = time.perf_counter()
+    with span("query_openai", call_site=call_site) as llm_span:
+        try:
+            result = complete_with_route(
+                backend,
+                messages, # Use the original messages list
+                call_site=call_site,
+                **kwargs # Pass through any other keyword arguments like model, temperature, max_tokens
+            )
+        except Exception as e:
+            log_event("llm_call", call_site=call_site, ok=False, error=type(e).__name__,
+                      latency_ms=round((time.perf_counter() - start) * 1000, 1))
+            raise
+        llm_span.set("model", result.get("model"))
+    log_event("llm_call", call_site=call_site, ok=True, model=result.get("model"),
+              latency_ms=round((time.perf_counter() - start) * 1000, 1),
+              prompt_tokens=result.get("prompt_tokens", 0), completion_tokens=result.get("completion_tokens", 0))
+    return result["text"].strip() # Ensure stripping
 
 # Assuming error_handling.py and search_utils.py exist or will be created
 # For now, using placeholders for these imports.
@@ -88,28 +146,21 @@ except ImportError:
 
 def count_tokens(prompt: str, response: str) -> Optional[str]:
     """
-    Updates session and daily token usage based on prompt and response length.
-    Returns a message if the daily limit is reached, otherwise None.
+    Adds a word-count estimate of this exchange to the session's token usage and refreshes the
+    "daily" figure from the usage ledger, which holds the real tokens of all sessions today.
+    Returns a message if the global daily limit is reached, otherwise None.
     """
-    # Simple token estimation: count words. A real implementation would use a tokenizer.
-    prompt_tokens = len(prompt.split())
-    response_tokens = len(response.split())
-    total_tokens = prompt_tokens + response_tokens
+    # Simple token estimation: count words. The ledger itself records the API's token counts.
+    total_tokens = len(prompt.split()) + len(response.split())
 
     if "token_usage" not in st.session_state:
         st.session_state["token_usage"] = {"session": 0, "daily": 0}
-
     st.session_state["token_usage"]["session"] += total_tokens
-    st.session_state["token_usage"]["daily"] += total_tokens
 
-    daily_cap_str = os.environ.get("DAILY_TOKEN_CAP", "100000") # Default cap
-    try:
-        daily_cap = int(daily_cap_str)
-    except ValueError:
-        daily_cap = 100000 # Fallback if env var is invalid
-
-    if st.session_state["token_usage"]["daily"] > daily_cap:
-        return "Daily limit reached; try again tomorrow."
+    ledger = usage_ledger.get_ledger()
+    st.session_state["token_usage"]["daily"] = ledger.day_tokens()
+    if 0 < ledger.daily_cap <= st.session_state["token_usage"]["daily"]:
+        return usage_ledger.DAILY_LIMIT_MESSAGE
     return None
 
 def format_citations(search_results: list) -> tuple[str, str]:
@@ -134,21 +185,28 @@ def format_citations(search_results: list) -> tuple[str, str]:
 
 
 def build_conversation_messages(scratchpad, latest_user_input, current_phase):
+    # Provider-side prefix caching only applies to a byte-identical leading segment, so the
+    # user message is ordered from most to least stable: the fixed instruction line, the
+    # intake summary (stable for the whole session), the rolling conversation summary (changes
+    # only when a chunk is folded), the scratchpad, then the latest input.
+    from src.rolling_summary import session_summary_context
     context_lines = []
     for key, value in scratchpad.items():
         if value and key != "research_requests":
             context_lines.append(f"{key.replace('_', ' ').title()}: {value}")
 
     intake_summary = st.session_state.get("context_summary", "")
-    context = ""
+    context = CONVERSATION_CONTEXT_INSTRUCTIONS + "\n\n"
     if intake_summary:
         context += intake_summary + "\n\n"
+    conversation_summary = session_summary_context()
+    if conversation_summary:
+        context += conversation_summary + "\n\n"
     context += (
         "Here’s what the user has shared about their idea so far:\n"
         + "\n".join(context_lines)
-        + f"\n\nMost recent user message: {latest_user_input}\n"
-        + f"Current focus: {current_phase}.\n"
-        "Your job is to advance the conversation in a natural, helpful, and opportunity-oriented way."
+        + f"\n\nCurrent focus: {current_phase}.\n"
+        + f"Most recent user message: {latest_user_input}\n"
     )
 
     system_prompt_content = COACH_SYSTEM_PROMPT
@@ -163,34 +221,39 @@ def build_conversation_messages(scratchpad, latest_user_input, current_phase):
         {"role": "user", "content": context},
     ]
     return messages
+
 def build_prompt(conversation_history: list, scratchpad: dict, summaries: list, user_input: str, phase: str, search_results: list = None, element_focus: dict = None) -> tuple[str, str]:
     """
     Builds a comprehensive prompt for the LLM, separating system instructions
     from user-facing content.
     Returns a tuple: (system_instructions, user_prompt_content)
     """
-    system_instructions = COACH_SYSTEM_PROMPT + """
-
-ADDITIONAL OPERATIONAL GUIDELINES:
-SYSTEM GOALS (Internal):
-- Internally maximise:
-  a) Idea maturity score
-  b) Coverage of value‑proposition elements in the scratchpad.
+    # The system block is a module-level constant so it is byte-identical on every call.
+    system_instructions = BUILD_PROMPT_SYSTEM_INSTRUCTIONS
 
-RESEARCH POLICY:
-- Use web_search() only when (a) the user explicitly requests it or (b) current phase == 'refinement' and missing fact is identified.
-- Hard limit: 3 calls per session.
+    # User content is ordered by stability so consecutive turns share the longest possible
+    # prefix: summaries and history only ever grow at the end, while phase, scratchpad,
+    # search results and the latest input change from turn to turn.
+    user_prompt_parts = []
 
-WEAKNESSES:
-- When weaknesses arise, state them plainly, followed by at least one mitigation or alternative.
-"""
+    # Add summaries
+    if summaries:
+        user_prompt_parts.append("--- Summaries ---")
+        for summary in summaries:
+            user_prompt_parts.append(summary)
+        user_prompt_parts.append("-------------------")
 
-    user_prompt_parts = []
+    # Add conversation history
+    if conversation_history:
+        user_prompt_parts.append("\n--- Conversation History ---")
+        for turn in conversation_history:
+            user_prompt_parts.append(f"{turn['role'].title()}: {turn['text']}")
+        user_prompt_parts.append("----------------------------")
 
     # Inject current focus from conversation_manager.navigate_value_prop_elements()
 
     # Add conversation phase
-    user_prompt_parts.append(f"Conversation Phase: {phase}")
+    user_prompt_parts.append(f"\nConversation Phase: {phase}")
 
     # Context from scratchpad
     if scratchpad and any(scratchpad.values()):
@@ -210,20 +273,6 @@ WEAKNESSES:
             user_prompt_parts.append(f"Result {i+1}: {result.get('snippet', 'No snippet available.')}")
         user_prompt_parts.append("------------------------------")
 
-    # Add conversation history
-    if conversation_history:
-        user_prompt_parts.append("\n--- Conversation History ---")
-        for turn in conversation_history:
-            user_prompt_parts.append(f"{turn['role'].title()}: {turn['text']}")
-        user_prompt_parts.append("----------------------------")
-
-    # Add summaries
-    if summaries:
-        user_prompt_parts.append("\n--- Summaries ---")
-        for summary in summaries:
-            user_prompt_parts.append(summary)
-        user_prompt_parts.append("-------------------")
-
     # Add the current user input
     user_prompt_parts.append(f"\nUser Input: {user_input}")
 
@@ -255,26 +304,24 @@ Generate a single, open-ended follow-up question that encourages the user to ref
 Follow-up question:"""
 
     try:
-        # Using the existing query_openai function structure
-        response = client.chat.completions.create(
-            model='gpt-4-1106-preview', # Or your preferred model for this task
-            messages=[
+        question = query_openai(
+            [
                 {"role": "system", "content": "You are an expert at crafting engaging and contextually relevant follow-up questions."},
                 {"role": "user", "content": prompt}
             ],
+            call_site="generate_contextual_follow_up", # Routed to a small, fast model
             temperature=0.7, # Allow for some creativity
             max_tokens=50,   # Keep the question concise
-            n=1,
-            stop=None
         )
-        question = response.choices[0].message.content.strip()
         # Ensure it's a question
         if question and not question.endswith("?"):
             question += "?"
         return question
+    except usage_ledger.DailyTokenCapExceeded:
+        raise
     except Exception as e:
         # Log the error, but don't break the flow. Return an empty string.
-        print(f"Error generating follow-up question: {e}") # Or use a proper logger
+        logging.error("Error generating follow-up question: %s", e)
         return ""
 
 # Alias for backward compatibility or clearer naming in some contexts
@@ -0,0 +1,88 @@
+"""
+Admin page: live load read from the analytics event stream.
+
+The event stream is tailed incrementally (src/analytics_tail.py) by one feed shared by every
+viewer of this page, and only the panel fragment reruns every ADMIN_REFRESH_SECONDS, so a refresh
+costs the newly appended lines plus a snapshot of the in-memory window. The page requires
+?token=<ADMIN_TOKEN> and stays closed while ADMIN_TOKEN is unset.
+
+Events logged from worker threads (e.g. brainstorm candidates' llm_call) carry the session bound
+for the script run but no workflow or phase; they count toward call rates and errors, and leave
+the session on its last known phase.
+"""
+import hmac
+import os
+import sys
+
+import streamlit as st
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src import analytics
+from src.analytics_tail import LiveFeed
+
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+REFRESH_SECONDS = float(os.environ.get("ADMIN_REFRESH_SECONDS", "5"))
+
+
+@st.cache_resource
+def get_feed() -> LiveFeed:
+    return LiveFeed(analytics.ANALYTICS_DIR or analytics.LOG_FILE_PATH)
+
+
+def _ms(value) -> str:
+    return "–" if value is None else f"{value:,.0f} ms"
+
+
+@st.fragment(run_every=REFRESH_SECONDS)
+def live_panel():
+    feed = get_feed()
+    snapshot = feed.refresh()
+    minutes = snapshot["window_seconds"] / 60
+
+    cols = st.columns(4)
+    cols[0].metric("Active sessions", snapshot["active_sessions"])
+    cols[1].metric("Turns / min", snapshot["turns_per_minute"])
+    cols[2].metric("LLM calls / min", snapshot["llm"]["per_minute"], f"{snapshot['llm']['errors']} errors",
+                   delta_color="inverse" if snapshot["llm"]["errors"] else "off")
+    cols[3].metric("Searches / min", snapshot["search"]["per_minute"], f"{snapshot['search']['errors']} errors",
+                   delta_color="inverse" if snapshot["search"]["errors"] else "off")
+
+    st.subheader(f"Turn latency (last {minutes:g} min, {snapshot['turns']} turns)")
+    latency_cols = st.columns(len(snapshot["turn_latency_ms"]))
+    for col, (name, value) in zip(latency_cols, snapshot["turn_latency_ms"].items()):
+        col.metric(name, _ms(value))
+
+    left, right = st.columns(2)
+    with left:
+        st.subheader("Active sessions by phase")
+        if snapshot["active_by_phase"]:
+            st.dataframe(snapshot["active_by_phase"], hide_index=True, use_container_width=True)
+        else:
+            st.caption("No active sessions.")
+    with right:
+        st.subheader("Errors")
+        if snapshot["errors"]:
+            st.dataframe([{"event": name, "count": count} for name, count in snapshot["errors"].items()],
+                         hide_index=True, use_container_width=True)
+        else:
+            st.caption("No errors in the window.")
+
+    tail = feed.tailer.stats
+    st.caption(f"Source: {feed.tailer.source} · {tail['events']:,} events read in {tail['polls']:,} polls "
+               f"({tail['bytes_read']:,} bytes) · refreshes every {REFRESH_SECONDS:g}s")
+
+
+def is_authorized(token) -> bool:
+    """True only when ADMIN_TOKEN is configured and token matches it."""
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(str(token or "").encode("utf-8"), ADMIN_TOKEN.encode("utf-8"))
+
+
+st.title("Live load")
+if not is_authorized(st.query_params.get("token")):
+    st.error("This page requires the admin token (?token=...)." if ADMIN_TOKEN else
+             "This page is disabled; set ADMIN_TOKEN to enable it.")
+    st.stop()
+live_panel()
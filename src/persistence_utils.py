@@ -1,134 +1,111 @@
 """Handles database interactions, including session saving/loading and schema creation for SQLite."""
 import os
 import sqlite3
-import sys
 import json
 from datetime import datetime
 
+from src.core import metrics
+from src.core.logger import get_logger, get_sampled_logger
+from src.core.tracing import traced
+
+logger = get_logger(__name__)
+# save_session runs on every turn; its per-key debug dump is sampled.
+save_debug = get_sampled_logger(__name__)
+
+SQLITE_WRITE_LATENCY = metrics.histogram("sqlite_write_duration_seconds", "SQLite write latency, including commit.", ("operation",))
+
 # --- ensure_data_dir_exists ---
 def ensure_data_dir_exists():
-    print("DEBUG_P_UTILS: ensure_data_dir_exists() CALLED")
-    sys.stdout.flush()
+    logger.debug("ensure_data_dir_exists() CALLED")
     data_dir = '/data'
     try:
         if not os.path.exists(data_dir):
-            print(f"DEBUG_P_UTILS: /data directory '{data_dir}' does not exist. Attempting to create.")
-            sys.stdout.flush()
+            logger.debug("/data directory '%s' does not exist. Attempting to create.", data_dir)
             os.makedirs(data_dir, exist_ok=True)
-            print(f"DEBUG_P_UTILS: Successfully created or ensured /data directory '{data_dir}'")
-            sys.stdout.flush()
+            logger.debug("Successfully created or ensured /data directory '%s'", data_dir)
         else:
-            print(f"DEBUG_P_UTILS: /data directory '{data_dir}' already exists.")
-            sys.stdout.flush()
+            logger.debug("/data directory '%s' already exists.", data_dir)
     except Exception as e:
-        print(f"CRITICAL_P_UTILS: Exception in ensure_data_dir_exists for {data_dir}: {e}")
-        sys.stdout.flush()
+        logger.error("Exception in ensure_data_dir_exists for %s: %s", data_dir, e)
         # Do not raise, allow get_sqlite_db_path to try to handle path determination
 
 # --- get_sqlite_db_path ---
 def get_sqlite_db_path():
-    print("DEBUG_P_UTILS: get_sqlite_db_path() CALLED - TOP")
-    sys.stdout.flush()
+    logger.debug("get_sqlite_db_path() CALLED - TOP")
     try:
         hf_space_id = os.environ.get("HF_SPACE_ID")
         # Check /data existence *before* calling ensure_data_dir_exists within this function's logic
         is_data_dir_initially = os.path.isdir('/data')
-        print(f"DEBUG_P_UTILS: In get_sqlite_db_path - HF_SPACE_ID: {hf_space_id}, initial os.path.isdir('/data'): {is_data_dir_initially}")
-        sys.stdout.flush()
+        logger.debug("In get_sqlite_db_path - HF_SPACE_ID: %s, initial os.path.isdir('/data'): %s", hf_space_id, is_data_dir_initially)
 
         if hf_space_id or is_data_dir_initially:
-            print("DEBUG_P_UTILS: get_sqlite_db_path() - In if block (HF Space or /data initially exists). Ensuring /data.")
-            sys.stdout.flush()
+            logger.debug("get_sqlite_db_path() - In if block (HF Space or /data initially exists). Ensuring /data.")
             ensure_data_dir_exists() # Attempt to create/ensure /data
             # Re-check /data status after attempt
             if not os.path.isdir('/data'):
-                 print("CRITICAL_P_UTILS: /data is STILL NOT a directory after ensure_data_dir_exists(). Defaulting path to local.")
-                 sys.stdout.flush()
+                 logger.error("/data is STILL NOT a directory after ensure_data_dir_exists(). Defaulting path to local.")
                  final_path = 'fallback_chatbot_sessions.sqlite' # Fallback if /data cannot be made
             else:
                  final_path = '/data/chatbot_sessions.sqlite'
-            print(f"DEBUG_P_UTILS: get_sqlite_db_path() - Returning from if block: {final_path}")
-            sys.stdout.flush()
+            logger.debug("get_sqlite_db_path() - Returning from if block: %s", final_path)
             return final_path
         else:
-            print("DEBUG_P_UTILS: get_sqlite_db_path() - In else block (local dev likely, /data not found initially).")
-            sys.stdout.flush()
+            logger.debug("get_sqlite_db_path() - In else block (local dev likely, /data not found initially).")
             final_path = 'chatbot_sessions.sqlite' # Local path for non-HF/no-data scenarios
-            print(f"DEBUG_P_UTILS: get_sqlite_db_path() - Returning from else block: {final_path}")
-            sys.stdout.flush()
+            logger.debug("get_sqlite_db_path() - Returning from else block: %s", final_path)
             return final_path
     except Exception as e:
-        print(f"CRITICAL_P_UTILS: Exception in get_sqlite_db_path() execution: {e}")
-        sys.stdout.flush()
+        logger.error("Exception in get_sqlite_db_path() execution: %s", e)
         error_fallback_path = 'error_during_get_path.sqlite'
-        print(f"DEBUG_P_UTILS: get_sqlite_db_path() - Returning error fallback path: {error_fallback_path}")
-        sys.stdout.flush()
+        logger.debug("get_sqlite_db_path() - Returning error fallback path: %s", error_fallback_path)
         return error_fallback_path
 
 # --- Global SQLITE_DB_PATH assignment with robust error handling ---
 SQLITE_DB_PATH = "uninitialized_db_path.sqlite" # Default if everything fails
 try:
-    print("DEBUG_P_UTILS: MODULE LEVEL - About to call get_sqlite_db_path() for SQLITE_DB_PATH global assignment.")
-    sys.stdout.flush()
+    logger.debug("MODULE LEVEL - About to call get_sqlite_db_path() for SQLITE_DB_PATH global assignment.")
     SQLITE_DB_PATH = get_sqlite_db_path()
-    print(f"DEBUG_P_UTILS: MODULE LEVEL - SQLITE_DB_PATH globally initialized to: {SQLITE_DB_PATH}")
-    sys.stdout.flush()
+    logger.debug("MODULE LEVEL - SQLITE_DB_PATH globally initialized to: %s", SQLITE_DB_PATH)
     if SQLITE_DB_PATH is None: # Should be handled by get_sqlite_db_path returning fallbacks
-        print("CRITICAL_P_UTILS: MODULE LEVEL - SQLITE_DB_PATH is None after assignment! This should not happen.")
-        sys.stdout.flush()
+        logger.critical("MODULE LEVEL - SQLITE_DB_PATH is None after assignment! This should not happen.")
         SQLITE_DB_PATH = "critical_none_fallback.sqlite"
 except Exception as e:
-    print(f"CRITICAL_P_UTILS: MODULE LEVEL - Exception during global SQLITE_DB_PATH assignment: {e}")
-    sys.stdout.flush()
+    logger.critical("MODULE LEVEL - Exception during global SQLITE_DB_PATH assignment: %s", e)
     SQLITE_DB_PATH = "global_assign_exception_fallback.sqlite"
 finally:
-    print(f"DEBUG_P_UTILS: MODULE LEVEL - Final SQLITE_DB_PATH after try/except/finally: {SQLITE_DB_PATH}")
-    sys.stdout.flush()
+    logger.debug("MODULE LEVEL - Final SQLITE_DB_PATH after try/except/finally: %s", SQLITE_DB_PATH)
 
 def get_db_connection():
-    print(f"DEBUG_P_UTILS: get_db_connection() called. Using SQLITE_DB_PATH: {SQLITE_DB_PATH}")
-    sys.stdout.flush()
+    logger.debug("get_db_connection() called. Using SQLITE_DB_PATH: %s", SQLITE_DB_PATH)
     db_dir = os.path.dirname(SQLITE_DB_PATH)
-    print(f"DEBUG: db_dir: {db_dir}")
-    sys.stdout.flush()
+    logger.debug("db_dir: %s", db_dir)
     if db_dir and not os.path.exists(db_dir):
-        print(f"DEBUG: db_dir '{db_dir}' does not exist. Attempting to create.")
-        sys.stdout.flush()
+        logger.debug("db_dir '%s' does not exist. Attempting to create.", db_dir)
         try:
             os.makedirs(db_dir, exist_ok=True)
-            print(f"DEBUG: Successfully created db_dir '{db_dir}'")
-            sys.stdout.flush()
+            logger.debug("Successfully created db_dir '%s'", db_dir)
         except Exception as e:
-            print(f"CRITICAL: Could not create db directory {db_dir}: {e}")
-            sys.stdout.flush()
+            logger.error("Could not create db directory %s: %s", db_dir, e)
             raise
     else:
-        print(f"DEBUG: db_dir '{db_dir}' already exists or is not specified.")
-        sys.stdout.flush()
+        logger.debug("db_dir '%s' already exists or is not specified.", db_dir)
     try:
-        print("DEBUG: Attempting to connect. SQLITE_DB_PATH =", SQLITE_DB_PATH)
-        sys.stdout.flush()
+        logger.debug("Attempting to connect. SQLITE_DB_PATH = %s", SQLITE_DB_PATH)
         return sqlite3.connect(SQLITE_DB_PATH, timeout=10, isolation_level=None)
     except Exception as e:
-        print(f"CRITICAL: Could not open SQLite DB at {SQLITE_DB_PATH}: {e}")
-        sys.stdout.flush()
+        logger.error("Could not open SQLite DB at %s: %s", SQLITE_DB_PATH, e)
         raise
 
 def ensure_db():
-    print("DEBUG_P_UTILS: ensure_db() CALLED")
-    sys.stdout.flush()
+    logger.debug("ensure_db() CALLED")
     try:
-        print("DEBUG_P_UTILS: ensure_db() - Attempting to get DB connection.")
-        sys.stdout.flush()
+        logger.debug("ensure_db() - Attempting to get DB connection.")
         conn = get_db_connection() 
-        print(f"DEBUG_P_UTILS: ensure_db() - DB connection obtained: {conn}")
-        sys.stdout.flush()
+        logger.debug("ensure_db() - DB connection obtained: %s", conn)
         cursor = conn.cursor()
-        print("DEBUG_P_UTILS: ensure_db() - Cursor obtained.")
-        sys.stdout.flush()
+        logger.debug("ensure_db() - Cursor obtained.")
         
-        print("DEBUG_P_UTILS: ensure_db() - Attempting to CREATE TABLE chatbot_sessions.")
-        sys.stdout.flush()
+        logger.debug("ensure_db() - Attempting to CREATE TABLE chatbot_sessions.")
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS chatbot_sessions (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -137,11 +114,9 @@ def ensure_db():
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
         ''')
-        print("DEBUG_P_UTILS: ensure_db() - CREATE TABLE chatbot_sessions executed.")
-        sys.stdout.flush()
+        logger.debug("ensure_db() - CREATE TABLE chatbot_sessions executed.")
 
-        print("DEBUG_P_UTILS: ensure_db() - Attempting to CREATE TABLE general_session_feedback.")
-        sys.stdout.flush()
+        logger.debug("ensure_db() - Attempting to CREATE TABLE general_session_feedback.")
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS general_session_feedback (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -150,23 +125,17 @@ def ensure_db():
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
         ''')
-        print("DEBUG_P_UTILS: ensure_db() - CREATE TABLE general_session_feedback executed.")
-        sys.stdout.flush()
+        logger.debug("ensure_db() - CREATE TABLE general_session_feedback executed.")
 
-        print("DEBUG_P_UTILS: ensure_db() - Attempting to commit.")
-        sys.stdout.flush()
+        logger.debug("ensure_db() - Attempting to commit.")
         conn.commit()
-        print("DEBUG_P_UTILS: ensure_db() - Commit successful.")
-        sys.stdout.flush()
+        logger.debug("ensure_db() - Commit successful.")
         
         conn.close()
-        print("DEBUG_P_UTILS: ensure_db() - Connection closed.")
-        sys.stdout.flush()
-        print(f"DEBUG_P_UTILS: SQLite DB ensure_db() completed successfully for {SQLITE_DB_PATH}")
-        sys.stdout.flush()
+        logger.debug("ensure_db() - Connection closed.")
+        logger.debug("SQLite DB ensure_db() completed successfully for %s", SQLITE_DB_PATH)
     except Exception as e:
-        print(f"CRITICAL_P_UTILS: Exception in ensure_db(): {e}")
-        sys.stdout.flush()
+        logger.error("Exception in ensure_db(): %s", e)
         raise
 
 # === Helper functions restored from your original code ===
@@ -177,34 +146,35 @@ def datetime_serializer(obj):
         return obj.isoformat()
     raise TypeError (f"Type {type(obj)} not serializable")
 
+@traced()
 def save_session(user_id, session_data):
     conn = get_db_connection()
     cursor = conn.cursor()
 
     # Log the types of items in session_data before attempting to serialize
-    print(f"DEBUG_P_UTILS: save_session - About to serialize. Keys in session_data: {list(session_data.keys())}")
-    for key, value in session_data.items():
-        print(f"DEBUG_P_UTILS: save_session - Key: '{key}', Type: {type(value)}")
-    sys.stdout.flush()
+    if save_debug.sample():
+        logger.debug("save_session - About to serialize.", extra={
+            "key_types": {key: type(value).__name__ for key, value in session_data.items()},
+            "sample_every": save_debug.every,
+        })
 
     # Create a shallow copy to modify before serialization
     data_to_serialize = session_data.copy()
 
     # Remove known non-serializable keys
-    keys_to_remove = ["value_prop_workflow_instance", "coach_persona_instance", "current_workflow_instance", "current_persona_instance"]
+    keys_to_remove = ["value_prop_workflow_instance", "coach_persona_instance", "current_workflow_instance", "current_persona_instance", "rolling_summarizer"]
     for key in keys_to_remove:
         if key in data_to_serialize:
-            print(f"DEBUG_P_UTILS: save_session - Removing key '{key}' before serialization.")
             del data_to_serialize[key]
-    sys.stdout.flush()
 
     session_data_json = json.dumps(data_to_serialize, default=datetime_serializer)
-    cursor.execute(
-        "INSERT INTO chatbot_sessions (user_id, session_data) VALUES (?, ?)",
-        (user_id, session_data_json,)
-    )
-    session_id = cursor.lastrowid
-    conn.commit()
+    with SQLITE_WRITE_LATENCY.time(operation="save_session"):
+        cursor.execute(
+            "INSERT INTO chatbot_sessions (user_id, session_data) VALUES (?, ?)",
+            (user_id, session_data_json,)
+        )
+        session_id = cursor.lastrowid
+        conn.commit()
     conn.close()
     return session_id
 
@@ -222,8 +192,7 @@ def load_session(session_id):
         try:
             return json.loads(session_data_json)
         except json.JSONDecodeError as e:
-            print(f"CRITICAL_P_UTILS: Failed to decode JSON from DB: {e}. Data: '{session_data_json}'")
-            sys.stdout.flush()
+            logger.error("Failed to decode JSON from DB: %s. Data: '%s'", e, session_data_json)
             return None # Or handle error appropriately, e.g., return an empty dict or raise
     return None
 
@@ -273,11 +242,8 @@ def delete_feedback(session_id):
 # Ensure the database schema is created when this module is first imported,
 # after all functions have been defined.
 try:
-    print("DEBUG_P_UTILS: MODULE LEVEL (END OF FILE) - Attempting to call ensure_db().")
-    sys.stdout.flush()
+    logger.debug("MODULE LEVEL (END OF FILE) - Attempting to call ensure_db().")
     ensure_db()
-    print("DEBUG_P_UTILS: MODULE LEVEL (END OF FILE) - ensure_db() call completed.")
-    sys.stdout.flush()
+    logger.debug("MODULE LEVEL (END OF FILE) - ensure_db() call completed.")
 except Exception as e:
-    print(f"CRITICAL_P_UTILS: MODULE LEVEL (END OF FILE) - Exception during initial ensure_db() call: {e}")
-    sys.stdout.flush()
+    logger.critical("MODULE LEVEL (END OF FILE) - Exception during initial ensure_db() call: %s", e)
@@ -1,6 +1,8 @@
 """Simulates persona responses using OpenAI GPT-3.5-turbo for testing and development."""
-import os
-from openai import OpenAI
+try:
+    from src.llm_backends import get_backend
+except ImportError:
+    from llm_backends import get_backend
 
 PERSONA_PROFILE = {
     "name": "Pat Morgan",
@@ -9,9 +11,6 @@ PERSONA_PROFILE = {
     "constraints": "Bootstrap, avoid external funding, keep scope tight and integration easy.",
 }
 
-# Create an OpenAI client instance
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
-
 def get_persona_response(phase, conversation_history=None, scratchpad=None): # Added conversation_history parameter
     """
     Calls OpenAI GPT-3.5-turbo to generate an adaptive persona reply, using conversation history.
@@ -49,11 +48,11 @@ def get_persona_response(phase, conversation_history=None, scratchpad=None): # A
     )
     messages.append({"role": "user", "content": user_prompt})
 
-    # New OpenAI 1.x interface!
-    response = client.chat.completions.create(
+    # Routed through the configured backend so simulations can run offline (LLM_BACKEND=fake).
+    result = get_backend().complete(
+        messages,
         model="gpt-3.5-turbo",
-        messages=messages,
         max_tokens=200,
         temperature=0.7,
     )
-    return response.choices[0].message.content.strip()
+    return result["text"].strip()
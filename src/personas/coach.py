@@ -15,8 +15,109 @@ Core Enhancements Summary (June 2025):
 - Permission-Based Tips: Asks for permission before offering unsolicited tips/examples.
 """
 import re
+import json
 import logging # Added import
-from src.llm_utils import query_openai # Updated import
+from src.llm_utils import query_openai, generate_contextual_follow_up # Updated import
+from src.brainstorm import BrainstormEngine, merge_idea_list
+from src.example_library import find_examples, load_example_library
+from src.usage_ledger import DailyTokenCapExceeded
+
+
+# Static prompt for propose_next_conversation_turn(). The persona description and the long task
+# block are kept together in the system message, ahead of any per-turn content, so the leading
+# segment is byte-identical on every call and eligible for provider-side prefix caching.
+NEXT_TURN_SYSTEM_PROMPT = """You are a peer coach, and I am helping the user brainstorm new digital health innovations. My goal is to help them surface promising business ideas. I should build on any aspect of their prior answers (from intake) that shows potential, creativity, or relevance, but for the *very first question of the 'ideation' phase*, I need to be particularly open-ended.
+
+Specifically for the first turn of 'ideation':
+- Acknowledge key themes from their intake answers briefly.
+- Ask a broad, inviting question to explore initial thoughts for their value proposition. Avoid making specific assumptions about the direction they want to take, even if their background suggests a particular area. For example, instead of asking "Given your nursing background, how about an app for X?", ask something like "Drawing from your experiences, what initial thoughts or areas are you most excited to explore for your value proposition?" or "What kind of problems are you most passionate about solving right now?"
+- Use "I" and "you" pronouns to make the conversation direct and personal. For example, "I can help you explore..." or "What are you thinking about...". Avoid "we" unless it's about a shared, immediate action like "Let's brainstorm."
+
+For all other interactions (and subsequent turns in 'ideation'):
+- I am not a therapist, but I am very emotionally intelligent and always bring conversational energy and warmth.
+- I should never just repeat the user’s last answer. I always move the conversation forward, build excitement, and keep things open-ended.
+- If the user says ‘no’, ‘I don’t know’, or gives a one-word answer, I should gently prompt them to revisit an earlier idea, suggest a new direction, or validate that it’s normal to feel stuck.
+
+Example interaction (general, not first ideation turn):
+User: I care about cost savings and rapid deployment.
+Assistant: I hear you - so quick wins and low friction matter. I could help you brainstorm ideas for settings where speed makes a huge difference, or we could dive into ways to get to value quickly. Would you like to explore those, or is there another angle you’re curious about?
+
+--- Your Task ---
+Based on all the information in the user message (intake, scratchpad, phase, and recent history):
+1.  **Scan** all intake responses, scratchpad fields (paying attention to which are filled and how detailed they are), and recent conversation history.
+2.  **Identify the single strongest or most developed element** from the scratchpad (e.g., 'problem', 'target_user', 'solution') that appears to be the **least vetted or explored in the recent conversation history**. "Least vetted" means it hasn't been the focus of recent questions or detailed discussion. If multiple elements are strong but not fully vetted, choose the one that seems most foundational or pivotal for the user's idea.
+3.  **Briefly recap relevant details** already provided by the user for this chosen element, drawing from the scratchpad and conversation history. This sets context.
+4.  **Express enthusiasm or acknowledge the user's current thinking** on this specific element in a natural, peer-like way.
+5.  **Ask a single, focused, open-ended question** to further vet, develop, or deepen the understanding of *this specific element*. The question should encourage the user to elaborate, clarify, consider implications, or think about next steps for that element. Examples: "That's an interesting point about [element X]. Could you tell me more about [specific aspect of X]?" or "Building on your idea for [element Y], what's one challenge you foresee in that area?" or "You've got a good start on [element Z]. What feels like the most important next thought to explore for it?"
+6.  **Ensure your entire response culminates in this single, focused question.** Do not ask multiple questions or offer a list of options to choose from.
+7.  If previous user responses were very brief, negative ("no"), or indicated uncertainty ("I don't know"), gently pivot. You can do this by acknowledging their response, then perhaps revisiting the chosen "strongest, least vetted element" with a slightly different angle or by offering to break it down further.
+8.  Maintain a friendly, peer-like tone, using mild humor and warmth when appropriate. Always aim to move the conversation forward constructively on the chosen element.
+
+--- Example Scenarios (Revised Focus) ---
+
+Scenario 1: Focusing on a strong, less-vetted element
+Context:
+  Scratchpad: Problem: "Students lack accessible mental wellness resources." Target_User: "University undergraduates." Solution: (empty)
+  Recent History: User just finished defining Target_User.
+Your Output: "Okay, focusing on university undergraduates as the target user for the problem of lacking accessible mental wellness resources is a solid direction. We haven't really dug into what a solution might look like yet. What are your initial thoughts on how we could start to solve that accessibility issue for them?"
+
+Scenario 2: Handling "no" and refocusing on a developed but unvetted element
+Context:
+  Scratchpad: Problem: "High stress for nurses." Solution: "AI tool for scheduling." Differentiator: (empty)
+  Recent History:
+    Assistant: "...Want to explore how the AI tool's interface might look?"
+    User: "No."
+Your Output: "No problem at all! We can set aside the interface for now. We have a clear problem (high stress for nurses) and a potential solution (AI tool for scheduling). I'm curious, what do you think makes this AI scheduling tool different or better than other approaches nurses might currently use or other tools out there? Exploring that could really highlight its unique value."
+
+Scenario 3: User is uncertain, guide towards a developed element
+Context:
+  Scratchpad: Problem: "Patients forget medication." Target_User: "Elderly patients with multiple prescriptions." Solution: "Smart pillbox." Main_Benefit: (empty)
+  Recent History:
+    Assistant: "What's the main benefit of the smart pillbox?"
+    User: "I'm not sure yet."
+Your Output: "That's perfectly okay, figuring out the main benefit can take some thought! We know the smart pillbox is for elderly patients with multiple prescriptions who tend to forget their medication. Thinking about that specific group and problem, what's the most significant positive change or outcome they would experience from using the smart pillbox consistently?"
+"""
+
+NEXT_TURN_CLOSING_PROMPT = """--- Now, generate your response for the current user based on their information, focusing on one key element. ---
+What is your proposed next conversational turn? (Ensure it's a single, focused question)"""
+
+# Static prompt for plan_turn(): one call returning paraphrase, coaching, follow-up question and a
+# short summary, in place of the paraphrase_user_input / coach_on_decision /
+# generate_contextual_follow_up / generate_short_summary chain.
+TURN_PLAN_SYSTEM_PROMPT = """You are a helpful coaching assistant helping the user develop a strong value proposition for a digital health idea.
+For the user's latest input, plan the whole coaching turn at once and reply with a single JSON object with exactly these string fields:
+- "paraphrase": one or two sentences acknowledging and paraphrasing the input conceptually for the current step. Never quote the user directly.
+- "coaching": brief, context-aware feedback that explains *why* it helps their value proposition, adapted to the input's clarity (vague: ask for one kind of detail; developing: probe for specifics; specific or expert-level: affirm and build on it) and to the user's cue (decided, uncertain, open, curious or neutral). Offer at most one suggestion and do not ask a question here.
+- "follow_up_question": exactly one focused, open-ended question that moves the conversation forward. It must end with a question mark.
+- "short_summary": a summary of the user's input in at most 25 words.
+Base everything only on what the user has shared; do not invent unrelated details. Output the JSON object only, with no markdown fences."""
+
+TURN_PLAN_FIELDS = ("paraphrase", "coaching", "follow_up_question", "short_summary")
+
+
+def parse_turn_plan(text: str):
+    """Parses a plan_turn() reply; returns None unless it is a JSON object with every field non-empty."""
+    if not text:
+        return None
+    text = text.strip()
+    if text.startswith("```"):
+        text = re.sub(r"^```(?:json)?\s*|\s*```$", "", text)
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    plan = {field: str(data.get(field) or "").strip() for field in TURN_PLAN_FIELDS}
+    if not all(plan.values()):
+        return None
+    if not plan["follow_up_question"].endswith("?"):
+        plan["follow_up_question"] += "?"
+    return plan
+
 
 class CoachPersona: # Renamed from BehaviorEngine
     """
@@ -24,6 +125,9 @@ class CoachPersona: # Renamed from BehaviorEngine
     embodying an enhanced coaching persona.
     """
 
+    # Idea-generating behaviors sample several candidates in parallel and keep the best.
+    brainstorm_engine = BrainstormEngine()
+
     def assess_input_clarity_depth(self, user_input: str) -> str:
         """
         Assesses the depth and clarity of the user's input on a sliding scale.
@@ -88,11 +192,12 @@ class CoachPersona: # Renamed from BehaviorEngine
         ]
         
         try:
-            response = query_openai(messages=messages, max_tokens=50, temperature=0.7)
+            response = query_openai(messages=messages, call_site="active_listening", max_tokens=50, temperature=0.7)
             return response
+        except DailyTokenCapExceeded:
+            raise
         except Exception as e:
-            # Log the error e.g., using logging.error(f"Error in active_listening: {e}")
-            print(f"Error in active_listening LLM call: {e}") # Basic error printing
+            logging.error("Error in active_listening LLM call: %s", e)
             return "DEBUG_COACH_ACTIVE_LISTENING_FALLBACK" # Unique fallback for debugging
 
     def diplomatic_acknowledgement(self, stance: str, user_input: str = "") -> str:
@@ -121,10 +226,12 @@ class CoachPersona: # Renamed from BehaviorEngine
         ]
         
         try:
-            response = query_openai(messages=messages, max_tokens=60, temperature=0.7)
+            response = query_openai(messages=messages, call_site="diplomatic_acknowledgement", max_tokens=60, temperature=0.7)
             return response
+        except DailyTokenCapExceeded:
+            raise
         except Exception as e:
-            print(f"Error in diplomatic_acknowledgement LLM call: {e}")
+            logging.error("Error in diplomatic_acknowledgement LLM call: %s", e)
             return "Understood." # Fallback response
 
     def _build_contextual_recap_prompt_segment(self, scratchpad: dict, current_step: str) -> str:
@@ -183,6 +290,14 @@ class CoachPersona: # Renamed from BehaviorEngine
         For now, this method will be updated to frame the LLM call to ask first.
         The actual delivery of the example upon user confirmation would ideally be a separate step/call.
         """
+        # When the example library covers this step the permission question needs no LLM call.
+        library = load_example_library()
+        if library and library.has_phase(step):
+            step_display = step.replace('_', ' ')
+            if len(user_input_for_context.split()) <= 3:
+                return f"I can offer an example for the {step_display} to help clarify, if you'd like. Would that be helpful?"
+            return f"Would you like an example for the {step_display}, or do you have some initial thoughts?"
+
         # This prompt now instructs the LLM to ask first.
         system_prompt_base = f"""You are a helpful coaching assistant. The user is working on the '{step}' step.
 First, ask the user if they would like an example for this step. Phrase it like: 'Would you like an example for the {step}, or do you have some initial thoughts?' or 'Sometimes an example can be helpful for the {step} step. Would you like one, or are you ready to share your ideas?'
@@ -200,17 +315,24 @@ Your response should be ONLY the question.
         
         try:
             # This call now expects the LLM to return the question "Would you like an example?"
-            response = query_openai(messages=messages, max_tokens=70, temperature=0.6)
+            response = query_openai(messages=messages, call_site="offer_example", max_tokens=70, temperature=0.6)
             return response
+        except DailyTokenCapExceeded:
+            raise
         except Exception as e:
-            print(f"Error in offer_example (permission asking) LLM call: {e}")
+            logging.error("Error in offer_example (permission asking) LLM call: %s", e)
             return f"Would you like an example for the {step} step?" # Fallback question
 
-    def provide_actual_example(self, step: str) -> str:
+    def provide_actual_example(self, step: str, context: str = "") -> str:
         """
-        Generates and provides a concrete example for a given workflow step using an LLM.
+        Provides a concrete example for a given workflow step, from the precomputed example
+        library when it has one relevant to context (e.g. the user's interests), otherwise using an LLM.
         This method is called *after* the user has agreed to see an example.
         """
+        examples = find_examples(step, context)
+        if examples:
+            return examples[0]["text"]
+
         system_prompt_base = """You are a helpful assistant. Your goal is to provide a single, concise, and relevant example for the given workflow step to help the user understand the type of input expected. Do not use quotation marks or list multiple examples. The example should be illustrative.
         Base the example on common scenarios but keep it brief and focused on the step's purpose.
         """
@@ -238,10 +360,12 @@ Your response should be ONLY the question.
         ]
         
         try:
-            response = query_openai(messages=messages, max_tokens=100, temperature=0.5)
+            response = query_openai(messages=messages, call_site="provide_actual_example", max_tokens=100, temperature=0.5)
             return response
+        except DailyTokenCapExceeded:
+            raise
         except Exception as e:
-            print(f"Error in provide_actual_example LLM call: {e}")
+            logging.error("Error in provide_actual_example LLM call: %s", e)
             return f"For instance, for the {step}, one might consider..." # Fallback example
 
     def offer_strategic_suggestion(self, step: str, user_input_for_context: str = "") -> str:
@@ -263,10 +387,12 @@ Your response should be ONLY the question asking if they want a suggestion. Do n
         ]
         
         try:
-            response = query_openai(messages=messages, max_tokens=70, temperature=0.6)
+            response = query_openai(messages=messages, call_site="offer_strategic_suggestion", max_tokens=70, temperature=0.6)
             return response
+        except DailyTokenCapExceeded:
+            raise
         except Exception as e:
-            print(f"Error in offer_strategic_suggestion (permission asking) LLM call: {e}")
+            logging.error("Error in offer_strategic_suggestion (permission asking) LLM call: %s", e)
             return f"Would you like a strategic tip for the {step} step?" # Fallback
 
     def provide_actual_strategic_suggestion(self, step: str) -> str:
@@ -297,12 +423,13 @@ Your response should be ONLY the question asking if they want a suggestion. Do n
             {"role": "user", "content": user_prompt}
         ]
         
-        try:
-            response = query_openai(messages=messages, max_tokens=120, temperature=0.7)
-            return response
-        except Exception as e:
-            print(f"Error in provide_actual_strategic_suggestion LLM call: {e}")
-            return f"For the {step}, one strategic angle to consider is..." # Fallback
+        responses = self.brainstorm_engine.best_responses(
+            messages, "provide_actual_strategic_suggestion", extra_context=user_prompt, max_tokens=120
+        )
+        if responses:
+            return responses[0]
+        logging.error("Error in provide_actual_strategic_suggestion LLM call: no candidate returned")
+        return f"For the {step}, one strategic angle to consider is..." # Fallback
 
     def paraphrase_user_input(self, user_input: str, user_cue: str, current_step: str = "the current topic", scratchpad: dict = None, search_results: list = None) -> str: # Added search_results
         """
@@ -365,7 +492,7 @@ Your response should have two parts:
         ]
         
         try:
-            response = query_openai(messages=messages, max_tokens=150, temperature=0.7) # Increased tokens
+            response = query_openai(messages=messages, call_site="paraphrase_user_input", max_tokens=150, temperature=0.7) # Increased tokens
             
             # Micro-validation for detailed input
             clarity_depth = self.assess_input_clarity_depth(user_input)
@@ -378,8 +505,10 @@ Your response should have two parts:
                 response += " What are your thoughts on this?" # Generic follow-up
 
             return response
+        except DailyTokenCapExceeded:
+            raise
         except Exception as e:
-            print(f"Error in paraphrase_user_input LLM call: {e}")
+            logging.error("Error in paraphrase_user_input LLM call: %s", e)
             # Fallback that still tries to reference the input
             if user_input:
                  return f"I've noted your thoughts on {current_step}. To help refine this, what's one aspect you'd like to focus on next?"
@@ -441,7 +570,7 @@ Your response should have two parts:
         ]
         
         try:
-            response = query_openai(messages=messages, max_tokens=180, temperature=0.7) # Increased tokens
+            response = query_openai(messages=messages, call_site="coach_on_decision", max_tokens=180, temperature=0.7) # Increased tokens
             
             # Micro-validation for detailed input
             clarity_depth = self.assess_input_clarity_depth(user_input)
@@ -454,8 +583,10 @@ Your response should have two parts:
                  response += " What are your thoughts on this approach?"
 
             return response
+        except DailyTokenCapExceeded:
+            raise
         except Exception as e:
-            print(f"Error in coach_on_decision LLM call: {e}")
+            logging.error("Error in coach_on_decision LLM call: %s", e)
             # Fallback that still tries to reference the input
             if user_input:
                 return f"That's an interesting decision for {current_step} regarding '{user_input[:50]}...'. What's the primary reason you landed on that?"
@@ -503,12 +634,14 @@ Your response should have two parts:
         ]
         
         try:
-            response = query_openai(messages=messages, max_tokens=300, temperature=0.7) # Increased max_tokens
+            response = query_openai(messages=messages, call_site="provide_feedback", max_tokens=300, temperature=0.7) # Increased max_tokens
             if not response.strip().endswith("?"):
                 response += " What are your initial thoughts on this feedback?"
             return response
+        except DailyTokenCapExceeded:
+            raise
         except Exception as e:
-            print(f"Error in provide_feedback LLM call: {e}")
+            logging.error("Error in provide_feedback LLM call: %s", e)
             return "That's an interesting set of ideas. Let's think about how they fit together. What's one area you'd like to discuss first?" # Fallback
 
     def generate_ideas(self, current_value_prop_elements: dict, user_request: str, scratchpad: dict) -> str:
@@ -552,13 +685,16 @@ Your response should have two parts:
             {"role": "user", "content": user_prompt_for_llm}
         ]
         
-        try:
-            response = query_openai(messages=messages, max_tokens=300, temperature=0.75) # Increased max_tokens
+        responses = self.brainstorm_engine.best_responses(
+            messages, "generate_ideas", scratchpad=scratchpad, extra_context=user_request, max_tokens=300
+        )
+        if responses:
+            response = responses[0]
             if not response.strip().endswith("?"):
                 response += " What do you think of this suggestion?"
             return response
-        except Exception as e:
-            print(f"Error in generate_ideas LLM call: {e}")
+        else:
+            logging.error("Error in generate_ideas LLM call: no candidate returned")
             return "Let's brainstorm some possibilities. What's one area you feel could be stronger?" # Fallback
 
     def get_intake_to_ideation_transition_message(self) -> str:
@@ -714,12 +850,19 @@ Your response should have two parts:
         """
         Sends text to OpenAI to create a short (<=100-token) summary.
         """
-        summary_prompt = f"Summarize the following text in 100 tokens or less:\n\n{text}"
         # Use a slightly lower temperature for summarization to get more concise results
         # query_openai is available via from ..llm_utils import query_openai
-        summary = query_openai(messages=[{"role": "user", "content": summary_prompt}], temperature=0.5, max_tokens=100)
+        summary = query_openai(messages=self.build_short_summary_messages(text), call_site="generate_short_summary", temperature=0.5, max_tokens=100)
         return summary
 
+    def build_short_summary_messages(self, text: str) -> list:
+        """
+        Builds the messages for generate_short_summary without calling the LLM,
+        so offline batch jobs can summarize many texts with the same prompt.
+        """
+        summary_prompt = f"Summarize the following text in 100 tokens or less:\n\n{text}"
+        return [{"role": "user", "content": summary_prompt}]
+
     def greet_and_explain_value_prop_process(self) -> str:
         """
         Provides an initial greeting and explanation of the value proposition workflow.
@@ -727,28 +870,11 @@ Your response should have two parts:
         # This is the method ValuePropWorkflow expects for the initial greeting.
         return "Welcome to the Value Proposition Workflow! We'll start by defining the problem you're aiming to solve. What problem are you focusing on?"
 
-    def propose_next_conversation_turn(self, intake_answers: list, scratchpad: dict, phase: str, conversation_history: list = None) -> str:
+    def build_next_turn_messages(self, intake_answers: list, scratchpad: dict, phase: str, conversation_history: list = None) -> list:
         """
-        Uses the LLM to propose the next natural conversation turn based on intake, scratchpad, phase, and conversation history.
-        Aims for peer coaching, brainstorming, and conversational EQ.
+        Builds the messages for propose_next_conversation_turn without calling the LLM.
+        The static NEXT_TURN_SYSTEM_PROMPT always comes first; only the user message varies per turn.
         """
-        # client is available via from ..llm_utils import client
-        system_prompt_content = """You are a peer coach, and I am helping the user brainstorm new digital health innovations. My goal is to help them surface promising business ideas. I should build on any aspect of their prior answers (from intake) that shows potential, creativity, or relevance, but for the *very first question of the 'ideation' phase*, I need to be particularly open-ended.
-
-Specifically for the first turn of 'ideation':
-- Acknowledge key themes from their intake answers briefly.
-- Ask a broad, inviting question to explore initial thoughts for their value proposition. Avoid making specific assumptions about the direction they want to take, even if their background suggests a particular area. For example, instead of asking "Given your nursing background, how about an app for X?", ask something like "Drawing from your experiences, what initial thoughts or areas are you most excited to explore for your value proposition?" or "What kind of problems are you most passionate about solving right now?"
-- Use "I" and "you" pronouns to make the conversation direct and personal. For example, "I can help you explore..." or "What are you thinking about...". Avoid "we" unless it's about a shared, immediate action like "Let's brainstorm."
-
-For all other interactions (and subsequent turns in 'ideation'):
-- I am not a therapist, but I am very emotionally intelligent and always bring conversational energy and warmth.
-- I should never just repeat the user’s last answer. I always move the conversation forward, build excitement, and keep things open-ended.
-- If the user says ‘no’, ‘I don’t know’, or gives a one-word answer, I should gently prompt them to revisit an earlier idea, suggest a new direction, or validate that it’s normal to feel stuck.
-
-Example interaction (general, not first ideation turn):
-User: I care about cost savings and rapid deployment.
-Assistant: I hear you - so quick wins and low friction matter. I could help you brainstorm ideas for settings where speed makes a huge difference, or we could dive into ways to get to value quickly. Would you like to explore those, or is there another angle you’re curious about?"""
-
         user_prompt_parts = []
         user_prompt_parts.append(f"Current Conversation Phase: {phase}")
 
@@ -777,60 +903,109 @@ Assistant: I hear you - so quick wins and low friction matter. I could help you
                     user_prompt_parts.append(f"{role}: {text}")
             user_prompt_parts.append("----------------------------------------------------")
 
+        user_prompt_parts.append("\n" + NEXT_TURN_CLOSING_PROMPT)
 
-        user_prompt_parts.append("\n--- Your Task ---")
-        user_prompt_parts.append("""Based on all the information above (intake, scratchpad, phase, and recent history):
-1.  **Scan** all intake responses, scratchpad fields (paying attention to which are filled and how detailed they are), and recent conversation history.
-2.  **Identify the single strongest or most developed element** from the scratchpad (e.g., 'problem', 'target_user', 'solution') that appears to be the **least vetted or explored in the recent conversation history**. "Least vetted" means it hasn't been the focus of recent questions or detailed discussion. If multiple elements are strong but not fully vetted, choose the one that seems most foundational or pivotal for the user's idea.
-3.  **Briefly recap relevant details** already provided by the user for this chosen element, drawing from the scratchpad and conversation history. This sets context.
-4.  **Express enthusiasm or acknowledge the user's current thinking** on this specific element in a natural, peer-like way.
-5.  **Ask a single, focused, open-ended question** to further vet, develop, or deepen the understanding of *this specific element*. The question should encourage the user to elaborate, clarify, consider implications, or think about next steps for that element. Examples: "That's an interesting point about [element X]. Could you tell me more about [specific aspect of X]?" or "Building on your idea for [element Y], what's one challenge you foresee in that area?" or "You've got a good start on [element Z]. What feels like the most important next thought to explore for it?"
-6.  **Ensure your entire response culminates in this single, focused question.** Do not ask multiple questions or offer a list of options to choose from.
-7.  If previous user responses were very brief, negative ("no"), or indicated uncertainty ("I don't know"), gently pivot. You can do this by acknowledging their response, then perhaps revisiting the chosen "strongest, least vetted element" with a slightly different angle or by offering to break it down further.
-8.  Maintain a friendly, peer-like tone, using mild humor and warmth when appropriate. Always aim to move the conversation forward constructively on the chosen element.
-
---- Example Scenarios (Revised Focus) ---
-
-Scenario 1: Focusing on a strong, less-vetted element
-Context:
-  Scratchpad: Problem: "Students lack accessible mental wellness resources." Target_User: "University undergraduates." Solution: (empty)
-  Recent History: User just finished defining Target_User.
-Your Output: "Okay, focusing on university undergraduates as the target user for the problem of lacking accessible mental wellness resources is a solid direction. We haven't really dug into what a solution might look like yet. What are your initial thoughts on how we could start to solve that accessibility issue for them?"
-
-Scenario 2: Handling "no" and refocusing on a developed but unvetted element
-Context:
-  Scratchpad: Problem: "High stress for nurses." Solution: "AI tool for scheduling." Differentiator: (empty)
-  Recent History:
-    Assistant: "...Want to explore how the AI tool's interface might look?"
-    User: "No."
-Your Output: "No problem at all! We can set aside the interface for now. We have a clear problem (high stress for nurses) and a potential solution (AI tool for scheduling). I'm curious, what do you think makes this AI scheduling tool different or better than other approaches nurses might currently use or other tools out there? Exploring that could really highlight its unique value."
-
-Scenario 3: User is uncertain, guide towards a developed element
-Context:
-  Scratchpad: Problem: "Patients forget medication." Target_User: "Elderly patients with multiple prescriptions." Solution: "Smart pillbox." Main_Benefit: (empty)
-  Recent History:
-    Assistant: "What's the main benefit of the smart pillbox?"
-    User: "I'm not sure yet."
-Your Output: "That's perfectly okay, figuring out the main benefit can take some thought! We know the smart pillbox is for elderly patients with multiple prescriptions who tend to forget their medication. Thinking about that specific group and problem, what's the most significant positive change or outcome they would experience from using the smart pillbox consistently?"
-
---- Now, generate your response for the current user based on their information, focusing on one key element. ---
-What is your proposed next conversational turn? (Ensure it's a single, focused question)
-""")
-
-        full_user_prompt = "\n".join(user_prompt_parts)
+        return [
+            {"role": "system", "content": NEXT_TURN_SYSTEM_PROMPT},
+            {"role": "user", "content": "\n".join(user_prompt_parts)}
+        ]
 
-        # query_openai is available via from ..llm_utils import query_openai
-        # client is also available from llm_utils if direct client call is preferred
+    def propose_next_conversation_turn(self, intake_answers: list, scratchpad: dict, phase: str, conversation_history: list = None) -> str:
+        """
+        Uses the LLM to propose the next natural conversation turn based on intake, scratchpad, phase, and conversation history.
+        Aims for peer coaching, brainstorming, and conversational EQ.
+        """
         response = query_openai(
-            messages=[
-                {"role": "system", "content": system_prompt_content},
-                {"role": "user", "content": full_user_prompt}
-            ],
+            messages=self.build_next_turn_messages(intake_answers, scratchpad, phase, conversation_history),
+            call_site="propose_next_conversation_turn",
             temperature=0.75,
             max_tokens=250
         )
         return response # query_openai already strips
 
+    def build_turn_plan_messages(self, user_input: str, current_step: str, scratchpad: dict = None, user_cue: str = None, search_results: list = None) -> list:
+        """
+        Builds the messages for plan_turn(). The static TURN_PLAN_SYSTEM_PROMPT comes first; the
+        scratchpad is sent once, with only its filled fields.
+        """
+        user_cue = user_cue or self.detect_user_cues(user_input, current_step)
+        user_prompt_parts = [
+            f"Current step: {current_step}",
+            f"User cue: {user_cue}",
+            f"Input clarity: {self.assess_input_clarity_depth(user_input)}",
+        ]
+        if scratchpad and any(scratchpad.values()):
+            user_prompt_parts.append("\n--- Current Scratchpad ---")
+            for key, value in scratchpad.items():
+                if value:
+                    user_prompt_parts.append(f"{key.replace('_', ' ').title()}: {value}")
+            user_prompt_parts.append("--------------------------")
+        if search_results:
+            user_prompt_parts.append(f"\nRelevant search results for context: {search_results}")
+        user_prompt_parts.append(f"\nUser input: {user_input}")
+        return [
+            {"role": "system", "content": TURN_PLAN_SYSTEM_PROMPT},
+            {"role": "user", "content": "\n".join(user_prompt_parts)}
+        ]
+
+    def plan_turn(self, user_input: str, current_step: str, scratchpad: dict = None, user_cue: str = None, search_results: list = None) -> dict:
+        """
+        Plans a coaching turn in one LLM round-trip: paraphrase, coaching, follow-up question and
+        short summary. If the reply cannot be parsed, falls back to the per-method calls
+        (paraphrase_user_input, coach_on_decision, generate_contextual_follow_up,
+        generate_short_summary). The result's "source" is "plan" or "fallback".
+        """
+        scratchpad = scratchpad or {}
+        user_cue = user_cue or self.detect_user_cues(user_input, current_step)
+        try:
+            response = query_openai(
+                messages=self.build_turn_plan_messages(user_input, current_step, scratchpad, user_cue, search_results),
+                call_site="plan_turn",
+                temperature=0.7,
+                max_tokens=350,
+                response_format={"type": "json_object"},
+            )
+            plan = parse_turn_plan(response)
+        except DailyTokenCapExceeded:
+            raise
+        except Exception as e:
+            logging.error("Error in plan_turn LLM call: %s", e)
+            plan = None
+
+        if plan is not None:
+            plan["source"] = "plan"
+            return plan
+
+        logging.warning("plan_turn reply could not be parsed; falling back to per-method calls.")
+        coaching = self.coach_on_decision(current_step, user_input, scratchpad, user_cue, search_results)
+        try:
+            short_summary = self.generate_short_summary(user_input)
+        except DailyTokenCapExceeded:
+            raise
+        except Exception as e:
+            logging.error("Error in generate_short_summary LLM call: %s", e)
+            short_summary = ""
+        return {
+            "paraphrase": self.paraphrase_user_input(user_input, user_cue, current_step, scratchpad, search_results),
+            "coaching": coaching,
+            "follow_up_question": generate_contextual_follow_up(coaching),
+            "short_summary": short_summary,
+            "source": "fallback",
+        }
+
+    def compose_turn_reply(self, plan: dict, user_input: str = "") -> str:
+        """
+        Joins a plan_turn() result into one reply that ends in a single question. Fallback plans
+        already carry questions in their paraphrase and coaching, so only the coaching is used.
+        """
+        if plan.get("source") == "fallback":
+            return plan.get("coaching", "")
+        parts = []
+        if self.assess_input_clarity_depth(user_input) in ["specific", "expert-level"] and len(user_input.split()) > 15:
+            parts.append("Thanks for sharing such a detailed perspective on that!")
+        parts.extend([plan["paraphrase"], plan["coaching"], plan["follow_up_question"]])
+        return " ".join(p.strip() for p in parts if p and p.strip())
+
     def assist_with_brainstorming(self, user_input: str, scratchpad: dict, intake_answers: list) -> str:
         """
         Helps the user brainstorm ideas when they explicitly ask for help.
@@ -866,18 +1041,19 @@ Keep the tone encouraging and collaborative.
 
         full_user_prompt = "\n".join(user_prompt_parts)
 
-        try:
-            response = query_openai(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": full_user_prompt}
-                ],
-                temperature=0.8, # Higher temperature for more creative brainstorming
-                max_tokens=200
-            )
-            return response
-        except Exception as e:
-            logging.error(f"Error in assist_with_brainstorming LLM call: {e}")
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": full_user_prompt}
+        ]
+        # Candidates are sampled at several temperatures; their ideas are pooled, deduplicated and ranked.
+        ideas, best_response = self.brainstorm_engine.best_ideas(
+            messages, "assist_with_brainstorming", scratchpad=scratchpad, extra_context=user_input, top_k=3, max_tokens=200
+        )
+        if best_response is None:
+            logging.error("Error in assist_with_brainstorming LLM call: no candidate returned")
             return "I'm having a little trouble generating ideas right now. Could you perhaps tell me a bit more about what general area you're interested in?" # Fallback
+        if len(ideas) >= 2:
+            return merge_idea_list(best_response, ideas)
+        return best_response # e.g. a clarifying question rather than a list
 
     # TODO: add behavior methods (paraphrase, feedback, etc.) - These seem to be well covered above.
\ No newline at end of file
@@ -0,0 +1,134 @@
+"""Measures how much of each rendered LLM prompt is a cacheable static prefix versus per-turn content."""
+import statistics
+from contextlib import contextmanager
+from typing import Dict, List
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken is optional; fall back to a character-based estimate
+    _ENCODING = None
+
+# OpenAI applies prompt caching to prompts of at least 1024 tokens and extends the cached
+# segment in 128-token increments.
+PROVIDER_MIN_CACHEABLE_TOKENS = 1024
+PROVIDER_CACHE_INCREMENT = 128
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Returns the token count of text using tiktoken when installed,
+    otherwise the usual ~4 characters per token approximation.
+    """
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return max(1, round(len(text) / 4))
+
+
+def render_prompt_text(messages: list) -> str:
+    """
+    Serializes a chat message list into the flat text the provider sees,
+    so that prefixes can be compared byte for byte.
+    """
+    return "".join(f"<|{m.get('role', '')}|>{m.get('content', '')}" for m in messages)
+
+
+def shared_prefix_length(texts: List[str]) -> int:
+    """Returns the number of leading characters shared by every string in texts."""
+    if not texts:
+        return 0
+    shortest = min(texts, key=len)
+    for i, ch in enumerate(shortest):
+        if any(t[i] != ch for t in texts):
+            return i
+    return len(shortest)
+
+
+def provider_cached_tokens(prefix_tokens: int) -> int:
+    """Returns how many of prefix_tokens a provider would actually serve from its prefix cache."""
+    if prefix_tokens < PROVIDER_MIN_CACHEABLE_TOKENS:
+        return 0
+    extra = prefix_tokens - PROVIDER_MIN_CACHEABLE_TOKENS
+    return PROVIDER_MIN_CACHEABLE_TOKENS + (extra // PROVIDER_CACHE_INCREMENT) * PROVIDER_CACHE_INCREMENT
+
+
+def cacheable_prefix_report(samples: Dict[str, List[dict]]) -> List[dict]:
+    """
+    Builds one report row per call site.
+
+    samples maps a call-site name to a list of {"session": <id>, "messages": [...]} renders,
+    in the order the calls happened. For every call site the report gives:
+      - static_prefix_tokens: prefix shared by every render (cacheable across all users)
+      - session_prefix_tokens: mean prefix shared with the previous call in the same session
+      - dynamic_tokens: mean tokens after the session prefix
+      - cacheable_ratio: session_prefix_tokens / mean total tokens
+      - provider_cached_tokens: session prefix rounded to what the provider would cache
+    """
+    rows = []
+    for call_site, renders in samples.items():
+        if not renders:
+            continue
+        texts = [render_prompt_text(r["messages"]) for r in renders]
+        totals = [estimate_tokens(t) for t in texts]
+        static_chars = shared_prefix_length(texts)
+        static_tokens = estimate_tokens(texts[0][:static_chars])
+
+        session_prefixes = []
+        previous_by_session = {}
+        for render, text in zip(renders, texts):
+            session = render.get("session")
+            previous = previous_by_session.get(session)
+            if previous is None:
+                prefix_chars = static_chars
+            else:
+                prefix_chars = max(static_chars, shared_prefix_length([previous, text]))
+            session_prefixes.append(estimate_tokens(text[:prefix_chars]))
+            previous_by_session[session] = text
+
+        mean_total = statistics.mean(totals)
+        mean_prefix = statistics.mean(session_prefixes)
+        rows.append({
+            "call_site": call_site,
+            "samples": len(renders),
+            "mean_total_tokens": round(mean_total, 1),
+            "static_prefix_tokens": static_tokens,
+            "session_prefix_tokens": round(mean_prefix, 1),
+            "dynamic_tokens": round(mean_total - mean_prefix, 1),
+            "cacheable_ratio": round(mean_prefix / mean_total, 3) if mean_total else 0.0,
+            "provider_cached_tokens": round(statistics.mean(provider_cached_tokens(p) for p in session_prefixes), 1),
+        })
+    return rows
+
+
+def format_report(rows: List[dict]) -> str:
+    """Formats report rows from cacheable_prefix_report() as a fixed-width text table."""
+    headers = ["call_site", "samples", "mean_total_tokens", "static_prefix_tokens",
+               "session_prefix_tokens", "dynamic_tokens", "cacheable_ratio", "provider_cached_tokens"]
+    widths = {h: max(len(h), *(len(str(r[h])) for r in rows)) if rows else len(h) for h in headers}
+    lines = ["  ".join(h.ljust(widths[h]) for h in headers)]
+    for row in rows:
+        lines.append("  ".join(str(row[h]).ljust(widths[h]) for h in headers))
+    return "\n".join(lines)
+
+
+@contextmanager
+def capture_llm_messages(module, reply: str = ""):
+    """
+    Temporarily replaces module.query_openai with a recorder so that a persona method can be
+    run to render its prompt without making a network call. Yields the list of captured
+    message lists.
+    """
+    captured = []
+    original = module.query_openai
+
+    def _record(messages=None, *args, **kwargs):
+        captured.append(messages if messages is not None else (args[0] if args else []))
+        return reply
+
+    module.query_openai = _record
+    try:
+        yield captured
+    finally:
+        module.query_openai = original
@@ -46,6 +46,7 @@ How to add a new Persona:
    The "My New Persona Name" is the string that will be used to look up this
    persona class.
 """
+import logging
 from typing import Type, Dict, Any, Callable
 
 # Workflow Imports
@@ -72,7 +73,7 @@ def register_workflow(name: str, cls: WorkflowClass) -> None:
     """Registers a workflow class with the given name."""
     if name in WORKFLOW_REGISTRY:
         # Potentially raise an error or log a warning if re-registering
-        print(f"Warning: Workflow '{name}' is being re-registered.")
+        logging.warning("Workflow '%s' is being re-registered.", name)
     WORKFLOW_REGISTRY[name] = cls
 
 def get_workflow(name: str) -> WorkflowClass | None:
@@ -83,7 +84,7 @@ def register_persona(name: str, cls: PersonaClass) -> None:
     """Registers a persona class with the given name."""
     if name in PERSONA_REGISTRY:
         # Potentially raise an error or log a warning if re-registering
-        print(f"Warning: Persona '{name}' is being re-registered.")
+        logging.warning("Persona '%s' is being re-registered.", name)
     PERSONA_REGISTRY[name] = cls
 
 def get_persona(name: str) -> PersonaClass | None:
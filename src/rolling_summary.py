@@ -0,0 +1,277 @@
+"""
+Hierarchical rolling summary of the conversation: turns fold into chunk summaries, chunks into a session summary.
+
+Used by the conversation_manager flow: generate_assistant_response() schedules updates, and
+build_conversation_messages() / reconstruct_context_from_summaries() read the context. The
+phase-engine turn path in streamlit_app.py uses neither, and its prompts carry no conversation
+history, so the app does not schedule summaries; doing so would pay for LLM calls whose output no
+prompt reads. Hook get_session_summarizer().schedule() into that path together with a prompt
+that consumes session_summary_context().
+"""
+import contextvars
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+import streamlit as st
+
+from src.core.logger import get_logger
+from src.llm_utils import query_openai
+from src.utils.fingerprint import message_fingerprint
+
+logger = get_logger(__name__)
+
+STATE_KEY = "rolling_summary"
+SESSION_KEY = "rolling_summarizer"
+# Turns per chunk summary.
+CHUNK_TURNS = int(os.environ.get("ROLLING_SUMMARY_CHUNK_TURNS", "6"))
+# Most recent turns left out of chunks; prompts carry these verbatim.
+KEEP_RECENT_TURNS = int(os.environ.get("ROLLING_SUMMARY_KEEP_RECENT", "4"))
+# Latest chunk summaries kept at full detail; older ones are folded into the session summary.
+DETAIL_CHUNKS = int(os.environ.get("ROLLING_SUMMARY_DETAIL_CHUNKS", "3"))
+# Default token budget for context(); tokens are estimated at about 4 characters each.
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("ROLLING_SUMMARY_TOKEN_BUDGET", "600"))
+CHUNK_SUMMARY_WORDS = 60
+SESSION_SUMMARY_WORDS = 120
+
+CHUNK_PROMPT = (
+    "Summarize this part of a coaching conversation about a digital health idea in at most "
+    f"{CHUNK_SUMMARY_WORDS} words. Keep decisions, facts, numbers and open questions; drop pleasantries."
+)
+SESSION_PROMPT = (
+    "Merge the summary of the conversation so far with the newer part below into one summary of at most "
+    f"{SESSION_SUMMARY_WORDS} words. Keep the idea's key decisions and facts; prefer the newer part where they conflict."
+)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _shared_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=int(os.environ.get("ROLLING_SUMMARY_WORKERS", "2")),
+                    thread_name_prefix="rolling-summary",
+                )
+    return _executor
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+def truncate_words(text: str, max_words: int) -> str:
+    words = text.split()
+    return text.strip() if len(words) <= max_words else " ".join(words[:max_words]) + "..."
+
+
+def _turn_id(turn: dict) -> str:
+    """Turns are identified by role and timestamp, so an edited turn keeps its identity."""
+    if turn.get("timestamp"):
+        return f"{turn.get('role', '')}|{turn['timestamp']}"
+    return message_fingerprint(f"{turn.get('role', '')}|{turn.get('text', '')}")
+
+
+def _format_turns(turns: list) -> str:
+    return "\n".join(f"{t['role']}: {t['text']}" for t in turns)
+
+
+class RollingSummarizer:
+    """
+    Keeps its own record of the turns it has seen, so trimming or clearing the live history
+    never loses long-range context. Every CHUNK_TURNS older turns become a chunk with its own
+    summary; chunks beyond the latest DETAIL_CHUNKS are folded into a single session summary.
+    A chunk is re-summarized only when the text of one of its turns changes, and the session
+    summary is extended incrementally unless a chunk it already covers changed.
+    State is a plain dict, so it can live in st.session_state and be saved with the session.
+    """
+
+    def __init__(self, state: Optional[dict] = None, complete: Optional[Callable] = None,
+                 executor: Optional[ThreadPoolExecutor] = None, chunk_turns: int = CHUNK_TURNS,
+                 keep_recent: int = KEEP_RECENT_TURNS, detail_chunks: int = DETAIL_CHUNKS):
+        self.state = state if state is not None else {}
+        self.state.setdefault("turns", [])     # [{"id", "role", "text"}] not yet in a chunk
+        self.state.setdefault("chunks", [])    # [{"turn_ids", "turn_hashes", "lines", "summary"}]
+        self.state.setdefault("session", {"summary": "", "covers": 0})  # covers: chunks folded in
+        self.state.setdefault("stats", {"chunk_calls": 0, "session_calls": 0, "updates": 0, "errors": 0})
+        self._complete = complete or query_openai
+        self._executor = executor
+        self.chunk_turns = max(1, chunk_turns)
+        self.keep_recent = max(0, keep_recent)
+        self.detail_chunks = max(0, detail_chunks)
+        self._lock = threading.RLock()
+        self._running: Optional[Future] = None
+        self._pending: Optional[list] = None
+
+    @property
+    def stats(self) -> dict:
+        return self.state["stats"]
+
+    def _summarize(self, system_prompt: str, text: str, call_site: str, max_words: int) -> str:
+        messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": text}]
+        try:
+            return truncate_words(self._complete(messages, call_site=call_site, max_tokens=max_words * 2,
+                                                 temperature=0.2), max_words)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Rolling summary call '{call_site}' failed, keeping a truncated excerpt: {e}")
+            return truncate_words(text, max_words)
+
+    def _observe(self, history: list) -> set:
+        """Records new turns and applies edits to known ones. Returns indexes of chunks whose text changed."""
+        known = {t["id"]: t for t in self.state["turns"]}
+        chunk_of = {tid: i for i, c in enumerate(self.state["chunks"]) for tid in c["turn_ids"]}
+        changed = set()
+        for turn in history:
+            if not isinstance(turn, dict) or not turn.get("text"):
+                continue
+            tid = _turn_id(turn)
+            if tid in chunk_of:
+                chunk = self.state["chunks"][chunk_of[tid]]
+                pos = chunk["turn_ids"].index(tid)
+                digest = message_fingerprint(turn["text"])
+                if chunk["turn_hashes"][pos] != digest:
+                    chunk["turn_hashes"][pos] = digest
+                    chunk["lines"][pos] = f"{turn.get('role', '')}: {turn['text']}"
+                    changed.add(chunk_of[tid])
+            elif tid in known:
+                known[tid]["text"] = turn["text"]
+            else:
+                record = {"id": tid, "role": turn.get("role", ""), "text": turn["text"]}
+                self.state["turns"].append(record)
+                known[tid] = record
+        return changed
+
+    def update(self, history: list) -> dict:
+        """
+        Folds history into the summaries synchronously and returns what was (re)computed.
+        LLM calls run outside the lock, so context() never waits on them; updates themselves
+        must not run concurrently, which schedule() guarantees.
+        """
+        with self._lock:
+            changed = self._observe(history)
+            new_chunks = []
+            while len(self.state["turns"]) >= self.chunk_turns + self.keep_recent:
+                turns = self.state["turns"][:self.chunk_turns]
+                del self.state["turns"][:self.chunk_turns]
+                self.state["chunks"].append({
+                    "turn_ids": [t["id"] for t in turns],
+                    "turn_hashes": [message_fingerprint(t["text"]) for t in turns],
+                    "lines": [f"{t['role']}: {t['text']}" for t in turns],
+                    "summary": "",
+                })
+                new_chunks.append(len(self.state["chunks"]) - 1)
+            todo = sorted(changed | set(new_chunks))
+            snapshot = [(i, "\n".join(self.state["chunks"][i]["lines"])) for i in todo]
+
+        summaries = {i: self._summarize(CHUNK_PROMPT, text, "rolling_summary_chunk", CHUNK_SUMMARY_WORDS)
+                     for i, text in snapshot}
+
+        with self._lock:
+            for i, summary in summaries.items():
+                self.state["chunks"][i]["summary"] = summary
+            self.stats["chunk_calls"] += len(summaries)
+            session = self.state["session"]
+            fold_upto = max(0, len(self.state["chunks"]) - self.detail_chunks)
+            rebuild = any(i < session["covers"] for i in changed)
+            start = 0 if rebuild else session["covers"]
+            summary = "" if rebuild else session["summary"]
+            to_fold = [c["summary"] for c in self.state["chunks"][start:fold_upto]]
+
+        # Chunks leaving the detail window are merged into the session summary one at a time.
+        for chunk_summary in to_fold:
+            if not summary:
+                summary = chunk_summary
+                continue
+            summary = self._summarize(SESSION_PROMPT, f"So far: {summary}\n\nNewer part: {chunk_summary}",
+                                      "rolling_summary_session", SESSION_SUMMARY_WORDS)
+            self.stats["session_calls"] += 1
+
+        with self._lock:
+            if to_fold:
+                self.state["session"].update(summary=summary, covers=fold_upto)
+            self.stats["updates"] += 1
+        return {"chunks_summarized": sorted(summaries), "chunks_folded": len(to_fold), "session_rebuilt": rebuild and bool(to_fold)}
+
+    def schedule(self, history: list, executor: Optional[ThreadPoolExecutor] = None) -> Future:
+        """
+        Runs update() in the background on a snapshot of history. While one update is running,
+        later calls just replace the snapshot it picks up next, so at most one runs per session.
+        """
+        snapshot = [dict(t) for t in history if isinstance(t, dict)]
+        with self._lock:
+            self._pending = snapshot
+            if self._running is None or self._running.done():
+                # In a copy of the caller's context: the summary calls keep the session's ledger attribution and trace.
+                self._running = (executor or self._executor or _shared_executor()).submit(
+                    contextvars.copy_context().run, self._drain)
+            return self._running
+
+    def _drain(self):
+        while True:
+            with self._lock:
+                history, self._pending = self._pending, None
+            if history is None:
+                return
+            try:
+                self.update(history)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Rolling summary update failed: {e}", exc_info=True)
+
+    def wait(self, timeout: Optional[float] = None):
+        """Blocks until the scheduled background update (if any) has finished."""
+        running = self._running
+        if running is not None:
+            running.result(timeout=timeout)
+
+    def context(self, recent_turns: Optional[list] = None, token_budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+        """
+        Session summary, then the detailed chunk summaries, then recent_turns verbatim, within
+        token_budget. Over budget, the oldest chunk summaries go first, then the session summary
+        is shortened; recent turns are always kept.
+        """
+        with self._lock:
+            session = self.state["session"]["summary"]
+            details = [c["summary"] for c in self.state["chunks"][self.state["session"]["covers"]:] if c["summary"]]
+        recent = _format_turns([t for t in (recent_turns or []) if t.get("text")][-self.keep_recent:]) if self.keep_recent else ""
+
+        def render(session_text, detail_texts):
+            parts = []
+            if session_text:
+                parts.append(f"Conversation so far: {session_text}")
+            if detail_texts:
+                parts.append("Recent discussion:\n" + "\n".join(f"- {d}" for d in detail_texts))
+            if recent:
+                parts.append(recent)
+            return "\n\n".join(parts)
+
+        text = render(session, details)
+        while details and estimate_tokens(text) > token_budget:
+            details = details[1:]
+            text = render(session, details)
+        if session and estimate_tokens(text) > token_budget:
+            spare_words = max(0, (token_budget - estimate_tokens(render("", details))) * 3 // 4)
+            text = render(truncate_words(session, spare_words) if spare_words else "", details)
+        return text
+
+
+def get_session_summarizer() -> RollingSummarizer:
+    """Returns this session's summarizer, bound to the saved summary state in st.session_state."""
+    state = st.session_state.setdefault(STATE_KEY, {})
+    summarizer = st.session_state.get(SESSION_KEY)
+    if summarizer is None or summarizer.state is not state:
+        summarizer = RollingSummarizer(state)
+        st.session_state[SESSION_KEY] = summarizer
+    return summarizer
+
+
+def session_summary_context(token_budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+    """The long-range summary part of this session's context (no recent turns), or "" before any chunk exists."""
+    if not st.session_state.get(STATE_KEY):
+        return ""
+    return get_session_summarizer().context(None, token_budget)
@@ -3,9 +3,16 @@ import asyncio
 import httpx
 import hashlib
 import os
+import time
 from typing import List, Dict, Optional
 import streamlit as st
 from constants import MAX_PERPLEXITY_CALLS
+from src.analytics import log_event
+from src.core import metrics
+from src.core.logger import get_logger
+from src.core.tracing import traced
+
+logger = get_logger(__name__)
 
 # Assuming error_handling.py exists
 try:
@@ -14,9 +21,9 @@ except ImportError:
     # Fallback if error_handling is not found (e.g., during standalone testing)
     class ErrorHandling: # type: ignore
         def log_error(self, message: str, e: Optional[Exception] = None):
-            print(f"ERROR: {message}")
+            logger.error("%s", message)
             if e:
-                print(f"Exception: {e}")
+                logger.error("Exception: %s", e)
     error_handling = ErrorHandling() # type: ignore
 
 # Import cache functions from persistence_utils
@@ -24,15 +31,17 @@ try:
     from .persistence_utils import get_cached_search_response, store_search_response
 except ImportError:
     # Fallback for standalone execution or if persistence_utils is not in the same relative path
-    print("Warning: Could not import persistence_utils. Caching will be non-functional or use a mock.")
+    logger.warning("Could not import persistence_utils. Caching will be non-functional or use a mock.")
     # Define mock functions if persistence_utils is not available
     def get_cached_search_response(query_hash: str, max_age_hours: int = 12) -> Optional[List[Dict]]: # type: ignore
-        print(f"Mock cache lookup for {query_hash} (max_age: {max_age_hours}hrs)")
+        logger.debug("Mock cache lookup for %s (max_age: %shrs)", query_hash, max_age_hours)
         return None
     def store_search_response(query_hash: str, response_data: List[Dict]): # type: ignore
-        print(f"Mock cache store for {query_hash} with data: {response_data}")
+        logger.debug("Mock cache store for %s with data: %s", query_hash, response_data)
         return
 
+SEARCH_CACHE_LOOKUPS = metrics.counter("search_cache_lookups_total", "Search cache lookups by result (hit/miss).", ("result",))
+
 def build_query(element: str, scratchpad: dict, user_msg: str) -> str:
     """
     Builds a focused Perplexity query based on the current element, scratchpad content,
@@ -74,11 +83,12 @@ async def _original_async_perplexity_search(query: str) -> List[Dict]:
     """
     query_hash = _get_query_hash(query)
     cached_response = get_cached_search_response(query_hash)
+    SEARCH_CACHE_LOOKUPS.inc(result="hit" if cached_response else "miss")
     if cached_response:
-        print(f"Cache hit for query: {query}")
+        logger.debug("Cache hit for query: %s", query)
         return cached_response
 
-    print(f"Cache miss for query: {query}. Fetching from Perplexity...")
+    logger.debug("Cache miss for query: %s. Fetching from Perplexity...", query)
     perplexity_api_key = os.environ.get("PERPLEXITY_API_KEY")
     if not perplexity_api_key:
         error_handling.log_error("PERPLEXITY_API_KEY environment variable not set.")
@@ -209,16 +219,24 @@ def parse_perplexity_response(raw_response: List[Dict]) -> List[Dict]:
 # Unit-Test Hooks
 _mock_response_data = None
 
+@traced()
 async def perform_search(query: str) -> List[Dict]:
     """
     Synchronously performs a search using the Perplexity API by running the
     async _mockable_async_perplexity_search function.
     """
-    print(f"DEBUG: In perform_search. Event loop running: {asyncio.get_event_loop().is_running()}")
+    logger.debug("In perform_search. Event loop running: %s", asyncio.get_event_loop().is_running())
     # If an event loop is already running, run the coroutine on it
     # Otherwise, start a new event loop
     # This function should be awaited, not run_until_complete or asyncio.run
-    return await _mockable_async_perplexity_search(query)
+    start = time.perf_counter()
+    try:
+        results = await _mockable_async_perplexity_search(query)
+    except Exception as e:
+        log_event("search_call", ok=False, error=type(e).__name__, latency_ms=round((time.perf_counter() - start) * 1000, 1))
+        raise
+    log_event("search_call", ok=True, results=len(results or []), latency_ms=round((time.perf_counter() - start) * 1000, 1))
+    return results
 
 def search_perplexity(query: str) -> str:
     """
@@ -280,7 +298,7 @@ async def _mockable_async_perplexity_search(query: str) -> List[Dict]:
     Internal function to allow mocking async_perplexity_search.
     """
     if _mock_response_data is not None:
-        print(f"Using mocked Perplexity response for query: {query}")
+        logger.debug("Using mocked Perplexity response for query: %s", query)
         return _mock_response_data
     else:
         return await _original_async_perplexity_search(query)
@@ -8,6 +8,7 @@ import streamlit as st
 import importlib # For dynamic module loading
 import asyncio
 import inspect # Added for line number logging
+import time
 
 # Ensure project root is in sys.path for consistent imports
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -17,6 +18,8 @@ if project_root not in sys.path:
 from src.core.logger import get_logger # Roo: Added
 from src.workflow_manager import WORKFLOW_REGISTRY, reset_workflow, get_workflow_display_name, get_workflow_names # Roo: Modified
 from src.analytics import log_event # Roo: Added
+from src.core import metrics, profiling, tracing
+from src import usage_ledger
 # from src.workflows.registry import WORKFLOWS # Roo: Replaced by workflow_manager
 from src.persistence_utils import ensure_db, save_session
 # from src.conversation_manager import ( # Roo: Will evaluate if these are still needed or replaced by PhaseEngine logic
@@ -32,6 +35,9 @@ from src.ui_components import (
 from src.workflows.value_prop.persona import ValuePropCoachPersona
 
 
+# Serves /metrics on METRICS_PORT and/or writes METRICS_TEXTFILE; once per process, not per rerun.
+metrics.start_exporters()
+
 # --- PAGE CONFIG & HEADER ---
 st.set_page_config(page_title="Chatbot UI", layout="wide")
 st.markdown("""
@@ -197,7 +203,7 @@ def get_phase_engine_instance(workflow_slug: str, phase_slug: str, coach_persona
         class_name_parts = [part.capitalize() for part in phase_slug.split('_')]
         class_name = "".join(class_name_parts) + "Phase"
         
-        logger.debug(f"Attempting to load PhaseEngine: module='{module_path}', class='{class_name}'")
+        logger.debug("Attempting to load PhaseEngine: module='%s', class='%s'", module_path, class_name)
         
         phase_module = importlib.import_module(module_path)
         phase_class = getattr(phase_module, class_name)
@@ -215,6 +221,10 @@ def get_phase_engine_instance(workflow_slug: str, phase_slug: str, coach_persona
 # --- MAIN APP LOGIC ---
 async def main():
     apply_responsive_css()
+    # Spans opened while the previous turn's rerun is pending (e.g. entering the next phase) join that turn's trace.
+    tracing.resume_rerun(st.session_state)
+    # LLM calls made during this run count against this session in the usage ledger.
+    usage_ledger.bind_session(st.session_state.get("user_id"))
     # privacy_notice() # Roo: Assuming this is still desired, keeping it.
 
     active_workflow_slug = st.session_state.get("workflow")
@@ -265,6 +275,10 @@ async def main():
                 st.session_state.history.append({"role": "assistant", "content": intro_message, "citations": []})
                 log_event("phase_engine_enter_success", workflow=active_workflow_slug, phase=active_phase_slug, message_length=len(intro_message))
                 st.rerun() 
+            except usage_ledger.DailyTokenCapExceeded:
+                st.session_state.history.append({"role": "assistant", "content": usage_ledger.DAILY_LIMIT_MESSAGE, "citations": []})
+                log_event("daily_limit_reached", workflow=active_workflow_slug, phase=active_phase_slug)
+                st.rerun()
             except Exception as e:
                 logger.error(f"Error during phase_engine.enter(): {e}", exc_info=True)
                 st.session_state.history.append({"role": "assistant", "content": f"Error entering phase: {e}", "citations": []})
@@ -310,11 +324,17 @@ async def main():
             chat_input_placeholder = "Please provide your input for the current question..."
             logger.warning("Intake phase active, but 'current_phase_placeholder' not found in session_state.")
     
+    # The previous turn's result is on screen now.
+    tracing.finish_rerun(st.session_state)
     user_input = st.chat_input(chat_input_placeholder, key=f"chat_input_{active_workflow_slug}_{active_phase_slug}")
 
     if user_input:
+        st.session_state["turn_count"] = st.session_state.get("turn_count", 0) + 1
+        turn_start = time.perf_counter()
+        turn_span = tracing.start_turn(st.session_state.get("user_id"), st.session_state["turn_count"],
+                                       workflow=active_workflow_slug, phase=active_phase_slug)
         st.session_state.history.append({"role": "user", "content": user_input})
-        logger.debug(f"User input: {user_input}")
+        logger.debug("User input: %s", user_input)
         log_event("user_input_submitted", workflow=active_workflow_slug, phase=active_phase_slug, input_length=len(user_input))
 
         with st.spinner("Coach is thinking..."):
@@ -369,11 +389,21 @@ async def main():
                     logger.info(f"Phase '{active_phase_slug}' is not complete and wants to stay (returned None). Setting _force_re_enter_current_phase = True.")
                 # Else: No transition, no forced re-entry.
 
+            except usage_ledger.DailyTokenCapExceeded:
+                # The global token cap is not a failure of the phase: answer with the limit notice.
+                st.session_state.history.append({"role": "assistant", "content": usage_ledger.DAILY_LIMIT_MESSAGE, "citations": []})
+                log_event("daily_limit_reached", workflow=active_workflow_slug, phase=active_phase_slug)
             except Exception as e:
                 logger.error(f"Error during phase_engine.handle_response(): {e}", exc_info=True)
                 st.session_state.history.append({"role": "assistant", "content": f"Error processing your response: {e}", "citations": []})
                 log_event("phase_engine_response_failed", workflow=active_workflow_slug, phase=active_phase_slug, error=str(e))
-        
+
+        turn_span.end()
+        turn_seconds = time.perf_counter() - turn_start
+        metrics.record_turn(st.session_state.get("user_id"), active_workflow_slug, active_phase_slug, turn_seconds)
+        log_event("turn_completed", workflow=active_workflow_slug, phase=active_phase_slug,
+                  latency_ms=round(turn_seconds * 1000, 1))
+        tracing.mark_rerun(st.session_state, turn_span)
         st.rerun() # Rerun to display new messages and reflect potential phase changes
 
     # Remove old stage transition buttons as phase engines now control flow.
@@ -382,4 +412,7 @@ async def main():
     #    if st.button("Restart Workflow"): reset_workflow(active_workflow_slug); st.rerun()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # Samples this script run when the session is selected for profiling (PROFILE_SESSIONS or
+    # ?profile=<PROFILE_TOKEN>); otherwise a no-op.
+    with profiling.profile_run(st.session_state.get("user_id"), st.query_params.get(profiling.QUERY_PARAM)):
+        asyncio.run(main())
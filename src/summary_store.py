@@ -0,0 +1,84 @@
+"""Caches generated summaries keyed by a fingerprint of the scratchpad fields they were built from."""
+from typing import Callable, Iterable, Optional
+
+import streamlit as st
+
+from src.core.logger import get_logger
+from src.utils.fingerprint import scratchpad_fingerprint
+
+logger = get_logger(__name__)
+
+SESSION_KEY = "summary_store"
+# Outputs written back into the scratchpad; they never feed a summary, so they are not fingerprinted.
+DERIVED_KEYS = frozenset({"final_summary", "cached_recommendations", "last_summary_command", "last_recommendation_command"})
+MAX_ENTRIES = 8
+
+
+class SummaryStore:
+    """
+    Holds recent summaries per kind (e.g. "value_prop_summary"). An entry is served only while
+    the fingerprint of its source fields matches the live scratchpad, so an edit can never
+    return a stale summary; invalidate() drops entries early when a field is known to change.
+    State is a plain dict, so the store can live in st.session_state and be saved with it.
+    """
+
+    def __init__(self, state: Optional[dict] = None, max_entries: int = MAX_ENTRIES):
+        self.state = state if state is not None else {}
+        self.state.setdefault("entries", {})
+        self.state.setdefault("stats", {"hits": 0, "misses": 0, "invalidated": 0})
+        self.max_entries = max_entries
+
+    @property
+    def stats(self) -> dict:
+        return self.state["stats"]
+
+    @staticmethod
+    def _source_keys(scratchpad: dict, keys: Optional[Iterable[str]]) -> list:
+        if keys is None:
+            keys = [k for k in scratchpad if k not in DERIVED_KEYS]
+        return sorted(keys)
+
+    def _entry_id(self, kind: str, scratchpad: dict, keys: list) -> str:
+        return f"{kind}:{scratchpad_fingerprint(scratchpad, keys)}"
+
+    def get(self, kind: str, scratchpad: dict, keys: Optional[Iterable[str]] = None) -> Optional[str]:
+        """Returns the cached summary for these source fields, or None."""
+        keys = self._source_keys(scratchpad, keys)
+        entry = self.state["entries"].get(self._entry_id(kind, scratchpad, keys))
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return entry["summary"]
+
+    def put(self, kind: str, scratchpad: dict, summary: str, keys: Optional[Iterable[str]] = None):
+        keys = self._source_keys(scratchpad, keys)
+        entries = self.state["entries"]
+        entries[self._entry_id(kind, scratchpad, keys)] = {"kind": kind, "keys": keys, "summary": summary}
+        while len(entries) > self.max_entries:
+            entries.pop(next(iter(entries)))
+
+    def get_or_generate(self, kind: str, scratchpad: dict, generate: Callable[[dict], str],
+                        keys: Optional[Iterable[str]] = None) -> str:
+        """Returns the cached summary, or calls generate(scratchpad) and caches its result."""
+        summary = self.get(kind, scratchpad, keys)
+        if summary is None:
+            summary = generate(scratchpad)
+            self.put(kind, scratchpad, summary, keys)
+        return summary
+
+    def invalidate(self, field: Optional[str] = None) -> int:
+        """Drops entries built from field (or all entries). Returns how many were dropped."""
+        entries = self.state["entries"]
+        doomed = [entry_id for entry_id, entry in entries.items() if field is None or field in entry["keys"]]
+        for entry_id in doomed:
+            del entries[entry_id]
+        self.stats["invalidated"] += len(doomed)
+        if doomed:
+            logger.debug("Invalidated %s cached summaries (field=%s).", len(doomed), field)
+        return len(doomed)
+
+
+def get_session_summary_store() -> SummaryStore:
+    """Returns a store bound to this session's summary cache."""
+    return SummaryStore(st.session_state.setdefault(SESSION_KEY, {}))
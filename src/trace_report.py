@@ -0,0 +1,139 @@
+"""Builds per-turn, flame-style latency breakdowns from the spans written by src.core.tracing."""
+import json
+from collections import defaultdict
+from typing import Optional
+
+TURN_ROOTS = ("turn", "streamlit_rerun")
+
+
+def load_spans(path: str) -> list:
+    """Reads a TRACE_FILE (JSON Lines); unreadable lines are skipped."""
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and record.get("end_ns") is not None:
+                spans.append(record)
+    return spans
+
+
+def _node(record: dict, children_of: dict) -> dict:
+    children = sorted((_node(child, children_of) for child in children_of.get(record["span_id"], [])),
+                      key=lambda node: node["start_ns"])
+    duration_ms = (record["end_ns"] - record["start_ns"]) / 1e6
+    return {
+        "name": record["name"],
+        "start_ns": record["start_ns"],
+        "duration_ms": duration_ms,
+        # Children running concurrently (or outliving the parent) can exceed it; self time never goes negative.
+        "self_ms": max(0.0, duration_ms - sum(child["duration_ms"] for child in children)),
+        "attrs": record.get("attrs") or {},
+        "error": record.get("error"),
+        "children": children,
+    }
+
+
+def turn_breakdowns(spans: list, session_id: Optional[str] = None) -> list:
+    """
+    One entry per traced turn, oldest first: the turn span and its Streamlit rerun as span
+    trees, with the turn's total being the sum of the two. Spans outside any turn are ignored.
+    """
+    by_trace = defaultdict(list)
+    for record in spans:
+        by_trace[record["trace_id"]].append(record)
+    turns = []
+    for trace_id, records in by_trace.items():
+        span_ids = {r["span_id"] for r in records}
+        children_of = defaultdict(list)
+        roots = []
+        for record in records:
+            if record.get("parent_id") in span_ids:
+                children_of[record["parent_id"]].append(record)
+            else:
+                roots.append(record)
+        roots = [r for r in roots if r["name"] in TURN_ROOTS]
+        if not roots:
+            continue
+        trace_session = next((r.get("session_id") for r in roots if r.get("session_id") is not None), None)
+        if session_id is not None and str(trace_session) != str(session_id):
+            continue
+        trees = sorted((_node(root, children_of) for root in roots), key=lambda node: node["start_ns"])
+        turns.append({
+            "trace_id": trace_id,
+            "session_id": trace_session,
+            "turn_id": next((r.get("turn_id") for r in roots if r.get("turn_id") is not None), None),
+            "start_ns": trees[0]["start_ns"],
+            "total_ms": sum(tree["duration_ms"] for tree in trees),
+            "roots": trees,
+        })
+    return sorted(turns, key=lambda turn: turn["start_ns"])
+
+
+def _walk(node: dict, stack: tuple = ()):
+    stack = stack + (node["name"],)
+    yield stack, node
+    for child in node["children"]:
+        yield from _walk(child, stack)
+
+
+def format_flame(turn: dict, width: int = 30) -> str:
+    """Indented span tree with each span's time, share of the turn and a proportional bar."""
+    total = turn["total_ms"] or 1.0
+    phase = next((root["attrs"].get("phase") for root in turn["roots"] if root["attrs"].get("phase")), None)
+    header = f"turn {turn['turn_id']}  session={turn['session_id']}"
+    if phase:
+        header += f"  phase={phase}"
+    lines = [f"{header}  total {turn['total_ms']:.1f} ms"]
+    for root in turn["roots"]:
+        for stack, node in _walk(root):
+            label = "  " * len(stack) + node["name"]
+            if node["error"]:
+                label += " !"
+            share = node["duration_ms"] / total
+            bar = "#" * max(1 if node["duration_ms"] else 0, round(share * width))
+            lines.append(f"{label:<48}{node['duration_ms']:>10.1f} ms {share:>6.1%}  {bar}")
+    return "\n".join(lines)
+
+
+def aggregate(turns: list) -> list:
+    """Per span name across turns: calls, total/self time and duration percentiles, slowest first."""
+    durations = defaultdict(list)
+    self_ms = defaultdict(float)
+    for turn in turns:
+        for root in turn["roots"]:
+            for _, node in _walk(root):
+                durations[node["name"]].append(node["duration_ms"])
+                self_ms[node["name"]] += node["self_ms"]
+    rows = []
+    for name, values in durations.items():
+        ordered = sorted(values)
+        rows.append({
+            "span": name,
+            "calls": len(values),
+            "total_ms": round(sum(values), 1),
+            "self_ms": round(self_ms[name], 1),
+            "p50_ms": round(ordered[(len(ordered) - 1) // 2], 1),
+            "p95_ms": round(ordered[min(len(ordered) - 1, round(0.95 * (len(ordered) - 1)))], 1),
+        })
+    return sorted(rows, key=lambda row: row["self_ms"], reverse=True)
+
+
+def collapsed_stacks(turns: list) -> list:
+    """Self time per stack in microseconds, in the collapsed format read by flamegraph.pl and speedscope."""
+    totals = defaultdict(float)
+    for turn in turns:
+        for root in turn["roots"]:
+            for stack, node in _walk(root):
+                totals[";".join(stack)] += node["self_ms"] * 1000
+    return [f"{stack} {round(us)}" for stack, us in sorted(totals.items()) if round(us) > 0]
+
+
+def format_aggregate(rows: list) -> str:
+    headers = ["span", "calls", "total_ms", "self_ms", "p50_ms", "p95_ms"]
+    widths = [max(len(h), *(len(str(row[h])) for row in rows)) if rows else len(h) for h in headers]
+    lines = ["  ".join(h.ljust(w) for h, w in zip(headers, widths))]
+    lines += ["  ".join(str(row[h]).ljust(w) for h, w in zip(headers, widths)) for row in rows]
+    return "\n".join(lines)
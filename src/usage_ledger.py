@@ -0,0 +1,309 @@
+"""
+Persistent ledger of LLM token usage and cost, fed with the real prompt/completion token counts
+of every completed call (llm_routing.complete_with_route records them here).
+
+Each call is appended to usage_events and folded into two aggregate tables in the same
+transaction, so reports and the daily cap read a handful of rows instead of scanning events:
+
+    usage_daily    (day, call_site, model)  -> calls, prompt_tokens, completion_tokens, cost_usd
+    usage_session  (session_id, day)        -> the same totals
+
+DAILY_TOKEN_CAP is global across sessions: reserve() admits a call only if today's recorded
+tokens plus the calls still in flight plus its own estimate fit under the cap. The check and
+the reservation happen under one lock, so concurrent threads cannot overshoot it together.
+Every record() re-reads today's total from the database, so calls recorded by other processes
+sharing the file count too; only their in-flight reservations are invisible, which lets several
+processes overshoot the cap by at most one round of concurrent calls.
+The day is the UTC date. Settings:
+
+    USAGE_DB_PATH      SQLite file of the ledger (default: the session database)
+    DAILY_TOKEN_CAP    tokens per UTC day across all sessions; 0 disables the cap (default 100000)
+"""
+import contextvars
+import datetime
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Optional
+
+from src.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+USAGE_DB_PATH = os.environ.get("USAGE_DB_PATH", "")
+try:
+    DAILY_TOKEN_CAP = int(os.environ.get("DAILY_TOKEN_CAP", "100000"))
+except ValueError:
+    DAILY_TOKEN_CAP = 100000
+DAILY_LIMIT_MESSAGE = "Daily limit reached; try again tomorrow."
+
+_session_id = contextvars.ContextVar("usage_session_id", default=None)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    day TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    call_site TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    cost_usd REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS usage_events_day ON usage_events (day);
+CREATE TABLE IF NOT EXISTS usage_daily (
+    day TEXT NOT NULL,
+    call_site TEXT NOT NULL,
+    model TEXT NOT NULL,
+    calls INTEGER NOT NULL DEFAULT 0,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    cost_usd REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, call_site, model)
+);
+CREATE TABLE IF NOT EXISTS usage_session (
+    session_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    calls INTEGER NOT NULL DEFAULT 0,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    cost_usd REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (session_id, day)
+);
+"""
+
+_UPSERT_DAILY = """
+INSERT INTO usage_daily (day, call_site, model, calls, prompt_tokens, completion_tokens, cost_usd)
+VALUES (?, ?, ?, 1, ?, ?, ?)
+ON CONFLICT (day, call_site, model) DO UPDATE SET
+    calls = calls + 1,
+    prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+    completion_tokens = completion_tokens + excluded.completion_tokens,
+    cost_usd = cost_usd + excluded.cost_usd
+"""
+
+_UPSERT_SESSION = """
+INSERT INTO usage_session (session_id, day, calls, prompt_tokens, completion_tokens, cost_usd)
+VALUES (?, ?, 1, ?, ?, ?)
+ON CONFLICT (session_id, day) DO UPDATE SET
+    calls = calls + 1,
+    prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+    completion_tokens = completion_tokens + excluded.completion_tokens,
+    cost_usd = cost_usd + excluded.cost_usd
+"""
+
+_TOTALS = "SUM(calls) AS calls, SUM(prompt_tokens) AS prompt_tokens, SUM(completion_tokens) AS completion_tokens, " \
+          "ROUND(SUM(cost_usd), 6) AS cost_usd"
+
+
+class DailyTokenCapExceeded(RuntimeError):
+    """Raised instead of making an LLM call that would take today's usage past DAILY_TOKEN_CAP."""
+
+    def __init__(self, message: str = DAILY_LIMIT_MESSAGE):
+        super().__init__(message)
+
+
+def utc_day(ts: Optional[float] = None) -> str:
+    return datetime.datetime.fromtimestamp(time.time() if ts is None else ts, datetime.timezone.utc).date().isoformat()
+
+
+def bind_session(session_id):
+    """Attributes LLM calls made from the current context (thread or task) to session_id."""
+    return _session_id.set(session_id)
+
+
+def current_session_id() -> Optional[str]:
+    session_id = _session_id.get()
+    if session_id is None:
+        # Fall back to the session of the traced turn, when tracing is on.
+        from src.core.tracing import current_span
+        active = current_span()
+        session_id = active.session_id if active is not None else None
+    return None if session_id is None else str(session_id)
+
+
+def estimate_tokens(messages: list, max_tokens: Optional[int] = None) -> int:
+    """Rough upper bound for a call before it is made: ~4 characters per prompt token plus the reply cap."""
+    chars = sum(len(str(m.get("content") or "")) for m in messages or [] if isinstance(m, dict))
+    return chars // 4 + (max_tokens or 0)
+
+
+class UsageLedger:
+    """
+    One ledger per database file. Writes use a short-lived connection per call inside
+    BEGIN IMMEDIATE, so events and aggregates are always updated together. Today's token total is
+    also kept in memory (re-read from usage_daily on every record) so the cap check costs no query.
+    """
+
+    def __init__(self, path: str, daily_cap: int = DAILY_TOKEN_CAP):
+        self.path = path
+        self.daily_cap = daily_cap
+        self._lock = threading.Lock()
+        self._day = None
+        self._day_tokens = 0
+        self._reserved = 0
+        db_dir = os.path.dirname(path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _roll_day(self, day: str):
+        """Loads the day's total when the UTC date changes. Caller holds the lock."""
+        if day == self._day:
+            return
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT COALESCE(SUM(prompt_tokens + completion_tokens), 0) FROM usage_daily WHERE day = ?",
+                               (day,)).fetchone()
+        self._day = day
+        self._day_tokens = row[0]
+        self._reserved = 0  # Calls reserved yesterday settle against yesterday's row
+
+    def reserve(self, tokens: int) -> bool:
+        """
+        Admits a call estimated at tokens if it fits under today's cap, counting calls still in
+        flight. Every admitted call must be settled by record() or release() with the same amount.
+        """
+        with self._lock:
+            self._roll_day(utc_day())
+            if self.daily_cap > 0 and self._day_tokens + self._reserved + tokens > self.daily_cap:
+                return False
+            self._reserved += tokens
+            return True
+
+    def release(self, tokens: int):
+        """Returns a reservation whose call failed."""
+        with self._lock:
+            self._reserved = max(0, self._reserved - tokens)
+
+    def record(self, call_site: str, model: str, prompt_tokens: int, completion_tokens: int, cost_usd: float = 0.0,
+               session_id: Optional[str] = None, reserved: int = 0, ts: Optional[float] = None):
+        """Appends one call and adds it to the daily and per-session aggregates in a single transaction."""
+        ts = time.time() if ts is None else ts
+        day = utc_day(ts)
+        session_id = session_id or current_session_id() or "unknown"
+        call_site = call_site or "none"
+        with self._lock:
+            self._roll_day(utc_day())
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(
+                    "INSERT INTO usage_events (ts, day, session_id, call_site, model, prompt_tokens, completion_tokens, cost_usd) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (ts, day, session_id, call_site, model, prompt_tokens, completion_tokens, cost_usd),
+                )
+                conn.execute(_UPSERT_DAILY, (day, call_site, model, prompt_tokens, completion_tokens, cost_usd))
+                conn.execute(_UPSERT_SESSION, (session_id, day, prompt_tokens, completion_tokens, cost_usd))
+                # Read under the write lock: includes what other processes sharing the file recorded today.
+                day_tokens = conn.execute(
+                    "SELECT COALESCE(SUM(prompt_tokens + completion_tokens), 0) FROM usage_daily WHERE day = ?",
+                    (self._day,)).fetchone()[0]
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+                self._reserved = max(0, self._reserved - reserved)
+            self._day_tokens = day_tokens
+
+    def day_tokens(self, day: Optional[str] = None) -> int:
+        """Recorded tokens of a UTC day across all sessions (today by default)."""
+        day = day or utc_day()
+        with self._lock:
+            if day == self._day:
+                return self._day_tokens
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COALESCE(SUM(prompt_tokens + completion_tokens), 0) FROM usage_daily WHERE day = ?",
+                                (day,)).fetchone()[0]
+
+    def session_tokens(self, session_id: str, day: Optional[str] = None) -> int:
+        """Recorded tokens of one session, on one day or over all days."""
+        query = "SELECT COALESCE(SUM(prompt_tokens + completion_tokens), 0) FROM usage_session WHERE session_id = ?"
+        params = [str(session_id)]
+        if day:
+            query += " AND day = ?"
+            params.append(day)
+        with closing(self._connect()) as conn:
+            return conn.execute(query, params).fetchone()[0]
+
+    def report(self, by: str = "day", since: Optional[str] = None, session_id: Optional[str] = None, limit: int = 0) -> list:
+        """
+        Aggregated rows grouped by "day", "call_site", "model" or "session", newest/largest first.
+        since is an inclusive UTC day (YYYY-MM-DD). Filtering by session reads usage_events.
+        """
+        if by == "session":
+            table, group = "usage_session", "session_id"
+        elif by in ("day", "call_site", "model"):
+            table, group = "usage_daily", by
+        else:
+            raise ValueError(f"Unknown grouping: {by}")
+        if session_id is not None:
+            if by == "session":
+                table = "usage_session"
+            else:
+                # The daily aggregate has no session column; a single session's calls are few enough to scan.
+                table = "(SELECT day, call_site, model, session_id, 1 AS calls, prompt_tokens, completion_tokens, cost_usd " \
+                        "FROM usage_events)"
+        where, params = [], []
+        if since:
+            where.append("day >= ?")
+            params.append(since)
+        if session_id is not None:
+            where.append("session_id = ?")
+            params.append(str(session_id))
+        order = "day DESC" if by == "day" else "SUM(prompt_tokens + completion_tokens) DESC"
+        query = f"SELECT {group} AS {by}, {_TOTALS} FROM {table}" + (f" WHERE {' AND '.join(where)}" if where else "") + \
+                f" GROUP BY {group} ORDER BY {order}" + (f" LIMIT {int(limit)}" if limit > 0 else "")
+        with closing(self._connect()) as conn:
+            rows = [dict(row) for row in conn.execute(query, params)]
+        for row in rows:
+            row["total_tokens"] = row["prompt_tokens"] + row["completion_tokens"]
+        return rows
+
+
+_ledger: Optional[UsageLedger] = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger() -> UsageLedger:
+    """The process-wide ledger, created on first use in USAGE_DB_PATH (or the session database)."""
+    global _ledger
+    if _ledger is None:
+        with _ledger_lock:
+            if _ledger is None:
+                path = USAGE_DB_PATH
+                if not path:
+                    from src.persistence_utils import SQLITE_DB_PATH
+                    path = SQLITE_DB_PATH
+                _ledger = UsageLedger(path)
+    return _ledger
+
+
+def set_ledger(ledger: Optional[UsageLedger]):
+    """Replaces the process-wide ledger (tests, scripts); None recreates it from the settings on next use."""
+    global _ledger
+    with _ledger_lock:
+        _ledger = ledger
+
+
+def format_report(rows: list) -> str:
+    """Formats report() rows as a compact text table."""
+    if not rows:
+        return "No usage recorded."
+    headers = list(rows[0])
+    cells = [{h: f"{r[h]:.6f}" if isinstance(r[h], float) else str(r[h]) for h in headers} for r in rows]
+    widths = {h: max([len(h)] + [len(c[h]) for c in cells]) for h in headers}
+    lines = ["  ".join(h.ljust(widths[h]) for h in headers)]
+    for row in cells:
+        lines.append("  ".join(row[h].ljust(widths[h]) for h in headers))
+    return "\n".join(lines)
@@ -0,0 +1,23 @@
+"""Stable fingerprints of scratchpad content, used as cache keys for derived results."""
+import hashlib
+import json
+from typing import Iterable, Optional
+
+
+def scratchpad_fingerprint(scratchpad: dict, keys: Optional[Iterable[str]] = None) -> str:
+    """
+    Returns a short hash of the scratchpad. When keys is given only those fields are hashed,
+    so edits to unrelated fields (e.g. cached outputs written back into the scratchpad) do not
+    invalidate results derived from the hashed fields.
+    """
+    scratchpad = scratchpad or {}
+    selected_keys = sorted(keys) if keys is not None else sorted(scratchpad)
+    selected = {k: scratchpad.get(k) for k in selected_keys}
+    payload = json.dumps(selected, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def message_fingerprint(text: str) -> str:
+    """Returns a short hash of a chat message, ignoring surrounding whitespace and case."""
+    normalized = " ".join((text or "").split()).lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
@@ -1,18 +1,180 @@
 """Calculates the maturity score of an idea based on a rubric and scratchpad content."""
-from constants import CANONICAL_KEYS
+import re
+
+import numpy as np
+
+from src.constants import CANONICAL_KEYS
+from src.utils.text_embedding import cosine_similarity_matrix, embed_texts
 
 RUBRIC = {
     "elements": {k: {"weight": 12.5} for k in CANONICAL_KEYS}, # 8 keys * 12.5 = 100
     "scoring_cap": 100
 }
 
+# Strong answers per element; a value's best cosine similarity to its element's exemplars is one quality feature.
+EXEMPLAR_ANSWERS = {
+    "problem": [
+        "Patients miss 30% of follow-up imaging appointments because reminders are manual and easy to ignore.",
+        "Small clinics spend 10 hours a week reconciling insurance denials by hand, delaying revenue.",
+    ],
+    "target_customer": [
+        "Outpatient radiology groups with 5-20 sites in the US Midwest, buying through the practice manager.",
+        "Independent primary care practices under 10 physicians that bill Medicare.",
+    ],
+    "solution": [
+        "An SMS assistant that books, confirms and reschedules scans automatically from the EHR schedule.",
+        "A web dashboard that flags likely claim denials before submission using payer rules.",
+    ],
+    "main_benefit": [
+        "Cuts no-show rates by 25% and recovers about $40,000 in monthly revenue per site.",
+        "Saves front-desk staff 8 hours per week on phone reminders.",
+    ],
+    "differentiator": [
+        "Unlike generic reminder tools, it integrates directly with Epic and Cerner scheduling and handles rescheduling in the same thread.",
+        "The only product trained on payer-specific denial codes rather than generic billing rules.",
+    ],
+    "revenue_model": [
+        "Per-site SaaS subscription of $500 per month plus a setup fee.",
+        "Revenue share of 5% on recovered claims.",
+    ],
+    "channels": [
+        "Direct sales to practice managers, plus partnerships with EHR resellers and regional radiology associations.",
+        "Referral program through billing consultants and presence at HIMSS.",
+    ],
+    "competitive_moat": [
+        "Proprietary dataset of 2 million appointment outcomes and deep EHR integrations that are costly to replicate.",
+        "Network effects from payer rule updates contributed by every customer.",
+    ],
+    "use_case": [
+        "A patient due for a follow-up MRI gets a text, picks a new slot, and the schedule updates without a phone call.",
+        "A billing specialist sees a flagged claim, fixes the missing modifier, and resubmits the same day.",
+    ],
+}
+
+# Weights of the per-element quality features; they sum to 1, so quality is in [0, 1].
+FEATURE_NAMES = ("presence", "length", "numeric_evidence", "named_entities", "exemplar_similarity")
+FEATURE_WEIGHTS = np.array([0.3, 0.2, 0.15, 0.1, 0.25], dtype=np.float32)
+LENGTH_SATURATION_WORDS = 20
+# Cosine similarities are mapped linearly from [SIMILARITY_FLOOR, SIMILARITY_CEILING] onto [0, 1].
+SIMILARITY_FLOOR = 0.05
+SIMILARITY_CEILING = 0.4
+QUALITY_CACHE_SIZE = 4096
+
+_NUMBER_RE = re.compile(r"\d|%|\$")
+# Acronyms, and capitalized words that do not start a sentence.
+_ENTITY_RE = re.compile(r"\b[A-Z]{2,}\b|(?<![.!?]\s)(?<!^)\b[A-Z][a-z]+\b")
+
+_exemplar_matrix = None
+_exemplar_keys = None
+_quality_cache = {}  # (element, value) -> quality
+
+
+def _exemplars():
+    """Embeds all exemplars once: a matrix of rows and the element each row belongs to."""
+    global _exemplar_matrix, _exemplar_keys
+    if _exemplar_matrix is None:
+        keys, texts = [], []
+        for element, answers in EXEMPLAR_ANSWERS.items():
+            keys.extend([element] * len(answers))
+            texts.extend(answers)
+        _exemplar_keys = np.array(keys)
+        _exemplar_matrix = embed_texts(texts)
+    return _exemplar_matrix, _exemplar_keys
+
+
+def _value_text(value) -> str:
+    if isinstance(value, (list, tuple)):
+        return "; ".join(str(v) for v in value)
+    return str(value)
+
+
+def quality_features(elements: list, values: list) -> np.ndarray:
+    """Returns an (n, len(FEATURE_NAMES)) matrix of features in [0, 1] for parallel lists of elements and values."""
+    texts = [_value_text(v).strip() for v in values]
+    features = np.zeros((len(texts), len(FEATURE_NAMES)), dtype=np.float32)
+    if not texts:
+        return features
+    features[:, 0] = [1.0 if t else 0.0 for t in texts]
+    features[:, 1] = np.minimum(np.array([len(t.split()) for t in texts]) / LENGTH_SATURATION_WORDS, 1.0)
+    features[:, 2] = np.minimum(np.array([len(_NUMBER_RE.findall(t)) for t in texts]) / 2, 1.0)
+    features[:, 3] = np.minimum(np.array([len(_ENTITY_RE.findall(t)) for t in texts]) / 2, 1.0)
+
+    exemplar_matrix, exemplar_keys = _exemplars()
+    similarities = cosine_similarity_matrix(embed_texts(texts), exemplar_matrix)
+    same_element = np.array(elements)[:, None] == exemplar_keys[None, :]
+    best = np.where(same_element, similarities, -1.0).max(axis=1)
+    features[:, 4] = np.clip((best - SIMILARITY_FLOOR) / (SIMILARITY_CEILING - SIMILARITY_FLOOR), 0.0, 1.0)
+    features[features[:, 0] == 0] = 0.0  # Empty values score nothing
+    return features
+
+
+def element_quality(scratchpad: dict) -> dict:
+    """
+    Returns a quality in [0, 1] for every canonical element. Values already scored are served
+    from a cache keyed by (element, value); the rest are scored together in one vectorized pass.
+    """
+    qualities, missing = {}, []
+    for element in CANONICAL_KEYS:
+        value = scratchpad.get(element)
+        if not value:
+            qualities[element] = 0.0
+            continue
+        cache_key = (element, _value_text(value))
+        if cache_key in _quality_cache:
+            qualities[element] = _quality_cache[cache_key]
+        else:
+            missing.append(cache_key)
+
+    if missing:
+        scores = quality_features([k for k, _ in missing], [v for _, v in missing]) @ FEATURE_WEIGHTS
+        for cache_key, quality in zip(missing, scores.tolist()):
+            if len(_quality_cache) >= QUALITY_CACHE_SIZE:
+                _quality_cache.pop(next(iter(_quality_cache)))
+            _quality_cache[cache_key] = quality
+            qualities[cache_key[0]] = quality
+    return qualities
+
+
+def quality_matrix(scratchpads: list, cache: dict = None) -> np.ndarray:
+    """
+    Returns a (len(scratchpads), len(CANONICAL_KEYS)) matrix of element qualities. Distinct
+    (element, value) pairs not yet cached are scored in a single vectorized pass. Batch callers
+    can pass their own (unbounded) cache dict instead of the shared bounded one.
+    """
+    shared = cache is None
+    if shared:
+        cache = _quality_cache
+    cells = [
+        [(element, _value_text(scratchpad.get(element))) if scratchpad.get(element) else None for element in CANONICAL_KEYS]
+        for scratchpad in scratchpads
+    ]
+    missing = list({cell for row in cells for cell in row if cell is not None and cell not in cache})
+    computed = {}
+    if missing:
+        scores = quality_features([k for k, _ in missing], [v for _, v in missing]) @ FEATURE_WEIGHTS
+        computed = dict(zip(missing, scores.tolist()))
+    lookup = {**cache, **computed} if shared else cache
+    if not shared:
+        cache.update(computed)
+    matrix = np.array(
+        [[0.0 if cell is None else lookup[cell] for cell in row] for row in cells],
+        dtype=np.float32,
+    ).reshape(len(cells), len(CANONICAL_KEYS))
+    if shared:
+        for cache_key, quality in computed.items():
+            if len(_quality_cache) >= QUALITY_CACHE_SIZE:
+                _quality_cache.pop(next(iter(_quality_cache)))
+            _quality_cache[cache_key] = quality
+    return matrix
+
+
 def calculate_maturity(scratchpad: dict) -> tuple[int, list[str]]:
     """
     Calculates the maturity score of an idea based on the provided scratchpad.
 
-    The score is determined by a weighted heuristic. If confidence in the
-    heuristic score is low (e.g., < 0.5, placeholder for now), a call to
-    a more sophisticated model like Gemini would be made using a specific rubric.
+    Each element earns its rubric weight scaled by a locally computed quality: presence,
+    length, numeric evidence, named entities and similarity to exemplar answers. No LLM call
+    is made, so the score can be refreshed every turn.
 
     Args:
         scratchpad: A dictionary containing idea elements.
@@ -22,17 +184,11 @@ def calculate_maturity(scratchpad: dict) -> tuple[int, list[str]]:
             - int: The maturity score (0-100).
             - list[str]: A list of the two weakest components (keys from RUBRIC).
     """
-    score = 0
-    present_elements_scores = {}
-
-    for element in CANONICAL_KEYS:
-        if scratchpad.get(element):  # Check if element is present and not empty
-            # For now, presence gives full weight. Quality weighting can be added later.
-            element_score = RUBRIC["elements"][element]["weight"]
-            score += element_score
-            present_elements_scores[element] = element_score
-        else:
-            present_elements_scores[element] = 0
+    qualities = element_quality(scratchpad)
+    present_elements_scores = {
+        element: RUBRIC["elements"][element]["weight"] * qualities[element] for element in CANONICAL_KEYS
+    }
+    score = sum(present_elements_scores.values())
 
     # Cap the score
     score = min(score, RUBRIC["scoring_cap"])
@@ -40,22 +196,13 @@ def calculate_maturity(scratchpad: dict) -> tuple[int, list[str]]:
     # Determine weakest components
     # Sort elements by their score (ascending), then by name (for tie-breaking)
     sorted_elements = sorted(present_elements_scores.items(), key=lambda item: (item[1], item[0]))
-    
+
     weakest_components = [element for element, score_val in sorted_elements if score_val < RUBRIC["elements"][element]["weight"]]
-    
+
     # If all elements are perfectly scored, weakest_components might be empty.
     # Ensure we return at most two weakest components.
     weakest_components = weakest_components[:2]
 
-
-    # Placeholder for confidence check and Gemini call
-    # confidence = 0.4 # Example confidence value
-    # if confidence < 0.5:
-    #     # print("Confidence low, consider calling Gemini with a detailed rubric.")
-    #     # gemini_score, gemini_weakest_components = call_gemini_with_rubric(scratchpad, GEMINI_RUBRIC)
-    #     # return gemini_score, gemini_weakest_components
-    #     pass
-
     return int(score), weakest_components
 
 if __name__ == '__main__':
@@ -1,8 +1,12 @@
 """Extracts information from user messages to update the scratchpad using regex and LLM fallback."""
+import os
 import re
 import json
 from src.llm_utils import get_llm_response
+import streamlit as st
 from src.constants import CANONICAL_KEYS
+from src.analytics import log_event
+from src.utils.fingerprint import message_fingerprint
 
 # Define synonyms for legacy keys that map to canonical keys
 SYNONYMS = {
@@ -15,145 +19,485 @@ SYNONYMS = {
     "market_size": "impact_metrics",
 }
 
-def update_scratchpad(user_message: str, scratchpad: dict) -> dict:
+# Extraction rules as (canonical key, pattern, trigger phrases). For each key the first matching
+# rule wins. Every rule lists literal phrases at least one of which must occur in any text the
+# pattern matches; the engine only runs a rule when one of its triggers was seen.
+# The value is the first capture group, or the whole match for rules without one.
+EXTRACTION_RULES = [
+    ("problem", r"\b(?:problem|issue|challenge|difficulty) is\s+(.+?)(?:\.|$)", ("problem", "issue", "challenge", "difficulty")),
+    ("problem", r"\bwe are facing\s+(.+?)(?:\.|$)", ("we are facing",)),
+    ("target_customer", r"\b(?:customer|target|user)s?\s+(?:are|is)\s+(.+?)(?:\.|$)", ("customer", "target", "user")),
+    ("target_customer", r"\bfor\s+(.+?)\s+(?:customers|users)", ("customers", "users")),
+    ("solution", r"\b(?:solution|idea|product) is\s+(.+?)(?:\.|$)", ("solution", "idea", "product")),
+    ("solution", r"\bwe propose\s+(.+?)(?:\.|$)", ("we propose",)),
+    ("main_benefit", r"\b(?:unique selling point|usp|key difference|secret sauce|unique benefit) is\s+(.+?)(?:\.|$)",
+     ("unique selling point", "usp", "key difference", "secret sauce", "unique benefit")),
+    ("main_benefit", r"\b(?:our|my|the)?\s*unique benefit is\s+(.+?)(?:\.|$)", ("unique benefit",)),
+    ("main_benefit", r"\bimpact\b.*(\d+%|\$|days|hours|readmission|adhere)", ("impact",)),
+    ("main_benefit", r"\bKPI(?:s)?\b", ("kpi",)),
+    ("main_benefit", r"\b(?:impact metrics|key performance indicators|kpis|measures success) (?:are|will be)\s+(.+?)(?:\.|$)",
+     ("impact metrics", "key performance indicators", "kpis", "measures success")),
+    ("main_benefit", r"\bwe will measure success by\s+(.+?)(?:\.|$)", ("we will measure success by",)),
+    ("main_benefit", r"total addressable market is worth\s+(.+?)(?:\.|$)", ("total addressable market is worth",)),
+    ("main_benefit", r"\b(?:market size|TAM)\s+(?:is|is worth|worth|is estimated at)\s+(.+?)(?:\.|$)", ("market size", "tam")),
+    ("differentiator", r"\b(?:differentiator|sets us apart|makes us different) is\s+(.+?)(?:\.|$)",
+     ("differentiator", "sets us apart", "makes us different")),
+    ("differentiator", r"\b(?:our|my|the)?\s*key differentiator is\s+(.+?)(?:\.|$)", ("key differentiator",)),
+    ("revenue_model", r"\b(?:revenue model|how we make money|pricing|pay|charge)\s+(?:is|will be)\s+(.+?)(?:\.|$)",
+     ("revenue model", "how we make money", "pricing", "pay", "charge")),
+    ("revenue_model", r"\bwill pay a\s+(.+? fee)", ("will pay a",)),
+    ("revenue_model", r"\blicence fee of\s+(.+?)(?:\.|$)", ("licence fee of",)),
+    ("revenue_model", r"\ba\s+(.+? fee)", ("fee",)),
+    ("channels", r"\bchannel(?:s)?\b.*(reach|distribution|sales|marketing)", ("channel",)),
+    ("channels", r"\bgo[- ]?to[- ]?market\b", ("go",)),
+    ("channels", r"\b(?:channels|distribution|reach customers) (?:are|will be)\s+(.+?)(?:\.|$)",
+     ("channels", "distribution", "reach customers")),
+    ("channels", r"\bwe will reach customers through\s+(.+?)(?:\.|$)", ("we will reach customers through",)),
+    ("competitive_moat", r"\b(?:competitive moat|barrier to entry|sustainable advantage) (?:is|will be)\s+(.+?)(?:\.|$)",
+     ("competitive moat", "barrier to entry", "sustainable advantage")),
+    ("competitive_moat", r"\b(?:our advantage|what protects us) is\s+(.+?)(?:\.|$)", ("our advantage", "what protects us")),
+    ("use_case", r"\b(?:use case|scenario|application) is\s+(.+?)(?:\.|$)", ("use case", "scenario", "application")),
+    ("use_case", r"\b(?:people will use it to|users can)\s+(.+?)(?:\.|$)", ("people will use it to", "users can")),
+    ("use_case", r"\b(?:envision people using it for|real-world scenario is)\s+(.+?)(?:\.|$)",
+     ("envision people using it for", "real-world scenario is")),
+]
+
+
+class ScratchpadExtractionEngine:
     """
-    Updates the scratchpad dictionary with information extracted from the user message.
-    Uses regex and simple heuristics first, then falls back to an LLM.
+    Compiles EXTRACTION_RULES once and extracts scratchpad values from a message.
+    A single case-insensitive scan with one combined trigger-phrase regex decides which rules
+    can possibly match; only those compiled patterns are then run.
     """
-    updated_scratchpad = scratchpad.copy()
 
-    # Define regex patterns for canonical keys
-    extraction_patterns = {
-        "problem": [
-            r"\b(?:problem|issue|challenge|difficulty) is\s+(.+?)(?:\.|$)",
-            r"\bwe are facing\s+(.+?)(?:\.|$)",
-        ],
-        "target_customer": [ # Changed from customer_segment
-            r"\b(?:customer|target|user)s?\s+(?:are|is)\s+(.+?)(?:\.|$)",
-            r"\bfor\s+(.+?)\s+(?:customers|users)",
-        ],
-        "solution": [
-            r"\b(?:solution|idea|product) is\s+(.+?)(?:\.|$)",
-            r"\bwe propose\s+(.+?)(?:\.|$)",
-        ],
-        "main_benefit": [ # Changed back to main_benefit
-            r"\b(?:unique selling point|usp|key difference|secret sauce|unique benefit) is\s+(.+?)(?:\.|$)",
-            r"\b(?:our|my|the)?\s*unique benefit is\s+(.+?)(?:\.|$)",
-        ],
-        "differentiator": [
-            r"\b(?:differentiator|sets us apart|makes us different) is\s+(.+?)(?:\.|$)",
-            r"\b(?:our|my|the)?\s*key differentiator is\s+(.+?)(?:\.|$)",
-        ],
-        "main_benefit": [ # Changed from impact_metrics
-            r"\bimpact\b.*(\d+%|\$|days|hours|readmission|adhere)",
-            r"\bKPI(s)?\b",
-            r"\b(?:impact metrics|key performance indicators|kpis|measures success) (?:are|will be)\s+(.+?)(?:\.|$)",
-            r"\bwe will measure success by\s+(.+?)(?:\.|$)",
-            r"total addressable market is worth\s+(.+?)(?:\.|$)", # More specific for testing
-            r"\b(?:market size|TAM)\s+(?:is|is worth|worth|is estimated at)\s+(.+?)(?:\.|$)", # Keep a more general one too
-        ],
-        "revenue_model": [
-            r"\b(?:revenue model|how we make money|pricing|pay|charge)\s+(?:is|will be)\s+(.+?)(?:\.|$)",
-            r"\bwill pay a\s+(.+? fee)",
-            r"\blicence fee of\s+(.+?)(?:\.|$)",
-            r"\ba\s+(.+? fee)",
-        ],
-        "channels": [
-            r"\bchannel(s)?\b.*(reach|distribution|sales|marketing)",
-            r"\bgo[- ]?to[- ]?market\b",
-            r"\b(?:channels|distribution|reach customers) (?:are|will be)\s+(.+?)(?:\.|$)",
-            r"\bwe will reach customers through\s+(.+?)(?:\.|$)",
-        ],
-        "competitive_moat": [
-            r"\b(?:competitive moat|barrier to entry|sustainable advantage) (?:is|will be)\s+(.+?)(?:\.|$)",
-            r"\b(?:our advantage|what protects us) is\s+(.+?)(?:\.|$)",
-        ],
-        "use_case": [
-            r"\b(?:use case|scenario|application) is\s+(.+?)(?:\.|$)",
-            r"\b(?:people will use it to|users can)\s+(.+?)(?:\.|$)",
-            r"\b(?:envision people using it for|real-world scenario is)\s+(.+?)(?:\.|$)",
-        ],
-    }
-
-    # First pass: Regex and simple heuristics
-    for key, patterns in extraction_patterns.items():
-        # Ensure we only process canonical keys that are part of our defined patterns
-        if key in CANONICAL_KEYS and (key not in updated_scratchpad or not updated_scratchpad[key]):
-            for pattern in patterns:
-                match = re.search(pattern, user_message, re.IGNORECASE)
+    def __init__(self, rules: list):
+        self.rules_by_key = {}
+        triggers = set()
+        for key, pattern, rule_triggers in rules:
+            compiled = re.compile(pattern, re.IGNORECASE)
+            lowered = frozenset(t.lower() for t in rule_triggers)
+            self.rules_by_key.setdefault(key, []).append((compiled, lowered))
+            triggers.update(lowered)
+
+        # Longest alternatives first inside a lookahead, so every start position reports the
+        # longest trigger beginning there. Shorter triggers that are substrings of a reported
+        # one (e.g. "customers" inside "we will reach customers through") are implied.
+        ordered = sorted(triggers, key=len, reverse=True)
+        self.trigger_re = re.compile("(?=(" + "|".join(re.escape(t) for t in ordered) + "))", re.IGNORECASE)
+        self.implied_triggers = {t: frozenset(u for u in ordered if u in t) for t in ordered}
+
+    def find_triggers(self, message: str) -> set:
+        """Returns every trigger phrase occurring in message."""
+        found = set()
+        for match in self.trigger_re.finditer(message):
+            found |= self.implied_triggers[match.group(1).lower()]
+        return found
+
+    def extract(self, message: str, skip_keys=()) -> dict:
+        """Returns {key: value} for every key (not in skip_keys) with a matching rule."""
+        found = self.find_triggers(message)
+        if not found:
+            return {}
+        extracted = {}
+        for key, key_rules in self.rules_by_key.items():
+            if key in skip_keys:
+                continue
+            for compiled, rule_triggers in key_rules:
+                if rule_triggers.isdisjoint(found):
+                    continue
+                match = compiled.search(message)
                 if match:
-                    extracted_value = match.group(1).strip()
-                    # Simple post-processing for common phrases
-                    if extracted_value.lower().startswith("that "):
-                        extracted_value = extracted_value[5:]
-                    updated_scratchpad[key] = extracted_value
+                    extracted[key] = _clean_value(match)
                     break # Move to next key once a match is found
+        return extracted
 
-    # Handle legacy synonyms: move content from old keys to new canonical keys
-    # Iterate over a copy of keys if modifying the dictionary during iteration
-    scratchpad_keys_copy = list(updated_scratchpad.keys())
+
+def _clean_value(match) -> str:
+    value = next((g for g in match.groups() if g is not None), match.group(0)).strip()
+    # Simple post-processing for common phrases
+    if value.lower().startswith("that "):
+        value = value[5:]
+    return value
+
+
+EXTRACTION_ENGINE = ScratchpadExtractionEngine(EXTRACTION_RULES)
+
+def build_llm_extraction_prompt(user_message, keys: list) -> str:
+    """
+    Builds the prompt asking the LLM to extract values for keys from user_message.
+    user_message may be a list of messages, which are then extracted in a single call.
+    Shared by update_scratchpad() and offline batch extraction jobs.
+    """
+    if isinstance(user_message, (list, tuple)):
+        if len(user_message) == 1:
+            user_message = user_message[0]
+        else:
+            joined = "\n".join(f"- \"{m}\"" for m in user_message)
+            return (
+                f"From the following user messages, extract any information relevant to these keys: "
+                f"{', '.join(keys)}. "
+                f"Provide the extracted information as a single JSON object with the keys as specified; "
+                f"if messages disagree, prefer the later one. "
+                f"If no information is found for a key, omit that key from the JSON. "
+                f"User messages:\n{joined}"
+            )
+    return (
+        f"From the following user message, extract any information relevant to these keys: "
+        f"{', '.join(keys)}. "
+        f"Provide the extracted information as a JSON object with the keys as specified. "
+        f"If no information is found for a key, omit that key from the JSON. "
+        f"User message: \"{user_message}\""
+    )
+
+def parse_llm_extraction_response(llm_response: str, keys: list) -> dict:
+    """
+    Parses the LLM's extraction reply into a dict. Accepts plain JSON, a ```json block,
+    or falls back to "key: value" lines for the requested keys.
+    """
+    llm_extracted_data = {}
+    # Basic attempt to find JSON in the response, handling potential markdown code blocks
+    json_match = re.search(r"```json\n({.*?})\n```", llm_response, re.DOTALL)
+    if json_match:
+        json_string = json_match.group(1)
+    else:
+        json_string = llm_response # Assume the whole response is JSON if no markdown block
+
+    try:
+        llm_extracted_data = json.loads(json_string)
+    except json.JSONDecodeError:
+        # Fallback for non-JSON responses, try to parse key-value pairs if possible
+        for key_fallback in keys: # Renamed to avoid clash
+            # Simple heuristic for "key: value" in plain text
+            match = re.search(rf"{key_fallback}:\s*(.+)", llm_response, re.IGNORECASE)
+            if match:
+                llm_extracted_data[key_fallback] = match.group(1).strip()
+    if not isinstance(llm_extracted_data, dict):
+        return {}
+    return llm_extracted_data
+
+# --- LLM fallback gate ---
+# The LLM fallback only runs for messages whose cheap local score reaches this threshold,
+# and (with a gate) only once LLM_BATCH_SIZE such messages have accumulated.
+LLM_GATE_THRESHOLD = float(os.environ.get("SCRATCHPAD_LLM_GATE_THRESHOLD", "1.5"))
+LLM_BATCH_SIZE = int(os.environ.get("SCRATCHPAD_LLM_BATCH_SIZE", "3"))
+
+GENERIC_MESSAGES = frozenset({
+    "ok", "okay", "sure", "yes", "yeah", "yep", "no", "nope", "got it", "idk", "i don't know", "maybe",
+    "alright", "fine", "sounds good", "correct", "thanks", "thank you", "done", "skip", "continue", "next",
+})
+
+# Words that suggest a message describes the venture rather than steering the conversation.
+CONTENT_HINT_WORDS = frozenset({
+    "patient", "patients", "clinic", "clinics", "hospital", "hospitals", "doctor", "doctors", "nurse", "nurses",
+    "provider", "providers", "payer", "payers", "caregiver", "caregivers", "health", "care", "medical",
+    "app", "platform", "tool", "service", "device", "software", "ai", "chatbot", "data",
+    "reduce", "reduces", "improve", "improves", "save", "saves", "cost", "costs", "time", "faster", "cheaper",
+    "subscription", "license", "fee", "revenue", "price", "pricing", "market", "competitors", "unlike",
+    "because", "problem", "customers", "users", "solution", "benefit", "different",
+})
+
+
+def extraction_score(message: str) -> float:
+    """
+    Cheap local estimate of how likely a message contains scratchpad content.
+    Zero for empty, generic or very short replies; grows with length, trigger phrases,
+    domain vocabulary and numbers; questions are discounted.
+    """
+    text = (message or "").strip().lower()
+    if not text or text.strip(".!?") in GENERIC_MESSAGES:
+        return 0.0
+    words = re.findall(r"[a-z0-9%$']+", text)
+    if len(words) < 3:
+        return 0.0
+    score = min(len(words), 30) / 10
+    score += min(len(EXTRACTION_ENGINE.find_triggers(text)), 2) * 1.0
+    score += min(sum(1 for w in words if w in CONTENT_HINT_WORDS), 4) * 0.5
+    if re.search(r"\d", text):
+        score += 0.5
+    if text.endswith("?"):
+        score -= 1.0
+    return max(score, 0.0)
+
+
+class LLMExtractionGate:
+    """
+    Decides when update_scratchpad() may call the LLM, and batches the calls.
+    Messages scoring below threshold never reach the LLM; the rest are queued and extracted
+    together once batch_size have accumulated (or on flush_pending_extraction()).
+    All state lives in the plain dict passed in, so it can sit in st.session_state and be
+    persisted with the session.
+    """
+
+    def __init__(self, state: dict = None, threshold: float = None, batch_size: int = None):
+        self.state = state if state is not None else {}
+        self.threshold = LLM_GATE_THRESHOLD if threshold is None else threshold
+        self.batch_size = LLM_BATCH_SIZE if batch_size is None else batch_size
+        self.state.setdefault("pending", [])
+        stats = self.state.setdefault("stats", {})
+        for key in ("messages", "gated_out", "deferred", "llm_calls", "messages_extracted", "calls_with_results", "keys_extracted"):
+            stats.setdefault(key, 0)
+
+    @property
+    def stats(self) -> dict:
+        return self.state["stats"]
+
+    def offer(self, message: str):
+        """Records a message. Returns the batch to extract now, or None to skip/defer the LLM."""
+        self.stats["messages"] += 1
+        if extraction_score(message) < self.threshold:
+            self.stats["gated_out"] += 1
+            return None
+        self.state["pending"].append(message)
+        if len(self.state["pending"]) >= self.batch_size:
+            return self.drain()
+        self.stats["deferred"] += 1
+        return None
+
+    def drain(self) -> list:
+        """Removes and returns all queued messages."""
+        batch = list(self.state["pending"])
+        self.state["pending"].clear()
+        return batch
+
+    def record_call(self, batch_size: int, keys_extracted: int):
+        self.stats["llm_calls"] += 1
+        self.stats["messages_extracted"] += batch_size
+        self.stats["keys_extracted"] += keys_extracted
+        if keys_extracted:
+            self.stats["calls_with_results"] += 1
+
+    def report(self) -> dict:
+        """Extraction rate and LLM calls saved versus one call per message."""
+        stats = dict(self.stats)
+        calls = stats["llm_calls"]
+        stats["pending"] = len(self.state["pending"])
+        stats["llm_calls_saved"] = stats["messages"] - calls
+        stats["call_reduction"] = round(1 - calls / stats["messages"], 3) if stats["messages"] else 0.0
+        stats["extraction_rate"] = round(stats["calls_with_results"] / calls, 3) if calls else 0.0
+        return stats
+
+
+def _llm_extract(messages: list, scratchpad: dict, gate: LLMExtractionGate = None) -> dict:
+    """Runs one LLM extraction over messages for the keys still empty in scratchpad (mutated in place)."""
+    keys_to_extract_with_llm = [
+        key for key in CANONICAL_KEYS
+        if key not in scratchpad or not scratchpad[key]
+    ]
+    if not keys_to_extract_with_llm or not messages:
+        return scratchpad
+
+    llm_prompt = build_llm_extraction_prompt(messages, keys_to_extract_with_llm)
+    keys_extracted = 0
+    try:
+        llm_response = get_llm_response([{"role": "user", "content": llm_prompt}], call_site="scratchpad_extraction", temperature=0.1)
+        llm_extracted_data = parse_llm_extraction_response(llm_response, keys_to_extract_with_llm)
+
+        for key_update, value_update in llm_extracted_data.items():
+            # If the LLM was tasked to find this key (because regex didn't initially),
+            # and the key is a canonical key, update it.
+            if key_update in keys_to_extract_with_llm and key_update in CANONICAL_KEYS and value_update:
+                scratchpad[key_update] = value_update
+                keys_extracted += 1
+    except Exception:
+        # print(f"Error during LLM extraction: {e}") # Keep this print for actual debugging if needed
+        pass # Silently pass exceptions during LLM extraction for now in tests
+
+    if gate is not None:
+        gate.record_call(len(messages), keys_extracted)
+    log_event("scratchpad_llm_extraction", messages_batched=len(messages), keys_extracted=keys_extracted)
+    return scratchpad
+
+
+def flush_pending_extraction(scratchpad: dict, gate: LLMExtractionGate) -> dict:
+    """Extracts any messages still queued in gate (e.g. when a phase or session ends)."""
+    updated_scratchpad = scratchpad.copy()
+    return _llm_extract(gate.drain(), updated_scratchpad, gate)
+
+
+def migrate_synonyms(scratchpad: dict) -> dict:
+    """Moves content from legacy synonym keys to their canonical keys, in place."""
+    if not SYNONYMS.keys() & scratchpad.keys():
+        return scratchpad  # Nothing to migrate; the common case after the first turn
+    scratchpad_keys_copy = list(scratchpad.keys())
     for old_key in scratchpad_keys_copy:
         if old_key in SYNONYMS:
             new_key = SYNONYMS[old_key]
-            if updated_scratchpad[old_key]: # If there's content in the old key
-                if new_key not in updated_scratchpad or not updated_scratchpad[new_key]:
+            if scratchpad[old_key]: # If there's content in the old key
+                if new_key not in scratchpad or not scratchpad[new_key]:
                     # If new key is empty or not present, move content
-                    updated_scratchpad[new_key] = updated_scratchpad.pop(old_key)
+                    scratchpad[new_key] = scratchpad.pop(old_key)
                 else:
                     # If new key already has content, append old content (or decide on a merge strategy)
                     # For now, let's append if new_key already has content.
-                    # updated_scratchpad[new_key] += f"; {updated_scratchpad.pop(old_key)}"
+                    # scratchpad[new_key] += f"; {scratchpad.pop(old_key)}"
                     # Or, simpler: just pop the old key if the new one is already filled, to avoid duplication.
-                    updated_scratchpad.pop(old_key) # Remove old key if new key is already populated
-            elif old_key in updated_scratchpad : # if old key exists but is empty
-                 updated_scratchpad.pop(old_key)
+                    scratchpad.pop(old_key) # Remove old key if new key is already populated
+            elif old_key in scratchpad : # if old key exists but is empty
+                 scratchpad.pop(old_key)
+    return scratchpad
 
 
+def update_scratchpad(user_message: str, scratchpad: dict, gate: LLMExtractionGate = None) -> dict:
+    """
+    Updates the scratchpad dictionary with information extracted from the user message.
+    Uses regex and simple heuristics first, then falls back to an LLM.
+    The LLM fallback only runs for messages that pass extraction_score(); with a gate
+    it is also deferred and batched across the last few messages.
+    """
+    updated_scratchpad = scratchpad.copy()
+
+    # First pass: compiled rules, prefiltered by trigger phrases in a single scan of the message
+    skip_keys = {key for key in CANONICAL_KEYS if updated_scratchpad.get(key)}
+    for key, extracted_value in EXTRACTION_ENGINE.extract(user_message, skip_keys=skip_keys).items():
+        if key in CANONICAL_KEYS:
+            updated_scratchpad[key] = extracted_value
+
+    # Handle legacy synonyms: move content from old keys to new canonical keys
+    migrate_synonyms(updated_scratchpad)
+
     # Second pass: LLM fallback for remaining or more complex extractions
-    # Only call LLM if there are still empty or partially filled relevant canonical fields
-    keys_to_extract_with_llm = [
-        key for key in CANONICAL_KEYS
-        if key not in updated_scratchpad or not updated_scratchpad[key]
-    ]
+    # Only call LLM if there are still empty relevant canonical fields and the message looks worth it
+    if gate is not None:
+        messages_for_llm = gate.offer(user_message)
+    else:
+        messages_for_llm = [user_message] if extraction_score(user_message) >= LLM_GATE_THRESHOLD else None
+
+    if messages_for_llm:
+        _llm_extract(messages_for_llm, updated_scratchpad, gate)
+
+    return updated_scratchpad
 
-    if keys_to_extract_with_llm:
-        llm_prompt = (
-            f"From the following user message, extract any information relevant to these keys: "
-            f"{', '.join(keys_to_extract_with_llm)}. "
-            f"Provide the extracted information as a JSON object with the keys as specified. "
-            f"If no information is found for a key, omit that key from the JSON. "
-            f"User message: \"{user_message}\""
-        )
-        try:
-            llm_response = get_llm_response(llm_prompt, temperature=0.1)
-            # Attempt to parse LLM response as JSON
-            llm_extracted_data = {}
-            # Basic attempt to find JSON in the response, handling potential markdown code blocks
-            json_match = re.search(r"```json\n({.*?})\n```", llm_response, re.DOTALL)
-            if json_match:
-                json_string = json_match.group(1)
-            else:
-                json_string = llm_response # Assume the whole response is JSON if no markdown block
-
-            try:
-                llm_extracted_data = json.loads(json_string)
-            except json.JSONDecodeError:
-                # print(f"Warning: LLM response not valid JSON: {json_string}") # Keep this print for actual debugging if needed
-                # Fallback for non-JSON responses, try to parse key-value pairs if possible
-                for key_fallback in keys_to_extract_with_llm: # Renamed to avoid clash
-                    # Simple heuristic for "key: value" in plain text
-                    match = re.search(rf"{key_fallback}:\s*(.+)", llm_response, re.IGNORECASE)
-                    if match:
-                        llm_extracted_data[key_fallback] = match.group(1).strip()
-
-
-            for key_update, value_update in llm_extracted_data.items():
-                # If the LLM was tasked to find this key (because regex didn't initially),
-                # and the key is a canonical key, update it.
-                if key_update in keys_to_extract_with_llm and key_update in CANONICAL_KEYS:
-                    updated_scratchpad[key_update] = value_update
-        except Exception:
-            # print(f"Error during LLM extraction: {e}") # Keep this print for actual debugging if needed
-            pass # Silently pass exceptions during LLM extraction for now in tests
-
-    return updated_scratchpad
\ No newline at end of file
+
+# --- Incremental extraction ---
+EXTRACTION_STATE_KEY = "scratchpad_extraction"
+# Per-session cap on memoized regex results (oldest dropped first).
+EXTRACTION_MEMO_LIMIT = int(os.environ.get("SCRATCHPAD_EXTRACTION_MEMO_LIMIT", "500"))
+
+
+class IncrementalScratchpadExtractor:
+    """
+    Session-scoped extractor that only processes messages it has not seen before.
+    State is a plain dict (kept in st.session_state and saved with the session):
+      processed:  message hash -> keys that message filled
+      provenance: key -> {"value", "source" ("regex"/"llm"), "messages": [hashes]}
+      memo:       message hash -> regex extraction result
+    The scratchpad is updated in place; no copy is made per message.
+    """
+
+    def __init__(self, state: dict = None, gate: LLMExtractionGate = None):
+        self.state = state if state is not None else {}
+        for key in ("processed", "provenance", "memo"):
+            self.state.setdefault(key, {})
+        stats = self.state.setdefault("stats", {})
+        for key in ("processed", "skipped", "memo_hits", "retracted"):
+            stats.setdefault(key, 0)
+        self.gate = gate
+
+    @property
+    def stats(self) -> dict:
+        return self.state["stats"]
+
+    def _regex_extract(self, message: str, digest: str) -> dict:
+        memo = self.state["memo"]
+        if digest in memo:
+            self.stats["memo_hits"] += 1
+            return memo[digest]
+        extracted = EXTRACTION_ENGINE.extract(message)
+        memo[digest] = extracted
+        while len(memo) > EXTRACTION_MEMO_LIMIT:
+            memo.pop(next(iter(memo)))
+        return extracted
+
+    def process(self, message: str, scratchpad: dict) -> dict:
+        """Extracts from one message into scratchpad unless already processed. Returns the keys it filled."""
+        digest = message_fingerprint(message)
+        if digest in self.state["processed"]:
+            self.stats["skipped"] += 1
+            return {}
+        self.stats["processed"] += 1
+        provenance = self.state["provenance"]
+        updates = {}
+
+        for key, value in self._regex_extract(message, digest).items():
+            if key in CANONICAL_KEYS and not scratchpad.get(key):
+                scratchpad[key] = value
+                updates[key] = value
+                provenance[key] = {"value": value, "source": "regex", "messages": [digest]}
+        migrate_synonyms(scratchpad)
+
+        if self.gate is not None:
+            batch = self.gate.offer(message)
+        else:
+            batch = [message] if extraction_score(message) >= LLM_GATE_THRESHOLD else None
+        if batch:
+            updates.update(self._extract_batch_with_llm(batch, scratchpad))
+
+        self.state["processed"][digest] = sorted(updates)
+        return updates
+
+    def _extract_batch_with_llm(self, batch: list, scratchpad: dict) -> dict:
+        before = {key: scratchpad.get(key) for key in CANONICAL_KEYS}
+        _llm_extract(batch, scratchpad, self.gate)
+        digests = [message_fingerprint(m) for m in batch]
+        updates = {}
+        for key in CANONICAL_KEYS:
+            if scratchpad.get(key) and scratchpad.get(key) != before[key]:
+                updates[key] = scratchpad[key]
+                self.state["provenance"][key] = {"value": scratchpad[key], "source": "llm", "messages": digests}
+        return updates
+
+    def flush(self, scratchpad: dict) -> dict:
+        """Runs the LLM over messages still queued in the gate. Returns the keys it filled."""
+        if self.gate is None:
+            return {}
+        batch = self.gate.drain()
+        return self._extract_batch_with_llm(batch, scratchpad) if batch else {}
+
+    def retract(self, message: str, scratchpad: dict) -> list:
+        """
+        Forgets a message and clears the keys derived from it, unless their value has since
+        been changed by something else. Returns the cleared keys.
+        """
+        digest = message_fingerprint(message)
+        self.state["processed"].pop(digest, None)
+        retracted = []
+        for key, source in list(self.state["provenance"].items()):
+            if digest in source["messages"]:
+                if scratchpad.get(key) == source["value"]:
+                    scratchpad.pop(key, None)
+                    retracted.append(key)
+                del self.state["provenance"][key]
+        self.stats["retracted"] += len(retracted)
+        return retracted
+
+    def replace(self, old_message: str, new_message: str, scratchpad: dict) -> dict:
+        """Handles an edited message: retracts what the old text produced and processes the new text."""
+        self.retract(old_message, scratchpad)
+        return self.process(new_message, scratchpad)
+
+    def process_history(self, history: list, scratchpad: dict, role: str = "user") -> dict:
+        """
+        Processes the messages of a chat history, skipping those already seen, so calling it
+        again on every Streamlit rerun only costs a hash per message.
+        History entries are dicts with "role" and "content" (or "text").
+        """
+        updates = {}
+        for turn in history:
+            if not isinstance(turn, dict) or turn.get("role") != role:
+                continue
+            message = turn.get("content") or turn.get("text")
+            if message:
+                updates.update(self.process(message, scratchpad))
+        return updates
+
+
+def get_session_extractor() -> IncrementalScratchpadExtractor:
+    """
+    Returns an extractor (with an LLM gate) bound to this session's extraction state.
+    Not yet called by the app: the phase engines store each answer under their own scratchpad
+    key (store_input_to_scratchpad) without free-text extraction, so only
+    scripts/benchmark_turn_pipeline.py exercises this path and its rerun savings.
+    """
+    state = st.session_state.setdefault(EXTRACTION_STATE_KEY, {})
+    gate = LLMExtractionGate(state.setdefault("llm_gate", {}))
+    return IncrementalScratchpadExtractor(state, gate)
@@ -0,0 +1,55 @@
+"""Local text embeddings from hashed word and character n-grams, for similarity scoring without an API call."""
+import re
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+EMBEDDING_DIM = 512
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset({
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with", "is", "are", "be", "it",
+    "that", "this", "we", "our", "their", "they", "by", "as", "at", "from", "who", "which",
+})
+
+
+def _ngram_features(text: str) -> list:
+    """Word unigrams and bigrams (stopwords dropped) plus character trigrams of each word."""
+    tokens = [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    for token in tokens:
+        padded = f"#{token}#"
+        features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return features
+
+
+@lru_cache(maxsize=4096)
+def embed_text(text: str) -> np.ndarray:
+    """
+    Returns a unit-length, read-only embedding of text. Features are hashed into EMBEDDING_DIM
+    buckets with a hash-derived sign, so similar wording gives a high cosine similarity.
+    """
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    features = _ngram_features(text or "")
+    if features:
+        hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.uint32, count=len(features))
+        signs = np.where(hashes & np.uint32(0x80000000), -1.0, 1.0).astype(np.float32)
+        np.add.at(vector, hashes % EMBEDDING_DIM, signs)
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+    vector.flags.writeable = False
+    return vector
+
+
+def embed_texts(texts: list) -> np.ndarray:
+    """Stacks the embeddings of texts into an (n, EMBEDDING_DIM) matrix."""
+    if not texts:
+        return np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+    return np.vstack([embed_text(t) for t in texts])
+
+
+def cosine_similarity_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise cosine similarity of two matrices of unit-length rows."""
+    return a @ b.T
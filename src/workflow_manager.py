@@ -71,7 +71,7 @@ def reset_workflow(workflow_name: str):
 
     for key in keys_to_clear:
         del st.session_state[key]
-    logger.debug(f"Cleared session state keys: {keys_to_clear}")
+    logger.debug("Cleared session state keys: %s", keys_to_clear)
 
     # Initialize new workflow state
     st.session_state.workflow = workflow_name
@@ -87,7 +87,7 @@ def reset_workflow(workflow_name: str):
             # but ensure the main scratchpad dict is there.
             # Example: st.session_state.scratchpad[f"{workflow_name}_{key}"] = None
             st.session_state.scratchpad[key] = None # Store unprefixed, prefixing done by consumer
-    logger.debug(f"Initialized scratchpad for {workflow_name} with keys: {list(st.session_state.scratchpad.keys())}")
+    logger.debug("Initialized scratchpad for %s with keys: %s", workflow_name, list(st.session_state.scratchpad.keys()))
 
 
     st.session_state.current_phase_engine = None # Will be initialized by the main app loop
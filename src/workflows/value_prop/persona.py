@@ -1,4 +1,5 @@
 from src.core.coach_persona_base import CoachPersonaBase
+from src.example_library import find_examples
 import streamlit as st # For accessing scratchpad if needed by persona logic
 
 # A more sophisticated persona would likely use an LLM or more complex logic.
@@ -12,12 +13,18 @@ class ValuePropCoachPersona(CoachPersonaBase):
         self.workflow_name = workflow_name
         # Potentially load workflow-specific prompts or configurations here
 
-    def _get_scratchpad_value(self, key: str, default: str = "") -> str:
-        """Helper to get a value from the workflow-specific scratchpad."""
+    def _get_scratchpad_value(self, key: str, default: str = "", scratchpad: dict = None) -> str:
+        """
+        Helper to get a value from the workflow-specific scratchpad.
+        An explicit scratchpad snapshot is used when given (e.g. on a background thread,
+        where st.session_state is not available).
+        """
         # Assuming scratchpad keys are stored unprefixed in st.session_state.scratchpad
         # and PhaseEngineBase/WorkflowManager handles prefixing if necessary for storage.
         # For direct access here, we assume keys are as defined for the workflow.
-        return st.session_state.get("scratchpad", {}).get(key, default)
+        if scratchpad is None:
+            scratchpad = st.session_state.get("scratchpad", {})
+        return scratchpad.get(key, default)
 
     def get_step_intro_message(self, phase_name: str, **kwargs) -> str:
         """
@@ -135,11 +142,30 @@ class ValuePropCoachPersona(CoachPersonaBase):
             return f"Okay, noted for {phase_display}."
         return f"Thanks for detailing the {phase_display}. I've noted that."
 
+    @staticmethod
+    def _as_clause(text: str) -> str:
+        """Quotes a library example for use inside a sentence."""
+        return f"'{text.strip().rstrip('.')}'"
+
     def suggest_examples(self, phase_name: str, user_input: str = "", **kwargs) -> str:
         """
         Suggests examples or provides hints if the user is stuck or input is unclear.
+        Examples come from the precomputed example library, matched to the user's intake interests.
         For 'use_case', it generates numbered suggestions and sets state for selection.
         """
+        if phase_name != "use_case":
+            scratchpad = kwargs.get("scratchpad")
+            query = " ".join([
+                self._get_scratchpad_value("vp_interests", scratchpad=scratchpad),
+                self._get_scratchpad_value("vp_background", scratchpad=scratchpad),
+                user_input,
+            ]).strip()
+            examples = find_examples(phase_name, query, k=2)
+            if len(examples) == 2:
+                return f"For example, {self._as_clause(examples[0]['text'])} or {self._as_clause(examples[1]['text'])}."
+            if len(examples) == 1:
+                return f"For example, {self._as_clause(examples[0]['text'])}."
+
         if phase_name == "problem":
             return "For example, a problem could be 'university students struggle to find affordable off-campus housing' or 'small businesses find it hard to manage online reviews'."
         elif phase_name == "use_case":
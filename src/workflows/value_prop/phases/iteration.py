@@ -2,6 +2,7 @@ import streamlit as st
 from src.core.phase_engine_base import PhaseEngineBase
 from src.core.coach_persona_base import CoachPersonaBase
 from src.workflows.value_prop import ITERATION_SUB_PHASES, SCRATCHPAD_KEYS, PHASE_ORDER
+from src.summary_store import get_session_summary_store
 
 class IterationPhase(PhaseEngineBase):
     phase_name = "iteration"
@@ -48,6 +49,7 @@ class IterationPhase(PhaseEngineBase):
             target_field = st.session_state.get("iteration_target_field")
             if target_field:
                 st.session_state.scratchpad[target_field] = user_input.strip()
+                get_session_summary_store().invalidate(target_field)
                 self.debug_log(step="store_input_revision_detail", field=target_field, input_len=len(user_input))
             else:
                 self.debug_log(step="store_input_revision_detail_error", error="No target_field in session")
@@ -35,6 +35,9 @@ class RecommendationPhase(PhaseEngineBase):
         intro_message = self.coach_persona.get_step_intro_message(phase_name=self.phase_name)
         # The intro message from persona might be generic like "Here are recommendations..."
         # We append the actual recommendations.
+        return self._format_enter_message(intro_message, recs_text)
+
+    def _format_enter_message(self, intro_message: str, recs_text: str) -> str:
         return f"{intro_message}\n\n{recs_text}\n\nWhat would you like to do next? (Type 'iterate' to refine, or 'summary' to wrap up.)"
 
 
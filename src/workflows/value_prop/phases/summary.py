@@ -2,9 +2,12 @@ import streamlit as st
 from src.core.phase_engine_base import PhaseEngineBase
 from src.core.coach_persona_base import CoachPersonaBase # For type hinting
 from src.workflows.value_prop.persona import ValuePropCoachPersona # Specific persona
+from src.summary_store import get_session_summary_store
 
 class SummaryPhase(PhaseEngineBase):
     phase_name = "summary"
+    # Fields read by generate_value_prop_summary(); the stored summary is reused while they are unchanged.
+    summary_keys = ("use_case", "problem", "target_customer", "solution", "main_benefit", "differentiator")
 
     def __init__(self, coach_persona: CoachPersonaBase, workflow_name: str = "value_prop"):
         super().__init__(coach_persona, workflow_name)
@@ -19,12 +22,18 @@ class SummaryPhase(PhaseEngineBase):
         self.debug_log(step="enter_phase")
         super().enter() # Base class enter for logging etc.
 
-        summary_text = ""
-        if isinstance(self.coach_persona, ValuePropCoachPersona):
-            summary_text = self.coach_persona.generate_value_prop_summary(st.session_state.scratchpad)
+        # Repeats and reruns re-enter this phase; serve the summary while its source fields are unchanged.
+        store = get_session_summary_store()
+        summary_text = store.get(self.phase_name, st.session_state.scratchpad, self.summary_keys)
+        if summary_text is not None:
+            self.debug_log(step="enter_phase_summary_cache_hit")
         else:
-            summary_text = "Could not generate a detailed summary at this time. Please review your scratchpad."
-            self.debug_log(step="enter_phase_fallback_summary", persona_type=type(self.coach_persona).__name__)
+            if isinstance(self.coach_persona, ValuePropCoachPersona):
+                summary_text = self.coach_persona.generate_value_prop_summary(st.session_state.scratchpad)
+                store.put(self.phase_name, st.session_state.scratchpad, summary_text, self.summary_keys)
+            else:
+                summary_text = "Could not generate a detailed summary at this time. Please review your scratchpad."
+                self.debug_log(step="enter_phase_fallback_summary", persona_type=type(self.coach_persona).__name__)
 
         st.session_state.scratchpad["final_summary"] = summary_text
         
@@ -37,6 +46,9 @@ class SummaryPhase(PhaseEngineBase):
         # For now, let's assume entering summary means the main data collection is done.
         # self.mark_complete() # This phase completes upon user saying "done" or similar.
 
+        return self._format_enter_message(intro_message, summary_text)
+
+    def _format_enter_message(self, intro_message: str, summary_text: str) -> str:
         return f"{intro_message}\n\nHere is your final summary:\n{summary_text}\n\nLet me know if you'd like it repeated, or type 'done' to finish."
 
     # The handle_response logic is now primarily in PhaseEngineBase.
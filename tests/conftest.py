@@ -0,0 +1,30 @@
+import pytest
+
+from src import analytics
+from src.llm_backends import FakeBackend, set_backend
+from src.usage_ledger import UsageLedger, set_ledger
+
+
+@pytest.fixture(autouse=True)
+def isolated_analytics(tmp_path, monkeypatch):
+    """Events logged by any test go to its own tmp_path, never to the repo's analytics_logs/."""
+    monkeypatch.setattr(analytics, "LOG_FILE_PATH", str(tmp_path / "analytics.jsonl"))
+    monkeypatch.setattr(analytics, "ANALYTICS_DIR", "")
+
+
+@pytest.fixture(autouse=True)
+def isolated_ledger(tmp_path):
+    """Token usage of any test's LLM calls is recorded in its own ledger, not the session database."""
+    ledger = UsageLedger(str(tmp_path / "usage.sqlite"))
+    set_ledger(ledger)
+    yield ledger
+    set_ledger(None)
+
+
+@pytest.fixture
+def fake_backend():
+    """An installed offline FakeBackend; set .responses for canned replies."""
+    backend = FakeBackend(sleep=False)
+    set_backend(backend)
+    yield backend
+    set_backend(None)
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from src.analytics_columnar import EventColumns, funnel, ingest, iter_column_chunks, phase_dwell_times, skip_rates
+
+EVENTS = [
+    # Session a: intake -> problem (skipped) -> target_customer
+    {"utc_ts": "2026-10-18T10:00:00", "session_id": "a", "event": "phase_enter", "phase_name": "intake"},
+    {"utc_ts": "2026-10-18T10:01:00", "session_id": "a", "event": "user_input_submitted", "input_length": 12},
+    {"utc_ts": "2026-10-18T10:02:00", "session_id": "a", "event": "phase_skipped", "phase_name": "problem"},
+    {"utc_ts": "2026-10-18T10:02:00", "session_id": "a", "event": "phase_enter", "phase_name": "target_customer"},
+    {"utc_ts": "2026-10-18T10:05:00", "session_id": "a", "event": "user_input_submitted"},
+    # Session b: intake -> problem
+    {"utc_ts": "2026-10-18T11:00:00", "session_id": "b", "event": "phase_enter", "phase_name": "intake"},
+    {"utc_ts": "2026-10-18T11:04:00", "session_id": "b", "event": "phase_enter", "phase_name": "problem"},
+    {"utc_ts": "2026-10-18T11:05:00", "session_id": "b", "event": "user_input_submitted"},
+]
+
+
+@pytest.fixture(params=["events.parquet", "events.sqlite"])
+def store(tmp_path, request):
+    source = tmp_path / "analytics_log.jsonl"
+    source.write_text("".join(json.dumps(e) + "\n" for e in EVENTS))
+    path = str(tmp_path / request.param)
+    assert ingest(str(source), path) == len(EVENTS)
+    return path
+
+
+def test_funnel(store):
+    rows = funnel(EventColumns.load(store), ["intake", "problem", "target_customer"])
+    assert [(r["phase"], r["sessions"]) for r in rows] == [("intake", 2), ("problem", 1), ("target_customer", 1)]
+    assert rows[1]["of_first"] == 0.5
+
+
+def test_dwell_times(store):
+    rows = {r["phase"]: r for r in phase_dwell_times(EventColumns.load(store))}
+    assert rows["intake"]["visits"] == 2 and rows["intake"]["mean_seconds"] == 180.0  # 120s and 240s
+    assert rows["target_customer"]["mean_seconds"] == 180.0  # closed by the session's last event
+
+
+def test_skip_rates(store):
+    rows = {r["phase"]: r for r in skip_rates(EventColumns.load(store, ["phase_enter", "phase_skipped"]))}
+    assert rows["problem"] == {"phase": "problem", "sessions": 2, "skipped": 1, "skip_rate": 0.5}
+    assert rows["intake"]["skip_rate"] == 0.0
+
+
+def test_legacy_events_get_inferred_sessions():
+    events = [{"utc_ts": "2026-10-18T10:00:00", "event": "workflow_reset_start"},
+              {"utc_ts": "2026-10-18T10:00:05", "event": "phase_enter", "phase_name": "intake"},
+              {"utc_ts": "2026-10-18T13:00:00", "event": "phase_enter", "phase_name": "intake"},
+              {"utc_ts": "2026-10-18T13:00:01", "event": "workflow_reset_start"}]
+    (chunk,) = iter_column_chunks(events)
+    assert chunk["session_id"] == ["legacy-1", "legacy-1", "legacy-2", "legacy-3"]
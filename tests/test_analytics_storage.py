@@ -0,0 +1,77 @@
+import datetime
+import json
+import os
+
+from src import analytics, analytics_storage
+from src.analytics import AnalyticsWriter
+from src.analytics_storage import PartitionedEventLog, iter_events, load_manifest, seal_stale_segments, select_segments
+
+
+def _event(ts, name="phase_enter", **kwargs):
+    return {"utc_ts": ts, "event": name, **kwargs}
+
+
+def _write(log, events):
+    log.write_lines([json.dumps(e) + "\n" for e in events], events)
+
+
+def test_events_are_partitioned_by_hour_and_sealed_segments_compressed(tmp_path):
+    log = PartitionedEventLog(str(tmp_path), partition="hour")
+    _write(log, [_event("2026-10-18T09:59:00"), _event("2026-10-18T10:00:01"), _event("2026-10-18T10:30:00")])
+    log.close()
+    segments = load_manifest(str(tmp_path))["segments"]
+    assert [s["partition"] for s in segments] == ["dt=2026-10-18/hour=09", "dt=2026-10-18/hour=10"]
+    assert [s["events"] for s in segments] == [1, 2]
+    assert all(s["status"] == "sealed" and s["codec"] in ("zstd", "gzip") for s in segments)
+    assert all(os.path.exists(tmp_path / s["path"]) for s in segments)
+
+
+def test_size_rotation(tmp_path):
+    log = PartitionedEventLog(str(tmp_path), max_segment_bytes=200)
+    _write(log, [_event("2026-10-18T10:00:00", detail="x" * 120) for _ in range(4)])
+    log.close()
+    assert len(load_manifest(str(tmp_path))["segments"]) == 2
+
+
+def test_time_range_reads_only_overlapping_segments(tmp_path):
+    log = PartitionedEventLog(str(tmp_path), partition="day")
+    _write(log, [_event(f"2026-10-{day:02d}T12:00:00", turn=day) for day in (15, 16, 17)])
+    _write(log, [_event("2026-10-18T08:00:00", "intent_classified", turn=18)])  # left open
+    start, end = datetime.datetime(2026, 10, 16), datetime.datetime(2026, 10, 19)
+    assert len(select_segments(str(tmp_path), start, end)) == 3
+    assert [e["turn"] for e in iter_events(str(tmp_path), start, end)] == [16, 17, 18]
+    assert [e["turn"] for e in iter_events(str(tmp_path), events={"intent_classified"})] == [18]
+    log.close()
+
+
+def test_log_event_writes_to_partitions(tmp_path, monkeypatch):
+    monkeypatch.setattr(analytics, "ANALYTICS_DIR", str(tmp_path))
+    writer = AnalyticsWriter()
+    monkeypatch.setattr(analytics, "_writer", writer)
+    analytics.log_event("user_input_submitted", length=12)
+    writer.close()
+    events = list(iter_events(str(tmp_path)))
+    assert [e["event"] for e in events] == ["user_input_submitted"]
+    assert load_manifest(str(tmp_path))["segments"][0]["status"] == "sealed"
+
+
+def test_stale_segments_of_live_writers_are_left_open(tmp_path):
+    log = PartitionedEventLog(str(tmp_path), partition="day")
+    _write(log, [_event("2026-10-18T08:00:00")])
+    assert seal_stale_segments(str(tmp_path), older_than_seconds=0) == 0  # This process still writes it
+    assert load_manifest(str(tmp_path))["segments"][0]["status"] == "open"
+    log.close()
+
+
+def test_rotate_keeps_a_segment_sealed_by_another_process(tmp_path, monkeypatch):
+    log = PartitionedEventLog(str(tmp_path), partition="day")
+    _write(log, [_event("2026-10-18T08:00:00", turn=1)])
+    log.fsync()
+    monkeypatch.setattr(analytics_storage, "_writer_alive", lambda segment_id: False)  # As if it had crashed
+    assert seal_stale_segments(str(tmp_path), older_than_seconds=0) == 1
+    _write(log, [_event("2026-10-19T08:00:00", turn=2)])  # The idle writer wakes up and rotates
+    log.close()
+    segments = load_manifest(str(tmp_path))["segments"]
+    assert [s["status"] for s in segments] == ["sealed", "sealed"]
+    assert all(os.path.exists(tmp_path / s["path"]) for s in segments)
+    assert [e["turn"] for e in iter_events(str(tmp_path))] == [1, 2]
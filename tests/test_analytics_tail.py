@@ -0,0 +1,83 @@
+import datetime
+import json
+
+import pytest
+
+from src.analytics_storage import PartitionedEventLog
+from src.analytics_tail import EventTailer, LiveFeed, LiveStats, percentile
+
+
+def event(name, seconds_ago=0, **fields):
+    ts = datetime.datetime.utcnow() - datetime.timedelta(seconds=seconds_ago)
+    return {"utc_ts": ts.isoformat(), "event": name, **fields}
+
+
+def line(entry):
+    return json.dumps(entry) + "\n"
+
+
+def test_file_tail_reads_only_new_complete_lines(tmp_path):
+    path = tmp_path / "analytics_log.jsonl"
+    path.write_text(line(event("a")) + '{"utc_ts": "2026')
+    tailer = EventTailer(str(path))
+    assert [e["event"] for e in tailer.poll()] == ["a"]
+    with open(path, "a") as f:
+        f.write('-10-18T00:00:00", "event": "b"}\n' + line(event("c")))
+    assert [e["event"] for e in tailer.poll()] == ["b", "c"]
+    assert tailer.poll() == []
+    path.write_text(line(event("d")))  # Truncated and rewritten
+    assert [e["event"] for e in tailer.poll()] == ["d"]
+
+
+@pytest.mark.parametrize("fmt", ["jsonl", "binary"])
+def test_partitioned_tail_follows_rotation(tmp_path, fmt):
+    root = str(tmp_path / "logs")
+    log = PartitionedEventLog(root, format=fmt)
+    old = event("old", seconds_ago=7200)
+    log.write_lines([log.encode(old)], [old])
+    log.rotate()  # Sealed, compressed and outside the backfill window
+    first = [event("one"), event("two")]
+    log.write_lines([log.encode(e) for e in first], first)
+
+    tailer = EventTailer(root, backfill_seconds=900)
+    assert [e["event"] for e in tailer.poll()] == ["one", "two"]
+    third = event("three")
+    log.write_lines([log.encode(third)], [third])
+    log.rotate()  # The tailed segment is sealed before its last record was read
+    fourth = event("four")
+    log.write_lines([log.encode(fourth)], [fourth])
+    assert sorted(e["event"] for e in tailer.poll()) == ["four", "three"]
+    assert tailer.poll() == []
+    log.close()
+
+
+def test_live_stats_window():
+    stats = LiveStats(window_seconds=600, active_seconds=120)
+    stats.extend([
+        event("turn_completed", 30, session_id="s1", workflow="value_prop", phase="problem", latency_ms=800),
+        event("turn_completed", 20, session_id="s2", workflow="value_prop", phase="problem", latency_ms=1200),
+        event("turn_completed", 10, session_id="s3", workflow="value_prop", phase="target_customer", latency_ms=4000),
+        event("turn_completed", 300, session_id="s4", workflow="value_prop", phase="problem", latency_ms=100),
+        event("llm_call", 5, session_id="s1", ok=True),
+        event("llm_call", 5, session_id="s1", ok=False, error="Timeout"),
+        event("search_call", 5, session_id="s2", ok=True),
+        event("phase_engine_response_failed", 5, session_id="s3"),
+        event("turn_completed", 3600, session_id="s5", latency_ms=99999),  # Outside the window
+    ])
+    snapshot = stats.snapshot()
+    assert snapshot["active_sessions"] == 3  # s4 went quiet, s5 is too old
+    assert snapshot["active_by_phase"][0] == {"workflow": "value_prop", "phase": "problem", "sessions": 2}
+    assert snapshot["turns"] == 4
+    assert snapshot["turn_latency_ms"] == {"p50": 800.0, "p90": 4000.0, "p99": 4000.0}
+    assert snapshot["llm"] == {"calls": 2, "per_minute": 0.2, "errors": 1}
+    assert snapshot["errors"] == {"llm_call": 1, "phase_engine_response_failed": 1}
+    assert stats.snapshot(now=datetime.datetime.now().timestamp() + 3600)["turns"] == 0
+
+
+def test_percentile_and_feed(tmp_path):
+    assert percentile([], 50) is None
+    assert percentile([1, 2, 3, 4], 50) == 2
+    path = tmp_path / "analytics_log.jsonl"
+    path.write_text(line(event("turn_completed", session_id="s1", phase="problem", latency_ms=500)))
+    assert LiveFeed(str(path)).refresh()["turn_latency_ms"]["p50"] == 500.0
+    assert LiveFeed(str(tmp_path / "missing.jsonl")).refresh()["turns"] == 0
@@ -0,0 +1,89 @@
+import contextvars
+import json
+import threading
+
+import pytest
+
+from src import analytics, usage_ledger
+from src.analytics import AnalyticsWriter
+
+
+def _read(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_log_event_is_written_after_flush(tmp_path, monkeypatch):
+    path = tmp_path / "analytics.jsonl"
+    monkeypatch.setattr(analytics, "LOG_FILE_PATH", str(path))
+    monkeypatch.setattr(analytics, "ANALYTICS_DIR", "")
+    for i in range(50):
+        analytics.log_event("phase_enter", turn=i)
+    assert analytics.flush_events()
+    events = _read(path)
+    assert [e["turn"] for e in events] == list(range(50))
+    assert events[0]["event"] == "phase_enter" and "utc_ts" in events[0]
+
+
+def test_writer_batches_and_fsyncs(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+    writer = AnalyticsWriter(batch_size=10, fsync_interval=60, autostart=False)
+    for i in range(25):
+        writer.emit(path, {"event": "x", "i": i})
+    writer.start()
+    assert writer.flush()
+    writer.close()
+    assert writer.stats["written"] == 25 and writer.stats["batches"] == 3
+    assert writer.stats["fsyncs"] >= 1
+
+
+@pytest.mark.parametrize("policy, kept", [("drop_oldest", [3, 4]), ("drop_newest", [0, 1])])
+def test_full_queue_applies_drop_policy(tmp_path, policy, kept):
+    path = tmp_path / "events.jsonl"
+    writer = AnalyticsWriter(max_queue=2, drop_policy=policy, autostart=False)
+    results = [writer.emit(str(path), {"i": i}) for i in range(5)]
+    writer.start()
+    writer.flush()
+    writer.close()
+    assert writer.stats["dropped"] == 3
+    assert [e["i"] for e in _read(path)] == kept
+    assert results.count(False) == (3 if policy == "drop_newest" else 0)
+
+
+def test_unknown_drop_policy_is_rejected():
+    with pytest.raises(ValueError):
+        AnalyticsWriter(drop_policy="spill_to_disk")
+
+
+class _FailingLog(analytics.PartitionedEventLog):
+    def write_lines(self, lines, entries):
+        raise RuntimeError("disk went away")
+
+
+def test_writer_survives_encoding_and_storage_errors(tmp_path, monkeypatch):
+    path = str(tmp_path / "events.jsonl")
+    writer = AnalyticsWriter(autostart=False)
+    monkeypatch.setattr(analytics, "normalize", lambda entry: entry if entry["i"] != 1 else 1 / 0)
+    writer.emit(path, {"event": "x", "i": 0})
+    writer.emit(path, {"event": "x", "i": 1})
+    writer.emit(_FailingLog(str(tmp_path / "logs")), {"event": "x", "i": 2})
+    writer.start()
+    assert writer.flush()
+    writer.emit(path, {"event": "x", "i": 3})
+    assert writer.flush()
+    writer.close()
+    assert [e["i"] for e in _read(tmp_path / "events.jsonl")] == [0, 3]
+    assert writer.stats["errors"] == 2
+
+
+def test_events_from_worker_threads_keep_the_bound_session(tmp_path):
+    token = usage_ledger.bind_session("sess-9")
+    try:
+        context = contextvars.copy_context()
+    finally:
+        usage_ledger._session_id.reset(token)
+    worker = threading.Thread(target=context.run, args=(analytics.log_event, "llm_call"), kwargs={"ok": True})
+    worker.start()
+    worker.join()
+    assert analytics.flush_events()
+    [event] = _read(tmp_path / "analytics.jsonl")
+    assert event["session_id"] == "sess-9"
@@ -0,0 +1,66 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.brainstorm import BrainstormEngine, dedupe_and_rank, merge_idea_list, split_ideas
+
+MESSAGES = [{"role": "user", "content": "ideas please"}]
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        yield pool
+
+
+def test_dedupe_drops_near_duplicates_and_ranks_by_relevance():
+    texts = [
+        "Offer a subscription for gym members",
+        "Send SMS reminders to patients who miss imaging appointments",
+        "Send SMS reminders to patients that missed imaging appointments",
+    ]
+    ranked = dedupe_and_rank(texts, "patients miss imaging appointments")
+    assert [t for t, _ in ranked] == [texts[1], texts[0]]
+
+
+def test_slow_candidates_are_abandoned_within_budget(executor):
+    release = threading.Event()
+
+    def complete(messages, call_site=None, seed=0, **kwargs):
+        if seed >= 2:
+            release.wait(5)  # stragglers
+        return f"Idea number {seed} about clinic scheduling {'x' * seed * 40}"
+
+    engine = BrainstormEngine(candidates=4, latency_budget=0.2, executor=executor, complete=complete)
+    start = time.perf_counter()
+    texts = engine.generate_candidates(MESSAGES, "generate_ideas")
+    assert time.perf_counter() - start < 1.0
+    assert len(texts) == 2 and engine.last_stats["abandoned"] == 2
+    release.set()
+
+
+def test_waits_past_budget_when_nothing_has_returned(executor):
+    def complete(messages, call_site=None, seed=0, **kwargs):
+        if seed == 0:
+            raise RuntimeError("rate limited")
+        time.sleep(0.2)
+        return "Late but useful idea"
+
+    engine = BrainstormEngine(candidates=2, latency_budget=0.05, executor=executor, complete=complete)
+    assert engine.best_responses(MESSAGES, "generate_ideas") == ["Late but useful idea"]
+
+
+def test_best_ideas_pools_list_items_across_candidates(executor):
+    replies = {
+        0: "Here are some options:\n1. Telehealth triage for rural clinics\n2. Billing denial prediction\nWhich appeals to you?",
+        1: "Consider:\n- Billing denial prediction\n- Medication adherence nudges for seniors",
+    }
+    engine = BrainstormEngine(candidates=2, executor=executor, complete=lambda m, seed=0, **kw: replies[seed])
+    ideas, best = engine.best_ideas(MESSAGES, "assist_with_brainstorming", top_k=3)
+    assert sorted(ideas) == sorted(["Telehealth triage for rural clinics", "Billing denial prediction",
+                                    "Medication adherence nudges for seniors"])
+    merged = merge_idea_list(replies[0], ideas)
+    assert merged.startswith("Here are some options:") and merged.endswith("Which appeals to you?")
+    assert len(split_ideas(merged)) == 3
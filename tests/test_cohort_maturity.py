@@ -0,0 +1,42 @@
+import json
+import sqlite3
+
+from src.cohort_maturity import score_sessions
+from src.constants import CANONICAL_KEYS
+from src.utils.idea_maturity import calculate_maturity
+
+SCRATCHPADS = [
+    {},
+    {"problem": "Patients miss 20% of follow-up scans.", "solution": "an SMS assistant"},
+    {key: "Clinics using Epic save 5 hours a week on reminders for patients." for key in CANONICAL_KEYS},
+    {"problem": "it is hard", "channels": "online", "use_case": "A nurse books a visit by text."},
+]
+
+
+def make_db():
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    conn.execute("CREATE TABLE chatbot_sessions (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, session_data TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+    for i, scratchpad in enumerate(SCRATCHPADS):
+        conn.execute("INSERT INTO chatbot_sessions (user_id, session_data) VALUES (?, ?)", (f"u{i}", json.dumps({"scratchpad": scratchpad})))
+    conn.execute("INSERT INTO chatbot_sessions (user_id, session_data) VALUES ('broken', 'not json')")
+    return conn
+
+
+def test_batch_scores_match_calculate_maturity():
+    conn = make_db()
+    summary = score_sessions(conn, batch_size=2)
+    rows = conn.execute("SELECT score, weakest_1, weakest_2 FROM session_maturity ORDER BY session_id").fetchall()
+
+    expected = [calculate_maturity(s) for s in SCRATCHPADS + [{}]]
+    assert [r[0] for r in rows] == [score for score, _ in expected]
+    assert [[w for w in r[1:] if w] for r in rows] == [weakest for _, weakest in expected]
+    assert summary["sessions"] == 5
+    assert summary["elements"]["problem"]["presence_rate"] == 0.6
+    assert set(summary["score_percentiles"]) == {"p10", "p25", "p50", "p75", "p90"}
+
+
+def test_rescoring_replaces_rows():
+    conn = make_db()
+    score_sessions(conn)
+    score_sessions(conn)
+    assert conn.execute("SELECT COUNT(*) FROM session_maturity").fetchone()[0] == 5
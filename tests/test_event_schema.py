@@ -0,0 +1,101 @@
+import datetime
+import json
+import os
+
+import pytest
+
+from src import analytics, event_codec
+from src.analytics import AnalyticsWriter
+from src.analytics_storage import PartitionedEventLog, iter_events, load_manifest
+from src.event_codec import decode_records, encode_event
+from src.event_schema import hash_text, normalize
+
+
+def _event(name, **fields):
+    return {"utc_ts": datetime.datetime(2026, 10, 18, 9, 30, 0, 123456).isoformat(), "session_id": "3f9a01bc",
+            "workflow": "value_prop", "phase": "problem", "event": name, **fields}
+
+
+def test_normalize_types_limits_and_hashes_user_text():
+    entry = normalize(_event("intent_classified", user_input="my patients miss appointments", intent="x" * 500,
+                             phase_name="problem", debug_blob="y" * 5000))
+    assert entry["user_input"] == hash_text("my patients miss appointments")
+    assert entry["user_input"].startswith("sha256:") and len(entry["user_input"]) == 23
+    assert len(entry["intent"]) == 64
+    assert len(entry["debug_blob"]) == 256  # Undeclared fields are kept, truncated
+    typed = normalize(_event("llm_call", ok=1, latency_ms="12.5", prompt_tokens="oops"))
+    assert typed["ok"] is True and typed["latency_ms"] == 12.5 and typed["prompt_tokens"] is None
+
+
+@pytest.mark.parametrize("value", [None, True, False, 0, 127, 200, -5, -33, -128, -129, -300, -40000, 70000, 2 ** 40,
+                                   -2 ** 40, 2 ** 64 - 1, -2 ** 63, 1.25,
+                                   "", "é" * 40, "z" * 70000, b"\x00\xff", [1, [2, {"k": None}]], {str(i): i for i in range(20)}])
+def test_builtin_packer_round_trips(value):
+    out = bytearray()
+    event_codec._pack_into(out, value)
+    decoded, end = event_codec._unpack_from(bytes(out), 0)
+    assert decoded == value and end == len(out)
+
+
+def test_out_of_range_ints_are_stringified():
+    out = bytearray()
+    event_codec._pack_into(out, [2 ** 70, -2 ** 70])
+    assert event_codec._unpack_from(bytes(out), 0)[0] == [str(2 ** 70), str(-2 ** 70)]
+    entry = normalize(_event("user_input_submitted", input_length=2 ** 70, big=2 ** 70, small=-2 ** 64, nested=[2 ** 65]))
+    assert entry["input_length"] is None
+    assert entry["big"] == str(2 ** 70) and entry["small"] == str(-2 ** 64) and entry["nested"] == [str(2 ** 65)]
+    [decoded], _ = decode_records(encode_event(entry))
+    assert decoded == {k: v for k, v in entry.items() if v is not None}
+
+
+def test_binary_records_round_trip_and_leave_partial_tail():
+    events = [
+        _event("user_input_submitted", input_length=42),
+        _event("llm_call", call_site="plan_turn", ok=True, model="gpt-4o-mini", latency_ms=812.5, prompt_tokens=690),
+        {**_event("something_new", detail={"a": [1, 2]}), "session_id": "not-hex", "phase": "custom_phase"},
+        {"utc_ts": 1760000000, "event": "x", "i": 3},
+    ]
+    data = b"".join(encode_event(e) for e in events)
+    decoded, consumed = decode_records(data + encode_event(events[0])[:4])
+    assert consumed == len(data)
+    assert decoded[0] == events[0] and decoded[1] == events[1] and decoded[2] == events[2]
+    assert decoded[3] == {"utc_ts": 1760000000, "session_id": None, "workflow": None, "phase": None, "event": "x", "i": 3}
+
+
+def test_binary_is_much_smaller_than_json():
+    events = [normalize(_event("user_input_submitted", input_length=i)) for i in range(200)]
+    events += [normalize(_event("intent_classified", phase_name="problem", workflow_name="value_prop",
+                                user_input="a long answer " * 20, intent="provide_detail")) for _ in range(200)]
+    json_bytes = sum(len(json.dumps(e)) + 1 for e in events)
+    binary_bytes = sum(len(encode_event(e)) for e in events)
+    assert json_bytes / binary_bytes >= 4  # About 7x for the small events that dominate real logs
+    assert len(json.dumps(events[0])) / len(encode_event(events[0])) >= 5
+
+
+def test_readers_handle_old_jsonl_and_new_binary_segments(tmp_path):
+    root = str(tmp_path)
+    old = PartitionedEventLog(root, partition="day")
+    legacy = {"utc_ts": "2026-10-17T10:00:00", "event": "phase_enter", "phase_name": "intake"}
+    old.write_lines([json.dumps(legacy) + "\n"], [legacy])
+    old.close()
+    new = PartitionedEventLog(root, partition="day", format="binary")
+    current = normalize(_event("phase_enter", phase_name="problem"))
+    new.write_lines([new.encode(current)], [current])
+    new.close()
+    segments = load_manifest(root)["segments"]
+    assert [s.get("format", "jsonl") for s in segments] == ["jsonl", "binary"]
+    assert any(s["path"].endswith(".evb.zst") or s["path"].endswith(".evb.gz") for s in segments)
+    assert [e["phase_name"] for e in iter_events(root)] == ["intake", "problem"]
+
+
+def test_log_event_writes_binary_partitions(tmp_path, monkeypatch):
+    monkeypatch.setattr(analytics, "ANALYTICS_DIR", str(tmp_path))
+    writer = AnalyticsWriter()
+    monkeypatch.setattr(analytics, "_writer", writer)
+    analytics.log_event("unexpected_input", phase_name="problem", user_input="call me at 555-0100")
+    writer.close()
+    [event] = iter_events(str(tmp_path))
+    assert event["user_input"] == hash_text("call me at 555-0100")
+    segment = load_manifest(str(tmp_path))["segments"][0]
+    assert segment["format"] == "binary"
+    assert b"555-0100" not in open(os.path.join(str(tmp_path), segment["path"]), "rb").read()
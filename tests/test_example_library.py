@@ -0,0 +1,57 @@
+import pytest
+
+from src.example_library import ExampleLibrary, find_examples, library_version, load_example_library
+from src.llm_backends import FakeBackend, set_backend
+from src.personas.coach import CoachPersona
+from src.workflows.value_prop.persona import ValuePropCoachPersona
+
+
+@pytest.fixture
+def backend():
+    fake = FakeBackend(responses=["An LLM-written example."], sleep=False)
+    set_backend(fake)
+    yield fake
+    set_backend(None)
+
+
+def test_default_library_loads_and_is_versioned():
+    library = load_example_library()
+    assert library is not None
+    assert all(library.has_phase(p) for p in ("problem", "target_customer", "solution", "use_case"))
+    assert library.version.endswith(library_version({"topics": library.topics, "examples": [
+        e for phase in library.by_phase.values() for e in phase]}))
+
+
+def test_find_matches_topic_and_rejects_unrelated_queries():
+    assert find_examples("problem", "mental health support for students")[0]["topic"] == "mental_health"
+    assert find_examples("problem", "hospital scheduling and no-shows")[0]["topic"] == "clinic_operations"
+    assert find_examples("problem", "I like cars") == []
+    assert find_examples("pricing", "mental health") == []
+    assert find_examples("target_user", "caring for my grandma with dementia")[0]["phase"] == "target_customer"
+
+
+def test_find_excludes_ids_and_honours_k():
+    library = ExampleLibrary({"schema_version": 1, "topics": {"sleep": ["insomnia"]}, "examples": [
+        {"id": "a", "phase": "problem", "topic": "sleep", "text": "Shift workers cannot sleep during the day."},
+        {"id": "b", "phase": "problem", "topic": "sleep", "text": "Insomnia goes untreated in older adults."},
+    ]})
+    assert [e["id"] for e in library.find("problem", "insomnia", k=2)] == ["b", "a"]
+    assert [e["id"] for e in library.find("problem", "insomnia", k=2, exclude_ids={"b"})] == ["a"]
+
+
+def test_provide_actual_example_uses_library_without_llm(backend):
+    persona = CoachPersona()
+    example = persona.provide_actual_example("problem", context="medication adherence for seniors")
+    assert example == find_examples("problem", "medication adherence for seniors")[0]["text"]
+    assert "?" in persona.offer_example("problem", "pills")
+    assert backend.call_count == 0
+    assert persona.provide_actual_example("problem", context="I like cars") == "An LLM-written example."
+    assert backend.call_count == 1
+
+
+def test_suggest_examples_draws_on_intake_interests():
+    scratchpad = {"vp_interests": "postpartum depression and maternal care"}
+    reply = ValuePropCoachPersona().suggest_examples("problem", "", scratchpad=scratchpad)
+    top = find_examples("problem", "postpartum depression and maternal care", k=2)
+    assert reply.startswith("For example,") and " or " in reply
+    assert top[0]["text"].rstrip(".") in reply
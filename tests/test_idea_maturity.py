@@ -0,0 +1,35 @@
+import numpy as np
+
+from src.utils import idea_maturity
+from src.utils.idea_maturity import calculate_maturity, element_quality
+from src.utils.text_embedding import embed_text
+
+
+def test_specific_answers_outscore_vague_ones():
+    vague = {"problem": "it is bad", "solution": "an app"}
+    specific = {
+        "problem": "Patients miss 20% of follow-up appointments because clinics rely on phone calls.",
+        "solution": "An SMS assistant that reschedules MRI appointments from the Epic schedule.",
+    }
+    assert calculate_maturity(specific)[0] > calculate_maturity(vague)[0] > calculate_maturity({})[0] == 0
+
+
+def test_weakest_components_include_low_quality_fields():
+    scratchpad = {key: "Saves clinics 5 hours per week with Epic integration and SMS reminders for patients." for key in idea_maturity.CANONICAL_KEYS}
+    scratchpad["channels"] = "online"
+    assert "channels" in calculate_maturity(scratchpad)[1]
+
+
+def test_quality_is_cached_per_value(monkeypatch):
+    scratchpad = {"problem": "Clinics lose $2,000 a week to no-shows."}
+    first = element_quality(scratchpad)
+    monkeypatch.setattr(idea_maturity, "quality_features", lambda *a: (_ for _ in ()).throw(AssertionError("recomputed")))
+    assert element_quality(scratchpad) == first
+
+
+def test_embeddings_are_unit_length_and_similar_for_similar_text():
+    a = embed_text("patients miss follow-up appointments")
+    b = embed_text("patients missing their follow-up appointment")
+    c = embed_text("subscription revenue per site")
+    assert np.isclose(np.linalg.norm(a), 1.0)
+    assert a @ b > a @ c
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from src.utils.scratchpad_extractor import IncrementalScratchpadExtractor
+
+
+@pytest.fixture(autouse=True)
+def offline_llm(fake_backend):
+    fake_backend.responses = ["{}"]
+    return fake_backend
+
+
+def test_reprocessing_history_is_free(offline_llm):
+    extractor = IncrementalScratchpadExtractor()
+    scratchpad = {}
+    history = [{"role": "user", "content": "The problem is that patients miss scans."},
+               {"role": "assistant", "content": "Our solution is ignored because it is the coach."}]
+    assert extractor.process_history(history, scratchpad) == {"problem": "patients miss scans"}
+    calls = offline_llm.call_count
+
+    history.append({"role": "user", "content": "Our solution is an SMS assistant."})
+    assert extractor.process_history(history, scratchpad) == {"solution": "an SMS assistant"}
+    assert extractor.process_history(history, scratchpad) == {}  # a rerun
+    assert extractor.stats["processed"] == 2 and extractor.stats["skipped"] == 3
+    assert offline_llm.call_count == calls + 1
+    assert extractor.state["provenance"]["solution"]["source"] == "regex"
+
+
+def test_edit_retracts_derived_keys():
+    extractor = IncrementalScratchpadExtractor()
+    scratchpad = {}
+    extractor.process("Our solution is an SMS assistant.", scratchpad)
+    extractor.replace("Our solution is an SMS assistant.", "Our solution is a voice bot.", scratchpad)
+    assert scratchpad["solution"] == "a voice bot"
+
+    # A value changed elsewhere is left alone when its source message goes away.
+    scratchpad["solution"] = "edited by hand"
+    assert extractor.retract("Our solution is a voice bot.", scratchpad) == []
+    assert scratchpad["solution"] == "edited by hand"
+
+
+def test_state_is_json_serializable():
+    state = {}
+    extractor = IncrementalScratchpadExtractor(state)
+    extractor.process("The problem is long wait times.", {})
+    restored = IncrementalScratchpadExtractor(json.loads(json.dumps(state)))
+    assert restored.process("the problem is long  wait times.", {}) == {}
+    assert restored.stats["skipped"] == 1
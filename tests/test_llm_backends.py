@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from src import llm_utils
+from src.llm_backends import FakeBackend, OpenAIBackend, parse_latency_spec, set_backend
+
+
+@pytest.fixture
+def fake_backend():
+    backend = FakeBackend(responses=["first reply", "second reply", "third reply"], latency="uniform:0.5,1.0", sleep=False)
+    set_backend(backend)
+    yield backend
+    set_backend(None)
+
+
+def test_fake_backend_is_deterministic():
+    messages = [{"role": "user", "content": "What problem should I focus on?"}]
+    a = FakeBackend(responses=["one", "two", "three"], sleep=False).complete(messages)
+    b = FakeBackend(responses=["one", "two", "three"], sleep=False).complete(messages)
+    assert a == b
+    assert a["text"] in ["one", "two", "three"]
+    assert a["prompt_tokens"] > 0
+
+
+@pytest.mark.parametrize("spec, low, high", [
+    ("constant:0.8", 0.8, 0.8),
+    ("uniform:0.2,1.5", 0.2, 1.5),
+    ("normal:0.8,0.2", 0.0, float("inf")),
+    ("lognormal:-0.5,0.5", 0.0, float("inf")),
+])
+def test_latency_specs(spec, low, high):
+    sampler = parse_latency_spec(spec)
+    rng = random.Random(0)
+    for _ in range(50):
+        assert low <= sampler(rng) <= high
+
+
+def test_unknown_latency_spec_raises():
+    with pytest.raises(ValueError):
+        parse_latency_spec("pareto:1")
+
+
+def test_query_openai_routes_through_backend(fake_backend):
+    reply = llm_utils.query_openai([{"role": "user", "content": "hello"}], temperature=0.2)
+    assert reply in fake_backend.responses
+    assert fake_backend.call_count == 1
+
+
+def test_query_openai_without_api_key_raises(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    set_backend(OpenAIBackend())
+    try:
+        with pytest.raises(ValueError):
+            llm_utils.query_openai([{"role": "user", "content": "hello"}])
+    finally:
+        set_backend(None)
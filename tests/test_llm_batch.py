@@ -0,0 +1,62 @@
+from src.llm_backends import FakeBackend, LLMBackend
+from src.llm_batch import load_checkpoint, make_request, parse_openai_batch_output, run_batch
+
+
+class FlakyBackend(LLMBackend):
+    """Fails the first attempt of every request, then answers."""
+    def __init__(self):
+        self.attempts = {}
+
+    def complete(self, messages, model="gpt-3.5-turbo", **kwargs):
+        key = messages[0]["content"]
+        self.attempts[key] = self.attempts.get(key, 0) + 1
+        if self.attempts[key] == 1:
+            raise RuntimeError("rate limited")
+        return {"text": f"ok {key}", "model": model, "prompt_tokens": 10, "completion_tokens": 5}
+
+
+def _requests(n):
+    return [make_request(f"r{i}", [{"role": "user", "content": f"msg {i}"}], model="gpt-3.5-turbo") for i in range(n)]
+
+
+def test_run_batch_retries_and_reports():
+    results, report = run_batch(_requests(5), backend=FlakyBackend(), concurrency=2, backoff_seconds=0)
+    assert all(r["status"] == "ok" for r in results.values())
+    assert report["completed"] == 5
+    assert report["retries"] == 5
+    assert report["prompt_tokens"] == 50
+    assert report["estimated_cost_usd"] > 0
+
+
+def test_run_batch_resumes_from_checkpoint(tmp_path):
+    checkpoint = str(tmp_path / "job.checkpoint")
+    backend = FakeBackend(sleep=False)
+    run_batch(_requests(3), backend=backend, checkpoint_path=checkpoint)
+    assert len(load_checkpoint(checkpoint)) == 3
+
+    _, report = run_batch(_requests(5), backend=backend, checkpoint_path=checkpoint)
+    assert report["resumed_from_checkpoint"] == 3
+    assert report["completed"] == 5
+    assert backend.call_count == 5
+
+
+def test_checkpoint_records_of_other_requests_are_not_reported(tmp_path):
+    checkpoint = str(tmp_path / "job.checkpoint")
+    backend = FakeBackend(sleep=False)
+    run_batch(_requests(5), backend=backend, checkpoint_path=checkpoint)
+
+    results, report = run_batch(_requests(2), backend=backend, checkpoint_path=checkpoint)
+    assert sorted(results) == ["r0", "r1"]
+    assert report["requests"] == 2 and report["completed"] == 2 and report["resumed_from_checkpoint"] == 2
+    assert backend.call_count == 5
+    assert report["prompt_tokens"] == sum(r["prompt_tokens"] for r in results.values())
+
+
+def test_parse_openai_batch_output():
+    line = (
+        '{"custom_id": "a", "response": {"status_code": 200, "body": {"model": "gpt-4o-mini", '
+        '"choices": [{"message": {"content": "hi"}}], "usage": {"prompt_tokens": 3, "completion_tokens": 1}}}}'
+    )
+    results = parse_openai_batch_output([line])
+    assert results["a"]["text"] == "hi"
+    assert results["a"]["prompt_tokens"] == 3
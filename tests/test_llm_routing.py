@@ -0,0 +1,63 @@
+import pytest
+
+from src.llm_backends import LLMBackend
+from src.llm_routing import complete_with_route, get_route_stats, reset_route_stats
+
+
+class RecordingBackend(LLMBackend):
+    def __init__(self, failing_models=()):
+        self.failing_models = set(failing_models)
+        self.calls = []
+
+    def complete(self, messages, model="", **kwargs):
+        self.calls.append((model, kwargs))
+        if model in self.failing_models:
+            raise TimeoutError(f"{model} timed out")
+        return {"text": "ok", "model": model, "prompt_tokens": 100, "completion_tokens": 10}
+
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    reset_route_stats()
+    yield
+    reset_route_stats()
+
+
+def test_small_call_site_uses_fast_model_with_cap_and_timeout():
+    backend = RecordingBackend()
+    complete_with_route(backend, [{"role": "user", "content": "hi"}], call_site="active_listening", max_tokens=500)
+    model, kwargs = backend.calls[0]
+    assert model == "gpt-4o-mini"
+    assert kwargs["max_tokens"] == 80
+    assert kwargs["timeout"] == 8
+
+
+def test_fallback_chain_and_stats():
+    backend = RecordingBackend(failing_models={"gpt-4o-mini"})
+    result = complete_with_route(backend, [{"role": "user", "content": "hi"}], call_site="generate_short_summary")
+    assert result["model"] == "gpt-3.5-turbo"
+    rows = {(r["route"], r["model"]): r for r in get_route_stats()}
+    assert rows[("summary", "gpt-4o-mini")]["errors"] == 1
+    assert rows[("summary", "gpt-3.5-turbo")]["fallbacks"] == 1
+    assert rows[("summary", "gpt-3.5-turbo")]["cost_usd"] > 0
+
+
+def test_all_models_failing_raises():
+    backend = RecordingBackend(failing_models={"gpt-4o-mini", "gpt-3.5-turbo"})
+    with pytest.raises(TimeoutError):
+        complete_with_route(backend, [{"role": "user", "content": "hi"}], call_site="active_listening")
+
+
+def test_unknown_call_site_uses_default_route():
+    backend = RecordingBackend()
+    complete_with_route(backend, [{"role": "user", "content": "hi"}], call_site="something_new", max_tokens=40)
+    model, kwargs = backend.calls[0]
+    assert model == "gpt-4-1106-preview"
+    assert kwargs == {"max_tokens": 40}
+
+
+def test_coaching_stays_on_default_model_with_fallback():
+    backend = RecordingBackend(failing_models={"gpt-4-1106-preview"})
+    result = complete_with_route(backend, [{"role": "user", "content": "hi"}], call_site="coach_on_decision")
+    assert [model for model, _ in backend.calls] == ["gpt-4-1106-preview", "gpt-4o"]
+    assert result["model"] == "gpt-4o"
@@ -0,0 +1,72 @@
+import io
+import json
+import logging
+import queue
+
+from src.core.logger import (JsonFormatter, NonBlockingQueueHandler, SampledLogger, configure_logging,
+                             parse_levels, stop_logging)
+
+
+class Expensive:
+    formatted = 0
+
+    def __str__(self):
+        Expensive.formatted += 1
+        return "expensive"
+
+
+def test_json_records_carry_extras_and_lazy_args():
+    stream = io.StringIO()
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter())
+    try:
+        configure_logging(level="INFO", levels="test.quiet=WARNING", handler=output)
+        log = logging.getLogger("test.logger")
+        log.debug("skipped %s", Expensive())
+        logging.getLogger("test.quiet").info("also skipped")
+        log.info("saved %s keys", 3, extra={"session_id": "abc"})
+        stop_logging()  # drains the queue
+    finally:
+        configure_logging()
+    [line] = stream.getvalue().splitlines()
+    record = json.loads(line)
+    assert record["msg"] == "saved 3 keys"
+    assert record["level"] == "INFO" and record["logger"] == "test.logger"
+    assert record["session_id"] == "abc"
+    assert Expensive.formatted == 0
+
+
+def test_parse_levels():
+    assert parse_levels("src.analytics=DEBUG, src.persistence_utils=warning,bad") == {
+        "src.analytics": logging.DEBUG, "src.persistence_utils": logging.WARNING}
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    record = logging.LogRecord("x", logging.INFO, __file__, 1, "msg %s", ("a",), None)
+    handler.handle(record)
+    handler.handle(logging.LogRecord("x", logging.INFO, __file__, 1, "msg", (), None))
+    assert handler.dropped == 1
+    assert handler.queue.get_nowait().msg == "msg a"
+
+
+def test_sampled_logger_emits_one_in_n():
+    log = logging.getLogger("test.sampled")
+    records = []
+
+    class Collect(logging.Handler):
+        def emit(self, record):
+            records.append(record)
+
+    collector = Collect()
+    log.addHandler(collector)
+    log.setLevel(logging.DEBUG)
+    log.propagate = False
+    try:
+        sampled = SampledLogger(log, every=10)
+        for i in range(25):
+            sampled.debug("hot %s", i)
+    finally:
+        log.removeHandler(collector)
+    assert [r.getMessage() for r in records] == ["hot 0", "hot 10", "hot 20"]
+    assert records[0].sample_every == 10
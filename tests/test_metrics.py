@@ -0,0 +1,61 @@
+import urllib.request
+
+from src.core import metrics
+from src.core.metrics import Registry
+from src.llm_routing import LLM_LATENCY, LLM_TOKENS, complete_with_route
+from tests.test_llm_routing import RecordingBackend
+
+
+def test_render_exposition_format():
+    registry = Registry()
+    turns = registry.counter("turns_total", "Turns handled.", ("phase",))
+    turns.inc(phase="problem")
+    turns.inc(2, phase='say "hi"')
+    registry.gauge("queue_depth", "Queued events.", fn=lambda: 7)
+    latency = registry.histogram("write_seconds", "Write latency.", buckets=(0.1, 1.0))
+    latency.observe(0.05)
+    latency.observe(0.5)
+    assert registry.counter("turns_total", "Turns handled.", ("phase",)) is turns
+
+    text = registry.render()
+    assert "# TYPE turns_total counter" in text
+    assert 'turns_total{phase="problem"} 1' in text
+    assert 'turns_total{phase="say \\"hi\\""} 2' in text
+    assert "queue_depth 7" in text
+    assert 'write_seconds_bucket{le="0.1"} 1' in text
+    assert 'write_seconds_bucket{le="+Inf"} 2' in text
+    assert "write_seconds_count 2" in text
+    assert "write_seconds_sum 0.55" in text
+
+
+def test_http_endpoint_and_textfile(tmp_path):
+    metrics.counter("test_scrapes_total", "Scrapes seen by the test.").inc()
+    server = metrics.start_http_server(0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            body = response.read().decode()
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    finally:
+        server.shutdown()
+    assert "test_scrapes_total 1" in body
+    assert "coach_active_sessions" in body and "analytics_queue_depth" in body
+
+    path = tmp_path / "coach.prom"
+    metrics.write_textfile(str(path))
+    assert "test_scrapes_total 1" in path.read_text()
+
+
+def test_llm_calls_are_recorded_by_call_site():
+    before = LLM_LATENCY.value(call_site="active_listening", route="acknowledgement", model="gpt-4o-mini", outcome="ok")
+    complete_with_route(RecordingBackend(), [{"role": "user", "content": "hi"}], call_site="active_listening")
+    after = LLM_LATENCY.value(call_site="active_listening", route="acknowledgement", model="gpt-4o-mini", outcome="ok")
+    assert after["count"] == before["count"] + 1
+    assert LLM_TOKENS.value(call_site="active_listening", model="gpt-4o-mini", kind="prompt") >= 100
+
+
+def test_record_turn_marks_session_active():
+    metrics.record_turn("metrics-test-session", "value_prop", "problem", 0.3)
+    assert metrics.TURNS.value(workflow="value_prop", phase="problem") >= 1
+    assert metrics.active_sessions() >= 1
+    assert metrics.active_sessions(window=-1) == 0
@@ -0,0 +1,63 @@
+import json
+import time
+
+from src.core import profiling
+from src.core.profiling import SamplingProfiler, profile_run, should_profile
+
+
+def busy_leaf(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def busy_caller():
+    busy_leaf(0.15)
+
+
+def test_samples_the_calling_thread():
+    with SamplingProfiler(interval=0.002) as profiler:
+        busy_caller()
+    assert profiler.samples > 10
+    hot = max(profiler.stacks, key=lambda stack: profiler.stacks[stack][1])
+    assert [frame[0] for frame in hot[-2:]] == ["busy_caller", "busy_leaf"]
+    folded = profiler.collapsed()
+    assert "busy_caller (test_profiling.py:" in folded[0] and ";busy_leaf (" in folded[0]
+    assert int(folded[0].rsplit(" ", 1)[1]) > 0
+
+
+def test_speedscope_document_is_consistent():
+    with SamplingProfiler(interval=0.002) as profiler:
+        busy_caller()
+    document = profiler.speedscope("run-1")
+    [profile] = document["profiles"]
+    frames = document["shared"]["frames"]
+    assert profile["type"] == "sampled" and len(profile["samples"]) == len(profile["weights"])
+    assert all(0 <= i < len(frames) for sample in profile["samples"] for i in sample)
+    assert {"busy_caller", "busy_leaf"} <= {frame["name"] for frame in frames}
+
+
+def test_should_profile_by_session_or_token():
+    assert should_profile("abc", sessions="abc, def", token="")
+    assert should_profile("zzz", sessions="*", token="")
+    assert not should_profile("zzz", sessions="abc", token="")
+    assert should_profile("zzz", query_value="s3cret", sessions="", token="s3cret")
+    assert not should_profile("zzz", query_value="s3cret", sessions="", token="")  # No token configured
+    assert not should_profile("zzz", query_value="wröng", sessions="", token="s3cret")
+    assert not should_profile("zzz", query_value=None, sessions="", token="s3cret")
+
+
+def test_profile_run_writes_files_even_when_the_run_raises(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_SESSIONS", "user/1")
+    try:
+        with profile_run("user/1", directory=str(tmp_path)):
+            busy_caller()
+            raise RuntimeError("rerun")  # st.rerun() ends a run by raising
+    except RuntimeError:
+        pass
+    [folded] = tmp_path.glob("user_1-*.folded")
+    [speedscope] = tmp_path.glob("user_1-*.speedscope.json")
+    assert "busy_leaf" in folded.read_text()
+    assert json.loads(speedscope.read_text())["profiles"][0]["samples"]
+    with profile_run("someone-else", directory=str(tmp_path)) as profiler:
+        assert profiler is None
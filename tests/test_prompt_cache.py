@@ -0,0 +1,84 @@
+import pytest
+import streamlit as st
+
+from src import prompt_cache
+from src.llm_utils import CONVERSATION_CONTEXT_INSTRUCTIONS, build_conversation_messages
+from src.personas.coach import CoachPersona
+from src.prompt_cache import (cacheable_prefix_report, provider_cached_tokens, render_prompt_text,
+                              shared_prefix_length)
+
+SCRATCHPAD = {"problem": "Patients miss follow-up scans", "target_customer": "Imaging clinics"}
+
+
+@pytest.fixture(autouse=True)
+def clean_session():
+    st.session_state.clear()
+    st.session_state["context_summary"] = "Intake: a radiologist exploring reminder tools."
+    yield
+    st.session_state.clear()
+
+
+@pytest.fixture
+def char_estimate(monkeypatch):
+    """Pins estimate_tokens to the ~4 characters per token fallback so counts are exact."""
+    monkeypatch.setattr(prompt_cache, "_ENCODING", None)
+
+
+def _static_prefix(first: list, second: list) -> str:
+    texts = [render_prompt_text(first), render_prompt_text(second)]
+    return texts[0][:shared_prefix_length(texts)]
+
+
+def test_conversation_messages_share_static_prefix_across_user_inputs():
+    first = build_conversation_messages(SCRATCHPAD, "They forget the appointment.", "problem")
+    second = build_conversation_messages(SCRATCHPAD, "Clinics lose revenue on every no-show.", "problem")
+
+    assert first[0] == second[0]
+    assert first[1]["content"].startswith(CONVERSATION_CONTEXT_INSTRUCTIONS)
+    assert second[1]["content"].startswith(CONVERSATION_CONTEXT_INSTRUCTIONS)
+    prefix = _static_prefix(first, second)
+    assert prefix.startswith(render_prompt_text(first[:1]) + "<|user|>" + CONVERSATION_CONTEXT_INSTRUCTIONS)
+    assert st.session_state["context_summary"] in prefix
+    assert "Most recent user message" in prefix and "They forget" not in prefix
+
+
+@pytest.mark.parametrize("build", [
+    lambda persona, text: persona.build_next_turn_messages([], SCRATCHPAD, "problem", [{"role": "user", "text": text}]),
+    lambda persona, text: persona.build_turn_plan_messages(text, "problem", SCRATCHPAD),
+])
+def test_coach_messages_keep_system_prompt_first_and_identical(build):
+    persona = CoachPersona()
+    first = build(persona, "They forget the appointment.")
+    second = build(persona, "Clinics lose revenue on every no-show.")
+
+    assert first[0]["role"] == "system" and first[0] == second[0]
+    assert first[1] != second[1]
+    assert _static_prefix(first, second).startswith(render_prompt_text(first[:1]))
+
+
+def test_prefix_report_counts_static_session_and_dynamic_tokens(char_estimate):
+    system = {"role": "system", "content": "s" * 4402}
+
+    def render(session, user):
+        return {"session": session, "messages": [system, {"role": "user", "content": user}]}
+
+    samples = {"coach": [render("a", "x" * 40), render("a", "x" * 40 + "y" * 40), render("b", "z" * 80)]}
+    [row] = cacheable_prefix_report(samples)
+
+    static_chars = len("<|system|>") + 4402 + len("<|user|>")
+    totals = [(static_chars + 40) / 4, (static_chars + 80) / 4, (static_chars + 80) / 4]
+    # The second call of session "a" also reuses the 40 characters it shares with the first.
+    prefixes = [static_chars / 4, (static_chars + 40) / 4, static_chars / 4]
+    assert row["samples"] == 3
+    assert row["static_prefix_tokens"] == static_chars / 4
+    assert row["mean_total_tokens"] == round(sum(totals) / 3, 1)
+    assert row["session_prefix_tokens"] == round(sum(prefixes) / 3, 1)
+    assert row["dynamic_tokens"] == round(sum(totals) / 3 - sum(prefixes) / 3, 1)
+    assert row["provider_cached_tokens"] == 1024
+
+
+def test_provider_cached_tokens_rounds_down_to_cache_increments():
+    assert provider_cached_tokens(1023) == 0
+    assert provider_cached_tokens(1024) == 1024
+    assert provider_cached_tokens(1151) == 1024
+    assert provider_cached_tokens(1300) == 1280
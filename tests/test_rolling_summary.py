@@ -0,0 +1,67 @@
+from src.rolling_summary import RollingSummarizer, estimate_tokens
+
+
+class CountingSummaries:
+    """Stand-in for query_openai that records each call and returns a short summary."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, messages, call_site=None, **kwargs):
+        self.calls.append(call_site)
+        return f"summary {len(self.calls)} of {messages[-1]['content'].splitlines()[0][:40]}"
+
+
+def _history(n, start=0):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "text": f"turn {i} about missed appointments",
+             "timestamp": f"2026-01-01T00:{i:02d}:00"} for i in range(start, start + n)]
+
+
+def test_turns_fold_into_chunks_and_session_summary():
+    complete = CountingSummaries()
+    summarizer = RollingSummarizer(complete=complete, chunk_turns=4, keep_recent=2, detail_chunks=1)
+    summarizer.update(_history(6))
+    assert len(summarizer.state["chunks"]) == 1 and len(summarizer.state["turns"]) == 2
+    summarizer.update(_history(14))
+    assert len(summarizer.state["chunks"]) == 3
+    assert summarizer.state["session"]["covers"] == 2
+    assert complete.calls.count("rolling_summary_chunk") == 3
+    assert complete.calls.count("rolling_summary_session") == 1
+
+
+def test_only_changed_chunks_are_resummarized():
+    complete = CountingSummaries()
+    summarizer = RollingSummarizer(complete=complete, chunk_turns=4, keep_recent=2, detail_chunks=1)
+    history = _history(14)
+    summarizer.update(history)
+    calls = len(complete.calls)
+    assert summarizer.update(history)["chunks_summarized"] == []
+    assert len(complete.calls) == calls
+
+    history[5] = {**history[5], "text": "turn 5 now says patients forget follow-up scans"}
+    result = summarizer.update(history)
+    assert result["chunks_summarized"] == [1] and result["session_rebuilt"]
+
+
+def test_cleared_history_keeps_long_range_context():
+    summarizer = RollingSummarizer(complete=CountingSummaries(), chunk_turns=4, keep_recent=2, detail_chunks=1)
+    summarizer.update(_history(14))
+    summarizer.update([])  # e.g. history reset on a phase change
+    context = summarizer.context(_history(2, start=14))
+    assert context.startswith("Conversation so far:") and "turn 15" in context
+
+
+def test_context_respects_token_budget():
+    summarizer = RollingSummarizer(complete=CountingSummaries(), chunk_turns=2, keep_recent=0, detail_chunks=5)
+    summarizer.update(_history(20))
+    full = summarizer.context()
+    trimmed = summarizer.context(token_budget=40)
+    assert estimate_tokens(trimmed) <= 40 < estimate_tokens(full)
+
+
+def test_schedule_runs_in_background():
+    complete = CountingSummaries()
+    summarizer = RollingSummarizer(complete=complete, chunk_turns=4, keep_recent=2)
+    summarizer.schedule(_history(10))
+    summarizer.wait(timeout=5)
+    assert len(summarizer.state["chunks"]) == 2 and summarizer.stats["updates"] == 1
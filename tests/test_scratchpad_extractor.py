@@ -0,0 +1,78 @@
+import pytest
+
+from src.utils.scratchpad_extractor import (
+    EXTRACTION_ENGINE, LLMExtractionGate, extraction_score, flush_pending_extraction, update_scratchpad,
+)
+
+
+@pytest.fixture(autouse=True)
+def offline_llm(fake_backend):
+    fake_backend.responses = ['{"problem": "missed follow-ups"}']
+    return fake_backend
+
+
+def test_extracts_several_keys_in_one_message():
+    message = "The problem is that patients miss scans. Our solution is an SMS assistant. We will reach customers through radiology groups."
+    extracted = EXTRACTION_ENGINE.extract(message)
+    assert extracted["problem"] == "patients miss scans"
+    assert extracted["solution"] == "an SMS assistant"
+    assert extracted["channels"] == "radiology groups"
+
+
+def test_unique_benefit_rules_are_not_shadowed():
+    # These rules used to be lost to a duplicate "main_benefit" dict key.
+    assert EXTRACTION_ENGINE.extract("Our unique benefit is same-day booking.")["main_benefit"] == "same-day booking"
+
+
+def test_rules_without_value_group_do_not_crash():
+    assert EXTRACTION_ENGINE.extract("We track one KPI")["main_benefit"] == "KPI"
+    assert EXTRACTION_ENGINE.extract("Our go-to-market plan")["channels"] == "go-to-market"
+
+
+def test_prefilter_skips_messages_without_triggers():
+    assert EXTRACTION_ENGINE.find_triggers("msg12") == set()
+    assert EXTRACTION_ENGINE.extract("msg12") == {}
+
+
+def test_update_scratchpad_keeps_filled_keys():
+    scratchpad = {"problem": "already set"}
+    updated = update_scratchpad("The problem is something else. Our product is a chatbot.", scratchpad)
+    assert updated["problem"] == "already set"
+    assert updated["solution"] == "a chatbot"
+    assert scratchpad == {"problem": "already set"}
+
+
+def test_generic_replies_score_zero():
+    for message in ["ok", "Sounds good!", "msg12", "yes please"]:
+        assert extraction_score(message) == 0.0
+    assert extraction_score("Our clinic patients miss 30% of follow-up appointments after discharge.") >= 1.5
+
+
+def test_update_scratchpad_skips_llm_for_low_signal_message(offline_llm):
+    update_scratchpad("ok", {})
+    assert offline_llm.call_count == 0
+
+
+def test_gate_batches_llm_calls(offline_llm):
+    gate = LLMExtractionGate({}, batch_size=2)
+    scratchpad = {}
+    messages = ["sure", "Nurses spend hours chasing patients for follow-up visits.",
+                "Most clinics lose revenue when patients do not return for care."]
+    for message in messages:
+        scratchpad = update_scratchpad(message, scratchpad, gate=gate)
+
+    assert offline_llm.call_count == 1
+    assert scratchpad["problem"] == "missed follow-ups"
+    report = gate.report()
+    assert report["messages"] == 3 and report["gated_out"] == 1
+    assert report["llm_calls"] == 1 and report["llm_calls_saved"] == 2
+    assert report["extraction_rate"] == 1.0
+
+
+def test_flush_extracts_pending_messages(offline_llm):
+    gate = LLMExtractionGate({}, batch_size=5)
+    scratchpad = update_scratchpad("Caregivers struggle to coordinate home care schedules.", {}, gate=gate)
+    assert offline_llm.call_count == 0 and gate.state["pending"]
+    scratchpad = flush_pending_extraction(scratchpad, gate)
+    assert offline_llm.call_count == 1 and not gate.state["pending"]
+    assert scratchpad["problem"] == "missed follow-ups"
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from src.core import tracing
+from src.trace_report import aggregate, collapsed_stacks, format_flame, load_spans, turn_breakdowns
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracing.set_exporter(tracing.FileSpanExporter(str(path)))
+    yield path
+    tracing.set_exporter(None)
+
+
+@tracing.traced()
+async def fake_search(query):
+    with tracing.span("http_request"):
+        return [query]
+
+
+def test_spans_nest_and_carry_turn_ids(trace_file):
+    turn = tracing.start_turn("session-1", 3, phase="problem")
+    with tracing.span("handle_response") as outer:
+        outer.set("intent", "provide_detail")
+        with tracing.span("query_openai", call_site="micro_validate"):
+            pass
+        asyncio.run(fake_search("clinics"))
+    with pytest.raises(ValueError):
+        with tracing.span("save_session"):
+            raise ValueError("disk full")
+    turn.end()
+    assert tracing.current_span() is None
+    assert tracing.flush_spans()
+
+    spans = {s["name"]: s for s in load_spans(str(trace_file))}
+    assert {s["trace_id"] for s in spans.values()} == {spans["turn"]["trace_id"]}
+    assert spans["query_openai"]["parent_id"] == spans["handle_response"]["span_id"]
+    assert spans["http_request"]["parent_id"] == spans["fake_search"]["span_id"]
+    assert spans["save_session"]["error"] == "ValueError: disk full"
+    assert all(s["session_id"] == "session-1" and s["turn_id"] == 3 for s in spans.values())
+    assert spans["handle_response"]["attrs"] == {"intent": "provide_detail"}
+
+
+def test_rerun_joins_the_turn_trace(trace_file):
+    state = {}
+    turn = tracing.start_turn("session-1", 1)
+    turn.end()
+    tracing.mark_rerun(state, turn)
+
+    tracing.resume_rerun(state)  # next script run
+    with tracing.span("enter"):
+        pass
+    tracing.finish_rerun(state)
+    assert tracing.RERUN_KEY not in state
+    tracing.flush_spans()
+
+    [breakdown] = turn_breakdowns(load_spans(str(trace_file)))
+    assert [root["name"] for root in breakdown["roots"]] == ["turn", "streamlit_rerun"]
+    assert [child["name"] for child in breakdown["roots"][1]["children"]] == ["enter"]
+    assert "streamlit_rerun" in format_flame(breakdown)
+    assert any(line.startswith("streamlit_rerun;enter ") for line in collapsed_stacks([breakdown]))
+    assert {row["span"] for row in aggregate([breakdown])} == {"turn", "streamlit_rerun", "enter"}
+
+
+def test_disabled_tracing_is_a_no_op(tmp_path):
+    tracing.set_exporter(None)
+    state = {}
+    with tracing.span("anything") as s:
+        s.set("key", "value")
+    turn = tracing.start_turn("session-1", 1)
+    turn.end()
+    tracing.mark_rerun(state, turn)
+    assert state == {} and tracing.current_span() is None
+
+
+def test_otlp_payload_shape():
+    record = {"name": "query_openai", "trace_id": "a" * 32, "span_id": "b" * 16, "parent_id": "c" * 16,
+              "session_id": "s", "turn_id": 2, "start_ns": 1, "end_ns": 5, "attrs": {"cached": True}, "error": "Timeout"}
+    otlp_span = tracing.otlp_payload([record])["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert otlp_span["parentSpanId"] == "c" * 16
+    assert otlp_span["endTimeUnixNano"] == "5"
+    assert {"key": "turn.id", "value": {"intValue": "2"}} in otlp_span["attributes"]
+    assert {"key": "cached", "value": {"boolValue": True}} in otlp_span["attributes"]
+    assert otlp_span["status"]["code"] == 2
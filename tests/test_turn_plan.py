@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from src.llm_backends import FakeBackend, set_backend
+from src.personas.coach import CoachPersona, parse_turn_plan
+
+PLAN = {
+    "paraphrase": "You're zeroing in on missed follow-up scans.",
+    "coaching": "Quantifying how often this happens will make the problem compelling.",
+    "follow_up_question": "How many scans are missed each month",
+    "short_summary": "Patients miss follow-up scans.",
+}
+
+
+@pytest.fixture
+def backend():
+    def use(responses):
+        fake = FakeBackend(responses=responses, sleep=False)
+        set_backend(fake)
+        return fake
+    yield use
+    set_backend(None)
+
+
+def test_parse_turn_plan_accepts_fenced_json_and_rejects_incomplete():
+    plan = parse_turn_plan("```json\n" + json.dumps(PLAN) + "\n```")
+    assert plan["follow_up_question"].endswith("?")
+    assert parse_turn_plan(json.dumps({**PLAN, "coaching": ""})) is None
+    assert parse_turn_plan("Sure! Here is my answer.") is None
+
+
+def test_plan_turn_uses_one_call(backend):
+    fake = backend([json.dumps(PLAN)])
+    persona = CoachPersona()
+    plan = persona.plan_turn("Patients keep missing their follow-up scans", "problem", {"problem": "missed scans"})
+    assert plan["source"] == "plan" and fake.call_count == 1
+    reply = persona.compose_turn_reply(plan, "Patients keep missing their follow-up scans")
+    assert reply.startswith(PLAN["paraphrase"]) and reply.endswith("?") and reply.count("?") == 1
+
+
+def test_plan_turn_falls_back_to_per_method_calls(backend):
+    fake = backend(["That is a solid direction to explore further."])
+    plan = CoachPersona().plan_turn("Patients keep missing their follow-up scans", "problem")
+    assert plan["source"] == "fallback"
+    assert fake.call_count == 5  # the plan attempt + paraphrase, coaching, follow-up, summary
+    assert all(plan[field] for field in ("paraphrase", "coaching", "follow_up_question"))
@@ -0,0 +1,104 @@
+import threading
+
+import pytest
+
+from src import usage_ledger
+from src.brainstorm import BrainstormEngine
+from src.llm_routing import complete_with_route
+from src.personas.coach import CoachPersona
+from src.usage_ledger import DailyTokenCapExceeded, UsageLedger
+from tests.test_llm_routing import RecordingBackend
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = UsageLedger(str(tmp_path / "usage.sqlite"), daily_cap=0)
+    usage_ledger.set_ledger(ledger)
+    yield ledger
+    usage_ledger.set_ledger(None)
+
+
+def test_aggregates_follow_events(ledger):
+    day = usage_ledger.utc_day()
+    ledger.record("summary", "gpt-4o-mini", 100, 20, 0.01, session_id="a")
+    ledger.record("summary", "gpt-4o-mini", 50, 10, 0.005, session_id="b")
+    ledger.record("coaching", "gpt-4o", 200, 80, 0.2, session_id="a")
+    ledger.record("coaching", "gpt-4o", 10, 10, 0.0, session_id="a", ts=0)  # 1970-01-01
+
+    assert ledger.day_tokens() == 460
+    assert ledger.session_tokens("a", day) == 400
+    assert ledger.session_tokens("a") == 420
+    by_site = {row["call_site"]: row for row in ledger.report(by="call_site", since=day)}
+    assert by_site["summary"]["calls"] == 2 and by_site["summary"]["total_tokens"] == 180
+    assert by_site["coaching"]["cost_usd"] == 0.2
+    assert [row["day"] for row in ledger.report(by="day")] == [day, "1970-01-01"]
+    [only_b] = ledger.report(by="call_site", session_id="b")
+    assert only_b["prompt_tokens"] == 50
+    assert "summary" in usage_ledger.format_report(ledger.report(by="call_site"))
+
+
+def test_routed_calls_are_recorded_with_the_bound_session(ledger):
+    token = usage_ledger.bind_session("session-7")
+    try:
+        complete_with_route(RecordingBackend(), [{"role": "user", "content": "hi"}], call_site="active_listening")
+    finally:
+        usage_ledger._session_id.reset(token)
+    [row] = ledger.report(by="session")
+    assert row["session"] == "session-7" and row["calls"] == 1 and row["prompt_tokens"] >= 100
+
+
+def test_brainstorm_candidates_are_recorded_with_the_bound_session(ledger, fake_backend):
+    token = usage_ledger.bind_session("sess-42")
+    try:
+        texts = BrainstormEngine(candidates=3, latency_budget=5).generate_candidates(
+            [{"role": "user", "content": "ideas?"}], call_site="brainstorm")
+    finally:
+        usage_ledger._session_id.reset(token)
+    assert len(texts) == 3
+    [row] = ledger.report(by="session")
+    assert row["session"] == "sess-42" and row["calls"] == 3
+
+
+def test_daily_cap_is_global_and_atomic(ledger):
+    ledger.daily_cap = 1000
+    ledger.record("summary", "gpt-4o-mini", 600, 0, session_id="other-session")
+    admitted = []
+
+    def worker():
+        admitted.append(ledger.reserve(100))
+
+    threads = [threading.Thread(target=worker) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert admitted.count(True) == 4  # 600 recorded + 4 x 100 in flight fills the cap
+    for _ in range(4):
+        ledger.release(100)
+
+    ledger.daily_cap = 650
+    backend = RecordingBackend()
+    with pytest.raises(DailyTokenCapExceeded):
+        complete_with_route(backend, [{"role": "user", "content": "x" * 400}], call_site="active_listening")
+    assert backend.calls == []
+
+
+def test_daily_cap_reaches_the_app_instead_of_persona_fallbacks(ledger, fake_backend):
+    ledger.daily_cap = 10
+    ledger.record("summary", "gpt-4o-mini", 10, 0, session_id="other-session")
+    with pytest.raises(DailyTokenCapExceeded):
+        CoachPersona().active_listening("Clinics lose revenue on missed scans.")
+    with pytest.raises(DailyTokenCapExceeded):
+        BrainstormEngine(candidates=2, latency_budget=5).generate_candidates(
+            [{"role": "user", "content": "ideas?"}], call_site="brainstorm")
+    assert fake_backend.call_count == 0
+
+
+def test_daily_total_includes_calls_recorded_by_other_processes(ledger):
+    other = UsageLedger(ledger.path, daily_cap=0)  # Another server process sharing the file
+    ledger.daily_cap = 1000
+    ledger.record("summary", "gpt-4o-mini", 100, 0)
+    other.record("summary", "gpt-4o-mini", 800, 0)
+    ledger.record("coaching", "gpt-4o", 50, 0)
+    assert ledger.day_tokens() == 950
+    assert not ledger.reserve(100)